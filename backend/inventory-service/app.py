@@ -5,8 +5,14 @@ import os
 from flask import Flask
 from flasgger import Swagger
 from middleware.error_handler import register_error_handlers
+from middleware.request_profiler import register_request_profiler
+from middleware.request_tracing import register_request_tracing
+from middleware.compression import register_response_compression
+from middleware.request_deadline import register_request_deadline
+from middleware.traffic_capture import register_traffic_capture
 from exceptions.api_exceptions import APIException
 from routes.invetory_routes import inventory_bp
+from routes.metrics_routes import metrics_bp
 from db.db_connection import DBConnection
 
 def create_app() -> Flask:
@@ -25,8 +31,16 @@ def create_app() -> Flask:
     swagger = Swagger(app, template_file='config/swagger.yaml')
 
     register_error_handlers(app)
+    # Primero: el span raíz debe existir antes que los demás hooks (y sus errores) de la solicitud.
+    register_request_tracing(app)
+    register_request_profiler(app)
+    register_response_compression(app)
+    register_request_deadline(app)
+    # Después de la compresión: su after_request corre antes y ve el cuerpo sin comprimir.
+    register_traffic_capture(app)
 
     app.register_blueprint(inventory_bp)
+    app.register_blueprint(metrics_bp)
 
     return app
 
@@ -0,0 +1,116 @@
+"""
+Benchmark del costo por consulta de los drivers de MySQL (pymysql vs mysqlclient).
+
+Ejecuta las sentencias de InventoryRepository sobre una única conexión persistente por
+driver (sin pool, para medir solo el driver: escape de parámetros, protocolo y decodificación
+de filas a dict) y reporta throughput y percentiles por sentencia. Las escrituras se
+deshacen con rollback, por lo que el inventario no cambia.
+Requiere MySQL accesible con la configuración del .env.
+
+Uso (desde inventory-service/):
+    python -m benchmarks.bench_db_drivers --iterations 2000
+    python -m benchmarks.bench_db_drivers --drivers pymysql --batch-size 1000
+"""
+import argparse
+import os
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from benchmarks.bench_utils import print_table, summarize_latencies
+from db.drivers import SUPPORTED_DRIVERS, load_driver
+from models.inventory_table import InventoryRepository
+
+
+class _BenchConnection:
+    """
+    Conexión persistente compartida entre llamadas: el repositorio la "cierra" tras cada
+    método (no-op) y sus commits se convierten en rollback para no modificar el inventario.
+    """
+
+    def __init__(self, connection: Any) -> None:
+        self._connection = connection
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+    def commit(self) -> None:
+        self._connection.rollback()
+
+    def close(self) -> None:
+        pass
+
+
+class _SingleConnection:
+    """Sustituye a DBConnection entregando siempre la misma conexión."""
+
+    def __init__(self, connection: Any) -> None:
+        self._connection = _BenchConnection(connection)
+
+    def get_connection(self) -> Any:
+        return self._connection
+
+
+def build_statements(repository: InventoryRepository, args: argparse.Namespace) -> List[Tuple[str, Callable[[], Any]]]:
+    product_id = args.product_ids[0]
+    batch_ids = [args.product_ids[i % len(args.product_ids)] + (i // len(args.product_ids)) * 100000
+                 for i in range(args.batch_size)]
+    return [
+        ("get_inventory_by_product_id", lambda: repository.get_inventory_by_product_id(product_id)),
+        (f"get_inventory_by_product_ids[{args.batch_size}]", lambda: repository.get_inventory_by_product_ids(batch_ids)),
+        ("decrease_inventory_stock (rollback)", lambda: repository.decrease_inventory_stock(product_id, 1)),
+        ("update_inventory_stock (rollback)", lambda: repository.update_inventory_stock(product_id, 10)),
+    ]
+
+
+def run_driver(driver_name: str, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    driver = load_driver(driver_name)
+    if driver.name != driver_name:
+        print(f"[omitido] {driver_name}: no está instalado.")
+        return []
+
+    connection = driver.module.connect(**driver.connect_kwargs(
+        os.environ.get('MYSQL_HOST', 'localhost'), os.environ.get('MYSQL_USER'),
+        os.environ.get('MYSQL_PASSWORD'), os.environ.get('MYSQL_DATABASE'),
+    ))
+    repository = InventoryRepository(_SingleConnection(connection))
+
+    rows = []
+    try:
+        for label, call in build_statements(repository, args):
+            for _ in range(args.warmup):
+                call()
+            latencies: List[float] = []
+            started = time.monotonic()
+            for _ in range(args.iterations):
+                t0 = time.perf_counter()
+                call()
+                latencies.append((time.perf_counter() - t0) * 1000)
+            rows.append({"driver": driver_name, "statement": label,
+                         **summarize_latencies(latencies, time.monotonic() - started)})
+    finally:
+        connection.rollback()
+        connection.close()
+    return rows
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drivers", default=",".join(SUPPORTED_DRIVERS))
+    parser.add_argument("--iterations", type=int, default=1000, help="Ejecuciones medidas por sentencia")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=500, help="IDs en la consulta IN por lotes")
+    parser.add_argument("--product-ids", type=lambda v: [int(x) for x in v.split(",")], default=[101, 102, 103, 104])
+    args = parser.parse_args()
+
+    rows: List[Dict[str, Any]] = []
+    for driver_name in args.drivers.split(","):
+        rows.extend(run_driver(driver_name, args))
+    if rows:
+        print_table(rows, ["driver", "statement", "requests", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+
+
+if __name__ == "__main__":
+    main()
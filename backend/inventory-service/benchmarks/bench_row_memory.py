@@ -0,0 +1,80 @@
+"""
+Benchmark de memoria y presión de GC de las lecturas masivas de inventario (sin base de datos).
+
+Compara, para N product_ids, las estructuras que produce cada forma de lectura:
+  - dict_rows + stock_map: filas de DictCursor y el mapa construido encima (camino anterior).
+  - records: InventoryRecord (__slots__) desde un cursor de tuplas.
+  - tuple stock_map: dict(cursor.fetchall()) sobre tuplas (product_id, available_stock).
+Las filas del cursor se simulan con los mismos tipos que retorna el driver.
+
+Uso (desde inventory-service/):
+    python -m benchmarks.bench_row_memory --ids 1000 --repeat 200
+"""
+import argparse
+import datetime
+import gc
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from benchmarks.bench_utils import print_table
+from models.inventory_record import INVENTORY_RECORD_COLUMNS, InventoryRecord
+
+
+def make_tuple_rows(count: int) -> List[tuple]:
+    now = datetime.datetime(2025, 11, 13, 10, 0, 0)
+    return [(i, 100000 + i, i % 500, f"Warehouse {i % 7:02d}", now, i % 13, None, 0) for i in range(count)]
+
+
+def dict_rows_with_stock_map(rows: List[tuple]) -> Any:
+    # Lo que entrega DictCursor (un dict por fila) más el stock_map que se construía encima.
+    dict_rows = [dict(zip(INVENTORY_RECORD_COLUMNS, row)) for row in rows]
+    stock_map = {item["product_id"]: item["available_stock"] for item in dict_rows}
+    return dict_rows, stock_map
+
+
+def slotted_records(rows: List[tuple]) -> Any:
+    return [InventoryRecord.from_row(row) for row in rows]
+
+
+def tuple_stock_map(rows: List[tuple]) -> Any:
+    pairs = [(row[1], row[2]) for row in rows]  # SELECT product_id, available_stock
+    return dict(pairs)
+
+
+def measure(build: Callable[[List[tuple]], Any], rows: List[tuple], repeat: int) -> Dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    result = build(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    gc.collect()
+    collections_before = sum(stat["collections"] for stat in gc.get_stats())
+    started = time.perf_counter()
+    for _ in range(repeat):
+        build(rows)
+    elapsed = time.perf_counter() - started
+    collections = sum(stat["collections"] for stat in gc.get_stats()) - collections_before
+    return {"peak_kib": peak / 1024, "us_per_call": elapsed / repeat * 1e6, "gc_collections": collections}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ids", type=int, default=1000, help="product_ids por consulta")
+    parser.add_argument("--repeat", type=int, default=200, help="Repeticiones para tiempo y conteo de GC")
+    args = parser.parse_args()
+
+    rows = make_tuple_rows(args.ids)
+    variants = [
+        ("dict_rows + stock_map", dict_rows_with_stock_map),
+        ("records (__slots__)", slotted_records),
+        ("tuple stock_map", tuple_stock_map),
+    ]
+    table = [{"variant": name, **measure(build, rows, args.repeat)} for name, build in variants]
+    print_table(table, ["variant", "peak_kib", "us_per_call", "gc_collections"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Utilidades compartidas por los scripts de benchmark (estadísticas de latencia y formato)."""
+import math
+from typing import Dict, List, Sequence
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Percentil por rango más cercano sobre una lista YA ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize_latencies(latencies_ms: List[float], elapsed_seconds: float, errors: int = 0) -> Dict[str, float]:
+    """Resume una corrida: throughput, errores y percentiles de latencia en milisegundos."""
+    ordered = sorted(latencies_ms)
+    total = len(ordered) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": total / elapsed_seconds if elapsed_seconds > 0 else 0.0,
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": ordered[-1] if ordered else 0.0,
+    }
+
+
+def print_table(rows: List[Dict[str, object]], columns: List[str]) -> None:
+    """Imprime una tabla alineada con las columnas indicadas."""
+    def fmt(value: object) -> str:
+        return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+    widths = {c: max(len(c), *(len(fmt(r.get(c, ''))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    print("  ".join("-" * widths[c] for c in columns))
+    for row in rows:
+        print("  ".join(fmt(row.get(c, '')).ljust(widths[c]) for c in columns))
@@ -0,0 +1,138 @@
+"""
+Benchmark de clases de worker de Gunicorn (sync, gthread, gevent) para las rutas de inventario.
+
+Levanta Gunicorn con gunicorn.conf.py para cada clase de worker, genera carga concurrente
+contra las rutas de lectura (y opcionalmente /purchase) y reporta throughput y percentiles.
+Requiere MySQL y Products Service accesibles con la configuración del .env.
+
+Uso (desde inventory-service/):
+    python -m benchmarks.bench_worker_classes --duration 20 --concurrency 64
+    python -m benchmarks.bench_worker_classes --worker-classes sync,gthread --include-purchase
+"""
+import argparse
+import importlib.util
+import itertools
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import requests
+
+from benchmarks.bench_utils import print_table, summarize_latencies
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_request_mix(args: argparse.Namespace) -> List[Tuple[str, str, Dict]]:
+    """Mezcla de solicitudes (método, ruta, cuerpo JSON) que se recorre cíclicamente."""
+    mix: List[Tuple[str, str, Dict]] = []
+    for product_id in args.product_ids:
+        mix.append(("GET", f"/api/v1/inventory/{product_id}", {}))
+    mix.append(("GET", f"/api/v1/inventory/products-with-stock?page=1&limit={args.page_limit}", {}))
+    if args.include_purchase:
+        mix.append(("POST", "/api/v1/inventory/purchase", {"product_id": args.product_ids[0], "quantity": 1}))
+    return mix
+
+
+def start_gunicorn(worker_class: str, args: argparse.Namespace) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "GUNICORN_WORKER_CLASS": worker_class,
+        "GUNICORN_BIND": f"127.0.0.1:{args.port}",
+        "GUNICORN_WORKERS": str(args.workers),
+        "GUNICORN_THREADS": str(args.threads),
+        "GUNICORN_ACCESS_LOG": "/dev/null",
+    })
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:create_app()"],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_ready(base_url: str, timeout_seconds: float = 20) -> None:
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{base_url}/swagger-inventory/", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"Gunicorn no respondió en {base_url} tras {timeout_seconds}s")
+
+
+def run_load(base_url: str, mix: List[Tuple[str, str, Dict]], args: argparse.Namespace) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + args.duration
+
+    def client(seed: int) -> None:
+        session = requests.Session()
+        requests_cycle = itertools.cycle(random.Random(seed).sample(mix, len(mix)))
+        local_latencies: List[float] = []
+        local_errors = 0
+        while time.monotonic() < stop_at:
+            method, path, body = next(requests_cycle)
+            started = time.perf_counter()
+            try:
+                response = session.request(method, base_url + path, json=body or None, timeout=10)
+                ok = response.status_code < 500
+            except requests.RequestException:
+                ok = False
+            if ok:
+                local_latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.monotonic()
+    clients = [threading.Thread(target=client, args=(i,)) for i in range(args.concurrency)]
+    for t in clients:
+        t.start()
+    for t in clients:
+        t.join()
+    return summarize_latencies(latencies, time.monotonic() - started, errors[0])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--worker-classes", default="sync,gthread,gevent")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4, help="Hilos por worker (solo gthread)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Clientes concurrentes")
+    parser.add_argument("--duration", type=float, default=15, help="Segundos de carga por clase")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--page-limit", type=int, default=10)
+    parser.add_argument("--product-ids", type=lambda v: [int(x) for x in v.split(",")], default=[101, 102, 103, 104])
+    parser.add_argument("--include-purchase", action="store_true", help="Incluye POST /purchase (modifica stock)")
+    args = parser.parse_args()
+
+    mix = build_request_mix(args)
+    base_url = f"http://127.0.0.1:{args.port}"
+    rows = []
+    for worker_class in args.worker_classes.split(","):
+        if worker_class == "gevent" and importlib.util.find_spec("gevent") is None:
+            print(f"[omitido] {worker_class}: instale gevent para incluirlo en la comparación.")
+            continue
+        process = start_gunicorn(worker_class, args)
+        try:
+            wait_until_ready(base_url)
+            print(f"[corriendo] {worker_class}: {args.concurrency} clientes durante {args.duration}s ...")
+            rows.append({"worker_class": worker_class, **run_load(base_url, mix, args)})
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait(timeout=30)
+
+    if rows:
+        print_table(rows, ["worker_class", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+
+
+if __name__ == "__main__":
+    main()
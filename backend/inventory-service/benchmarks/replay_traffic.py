@@ -0,0 +1,204 @@
+"""
+Replay del tráfico capturado con TRAFFIC_CAPTURE_ENABLED (middleware/traffic_capture.py).
+
+Lee los archivos `traffic-*.jsonl` (incluidos los rotados), los ordena por instante de
+llegada y reproduce cada solicitud contra uno o dos stacks locales de inventario:
+    - a la velocidad original (--speed 1), N veces más rápido (--speed N) o sin esperas (--speed max);
+    - con --compare, contra un segundo build, para comparar latencias y respuestas.
+Reporta percentiles de latencia por ruta y las solicitudes cuyo estado o huella de respuesta
+difieren (entre los dos builds o, con un solo build, respecto de lo capturado).
+
+Las compras y los PUT modifican el stock: para que la comparación sea determinista cada
+stack debe partir de los mismos datos (--reset-command se ejecuta antes de cada corrida)
+y conviene --concurrency 1 con --speed max, para conservar el orden.
+
+Uso (desde inventory-service/):
+    python -m benchmarks.replay_traffic logs/traffic/traffic-*.jsonl* --target http://127.0.0.1:8002
+    python -m benchmarks.replay_traffic capture/*.jsonl* --target http://127.0.0.1:8002 \\
+        --compare http://127.0.0.1:8102 --speed 4 --reset-command "./reset_db.sh"
+"""
+import argparse
+import json
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from benchmarks.bench_utils import print_table, summarize_latencies
+from middleware.traffic_capture import VOLATILE_FIELDS, response_fingerprint
+
+
+def load_trace(paths: List[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Lee los registros de captura de todos los archivos, ordenados por instante de llegada."""
+    records: List[Dict[str, Any]] = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as trace_file:
+            records.extend(json.loads(line) for line in trace_file if line.strip())
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+
+def parse_speed(value: str) -> Optional[float]:
+    """'max' -> None (sin esperas); un número > 0 -> factor de velocidad."""
+    if value == "max":
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("--speed debe ser > 0 o 'max'.")
+    return speed
+
+
+def replay(
+    records: List[Dict[str, Any]],
+    base_url: str,
+    speed: Optional[float],
+    concurrency: int,
+    timeout: float,
+    ignored_fields: frozenset
+) -> List[Dict[str, Any]]:
+    """
+    Reproduce los registros contra `base_url` y retorna un resultado por registro (en el mismo
+    orden): estado, latencia en ms y huella de la respuesta, o el error de conexión.
+    """
+    results: List[Dict[str, Any]] = [{} for _ in records]
+    local = threading.local()
+
+    def send(index: int, record: Dict[str, Any]) -> None:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        body = record.get("body")
+        started = time.perf_counter()
+        try:
+            response = session.request(
+                record["method"], base_url + record["path"], params=record.get("query") or None,
+                headers=record.get("headers") or {}, timeout=timeout,
+                json=body if isinstance(body, (dict, list)) else None,
+                data=body if isinstance(body, str) else None,
+            )
+            content = response.content  # Lee también las respuestas en streaming
+            results[index] = {
+                "status": response.status_code,
+                "latency_ms": (time.perf_counter() - started) * 1000,
+                "response_hash": response_fingerprint(content, ignored_fields),
+            }
+        except requests.RequestException as e:
+            results[index] = {"status": None, "latency_ms": None, "error": str(e)}
+
+    first_ts = records[0]["ts"] if records else 0.0
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for index, record in enumerate(records):
+            if speed is not None:
+                delay = started + (record["ts"] - first_ts) / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(send, index, record)
+    return results
+
+
+def summarize_by_route(records: List[Dict[str, Any]], results: List[Dict[str, Any]], label: str) -> List[Dict[str, Any]]:
+    """Percentiles de latencia por ruta (plantilla de Flask) y cantidad de errores 5xx o de conexión."""
+    by_route: Dict[str, Dict[str, Any]] = {}
+    for record, result in zip(records, results):
+        route = f"{record['method']} {record.get('route') or record['path']}"
+        bucket = by_route.setdefault(route, {"latencies": [], "errors": 0})
+        if result.get("status") is None or result["status"] >= 500:
+            bucket["errors"] += 1
+        else:
+            bucket["latencies"].append(result["latency_ms"])
+    rows = []
+    for route, bucket in sorted(by_route.items()):
+        summary = summarize_latencies(bucket["latencies"], 1.0, bucket["errors"])
+        summary.pop("rps")
+        rows.append({"build": label, "route": route, **summary})
+    return rows
+
+
+def find_mismatches(
+    records: List[Dict[str, Any]],
+    results: List[Dict[str, Any]],
+    baseline: Optional[List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Solicitudes cuyo estado o huella difieren de la línea base: el primer build, o lo capturado
+    en producción si no hay segundo build (las respuestas en streaming no tienen huella capturada).
+    """
+    mismatches = []
+    for index, (record, result) in enumerate(zip(records, results)):
+        expected = baseline[index] if baseline is not None else record
+        expected_hash = expected.get("response_hash")
+        if result.get("status") != expected.get("status") or (
+            expected_hash is not None and result.get("response_hash") != expected_hash
+        ):
+            mismatches.append({
+                "index": index, "method": record["method"], "path": record["path"],
+                "expected_status": expected.get("status"), "status": result.get("status"),
+                "expected_hash": expected_hash, "response_hash": result.get("response_hash"),
+            })
+    return mismatches
+
+
+def run_target(label: str, base_url: str, records: List[Dict[str, Any]], args: argparse.Namespace) -> List[Dict[str, Any]]:
+    if args.reset_command:
+        print(f"[{label}] Reiniciando datos: {args.reset_command}")
+        subprocess.run(args.reset_command, shell=True, check=True)
+    print(f"[{label}] Reproduciendo {len(records)} solicitudes contra {base_url} (speed={args.speed or 'max'})")
+    started = time.monotonic()
+    results = replay(records, base_url, args.speed, args.concurrency, args.timeout, args.ignored_fields)
+    print(f"[{label}] Terminado en {time.monotonic() - started:.1f}s")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", nargs="+", help="Archivos de captura (traffic-*.jsonl y rotados)")
+    parser.add_argument("--target", required=True, help="URL base del build a medir")
+    parser.add_argument("--compare", help="URL base de un segundo build para comparar")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="Factor de velocidad (1, N) o 'max'")
+    parser.add_argument("--concurrency", type=int, default=32, help="Solicitudes en vuelo como máximo")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--limit", type=int, help="Reproduce solo las primeras N solicitudes")
+    parser.add_argument("--reset-command", help="Comando de shell que restaura los datos antes de cada corrida")
+    parser.add_argument("--ignore-fields", default=",".join(sorted(VOLATILE_FIELDS)),
+                        help="Campos JSON excluidos al comparar respuestas")
+    parser.add_argument("--report", help="Archivo JSON con los resultados por solicitud y las diferencias")
+    parser.add_argument("--show-mismatches", type=int, default=10)
+    args = parser.parse_args()
+    args.ignored_fields = frozenset(field for field in args.ignore_fields.split(",") if field)
+
+    records = load_trace(args.traces, args.limit)
+    if not records:
+        print("La captura no tiene solicitudes.")
+        return
+
+    results_a = run_target("A", args.target, records, args)
+    results_b = run_target("B", args.compare, records, args) if args.compare else None
+
+    rows = summarize_by_route(records, results_a, "A")
+    if results_b is not None:
+        rows.extend(summarize_by_route(records, results_b, "B"))
+        rows.sort(key=lambda row: (row["route"], row["build"]))
+    print_table(rows, ["route", "build", "requests", "errors", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+
+    if results_b is not None:
+        mismatches, reference = find_mismatches(records, results_b, results_a), "A vs B"
+    else:
+        mismatches, reference = find_mismatches(records, results_a, None), "captura vs A"
+    print(f"\nRespuestas distintas ({reference}): {len(mismatches)} de {len(records)}")
+    for mismatch in mismatches[:args.show_mismatches]:
+        print(f"  #{mismatch['index']} {mismatch['method']} {mismatch['path']}: "
+              f"{mismatch['expected_status']} -> {mismatch['status']} "
+              f"({mismatch['expected_hash']} -> {mismatch['response_hash']})")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as report_file:
+            json.dump({"summary": rows, "mismatches": mismatches, "results_a": results_a, "results_b": results_b},
+                      report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from cache.negative_lookup_cache import NegativeLookupCache
+from cache.page_prefetcher import PagePrefetcher
+from metrics.registry import metrics_registry
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+cache_snapshot_operations_total = metrics_registry.counter(
+    "inventory_cache_snapshot_operations_total",
+    "Operaciones sobre el snapshot de cachés por tipo (dump/load/revalidate) y resultado."
+)
+
+
+class CacheSnapshotter:
+    """
+    Persiste las cachés de lectura del servicio (caché negativa de product_id sin inventario
+    y páginas prefetcheadas de /products-with-stock) en un snapshot JSON comprimido con gzip,
+    para que un worker nuevo arranque con ellas en lugar de vacías.
+
+    `dump` guarda cada entrada con su vida restante y la marca del inventario
+    (`get_inventory_watermark`, que cambia con toda escritura, incluidas las eliminaciones y
+    varias en el mismo segundo). `load` restaura las entradas que no hayan expirado, sin
+    consultar MySQL; la marca se compara una sola vez, en el primer acierto sobre una entrada
+    restaurada, y si el inventario cambió desde el snapshot se descartan todas.
+
+    `start` carga el snapshot e inicia un hilo que lo vuelve a guardar cada
+    `interval_seconds`; `stop` detiene el hilo y guarda el estado final.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        interval_seconds: float,
+        get_watermark: Callable[[], Any],
+        negative_cache: Optional[NegativeLookupCache] = None,
+        page_prefetcher: Optional[PagePrefetcher] = None,
+        clock: Callable[[], float] = time.time
+    ) -> None:
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self.get_watermark = get_watermark
+        self.negative_cache = negative_cache
+        self.page_prefetcher = page_prefetcher
+        self._clock = clock
+        self._restored_watermark: Optional[str] = None
+        self._restored_valid: Optional[bool] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Carga el snapshot e inicia el guardado periódico (una vez por proceso, tras el fork)."""
+        self.load()
+        if self.interval_seconds > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cache-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el guardado periódico y guarda el snapshot final (al apagar el worker)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.dump()
+
+    def dump(self) -> bool:
+        """Guarda el snapshot de forma atómica (archivo temporal + rename). Retorna True si se guardó."""
+        try:
+            # La marca se toma antes que las entradas: ninguna entrada es posterior a ella.
+            watermark = self._serialize_watermark(self.get_watermark())
+            snapshot: Dict[str, Any] = {
+                "version": SNAPSHOT_FORMAT_VERSION,
+                "written_at": self._clock(),
+                "watermark": watermark,
+                "negative": self.negative_cache.export_entries() if self.negative_cache is not None else [],
+                "pages": self.page_prefetcher.export_entries() if self.page_prefetcher is not None else [],
+            }
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temporary_path = f"{self.path}.{os.getpid()}.tmp"
+            with gzip.open(temporary_path, "wt", encoding="utf-8") as snapshot_file:
+                json.dump(snapshot, snapshot_file, separators=(",", ":"))
+            os.replace(temporary_path, self.path)
+        except Exception as e:
+            cache_snapshot_operations_total.inc(operation="dump", result="failed")
+            print(f"CACHE SNAPSHOT WARNING: No se pudo guardar el snapshot en {self.path}. {e}")
+            return False
+        cache_snapshot_operations_total.inc(operation="dump", result="ok")
+        return True
+
+    def load(self) -> int:
+        """
+        Restaura en las cachés las entradas vigentes del snapshot, descontando el tiempo
+        transcurrido desde que se guardó. Un snapshot ausente, corrupto o de otra versión
+        se ignora. Retorna el número de entradas restauradas.
+        """
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            cache_snapshot_operations_total.inc(operation="load", result="failed")
+            print(f"CACHE SNAPSHOT WARNING: Snapshot inválido en {self.path}, se ignora. {e}")
+            return 0
+        if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_FORMAT_VERSION:
+            cache_snapshot_operations_total.inc(operation="load", result="failed")
+            return 0
+
+        elapsed = max(0.0, self._clock() - float(snapshot.get("written_at", 0)))
+        with self._lock:
+            self._restored_watermark = snapshot.get("watermark")
+            self._restored_valid = None
+
+        restored = 0
+        if self.negative_cache is not None:
+            restored += self.negative_cache.restore_entries(
+                ((key, remaining - elapsed) for key, remaining in snapshot.get("negative", [])),
+                self._restored_entries_valid
+            )
+        if self.page_prefetcher is not None:
+            restored += self.page_prefetcher.restore_entries(
+                ((key, remaining - elapsed, page) for key, remaining, page in snapshot.get("pages", [])),
+                self._restored_entries_valid
+            )
+        cache_snapshot_operations_total.inc(operation="load", result="ok")
+        return restored
+
+    def _restored_entries_valid(self) -> bool:
+        """
+        True si el inventario no cambió desde el snapshot. Consulta la marca una sola vez
+        por carga; ante un error se descartan las entradas restauradas.
+        """
+        with self._lock:
+            if self._restored_valid is None:
+                try:
+                    current = self._serialize_watermark(self.get_watermark())
+                    self._restored_valid = current == self._restored_watermark
+                except Exception as e:
+                    print(f"CACHE SNAPSHOT WARNING: No se pudo revalidar el snapshot. {e}")
+                    self._restored_valid = False
+                cache_snapshot_operations_total.inc(
+                    operation="revalidate", result="valid" if self._restored_valid else "stale"
+                )
+            return self._restored_valid
+
+    @staticmethod
+    def _serialize_watermark(watermark: Any) -> Optional[str]:
+        return None if watermark is None else str(watermark)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.dump()
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, List, Optional, Set, Tuple
+
+class NegativeLookupCache:
+    """
+    Conjunto acotado con TTL de llaves confirmadas como inexistentes (ej. product_id sin inventario).
+    Permite responder 404 sin consultar MySQL mientras la entrada esté vigente.
+    Al superar `max_entries` se descarta la entrada más antigua. Es seguro entre hilos.
+
+    Las entradas restauradas de un snapshot (`restore_entries`) se revalidan en el primer
+    acierto sobre una de ellas; si `revalidate` retorna False se descartan todas.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._restored: Set[Hashable] = set()
+        self._revalidate: Optional[Callable[[], bool]] = None
+        self._lock = threading.Lock()
+
+    def contains(self, key: Hashable) -> bool:
+        """Retorna True si la llave está marcada como inexistente y no ha expirado."""
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return False
+            if key not in self._restored:
+                return True
+        return self._revalidate_restored()
+
+    def add(self, key: Hashable) -> None:
+        """Marca la llave como inexistente durante `ttl_seconds`."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = self._clock() + self.ttl_seconds
+            self._entries.move_to_end(key)
+            self._restored.discard(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        """Invalida la llave (ej. cuando se crea el inventario del producto)."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._restored.discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._restored.clear()
+
+    def export_entries(self) -> List[Tuple[Hashable, float]]:
+        """Retorna las entradas vigentes como (llave, segundos de vida restantes)."""
+        with self._lock:
+            now = self._clock()
+            return [(key, expires_at - now) for key, expires_at in self._entries.items() if expires_at > now]
+
+    def restore_entries(self, entries: Iterable[Tuple[Hashable, float]], revalidate: Callable[[], bool]) -> int:
+        """
+        Carga entradas de un snapshot sin pisar las existentes. Quedan pendientes de
+        `revalidate`, que se invoca (fuera del lock) en el primer acierto sobre una de ellas.
+        Retorna el número de entradas cargadas.
+        """
+        restored = 0
+        with self._lock:
+            now = self._clock()
+            for key, remaining_seconds in entries:
+                if remaining_seconds <= 0 or key in self._entries or len(self._entries) >= self.max_entries:
+                    continue
+                self._entries[key] = now + remaining_seconds
+                self._restored.add(key)
+                restored += 1
+            self._revalidate = revalidate
+        return restored
+
+    def _revalidate_restored(self) -> bool:
+        revalidate = self._revalidate
+        valid = revalidate is not None and revalidate()
+        with self._lock:
+            if not valid:
+                for key in self._restored:
+                    self._entries.pop(key, None)
+            self._restored.clear()
+        return valid
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,202 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from metrics.registry import metrics_registry
+
+PageKey = Tuple[int, int]  # (page, limit)
+
+prefetch_lookups_total = metrics_registry.counter(
+    "inventory_prefetch_lookups_total", "Consultas de /products-with-stock a la caché de prefetch por resultado (hit/miss)."
+)
+prefetch_tasks_total = metrics_registry.counter(
+    "inventory_prefetch_tasks_total", "Prefetch de la página siguiente por resultado (scheduled/skipped/dropped/failed)."
+)
+
+
+class PagePrefetcher:
+    """
+    Prefetch de la página siguiente de `/products-with-stock`.
+
+    Tras servir la página N, `schedule_next` encola en un pool acotado de hilos la obtención
+    y el enriquecimiento de la página N+1 y la guarda en una caché con TTL corto. Una
+    página ya en vuelo o vigente en la caché no se vuelve a pedir; si el pool está lleno
+    el prefetch se descarta. Nunca bloquea la solicitud actual. Es seguro entre hilos.
+
+    Las páginas restauradas de un snapshot (`restore_entries`) se revalidan en el primer
+    acierto sobre una de ellas; si `revalidate` retorna False se descartan todas.
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[int, int], Dict[str, Any]],
+        ttl_seconds: float,
+        max_entries: int,
+        max_workers: int,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.fetch_page = fetch_page
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_workers = max_workers
+        self._clock = clock
+        self._entries: "OrderedDict[PageKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Set[PageKey] = set()
+        self._restored: Set[PageKey] = set()
+        self._revalidate: Optional[Callable[[], bool]] = None
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def get(self, page: int, limit: int) -> Optional[Dict[str, Any]]:
+        """Retorna la página prefetcheada si sigue vigente (contabiliza hit/miss)."""
+        key = (page, limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                entry = None
+            restored = entry is not None and key in self._restored
+            if not restored:
+                self._count_lookup(entry is not None)
+        if restored:
+            # Página de un snapshot: se usa solo si el inventario no cambió desde que se guardó.
+            if not self._revalidate_restored():
+                entry = None
+            with self._lock:
+                self._count_lookup(entry is not None)
+        prefetch_lookups_total.inc(result="miss" if entry is None else "hit")
+        return entry[1] if entry is not None else None
+
+    def schedule_next(self, page: int, limit: int, current_page: Dict[str, Any]) -> bool:
+        """
+        Encola el prefetch de la página `page + 1` si existe según `meta.total` de la página
+        actual. Retorna True si se encoló.
+        """
+        if not current_page.get("data"):
+            return False
+        total = (current_page.get("meta") or {}).get("total")
+        if isinstance(total, int) and page * limit >= total:
+            return False
+
+        key = (page + 1, limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if key in self._in_flight or (entry is not None and entry[0] > self._clock()):
+                outcome = "skipped"
+            elif len(self._in_flight) >= self.max_workers:
+                # Sin cola: un prefetch que esperaría turno ya no llegaría a tiempo.
+                outcome = "dropped"
+            else:
+                self._in_flight.add(key)
+                generation = self._generation
+                outcome = "scheduled"
+        prefetch_tasks_total.inc(result=outcome)
+        if outcome != "scheduled":
+            return False
+        self._get_executor().submit(self._prefetch, key, generation)
+        return True
+
+    def invalidate(self) -> None:
+        """
+        Descarta las páginas prefetcheadas (tras una escritura de stock en este proceso).
+        Los prefetch en vuelo iniciados antes de la invalidación no se guardan.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._restored.clear()
+            self._generation += 1
+
+    def export_entries(self) -> List[Tuple[PageKey, float, Dict[str, Any]]]:
+        """Retorna las páginas vigentes como ((page, limit), segundos de vida restantes, página)."""
+        with self._lock:
+            now = self._clock()
+            return [(key, expires_at - now, page_data)
+                    for key, (expires_at, page_data) in self._entries.items() if expires_at > now]
+
+    def restore_entries(
+        self,
+        entries: Iterable[Tuple[PageKey, float, Dict[str, Any]]],
+        revalidate: Callable[[], bool]
+    ) -> int:
+        """
+        Carga páginas de un snapshot sin pisar las existentes. Quedan pendientes de
+        `revalidate`, que se invoca (fuera del lock) en el primer acierto sobre una de ellas.
+        Retorna el número de páginas cargadas.
+        """
+        restored = 0
+        with self._lock:
+            now = self._clock()
+            for key, remaining_seconds, page_data in entries:
+                key = tuple(key)
+                if remaining_seconds <= 0 or key in self._entries or len(self._entries) >= self.max_entries:
+                    continue
+                self._entries[key] = (now + remaining_seconds, page_data)
+                self._restored.add(key)
+                restored += 1
+            self._revalidate = revalidate
+        return restored
+
+    def _revalidate_restored(self) -> bool:
+        revalidate = self._revalidate
+        valid = revalidate is not None and revalidate()
+        with self._lock:
+            if not valid:
+                for key in self._restored:
+                    self._entries.pop(key, None)
+            self._restored.clear()
+        return valid
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "cached_pages": len(self._entries),
+                "in_flight": len(self._in_flight),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _count_lookup(self, hit: bool) -> None:
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Se crea en el primer uso: así cada worker de Gunicorn tiene sus propios hilos tras el fork.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="page-prefetch")
+            return self._executor
+
+    def _prefetch(self, key: PageKey, generation: int) -> None:
+        try:
+            page_data = self.fetch_page(*key)
+        except Exception as e:
+            prefetch_tasks_total.inc(result="failed")
+            print(f"PREFETCH WARNING: No se pudo prefetchear la página {key[0]} (limit={key[1]}). {e}")
+            with self._lock:
+                self._in_flight.discard(key)
+            return
+
+        with self._lock:
+            self._in_flight.discard(key)
+            if generation != self._generation or self.max_entries <= 0:
+                return
+            self._entries[key] = (self._clock() + self.ttl_seconds, page_data)
+            self._entries.move_to_end(key)
+            self._restored.discard(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,168 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Optional, Tuple
+
+# Encabezado: magic (8 bytes) + capacidad (uint64), alineado a 64 bytes.
+HEADER = struct.Struct("<8sQ")
+HEADER_SIZE = 64
+MAGIC = b"INVSTK01"
+# Slot por product_id: seq (uint64), available_stock (int64), version (int64), written_at_ms (int64).
+SLOT = struct.Struct("<Qqqq")
+SEQ = struct.Struct("<Q")
+PAYLOAD = struct.Struct("<qqq")
+# Versión de una entrada que confirma que el producto no tiene inventario.
+ABSENT_VERSION = -1
+# Reintentos de lectura mientras un escritor modifica el slot.
+MAX_READ_RETRIES = 8
+
+
+class SharedStockTable:
+    """
+    Tabla de stock compartida por todos los workers de Gunicorn del host: un archivo mapeado
+    en memoria (`mmap`, idealmente en /dev/shm) con un slot de tamaño fijo por `product_id`
+    que guarda `available_stock`, la `version` de la fila y el instante de escritura.
+
+    Las lecturas no toman locks ni hacen llamadas al sistema: cada slot es un seqlock
+    (el escritor deja `seq` impar mientras escribe y el lector reintenta si lo ve impar o
+    si cambió durante la copia). Los escritores se serializan por slot con un lock de rango
+    (`lockf`, entre procesos) y un lock de hilos (dentro del proceso).
+
+    Una escritura con una `version` menor que la vigente se descarta, así una lectura lenta
+    de MySQL nunca pisa el resultado de una escritura posterior. Las entradas vencen a los
+    `ttl_seconds`, lo que acota el desfase por escrituras que la tabla no vio (otros hosts,
+    SQL directo). Los `product_id` fuera de `capacity` no se guardan.
+    """
+
+    def __init__(self, path: str, capacity: int, ttl_seconds: float) -> None:
+        self.path = path
+        self.capacity = capacity
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self._write_lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    def get(self, product_id: int) -> Optional[Tuple[int, int]]:
+        """
+        Retorna (available_stock, version) si hay una entrada vigente; version es
+        ABSENT_VERSION si el producto no tiene inventario. None si no hay entrada.
+        """
+        offset = self._offset(product_id)
+        if offset is None:
+            return None
+        table = self._get_mmap()
+        for _ in range(MAX_READ_RETRIES):
+            seq, available_stock, version, written_at_ms = SLOT.unpack_from(table, offset)
+            if seq & 1 or SEQ.unpack_from(table, offset)[0] != seq:
+                continue  # Escritura en curso: se vuelve a leer
+            if written_at_ms == 0 or _now_ms() - written_at_ms > self.ttl_ms:
+                return None
+            return available_stock, version
+        return None
+
+    def put(self, product_id: int, available_stock: int, version: int, force: bool = False) -> bool:
+        """
+        Guarda el stock de un producto si `version` no es menor que la vigente (o siempre, con
+        `force`: la fila se acaba de crear y su versión reinicia). Retorna True si se guardó.
+        """
+        return self._write(product_id, available_stock, version, force=force)
+
+    def put_absent(self, product_id: int) -> bool:
+        """Registra que el producto no tiene inventario (no pisa una entrada con stock vigente)."""
+        return self._write(product_id, 0, ABSENT_VERSION, force=False)
+
+    def discard(self, product_id: int) -> None:
+        """Vacía el slot del producto (ej. tras eliminar su inventario o si falló el refresco)."""
+        self._write(product_id, 0, 0, force=True, written_at_ms=0)
+
+    def open(self) -> None:
+        """Abre la tabla de inmediato (por defecto se abre en el primer uso)."""
+        self._get_mmap()
+
+    def close(self) -> None:
+        with self._open_lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                os.close(self._fd)
+                self._mmap = None
+                self._fd = None
+
+    def _write(
+        self,
+        product_id: int,
+        available_stock: int,
+        version: int,
+        force: bool,
+        written_at_ms: Optional[int] = None
+    ) -> bool:
+        offset = self._offset(product_id)
+        if offset is None:
+            return False
+        table = self._get_mmap()
+        with self._write_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, SLOT.size, offset)
+            try:
+                seq, _, current_version, current_written_at_ms = SLOT.unpack_from(table, offset)
+                if not force and current_written_at_ms != 0 and version < current_version:
+                    return False
+                SEQ.pack_into(table, offset, seq + 1)
+                PAYLOAD.pack_into(table, offset + SEQ.size, available_stock, version,
+                                  _now_ms() if written_at_ms is None else written_at_ms)
+                SEQ.pack_into(table, offset, seq + 2)
+                return True
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, SLOT.size, offset)
+
+    def _offset(self, product_id: int) -> Optional[int]:
+        if not 0 <= product_id < self.capacity:
+            return None
+        return HEADER_SIZE + product_id * SLOT.size
+
+    def _get_mmap(self) -> mmap.mmap:
+        if self._mmap is None:
+            with self._open_lock:
+                if self._mmap is None:
+                    self._open()
+        return self._mmap
+
+    def _open(self) -> None:
+        """
+        Abre (o crea) el archivo de la tabla. Se inicializa bajo un lock exclusivo del archivo
+        para que varios workers que arrancan a la vez no lo inicialicen dos veces.
+
+        Lanza:
+            - ValueError: Si el archivo existente tiene otro formato o capacidad (truncarlo
+              rompería el mmap de los workers que ya lo usan).
+        """
+        size = HEADER_SIZE + self.capacity * SLOT.size
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size == 0:
+                    os.ftruncate(fd, size)  # Archivo disperso: los slots vacíos no ocupan memoria
+                    os.pwrite(fd, HEADER.pack(MAGIC, self.capacity), 0)
+                header = os.pread(fd, HEADER.size, 0)
+                if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, self.capacity):
+                    raise ValueError(
+                        f"La tabla de stock compartida {self.path} tiene otro formato o capacidad; "
+                        "use otra SHARED_STOCK_PATH o elimine el archivo con los workers detenidos."
+                    )
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._mmap = mmap.mmap(fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+            self._fd = fd
+        except Exception:
+            os.close(fd)
+            raise
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
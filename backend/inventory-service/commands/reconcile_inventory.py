@@ -0,0 +1,104 @@
+"""
+Reconciliación entre `products` e `inventory` (merge-join por keyset con memoria acotada).
+
+Reporta inventario huérfano (orphan), productos activos sin inventario (missing) y productos
+inactivos que conservan stock (inactive_with_stock). Por defecto solo reporta; con --repair
+corrige los tipos indicados en lotes pequeños con una pausa entre lotes. El avance se guarda
+en un checkpoint y una corrida interrumpida continúa donde quedó (--restart la ignora).
+Requiere MySQL accesible con la configuración del .env.
+
+Uso (desde inventory-service/):
+    python -m commands.reconcile_inventory
+    python -m commands.reconcile_inventory --output logs/reconciliation.jsonl
+    python -m commands.reconcile_inventory --repair missing,orphan --throttle 0.5
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+from db.db_connection import DBConnection
+from logic.inventory_reconciliation import ISSUE_KINDS, InventoryReconciler
+from models.reconciliation_table import ReconciliationRepository
+
+
+def parse_issue_kinds(value: str) -> List[str]:
+    kinds = [kind.strip() for kind in value.split(",") if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in ISSUE_KINDS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"Tipos desconocidos: {', '.join(unknown)}. Valores permitidos: {', '.join(ISSUE_KINDS)}."
+        )
+    return kinds
+
+
+def format_progress(state: Dict[str, Any], max_key: int, started: float) -> str:
+    percent = 100.0 * state["last_product_id"] / max_key if max_key else 100.0
+    issues = " ".join(f"{kind}={count}" for kind, count in state["issues"].items())
+    repaired = sum(state["repaired"].values())
+    return (
+        f"[{min(percent, 100.0):5.1f}%] product_id<={state['last_product_id']} "
+        f"products={state['products']} inventory={state['inventory']} {issues} "
+        f"repaired={repaired} elapsed={time.monotonic() - started:.1f}s"
+    )
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Filas por lectura keyset y por checkpoint")
+    parser.add_argument("--repair", type=parse_issue_kinds, default=[],
+                        help=f"Tipos a corregir, separados por coma ({', '.join(ISSUE_KINDS)})")
+    parser.add_argument("--repair-batch-size", type=int, default=100, help="Filas por sentencia de reparación")
+    parser.add_argument("--throttle", type=float, default=0.1, help="Pausa en segundos tras cada lote de reparación")
+    parser.add_argument("--checkpoint", default="logs/reconciliation.checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="Ignora el checkpoint y empieza desde el inicio")
+    parser.add_argument("--output", help="Archivo JSONL donde se agrega cada discrepancia encontrada")
+    args = parser.parse_args()
+
+    # Después de load_dotenv(): la configuración se lee del entorno al importar.
+    from config.settings import MULTI_WAREHOUSE_ENABLED
+    from models.repository_factory import LOW_STOCK_THRESHOLD
+    repository = ReconciliationRepository(
+        DBConnection(), multi_warehouse=MULTI_WAREHOUSE_ENABLED, low_stock_threshold=LOW_STOCK_THRESHOLD
+    )
+    max_key = max(repository.get_max_keys())
+    started = time.monotonic()
+    output_file = open(args.output, "a", encoding="utf-8") if args.output else None
+
+    def on_issue(kind: str, product_id: int, available_stock: Any) -> None:
+        if output_file is not None:
+            output_file.write(json.dumps(
+                {"kind": kind, "product_id": product_id, "available_stock": available_stock}
+            ) + "\n")
+
+    def on_progress(state: Dict[str, Any]) -> None:
+        if output_file is not None:
+            output_file.flush()
+        print(format_progress(state, max_key, started), flush=True)
+
+    reconciler = InventoryReconciler(
+        repository,
+        chunk_size=args.chunk_size,
+        repair=args.repair,
+        repair_batch_size=args.repair_batch_size,
+        throttle_seconds=args.throttle,
+        checkpoint_path=args.checkpoint,
+        on_issue=on_issue,
+        on_progress=on_progress,
+    )
+    try:
+        state = reconciler.run(resume=not args.restart)
+    finally:
+        if output_file is not None:
+            output_file.close()
+
+    print("Discrepancias:", json.dumps(state["issues"]))
+    if args.repair:
+        print("Reparadas:", json.dumps(state["repaired"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+
+# ----------------- CONFIGURACIÓN DEL SERVICIO (variables de entorno) -----------------
+
+# Idempotencia de compras (header Idempotency-Key)
+IDEMPOTENCY_KEY_TTL_SECONDS: int = int(os.environ.get('IDEMPOTENCY_KEY_TTL_SECONDS', 86400))
+IDEMPOTENCY_KEY_MAX_LENGTH: int = 255
+
+# Ajustes masivos de stock (POST /adjustments)
+ADJUSTMENTS_MAX_LINES: int = int(os.environ.get('ADJUSTMENTS_MAX_LINES', 5000))
+ADJUSTMENTS_CHUNK_SIZE: int = int(os.environ.get('ADJUSTMENTS_CHUNK_SIZE', 200))
+
+# Caché negativa de product_id sin inventario (GET /<product_id>). Es por worker: un inventario
+# creado en otro worker sigue respondiendo 404 aquí hasta el TTL (sin SHARED_STOCK_ENABLED).
+NEGATIVE_CACHE_ENABLED: bool = os.environ.get('NEGATIVE_CACHE_ENABLED', 'true').lower() == 'true'
+NEGATIVE_CACHE_TTL_SECONDS: float = float(os.environ.get('NEGATIVE_CACHE_TTL_SECONDS', 5))
+NEGATIVE_CACHE_MAX_ENTRIES: int = int(os.environ.get('NEGATIVE_CACHE_MAX_ENTRIES', 10000))
+
+# Limitación de logs repetidos (mismo 404 sobre la misma URL)
+NOT_FOUND_LOG_WINDOW_SECONDS: float = float(os.environ.get('NOT_FOUND_LOG_WINDOW_SECONDS', 60))
+
+# Perfilado bajo demanda (muestreo de pilas, salida en formato collapsed-stack/flamegraph)
+PROFILING_TOKEN: str = os.environ.get('PROFILING_TOKEN', '')
+PROFILING_SAMPLE_RATE: float = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_INTERVAL_MS: float = float(os.environ.get('PROFILING_INTERVAL_MS', 5))
+PROFILING_OUTPUT_DIR: str = os.environ.get('PROFILING_OUTPUT_DIR', 'logs/profiles')
+
+# Paginación y streaming de /products-with-stock
+MAX_PAGE_LIMIT: int = int(os.environ.get('MAX_PAGE_LIMIT', 1000))
+STREAM_RESPONSE_MIN_LIMIT: int = int(os.environ.get('STREAM_RESPONSE_MIN_LIMIT', 200))
+
+# Compresión de respuestas (gzip / brotli si el paquete `brotli` está instalado)
+COMPRESSION_ENABLED: bool = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+COMPRESSION_MIN_SIZE: int = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_LEVEL: int = int(os.environ.get('COMPRESSION_LEVEL', 6))
+
+# Server-Sent Events de cambios de stock (GET /stream)
+STOCK_STREAM_POLL_INTERVAL_SECONDS: float = float(os.environ.get('STOCK_STREAM_POLL_INTERVAL_SECONDS', 1.0))
+STOCK_STREAM_HEARTBEAT_SECONDS: float = float(os.environ.get('STOCK_STREAM_HEARTBEAT_SECONDS', 15))
+# Segundos que el observador vuelve a leer detrás de su marca para captar commits tardíos
+STOCK_STREAM_LATE_COMMIT_SECONDS: float = float(os.environ.get('STOCK_STREAM_LATE_COMMIT_SECONDS', 10))
+# Streams abiertos por worker. Con gthread cada stream retiene un hilo: debe ser menor que GUNICORN_THREADS
+STOCK_STREAM_MAX_SUBSCRIBERS: int = int(os.environ.get('STOCK_STREAM_MAX_SUBSCRIBERS', 3))
+STOCK_STREAM_MAX_PRODUCT_IDS: int = int(os.environ.get('STOCK_STREAM_MAX_PRODUCT_IDS', 500))
+
+# Log de consultas lentas con captura de EXPLAIN (db/query_instrumentation.py)
+SLOW_QUERY_THRESHOLD_MS: float = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+SLOW_QUERY_EXPLAIN_ENABLED: bool = os.environ.get('SLOW_QUERY_EXPLAIN_ENABLED', 'true').lower() == 'true'
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: float = float(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS', 300))
+
+# Backend de almacenamiento del repositorio de inventario: mysql | sqlite | memory
+STORAGE_BACKEND: str = os.environ.get('STORAGE_BACKEND', 'mysql').lower()
+SQLITE_DATABASE_PATH: str = os.environ.get('SQLITE_DATABASE_PATH', 'data/inventory.db')
+
+# Presupuesto de tiempo por solicitud (deadline), propagado a MySQL y al Products Service
+REQUEST_TIMEOUT_SECONDS: float = float(os.environ.get('REQUEST_TIMEOUT_SECONDS', 15))
+REQUEST_TIMEOUT_MAX_SECONDS: float = float(os.environ.get('REQUEST_TIMEOUT_MAX_SECONDS', 30))
+PRODUCTS_HTTP_TIMEOUT_SECONDS: float = float(os.environ.get('PRODUCTS_HTTP_TIMEOUT_SECONDS', 5))
+
+# Trazas distribuidas (W3C traceparent), muestreo en la cabecera y exportación a archivo
+TRACING_ENABLED: bool = os.environ.get('TRACING_ENABLED', 'true').lower() == 'true'
+TRACING_SAMPLE_RATIO: float = float(os.environ.get('TRACING_SAMPLE_RATIO', 0.05))
+TRACING_OUTPUT_DIR: str = os.environ.get('TRACING_OUTPUT_DIR', 'logs/traces')
+
+# Prefetch de la página siguiente de /products-with-stock (caché por proceso con TTL corto)
+PREFETCH_ENABLED: bool = os.environ.get('PREFETCH_ENABLED', 'false').lower() == 'true'
+PREFETCH_TTL_SECONDS: float = float(os.environ.get('PREFETCH_TTL_SECONDS', 5))
+PREFETCH_MAX_PAGES: int = int(os.environ.get('PREFETCH_MAX_PAGES', 100))
+PREFETCH_MAX_WORKERS: int = int(os.environ.get('PREFETCH_MAX_WORKERS', 2))
+
+# Páginas grandes de /products-with-stock: sub-páginas pedidas en paralelo al Products Service
+FANOUT_ENABLED: bool = os.environ.get('FANOUT_ENABLED', 'true').lower() == 'true'
+FANOUT_CHUNK_SIZE: int = int(os.environ.get('FANOUT_CHUNK_SIZE', 200))
+FANOUT_MAX_WORKERS: int = int(os.environ.get('FANOUT_MAX_WORKERS', 4))
+
+# Snapshot en disco de las cachés de lectura para que los workers nuevos arranquen con ellas
+CACHE_SNAPSHOT_ENABLED: bool = os.environ.get('CACHE_SNAPSHOT_ENABLED', 'false').lower() == 'true'
+CACHE_SNAPSHOT_PATH: str = os.environ.get('CACHE_SNAPSHOT_PATH', 'logs/cache-snapshot.json.gz')
+CACHE_SNAPSHOT_INTERVAL_SECONDS: float = float(os.environ.get('CACHE_SNAPSHOT_INTERVAL_SECONDS', 60))
+
+# Tabla de stock compartida entre los workers del host (mmap indexado por product_id)
+SHARED_STOCK_ENABLED: bool = os.environ.get('SHARED_STOCK_ENABLED', 'false').lower() == 'true'
+SHARED_STOCK_PATH: str = os.environ.get('SHARED_STOCK_PATH', '/dev/shm/inventory-shared-stock')
+SHARED_STOCK_CAPACITY: int = int(os.environ.get('SHARED_STOCK_CAPACITY', 1000000))
+SHARED_STOCK_TTL_SECONDS: float = float(os.environ.get('SHARED_STOCK_TTL_SECONDS', 30))
+
+# Captura de tráfico para reproducirlo con benchmarks/replay_traffic.py (un archivo rotativo por worker)
+TRAFFIC_CAPTURE_ENABLED: bool = os.environ.get('TRAFFIC_CAPTURE_ENABLED', 'false').lower() == 'true'
+TRAFFIC_CAPTURE_SAMPLE_RATIO: float = float(os.environ.get('TRAFFIC_CAPTURE_SAMPLE_RATIO', 1.0))
+TRAFFIC_CAPTURE_OUTPUT_DIR: str = os.environ.get('TRAFFIC_CAPTURE_OUTPUT_DIR', 'logs/traffic')
+TRAFFIC_CAPTURE_MAX_FILE_BYTES: int = int(os.environ.get('TRAFFIC_CAPTURE_MAX_FILE_BYTES', 50 * 1024 * 1024))
+TRAFFIC_CAPTURE_MAX_FILES: int = int(os.environ.get('TRAFFIC_CAPTURE_MAX_FILES', 5))
+TRAFFIC_CAPTURE_MAX_BODY_BYTES: int = int(os.environ.get('TRAFFIC_CAPTURE_MAX_BODY_BYTES', 64 * 1024))
+
+# Compras asíncronas (Prefer: respond-async -> 202) con outbox durable y workers por partición
+ASYNC_PURCHASES_ENABLED: bool = os.environ.get('ASYNC_PURCHASES_ENABLED', 'false').lower() == 'true'
+ASYNC_PURCHASE_PARTITIONS: int = int(os.environ.get('ASYNC_PURCHASE_PARTITIONS', 4))
+ASYNC_PURCHASE_BATCH_SIZE: int = int(os.environ.get('ASYNC_PURCHASE_BATCH_SIZE', 100))
+ASYNC_PURCHASE_POLL_INTERVAL_SECONDS: float = float(os.environ.get('ASYNC_PURCHASE_POLL_INTERVAL_SECONDS', 1))
+
+# Alertas de stock bajo: cada escritura registra los cruces de umbral (requiere 07-stock-alerts.sql)
+LOW_STOCK_ALERTS_ENABLED: bool = os.environ.get('LOW_STOCK_ALERTS_ENABLED', 'false').lower() == 'true'
+LOW_STOCK_DEFAULT_THRESHOLD: int = int(os.environ.get('LOW_STOCK_DEFAULT_THRESHOLD', 10))
+# Antigüedad mínima de una alerta para listarla (MySQL): margen heurístico para los commits fuera de orden
+LOW_STOCK_ALERT_SETTLE_SECONDS: float = float(os.environ.get('LOW_STOCK_ALERT_SETTLE_SECONDS', 2))
+
+# Inventario multi-bodega: stock por ubicación con el total mantenido en `inventory` (requiere 08-inventory-locations.sql)
+MULTI_WAREHOUSE_ENABLED: bool = os.environ.get('MULTI_WAREHOUSE_ENABLED', 'false').lower() == 'true'
+ALLOCATION_STRATEGY: str = os.environ.get('ALLOCATION_STRATEGY', 'nearest').lower()
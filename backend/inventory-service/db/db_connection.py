@@ -1,48 +1,88 @@
 import os
+import threading
+import time
 import pymysql.cursors
-from typing import Any, Dict
+from typing import Any, Dict, List
 from dbutils.pooled_db import PooledDB
 
+from db.drivers import MySQLDriver, load_driver
+from db.query_instrumentation import InstrumentedConnection
+
 # Constantes de conexión
 
 MYSQL_HOST = os.environ.get('MYSQL_HOST', 'localhost')
+MYSQL_PORT = int(os.environ.get('MYSQL_PORT', 3306))
 MYSQL_USER = os.environ.get('MYSQL_USER')
 MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD')
 MYSQL_DATABASE = os.environ.get('MYSQL_DATABASE')
 
+# Tamaño del pool (por proceso). Con workers gthread debe ser >= GUNICORN_THREADS.
+DB_POOL_MAX_CONNECTIONS = int(os.environ.get('DB_POOL_MAX_CONNECTIONS', 10))
+DB_POOL_MIN_CACHED = int(os.environ.get('DB_POOL_MIN_CACHED', 2))
+
+# Driver de MySQL: pymysql (por defecto) o mysqlclient (extensión en C, con fallback a pymysql).
+DB_DRIVER = os.environ.get('DB_DRIVER', 'pymysql').lower()
+
+# Pools heredados del master tras un fork: se mantienen referenciados para que nunca se
+# recolecten (PooledDB.__del__ cerraría sus conexiones, que el master sigue usando).
+_inherited_pools: List[PooledDB] = []
+
 class DBConnection:
     """
     Gestión de un Pool de Conexiones a MySQL usando DBUtils.
-    Esta clase sigue el patrón Singleton para asegurar una única instancia del pool.
+    Esta clase sigue el patrón Singleton para asegurar una única instancia del pool por proceso.
     """
     _pool = None
+    _pool_lock = threading.Lock()
+    driver: MySQLDriver = load_driver(DB_DRIVER)
 
     @classmethod
     def get_pool(cls) -> PooledDB:
         """Retorna la instancia del pool, creándola si no existe."""
         if cls._pool is None:
-            if not all([MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE]):
-                raise EnvironmentError("Variables de entorno de DB faltantes.")
-            try:
-                cls._pool = PooledDB(
-                    creator=pymysql,
-                    maxconnections=10,  # Número máximo de conexiones en el pool
-                    mincached=2,      # Número mínimo de conexiones inactivas
-                    host=MYSQL_HOST,
-                    user=MYSQL_USER,
-                    password=MYSQL_PASSWORD,
-                    database=MYSQL_DATABASE,
-                    charset='utf8mb4',
-                    cursorclass=pymysql.cursors.DictCursor,
-                    autocommit=False,
-                    blocking=True     # Esperar si no hay conexiones disponibles
-                )
-            except pymysql.Error as e:
-                print(f"CRITICAL DB ERROR: No se pudo inicializar el pool de conexiones. {e}")
-                raise
+            with cls._pool_lock:
+                if cls._pool is None:
+                    cls._pool = cls._create_pool()
         return cls._pool
 
+    @classmethod
+    def reset_pool(cls) -> None:
+        """
+        Descarta el pool heredado tras un fork (hook post_fork de Gunicorn).
+        Las conexiones NO se cierran: sus sockets pertenecen también al proceso padre y
+        cerrarlas enviaría COM_QUIT por una conexión que otro proceso sigue usando. Por eso
+        el pool heredado queda referenciado en `_inherited_pools`: soltar la última
+        referencia ejecutaría `PooledDB.__del__`, que sí las cierra.
+        El siguiente get_pool() crea un pool propio del worker.
+        """
+        if cls._pool is not None:
+            _inherited_pools.append(cls._pool)
+        cls._pool = None
+        cls._pool_lock = threading.Lock()
+
+    @classmethod
+    def _create_pool(cls) -> PooledDB:
+        """Crea el pool de conexiones con la configuración del entorno."""
+        if not all([MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE]):
+            raise EnvironmentError("Variables de entorno de DB faltantes.")
+        try:
+            return PooledDB(
+                creator=cls.driver.module,
+                maxconnections=DB_POOL_MAX_CONNECTIONS,  # Número máximo de conexiones en el pool
+                mincached=DB_POOL_MIN_CACHED,            # Número mínimo de conexiones inactivas
+                blocking=True,    # Esperar si no hay conexiones disponibles
+                **cls.driver.connect_kwargs(MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE, MYSQL_PORT)
+            )
+        except cls.driver.module.Error as e:
+            print(f"CRITICAL DB ERROR: No se pudo inicializar el pool de conexiones. {e}")
+            raise
+
     def get_connection(self) -> pymysql.connections.Connection:
-        """Obtiene una conexión del pool."""
+        """
+        Obtiene una conexión del pool, instrumentada para medir la espera del pool y
+        cada sentencia (log de consultas lentas y métricas).
+        """
         pool = self.get_pool()
-        return pool.connection()
+        started = time.perf_counter()
+        connection = pool.connection()
+        return InstrumentedConnection(connection, (time.perf_counter() - started) * 1000)
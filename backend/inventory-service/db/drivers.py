@@ -0,0 +1,90 @@
+import importlib
+from typing import Any, Dict, Tuple
+
+import pymysql
+import pymysql.cursors
+import pymysql.err
+
+# Drivers soportados: `pymysql` (Python puro, por defecto) y `mysqlclient` (extensión en C, módulo MySQLdb).
+SUPPORTED_DRIVERS = ('pymysql', 'mysqlclient')
+
+DUPLICATE_ENTRY_ERROR = 1062
+
+
+class MySQLDriver:
+    """
+    Describe un driver DB-API de MySQL: el módulo que usa PooledDB como `creator` y los
+    argumentos de conexión en el dialecto del driver (ambos usan parámetros `%s` y DictCursor).
+    `tuple_cursor_class` es el cursor que retorna tuplas, para lecturas masivas sin un dict por fila.
+    """
+
+    def __init__(self, name: str, module: Any, cursor_class: Any, tuple_cursor_class: Any, integrity_error: type) -> None:
+        self.name = name
+        self.module = module
+        self.cursor_class = cursor_class
+        self.tuple_cursor_class = tuple_cursor_class
+        self.integrity_error = integrity_error
+
+    def connect_kwargs(self, host: str, user: str, password: str, database: str, port: int = 3306) -> Dict[str, Any]:
+        """Argumentos de conexión comunes traducidos a los nombres que acepta el driver."""
+        if self.name == 'mysqlclient':
+            # `passwd` y `db` son los nombres aceptados por todas las versiones de mysqlclient.
+            credentials = {'passwd': password, 'db': database}
+        else:
+            credentials = {'password': password, 'database': database}
+        return {
+            'host': host,
+            'port': port,
+            'user': user,
+            'charset': 'utf8mb4',
+            'cursorclass': self.cursor_class,
+            'autocommit': False,
+            **credentials,
+        }
+
+
+def _load_mysqlclient() -> MySQLDriver:
+    mysqldb = importlib.import_module('MySQLdb')
+    cursors = importlib.import_module('MySQLdb.cursors')
+    return MySQLDriver('mysqlclient', mysqldb, cursors.DictCursor, cursors.Cursor, mysqldb.IntegrityError)
+
+
+PYMYSQL_DRIVER = MySQLDriver(
+    'pymysql', pymysql, pymysql.cursors.DictCursor, pymysql.cursors.Cursor, pymysql.err.IntegrityError
+)
+
+
+def load_driver(name: str) -> MySQLDriver:
+    """
+    Retorna el driver configurado en DB_DRIVER. Si `mysqlclient` no está instalado
+    (requiere libmysqlclient), se usa PyMySQL y se informa en el log de arranque.
+
+    Lanza:
+        - ValueError: Si el nombre no es uno de SUPPORTED_DRIVERS.
+    """
+    if name not in SUPPORTED_DRIVERS:
+        raise ValueError(f"DB_DRIVER inválido: '{name}'. Valores permitidos: {', '.join(SUPPORTED_DRIVERS)}.")
+    if name == 'mysqlclient':
+        try:
+            return _load_mysqlclient()
+        except ImportError as e:
+            print(f"WARNING DB DRIVER: mysqlclient no está disponible ({e}); se usa PyMySQL.")
+    return PYMYSQL_DRIVER
+
+
+def _available_integrity_errors() -> Tuple[type, ...]:
+    errors = [pymysql.err.IntegrityError]
+    try:
+        errors.append(_load_mysqlclient().integrity_error)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+# Tupla para `except`: la capa de servicio captura el IntegrityError de cualquier driver instalado.
+INTEGRITY_ERRORS: Tuple[type, ...] = _available_integrity_errors()
+
+
+def is_duplicate_entry(error: BaseException) -> bool:
+    """True si el error es la violación de clave única de MySQL (código 1062), con cualquier driver."""
+    return bool(getattr(error, 'args', None)) and error.args[0] == DUPLICATE_ENTRY_ERROR
@@ -0,0 +1,213 @@
+import datetime
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import has_request_context, request
+
+from config.settings import (
+    SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_EXPLAIN_ENABLED, SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS
+)
+from exceptions.api_exceptions import DeadlineExceededError
+from metrics.registry import metrics_registry
+from middleware.error_handler import LogRateLimiter, write_structured_log
+from middleware.request_deadline import check_deadline, with_max_execution_time
+from middleware.request_tracing import current_trace_id, start_span
+
+# Código de MySQL cuando una SELECT supera MAX_EXECUTION_TIME.
+QUERY_EXECUTION_INTERRUPTED = 3024
+
+# ----------------- MÉTRICAS -----------------
+
+pool_acquire_seconds = metrics_registry.histogram(
+    "inventory_db_pool_acquire_seconds", "Tiempo de espera para obtener una conexión del pool de MySQL."
+)
+query_duration_seconds = metrics_registry.histogram(
+    "inventory_db_query_duration_seconds", "Tiempo de ejecución de las sentencias SQL por operación."
+)
+slow_queries_total = metrics_registry.counter(
+    "inventory_db_slow_queries_total", "Sentencias SQL que superaron SLOW_QUERY_THRESHOLD_MS."
+)
+explains_captured_total = metrics_registry.counter(
+    "inventory_db_explain_captured_total", "Planes EXPLAIN capturados para consultas lentas."
+)
+
+# Un EXPLAIN por forma de consulta (SQL normalizado) en cada ventana.
+explain_limiter = LogRateLimiter(SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS)
+
+# ----------------- NORMALIZACIÓN DE SQL -----------------
+
+_WHITESPACE = re.compile(r"\s+")
+_CASE_WHEN = re.compile(r"(?:WHEN %s THEN %s ?)+", re.IGNORECASE)
+_PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Reduce una sentencia a su "forma": sin espacios redundantes, con literales y
+    placeholders reemplazados por `?` y las listas `IN (%s, %s, ...)` colapsadas a `(?+)`,
+    de modo que un IN de 5 o de 500 elementos comparta la misma forma.
+    """
+    shape = _WHITESPACE.sub(" ", sql).strip()
+    shape = _CASE_WHEN.sub("WHEN ? THEN ? ... ", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?+)", shape)
+    shape = _STRING_LITERAL.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return shape.replace("%s", "?")
+
+
+def _operation(shape: str) -> str:
+    keyword = shape.split(" ", 1)[0].lower()
+    return keyword if keyword in ("select", "insert", "update", "delete") else "other"
+
+
+def _param_count(params: Any) -> int:
+    if params is None:
+        return 0
+    if isinstance(params, (list, tuple, dict)):
+        return len(params)
+    return 1
+
+# ----------------- ENVOLTORIOS DE CONEXIÓN Y CURSOR -----------------
+
+class InstrumentedCursor:
+    """
+    Cursor que mide cada `execute` y reporta las sentencias lentas. También aplica el
+    deadline de la solicitud: no inicia sentencias con el presupuesto agotado y limita
+    las SELECT con MAX_EXECUTION_TIME, y abre un span por sentencia si la solicitud se
+    está trazando. El resto de atributos (fetchone, fetchall, rowcount, lastrowid...) se delegan al cursor real.
+    """
+
+    def __init__(self, cursor: Any, connection: "InstrumentedConnection") -> None:
+        self._cursor = cursor
+        self._connection = connection
+
+    def execute(self, sql: str, params: Any = None) -> int:
+        check_deadline("consultar la base de datos")
+        with start_span("mysql.query", kind="client") as span:
+            if span is not None:
+                span.set_attribute("db.system", "mysql")
+                span.set_attribute("db.statement", normalize_sql(sql))
+            started = time.perf_counter()
+            try:
+                return self._cursor.execute(with_max_execution_time(sql), params)
+            except Exception as e:
+                if e.args and e.args[0] == QUERY_EXECUTION_INTERRUPTED:
+                    raise DeadlineExceededError("La consulta a la base de datos superó el tiempo de la solicitud.") from e
+                raise
+            finally:
+                execute_ms = (time.perf_counter() - started) * 1000
+                self._connection.record_statement(sql, params, execute_ms, self._cursor)
+                if span is not None:
+                    span.set_attribute("db.rows", getattr(self._cursor, "rowcount", None))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __iter__(self) -> Any:
+        # Los métodos especiales no pasan por __getattr__: `for row in cursor` se delega aparte.
+        return iter(self._cursor)
+
+    def __enter__(self) -> "InstrumentedCursor":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._cursor.close()
+
+
+class InstrumentedConnection:
+    """
+    Envuelve una conexión del pool para medir el tiempo de adquisición y de cada sentencia.
+    El tiempo de adquisición se atribuye a la primera sentencia de la conexión, que es la
+    que lo pagó.
+
+    El EXPLAIN de una SELECT lenta se difiere hasta que termina la transacción (commit,
+    rollback o close): dentro de ella, p. ej. tras un SELECT ... FOR UPDATE, sería una ida y
+    vuelta más a MySQL con los bloqueos de fila tomados.
+    """
+
+    def __init__(self, connection: Any, acquire_ms: float, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS) -> None:
+        self._connection = connection
+        self._pending_acquire_ms = acquire_ms
+        self.threshold_ms = threshold_ms
+        self._pending_explains: List[Tuple[Dict[str, Any], str, Any]] = []
+        pool_acquire_seconds.observe(acquire_ms / 1000)
+
+    def cursor(self, *args: Any, **kwargs: Any) -> InstrumentedCursor:
+        return InstrumentedCursor(self._connection.cursor(*args, **kwargs), self)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._connection, name)
+
+    def commit(self) -> None:
+        self._connection.commit()
+        self._flush_pending_explains()
+
+    def rollback(self) -> None:
+        self._connection.rollback()
+        self._flush_pending_explains()
+
+    def close(self) -> None:
+        try:
+            self._flush_pending_explains()
+        finally:
+            self._connection.close()
+
+    def record_statement(self, sql: str, params: Any, execute_ms: float, cursor: Any) -> None:
+        acquire_ms, self._pending_acquire_ms = self._pending_acquire_ms, 0.0
+        shape = normalize_sql(sql)
+        operation = _operation(shape)
+        query_duration_seconds.observe(execute_ms / 1000, operation=operation)
+
+        if acquire_ms + execute_ms < self.threshold_ms:
+            return
+        slow_queries_total.inc(operation=operation)
+
+        entry: Dict[str, Any] = {
+            "sql": shape,
+            "param_count": _param_count(params),
+            "rows": getattr(cursor, "rowcount", None),
+            "acquire_ms": round(acquire_ms, 2),
+            "execute_ms": round(execute_ms, 2),
+        }
+        if operation == "select" and SLOW_QUERY_EXPLAIN_ENABLED and explain_limiter.acquire(("EXPLAIN", shape))[0]:
+            self._pending_explains.append((entry, sql, params))
+            return
+        log_slow_query(entry)
+
+    def _flush_pending_explains(self) -> None:
+        """Captura el EXPLAIN de las SELECT lentas de la transacción que terminó y las loguea."""
+        pending, self._pending_explains = self._pending_explains, []
+        for entry, sql, params in pending:
+            entry["explain"] = self._explain(sql, params)
+            log_slow_query(entry)
+
+    def _explain(self, sql: str, params: Any) -> Optional[List[Dict[str, Any]]]:
+        """
+        Captura el plan de ejecución con un cursor aparte (sin instrumentar), para no pisar
+        el resultado ya leído por el cursor de la consulta original.
+        """
+        try:
+            with self._connection.cursor() as explain_cursor:
+                explain_cursor.execute("EXPLAIN " + sql, params)
+                plan = list(explain_cursor.fetchall())
+            explains_captured_total.inc()
+            return plan
+        except Exception as e:
+            print(f"SLOW QUERY WARNING: No se pudo capturar el EXPLAIN. {e}")
+            return None
+
+
+def log_slow_query(entry: Dict[str, Any]) -> None:
+    """Escribe la consulta lenta en el log estructurado del servicio (logs/YYYY-MM-DD.log)."""
+    write_structured_log({
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat().replace('+00:00', 'Z'),
+        "service": "inventory-service",
+        "error_code": "SLOW_QUERY",
+        "api_url": request.path if has_request_context() else "N/A",
+        "message": json.dumps(entry, default=str, separators=(",", ":")),
+        "trace_id": current_trace_id(),
+    })
@@ -1,12 +1,13 @@
-from typing import Optional, Any
+from typing import Optional, Any, Dict
 
 # Excepción base para todos los errores que deben ser formateados como JSON API
 class APIException(Exception):
-    def __init__(self, message: str, status_code: int, error_code: str, detail: Optional[str] = None) -> None:
+    def __init__(self, message: str, status_code: int, error_code: str, detail: Optional[str] = None, meta: Optional[Dict[str, Any]] = None) -> None:
         super().__init__(message)
         self.status_code: int = status_code
         self.error_code: str = error_code
         self.detail: str = detail if detail is not None else message
+        self.meta: Optional[Dict[str, Any]] = meta
 
 # 503 Service Unavailable (Para fallos de resiliencia inter-servicio)
 class ServiceUnavailableError(APIException):
@@ -18,6 +19,16 @@ class ServiceUnavailableError(APIException):
             detail=detail
         )
 
+# 504 Gateway Timeout (El presupuesto de tiempo de la solicitud se agotó)
+class DeadlineExceededError(APIException):
+    def __init__(self, detail: str = "Se agotó el tiempo máximo de la solicitud.") -> None:
+        super().__init__(
+            message="Tiempo de Solicitud Agotado",
+            status_code=504,
+            error_code="DEADLINE_EXCEEDED",
+            detail=detail
+        )
+
 # 404 Not Found (Para manejar IDs no encontrados)
 class NotFoundError(APIException):
     def __init__(self, resource_type: str, resource_id: Any) -> None:
@@ -48,3 +59,11 @@ class ConflictError(APIException):
             error_code="RESOURCE_CONFLICT",
             detail=detail
         )
+
+
+# 409 Conflict (Para escrituras con una versión desactualizada - concurrencia optimista)
+class VersionConflictError(ConflictError):
+    def __init__(self, detail: str, current_state: Dict[str, Any]) -> None:
+        super().__init__(detail)
+        self.error_code = "VERSION_CONFLICT"
+        self.meta = {"current_state": current_state}
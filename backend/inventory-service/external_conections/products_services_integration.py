@@ -1,22 +1,59 @@
 import os
+import threading
 import requests
-from typing import Dict, Any, Tuple
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, Sequence, Tuple
 
-from exceptions.api_exceptions import ServiceUnavailableError
+from config.settings import PRODUCTS_HTTP_TIMEOUT_SECONDS
+from exceptions.api_exceptions import DeadlineExceededError, ServiceUnavailableError
+from middleware.request_deadline import DEADLINE_HEADER, check_deadline, outbound_timeout, remaining_seconds
+from middleware.request_tracing import inject_traceparent, start_span
 
-def get_products_from_service(page: int = 1, limit: int = 10) -> Tuple[Dict[str, Any], int]:
+# Conexiones HTTP keep-alive reutilizadas hacia el Products Service (por proceso).
+PRODUCTS_HTTP_POOL_SIZE = int(os.environ.get('PRODUCTS_HTTP_POOL_SIZE', 10))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    """Retorna la sesión HTTP del proceso, creándola si no existe."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=PRODUCTS_HTTP_POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+def reset_http_session() -> None:
+    """
+    Descarta la sesión heredada tras un fork (hook post_fork de Gunicorn) para que
+    cada worker abra sus propios sockets keep-alive.
+    """
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+
+def get_products_from_service(
+    page: int = 1, limit: int = 10, fields: Optional[Sequence[str]] = None
+) -> Tuple[Dict[str, Any], int]:
     """
     Obtiene la lista de productos desde el servicio de productos.
 
     Args:
         page (int): El número de página a solicitar.
         limit (int): El número de productos por página.
+        fields (Sequence[str], opcional): Atributos a pedir (`fields[productos]`); None pide todos.
 
     Returns:
         Tuple[Dict[str, Any], int]: Una tupla con los datos de la respuesta y el código de estado.
 
     Lanza:
         ServiceUnavailableError: Si el servicio de productos no está disponible o responde con un error.
+        DeadlineExceededError: Si se agota el tiempo de la solicitud antes o durante la llamada.
     """
     base_url = os.environ.get("PRODUCTS_SERVICE_URL_INTERNAL")
     if not base_url:
@@ -27,12 +64,35 @@ def get_products_from_service(page: int = 1, limit: int = 10) -> Tuple[Dict[str,
 
     url = f"{base_url}/api/v1/productos"
     params = {"page": page, "limit": limit}
+    if fields is not None:
+        params["fields[productos]"] = ",".join(fields)
     headers = {"X-API-KEY": products_api_key}
 
-    try:
-        response = requests.get(url, params=params, headers=headers, timeout=5)
-        response.raise_for_status()  # Lanza una excepción para códigos de estado 4xx/5xx
-        return response.json(), response.status_code
-    except requests.exceptions.RequestException as e:
-        # Engloba cualquier error de `requests` en una excepción personalizada
-        raise ServiceUnavailableError(f"No se pudo conectar con el servicio de productos: {e}")
+    check_deadline("llamar al servicio de productos")
+    timeout = outbound_timeout(PRODUCTS_HTTP_TIMEOUT_SECONDS)
+    # Propaga el presupuesto restante para que el servicio de productos no trabaje de más.
+    headers[DEADLINE_HEADER] = f"{timeout:.3f}"
+
+    with start_span("products-service GET /api/v1/productos", kind="client") as span:
+        # traceparent del span de la llamada (o del raíz si la traza no está muestreada).
+        inject_traceparent(headers)
+        if span is not None:
+            span.set_attribute("http.url", url)
+            span.set_attribute("http.timeout_seconds", round(timeout, 3))
+        try:
+            response = get_http_session().get(url, params=params, headers=headers, timeout=timeout)
+            if span is not None:
+                span.set_attribute("http.status_code", response.status_code)
+            response.raise_for_status()  # Lanza una excepción para códigos de estado 4xx/5xx
+            return response.json(), response.status_code
+        except requests.exceptions.Timeout as e:
+            remaining = remaining_seconds()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceededError("El servicio de productos no respondió dentro del tiempo de la solicitud.") from e
+            raise ServiceUnavailableError(f"No se pudo conectar con el servicio de productos: {e}")
+        except requests.exceptions.RequestException as e:
+            # Engloba cualquier error de `requests` en una excepción personalizada
+            raise ServiceUnavailableError(f"No se pudo conectar con el servicio de productos: {e}")
+        except ValueError as e:
+            # Cuerpo que no es JSON (versiones de requests sin JSONDecodeError propio)
+            raise ServiceUnavailableError(f"El servicio de productos retornó un JSON inválido: {e}")
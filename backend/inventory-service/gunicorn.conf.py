@@ -0,0 +1,59 @@
+# gunicorn.conf.py - Configuración de runtime de Gunicorn para inventory-service
+# Uso: gunicorn -c gunicorn.conf.py "app:create_app()"
+# Todos los valores se controlan por variables de entorno (ver .env.example).
+import multiprocessing
+import os
+
+# ----------------- SOCKET -----------------
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+backlog = int(os.environ.get('GUNICORN_BACKLOG', 2048))
+
+# ----------------- WORKERS -----------------
+# sync: un request por worker. gthread: hilos por worker (recomendado, la carga es I/O contra
+# MySQL y Products Service). gevent: requiere instalar gevent y no se incluye por defecto.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))  # Solo gevent/eventlet
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Reciclaje de workers: el jitter evita que todos se reinicien a la vez.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+# preload_app carga la aplicación una sola vez en el master y los workers se crean por fork
+# (arranque más rápido y memoria compartida copy-on-write). Es seguro porque post_fork
+# reconstruye los recursos con sockets (pool de MySQL y sesión HTTP) en cada worker.
+preload_app = os.environ.get('GUNICORN_PRELOAD_APP', 'true').lower() == 'true'
+
+# ----------------- LOGGING -----------------
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', '-')
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# ----------------- HOOKS -----------------
+
+def post_fork(server, worker):
+    """
+    Cada worker descarta el pool de MySQL y la sesión HTTP heredados del master y, si
+    CACHE_SNAPSHOT_ENABLED, carga el snapshot de cachés e inicia su guardado periódico.
+    """
+    from db.db_connection import DBConnection
+    from external_conections.products_services_integration import reset_http_session
+    from routes.invetory_routes import inventory_service
+
+    DBConnection.reset_pool()
+    reset_http_session()
+    server.log.info("Worker %s: pool de MySQL y sesión HTTP reinicializados tras el fork.", worker.pid)
+
+    if inventory_service.cache_snapshotter is not None:
+        inventory_service.cache_snapshotter.start()
+
+def worker_exit(server, worker):
+    """Guarda el snapshot de cachés al apagar el worker (deploy o reciclado por max_requests)."""
+    from routes.invetory_routes import inventory_service
+    if inventory_service.cache_snapshotter is not None:
+        inventory_service.cache_snapshotter.stop()
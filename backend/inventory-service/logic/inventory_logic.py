@@ -1,10 +1,51 @@
-import pymysql
-from typing import Any, Dict, Optional, List
+import hashlib
+import json
+import uuid
+from functools import partial
+from typing import Any, Dict, Optional, List, Tuple
 
 from models.inventory_table import InventoryRepository
-from db.db_connection import DBConnection
-from exceptions.api_exceptions import NotFoundError, InvalidInputError, ConflictError
+from cache.negative_lookup_cache import NegativeLookupCache
+from cache.page_prefetcher import PagePrefetcher
+from cache.cache_snapshot import CacheSnapshotter
+from logic.page_fanout import PageFanout
+from db.drivers import INTEGRITY_ERRORS, is_duplicate_entry
+from logic.stock_change_hub import StockChangeHub
+from logic.purchase_outbox_worker import PurchaseOutboxWorker
+from models.repository_factory import create_inventory_repository
+from models.shared_stock_repository import SharedStockRepository
+from cache.shared_stock_table import ABSENT_VERSION
+from models.product_schema import INVENTORY_FIELDS
+from models.stock_allocation import LOCATION_CODE_MAX_LENGTH, LocatedStockError, allocation_to_json
+from models.adjustment_evaluation import MAX_AVAILABLE_STOCK
+from exceptions.api_exceptions import (
+    NotFoundError, InvalidInputError, ConflictError, VersionConflictError, ServiceUnavailableError
+)
 from external_conections.products_services_integration import get_products_from_service
+from config.settings import (
+    IDEMPOTENCY_KEY_TTL_SECONDS, IDEMPOTENCY_KEY_MAX_LENGTH,
+    ADJUSTMENTS_MAX_LINES, ADJUSTMENTS_CHUNK_SIZE,
+    NEGATIVE_CACHE_ENABLED, NEGATIVE_CACHE_TTL_SECONDS, NEGATIVE_CACHE_MAX_ENTRIES,
+    PREFETCH_ENABLED, PREFETCH_TTL_SECONDS, PREFETCH_MAX_PAGES, PREFETCH_MAX_WORKERS,
+    FANOUT_ENABLED, FANOUT_CHUNK_SIZE, FANOUT_MAX_WORKERS,
+    CACHE_SNAPSHOT_ENABLED, CACHE_SNAPSHOT_PATH, CACHE_SNAPSHOT_INTERVAL_SECONDS,
+    ASYNC_PURCHASES_ENABLED, ASYNC_PURCHASE_PARTITIONS, ASYNC_PURCHASE_BATCH_SIZE,
+    ASYNC_PURCHASE_POLL_INTERVAL_SECONDS, MULTI_WAREHOUSE_ENABLED
+)
+
+LOCATION_PRIORITY_MAX = 65535  # SMALLINT UNSIGNED
+PRODUCT_ID_MAX = 18446744073709551615  # BIGINT UNSIGNED
+
+
+def _product_id_of(product: Any) -> Optional[int]:
+    """ID entero de un producto del Products Service, o None si falta o no es válido."""
+    if not isinstance(product, dict):
+        return None
+    try:
+        return int(product["id"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
 
 class InventoryService:
     """
@@ -12,17 +53,70 @@ class InventoryService:
     Orquesta las operaciones del repositorio y aplica las validaciones de negocio.
     """
 
-    def __init__(self, inventory_repository: Optional[InventoryRepository] = None) -> None:
+    def __init__(
+        self,
+        inventory_repository: Optional[InventoryRepository] = None,
+        negative_cache: Optional[NegativeLookupCache] = None,
+        stock_change_hub: Optional[StockChangeHub] = None,
+        page_prefetcher: Optional[PagePrefetcher] = None,
+        purchase_outbox_worker: Optional[PurchaseOutboxWorker] = None,
+        page_fanout: Optional[PageFanout] = None,
+        cache_snapshotter: Optional[CacheSnapshotter] = None
+    ) -> None:
         """
         Inicializa el servicio con una instancia del repositorio de inventario.
-        Si no se proporciona un repositorio, crea uno por defecto.
+        Si no se proporciona un repositorio, crea el del backend configurado (STORAGE_BACKEND).
+        La caché negativa de product_id sin inventario, el prefetch de la página siguiente
+        de /products-with-stock, la división en paralelo de sus páginas grandes y los workers
+        de compras asíncronas se crean según la configuración, igual que el snapshot en disco
+        de las cachés (que se inicia tras el fork, ver gunicorn.conf.py).
+        El hub de cambios de stock (opcional) se notifica tras cada escritura exitosa.
         """
         if inventory_repository is None:
-            db_connection = DBConnection()
-            self.inventory_repository = InventoryRepository(db_connection)
+            self.inventory_repository = create_inventory_repository()
         else:
             self.inventory_repository = inventory_repository
 
+        if negative_cache is None and NEGATIVE_CACHE_ENABLED:
+            negative_cache = NegativeLookupCache(NEGATIVE_CACHE_TTL_SECONDS, NEGATIVE_CACHE_MAX_ENTRIES)
+        self.negative_cache = negative_cache
+        self.stock_change_hub = stock_change_hub
+
+        if page_prefetcher is None and PREFETCH_ENABLED:
+            page_prefetcher = PagePrefetcher(
+                self._fetch_products_with_stock, PREFETCH_TTL_SECONDS, PREFETCH_MAX_PAGES, PREFETCH_MAX_WORKERS
+            )
+        self.page_prefetcher = page_prefetcher
+
+        if page_fanout is None and FANOUT_ENABLED:
+            page_fanout = PageFanout(FANOUT_CHUNK_SIZE, FANOUT_MAX_WORKERS)
+        self.page_fanout = page_fanout
+
+        has_caches = self.negative_cache is not None or self.page_prefetcher is not None
+        if cache_snapshotter is None and CACHE_SNAPSHOT_ENABLED and has_caches:
+            cache_snapshotter = CacheSnapshotter(
+                CACHE_SNAPSHOT_PATH, CACHE_SNAPSHOT_INTERVAL_SECONDS,
+                self.inventory_repository.get_inventory_watermark,
+                negative_cache=self.negative_cache, page_prefetcher=self.page_prefetcher
+            )
+        self.cache_snapshotter = cache_snapshotter
+
+        if purchase_outbox_worker is None and ASYNC_PURCHASES_ENABLED:
+            purchase_outbox_worker = PurchaseOutboxWorker(
+                self.inventory_repository, ASYNC_PURCHASE_PARTITIONS, ASYNC_PURCHASE_BATCH_SIZE,
+                ASYNC_PURCHASE_POLL_INTERVAL_SECONDS, on_processed=self._on_async_purchases_processed
+            )
+        self.purchase_outbox_worker = purchase_outbox_worker
+
+    def _notify_stock_change(self) -> None:
+        """
+        Despierta al observador de cambios para que los clientes SSE reciban el nuevo stock
+        y descarta las páginas prefetcheadas, que ya tendrían el stock anterior.
+        """
+        if self.stock_change_hub is not None:
+            self.stock_change_hub.notify_write()
+        if self.page_prefetcher is not None:
+            self.page_prefetcher.invalidate()
 
     def create_new_inventory(self, product_id: int, available_stock: int, location: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -37,15 +131,18 @@ class InventoryService:
 
         try:
             inventory_id = self.inventory_repository.create_inventory(product_id, available_stock, location)
+            if self.negative_cache is not None:
+                self.negative_cache.discard(product_id)
+            self._notify_stock_change()
             return {
                 "id": inventory_id,
                 "product_id": product_id,
                 "available_stock": available_stock,
                 "location": location
             }
-        except pymysql.err.IntegrityError as e:
-            # Captura el error de clave única para 'product_id'
-            if e.args[0] == 1062: # Código de error para 'Duplicate entry'
+        except INTEGRITY_ERRORS as e:
+            # Captura el error de clave única para 'product_id' (con cualquier driver de MySQL)
+            if is_duplicate_entry(e): # Código de error 1062 'Duplicate entry'
                 raise ConflictError(f"Ya existe un inventario para el producto con ID {product_id}.")
             # Relanza otros errores de integridad (ej. FK no encontrada)
             raise InvalidInputError(f"No se pudo crear el inventario. Verifique que el producto con ID {product_id} exista.")
@@ -54,39 +151,159 @@ class InventoryService:
         """
         Obtiene el inventario de un producto específico.
 
+        Los product_id confirmados como inexistentes se responden desde la caché negativa
+        sin consultar la base de datos hasta que expiran o se crea su inventario.
+
         Lanza:
             - NotFoundError: Si no se encuentra un inventario para el producto_id.
         """
+        if self._cached_as_missing(product_id):
+            raise NotFoundError("inventario", product_id)
+
         inventory = self.inventory_repository.get_inventory_by_product_id(product_id)
         if not inventory:
+            if self.negative_cache is not None:
+                self.negative_cache.add(product_id)
             raise NotFoundError("inventario", product_id)
         return inventory
 
-    def update_stock_for_product(self, product_id: int, new_stock: int) -> Dict[str, Any]:
+    def update_stock_for_product(self, product_id: int, new_stock: int, expected_version: Optional[int] = None) -> Dict[str, Any]:
         """
         Valida y actualiza el stock de un producto.
+        Con `expected_version` la escritura es un compare-and-set: si el inventario cambió
+        desde que el cliente lo leyó, no se sobrescribe y se informa el estado actual.
 
         Lanza:
             - InvalidInputError: Si el nuevo stock es negativo.
             - NotFoundError: Si no se encuentra un inventario para el producto_id.
+            - VersionConflictError: Si la versión actual no coincide con `expected_version`.
+            - ConflictError: Si el stock del producto se administra por ubicación.
         """
         if new_stock < 0:
             raise InvalidInputError("El nuevo stock ('new_stock') no puede ser negativo.")
 
         # Primero, verificamos que el inventario exista para dar un error 404 claro.
-        self.get_inventory_for_product(product_id)
+        current = self.get_inventory_for_product(product_id)
+        if expected_version is not None and current.get("version") != expected_version:
+            raise self._version_conflict(product_id, expected_version, current)
+
+        try:
+            affected_rows = self.inventory_repository.update_inventory_stock(product_id, new_stock, expected_version)
+        except LocatedStockError:
+            # El repositorio lo comprueba en la transacción del UPDATE, con la fila bloqueada.
+            raise ConflictError(
+                f"El stock del producto con ID {product_id} se administra por ubicación: "
+                f"use PUT /{product_id}/locations/<location_code>."
+            )
 
-        affected_rows = self.inventory_repository.update_inventory_stock(product_id, new_stock)
-        
-        # Esta comprobación es una salvaguarda, aunque get_inventory_for_product ya lo valida.
         if affected_rows == 0:
-            raise NotFoundError("inventario", product_id)
+            # Sin versión esperada es una salvaguarda: la fila se eliminó tras la lectura.
+            current = self.inventory_repository.get_inventory_by_product_id(product_id)
+            if not current:
+                raise NotFoundError("inventario", product_id)
+            # Con versión esperada, otra escritura ganó la carrera entre la lectura y el UPDATE.
+            raise self._version_conflict(product_id, expected_version, current)
 
-        return {
+        self._notify_stock_change()
+        result: Dict[str, Any] = {
             "product_id": product_id,
             "available_stock": new_stock,
             "message": "Stock actualizado correctamente."
         }
+        if expected_version is not None:
+            result["version"] = expected_version + 1
+        return result
+
+    def _version_conflict(self, product_id: int, expected_version: Optional[int], current: Dict[str, Any]) -> VersionConflictError:
+        """Construye el error 409 con el estado actual del inventario."""
+        return VersionConflictError(
+            f"El inventario del producto con ID {product_id} fue modificado por otra operación "
+            f"(versión esperada: {expected_version}, versión actual: {current.get('version')}).",
+            current_state=current
+        )
+
+    def set_reorder_threshold(self, product_id: int, reorder_threshold: Optional[int]) -> Dict[str, Any]:
+        """
+        Define el umbral de stock bajo de un producto; None vuelve al umbral por defecto
+        (LOW_STOCK_DEFAULT_THRESHOLD). Si el stock actual queda del otro lado del nuevo
+        umbral, el cruce se registra como alerta en la misma escritura.
+
+        Lanza:
+            - InvalidInputError: Si el umbral no es un entero no negativo ni None.
+            - NotFoundError: Si no se encuentra un inventario para el producto_id.
+        """
+        if reorder_threshold is not None and (
+            not isinstance(reorder_threshold, int) or isinstance(reorder_threshold, bool) or reorder_threshold < 0
+        ):
+            raise InvalidInputError("'reorder_threshold' debe ser un número entero no negativo o null.")
+        if self.inventory_repository.set_reorder_threshold(product_id, reorder_threshold) == 0:
+            raise NotFoundError("inventario", product_id)
+        return {
+            "product_id": product_id,
+            "reorder_threshold": reorder_threshold,
+            "message": "Umbral de stock bajo actualizado correctamente."
+        }
+
+    def get_locations_for_product(self, product_id: int) -> Dict[str, Any]:
+        """
+        Retorna el stock total de un producto y su reparto por ubicación, de la más cercana a
+        la más lejana (vacío si el producto no tiene ubicaciones).
+
+        Lanza:
+            - NotFoundError: Si no se encuentra un inventario para el producto_id.
+        """
+        inventory = self.get_inventory_for_product(product_id)
+        return {
+            "product_id": product_id,
+            "available_stock": inventory["available_stock"],
+            "locations": self.inventory_repository.get_locations(product_id)
+        }
+
+    def set_location_stock(
+        self, product_id: int, location_code: Any, available_stock: Any, priority: Any = None
+    ) -> Dict[str, Any]:
+        """
+        Fija el stock de un producto en una ubicación (la crea si no existe) y recalcula su
+        total en la misma escritura. `priority` ordena las ubicaciones para la estrategia
+        `nearest` (menor es más cercana); None conserva la actual.
+
+        Lanza:
+            - InvalidInputError: Si el inventario multi-bodega está desactivado o algún valor es inválido.
+            - NotFoundError: Si no se encuentra un inventario para el producto_id.
+        """
+        if not MULTI_WAREHOUSE_ENABLED:
+            raise InvalidInputError("El inventario por ubicación está desactivado (MULTI_WAREHOUSE_ENABLED).")
+        if not isinstance(location_code, str) or not location_code.strip() or len(location_code) > LOCATION_CODE_MAX_LENGTH:
+            raise InvalidInputError(
+                f"'location_code' debe ser un texto no vacío de hasta {LOCATION_CODE_MAX_LENGTH} caracteres."
+            )
+        if not isinstance(available_stock, int) or isinstance(available_stock, bool) or available_stock < 0:
+            raise InvalidInputError("'available_stock' debe ser un número entero no negativo.")
+        if priority is not None and (
+            not isinstance(priority, int) or isinstance(priority, bool) or not 0 <= priority <= LOCATION_PRIORITY_MAX
+        ):
+            raise InvalidInputError(f"'priority' debe ser un número entero entre 0 y {LOCATION_PRIORITY_MAX} o null.")
+
+        if self.inventory_repository.set_location_stock(product_id, location_code, available_stock, priority) == 0:
+            raise NotFoundError("inventario", product_id)
+        self._notify_stock_change()
+        return self.get_locations_for_product(product_id)
+
+    def get_stock_alerts(self, after_id: int, limit: int) -> Dict[str, Any]:
+        """
+        Retorna una página de alertas de stock bajo (cruces de umbral registrados por las
+        escrituras) con id mayor que `after_id`. `meta.next_after_id` es el cursor de la
+        página siguiente: paginar por id no relee las alertas ya vistas.
+        """
+        alerts = self.inventory_repository.get_stock_alerts(after_id, limit)
+        return {
+            "data": [{"type": "stock_alerts", "id": str(alert["id"]), "attributes": alert} for alert in alerts],
+            "meta": {
+                "after_id": after_id,
+                "limite": limit,
+                "next_after_id": alerts[-1]["id"] if alerts else after_id
+            }
+        }
 
     def delete_inventory_for_product(self, product_id: int) -> None:
         """
@@ -98,8 +315,108 @@ class InventoryService:
         affected_rows = self.inventory_repository.delete_inventory(product_id)
         if affected_rows == 0:
             raise NotFoundError("inventario", product_id)
+        if self.page_prefetcher is not None:
+            self.page_prefetcher.invalidate()
 
-    def get_products_with_stock(self, page: int, limit: int) -> Dict[str, Any]:
+    def apply_stock_adjustments(self, adjustments: Any) -> Dict[str, Any]:
+        """
+        Aplica ajustes relativos de stock ({product_id, delta, reason}) en lotes.
+        Cada bloque de ADJUSTMENTS_CHUNK_SIZE líneas se aplica en una transacción con
+        UPDATEs atómicos `available_stock + delta`; las líneas inválidas, fuera de rango o que
+        dejarían el stock negativo se rechazan individualmente sin afectar al resto. Si falla un
+        bloque, los anteriores quedan confirmados y se reportan; ese bloque y los siguientes se
+        rechazan con SERVICE_UNAVAILABLE.
+
+        Returns:
+            Dict[str, Any]: El resultado de cada línea (en el orden recibido) y un resumen.
+
+        Lanza:
+            - InvalidInputError: Si la lista de ajustes está vacía, no es una lista o excede el máximo.
+        """
+        if not isinstance(adjustments, list) or not adjustments:
+            raise InvalidInputError("'adjustments' debe ser una lista no vacía de ajustes.")
+        if len(adjustments) > ADJUSTMENTS_MAX_LINES:
+            raise InvalidInputError(f"Se permiten como máximo {ADJUSTMENTS_MAX_LINES} ajustes por solicitud.")
+
+        results: List[Dict[str, Any]] = []
+        valid_lines: List[Tuple[int, Dict[str, Any]]] = []
+        for index, line in enumerate(adjustments):
+            result, error_detail = self._validate_adjustment_line(index, line)
+            results.append(result)
+            if error_detail:
+                self._reject_adjustment(result, "INVALID_INPUT_DATA", error_detail)
+            else:
+                valid_lines.append((index, result))
+
+        for start in range(0, len(valid_lines), ADJUSTMENTS_CHUNK_SIZE):
+            chunk = valid_lines[start:start + ADJUSTMENTS_CHUNK_SIZE]
+            try:
+                outcomes = self.inventory_repository.apply_stock_adjustments(
+                    [(result["product_id"], result["delta"]) for _, result in chunk]
+                )
+            except Exception as e:
+                # Los bloques anteriores ya están confirmados: se reportan, y este bloque y los
+                # siguientes se rechazan sin aplicarse para que el cliente los reintente.
+                print(f"CRITICAL ADJUSTMENTS ERROR: Falló el bloque de ajustes que inicia en la línea {chunk[0][0]}. {e}")
+                for _, result in valid_lines[start:]:
+                    self._reject_adjustment(
+                        result, "SERVICE_UNAVAILABLE", "El ajuste no se aplicó por un error de la base de datos. Reintente."
+                    )
+                break
+            for (_, result), outcome in zip(chunk, outcomes):
+                result["available_stock"] = outcome["available_stock"]
+                if outcome["status"] == "APPLIED":
+                    result["status"] = "applied"
+                elif outcome["status"] == "NOT_FOUND":
+                    self._reject_adjustment(
+                        result, "RESOURCE_NOT_FOUND", f"No existe inventario para el producto con ID {result['product_id']}."
+                    )
+                elif outcome["status"] == "OUT_OF_RANGE":
+                    self._reject_adjustment(
+                        result, "INVALID_INPUT_DATA",
+                        f"El ajuste dejaría el stock por encima de {MAX_AVAILABLE_STOCK}. Stock disponible: {outcome['available_stock']}, delta: {result['delta']}."
+                    )
+                else:
+                    self._reject_adjustment(
+                        result, "INVENTORY_NOT_AVAILABLE",
+                        f"El ajuste dejaría el stock en negativo. Stock disponible: {outcome['available_stock']}, delta: {result['delta']}."
+                    )
+
+        applied = sum(1 for result in results if result["status"] == "applied")
+        if applied:
+            self._notify_stock_change()
+        return {
+            "results": results,
+            "summary": {"total": len(results), "applied": applied, "rejected": len(results) - applied}
+        }
+
+    def _validate_adjustment_line(self, index: int, line: Any) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Construye el resultado base de una línea de ajuste y retorna el motivo si es inválida."""
+        if not isinstance(line, dict):
+            return {"index": index, "status": "pending"}, "Cada ajuste debe ser un objeto con 'product_id' y 'delta'."
+
+        product_id, delta, reason = line.get("product_id"), line.get("delta"), line.get("reason")
+        result: Dict[str, Any] = {
+            "index": index, "product_id": product_id, "delta": delta, "reason": reason, "status": "pending"
+        }
+        if not isinstance(product_id, int) or isinstance(product_id, bool) or not 0 < product_id <= PRODUCT_ID_MAX:
+            return result, f"'product_id' debe ser un número entero entre 1 y {PRODUCT_ID_MAX}."
+        if not isinstance(delta, int) or isinstance(delta, bool) or delta == 0:
+            return result, "'delta' debe ser un número entero distinto de cero."
+        if abs(delta) > MAX_AVAILABLE_STOCK:
+            return result, f"'delta' debe estar entre -{MAX_AVAILABLE_STOCK} y {MAX_AVAILABLE_STOCK}."
+        if reason is not None and not isinstance(reason, str):
+            return result, "'reason' debe ser un texto."
+        return result, None
+
+    def _reject_adjustment(self, result: Dict[str, Any], error_code: str, detail: str) -> None:
+        """Marca una línea de ajuste como rechazada con el código de error estándar."""
+        result["status"] = "rejected"
+        result["error"] = {"code": error_code, "detail": detail}
+
+    def get_products_with_stock(
+        self, page: int, limit: int, product_fields: Optional[Tuple[str, ...]] = None
+    ) -> Dict[str, Any]:
         """
         Obtiene una lista paginada de productos desde el servicio de productos
         y la enriquece con la información de stock del inventario.
@@ -107,62 +424,266 @@ class InventoryService:
         Args:
             page (int): Número de página a solicitar.
             limit (int): Límite de productos por página.
+            product_fields (Tuple[str, ...], opcional): Atributos pedidos (`fields[productos]`).
+                Al Products Service solo se le piden esos atributos, y el stock solo se consulta
+                si se pidió `available_stock`. Una página completa prefetcheada también sirve
+                (el esquema la recorta), pero las páginas parciales no se prefetchean.
 
         Returns:
             Dict[str, Any]: Un diccionario con la lista de productos enriquecida y metadatos de paginación.
         """
-        # 1. Obtener productos del servicio externo
-        products_data, _ = get_products_from_service(page, limit)
+        prefetcher = self.page_prefetcher
+        products_data = prefetcher.get(page, limit) if prefetcher is not None else None
+        if products_data is None:
+            products_data = self._fetch_products_with_stock(page, limit, product_fields)
+        if prefetcher is not None and product_fields is None:
+            # Solo encola: la página siguiente se obtiene en segundo plano.
+            prefetcher.schedule_next(page, limit, products_data)
+        return products_data
+
+    def get_stock_page(self, page: int, limit: int) -> Dict[str, Any]:
+        """
+        Página de `/products-with-stock?view=stock`: solo datos de inventario, ordenados por
+        product_id y sin consultar el Products Service. Lista los productos con registro de
+        inventario, con el mismo formato JSON:API y `meta` que la vista completa.
+        """
+        offset = (page - 1) * limit
+        rows, total = self.inventory_repository.get_stock_page(limit, offset)
+        return {
+            "data": [
+                {"type": "productos", "id": str(product_id), "attributes": {"available_stock": available_stock}}
+                for product_id, available_stock in rows
+            ],
+            "meta": {"total": total, "limite": limit, "offset": offset}
+        }
+
+    def _fetch_products_with_stock(
+        self, page: int, limit: int, product_fields: Optional[Tuple[str, ...]] = None
+    ) -> Dict[str, Any]:
+        """
+        Obtiene una página del Products Service y la enriquece con el stock (sin prefetch).
+        Las páginas grandes se piden por sub-páginas en paralelo si el fan-out está activo.
+        """
+        fetch_chunk = partial(self._fetch_page_with_stock, product_fields=product_fields)
+        if self.page_fanout is not None:
+            return self.page_fanout.fetch(page, limit, fetch_chunk)
+        return fetch_chunk(page, limit)
+
+    def _fetch_page_with_stock(
+        self, page: int, limit: int, product_fields: Optional[Tuple[str, ...]] = None
+    ) -> Dict[str, Any]:
+        """Obtiene una página (o sub-página) del Products Service y la enriquece con el stock."""
+        # 1. Obtener productos del servicio externo (solo los atributos pedidos, si se indicaron)
+        if product_fields is None:
+            products_data, _ = get_products_from_service(page, limit)
+        else:
+            upstream_fields = [name for name in product_fields if name not in INVENTORY_FIELDS]
+            products_data, _ = get_products_from_service(page, limit, fields=upstream_fields)
+        if not isinstance(products_data, dict) or not isinstance(products_data.get("data") or [], list):
+            raise ServiceUnavailableError("El servicio de productos retornó una respuesta con formato inválido.")
 
         if not products_data.get("data"):
             return {"data": [], "meta": products_data.get("meta", {})}
+        with_stock = product_fields is None or "available_stock" in product_fields
 
-        # 2. Extraer IDs de productos
-        product_ids = [int(p["id"]) for p in products_data["data"]]
+        # 2. Extraer IDs de productos (los elementos sin un ID entero válido no se consultan)
+        product_ids = [pid for pid in map(_product_id_of, products_data["data"]) if pid is not None]
 
-        # 3. Obtener el inventario para esos IDs
-        inventory_list = self.inventory_repository.get_inventory_by_product_ids(product_ids)
+        # 3. Obtener el mapa de stock para esos IDs (construido desde un cursor de tuplas)
+        stock_map = self.inventory_repository.get_stock_map(product_ids) if product_ids and with_stock else {}
 
-        # 4. Crear un mapa de stock para búsqueda rápida
-        stock_map = {item["product_id"]: item["available_stock"] for item in inventory_list}
-
-        # 5. Enriquecer los productos con la información de stock
+        # 4. Enriquecer los productos con la información de stock
         for product in products_data["data"]:
-            product_id = int(product["id"])
-            # Asignar stock si existe, de lo contrario, 0.
-            stock = stock_map.get(product_id, 0)
-            product["attributes"]["available_stock"] = stock
+            if not isinstance(product, dict):
+                raise ServiceUnavailableError("El servicio de productos retornó un producto con formato inválido.")
+            product_id = _product_id_of(product)
+            attributes = product.get("attributes")
+            if not isinstance(attributes, dict):
+                attributes = product["attributes"] = {}
+            # Asignar stock si existe, de lo contrario, 0 (None si el producto no trae un ID válido).
+            if with_stock:
+                attributes["available_stock"] = stock_map.get(product_id, 0) if product_id is not None else None
 
         return products_data
 
     def purchase_product(self, product_id: int, quantity: int) -> Dict[str, Any]:
         """
         Procesa la compra de un producto, disminuyendo su stock.
+        Con MULTI_WAREHOUSE_ENABLED, el descuento se reparte entre las ubicaciones con la
+        estrategia configurada y la respuesta incluye desde dónde se despacha.
 
         Lanza:
             - InvalidInputError: Si la cantidad es inválida o no hay suficiente stock.
             - NotFoundError: Si el producto no se encuentra en el inventario.
         """
-        if not isinstance(quantity, int) or quantity <= 0:
-            raise InvalidInputError("La cantidad ('quantity') debe ser un número entero positivo.")
+        self._validate_purchase_quantity(quantity)
 
         # La lógica atómica en el repositorio se encarga de la race condition.
-        affected_rows = self.inventory_repository.decrease_inventory_stock(product_id, quantity)
+        if not MULTI_WAREHOUSE_ENABLED:
+            if self.inventory_repository.decrease_inventory_stock(product_id, quantity) == 0:
+                self._raise_purchase_failure(product_id, quantity)
+            self._notify_stock_change()
+            return self._build_purchase_result(product_id, quantity)
 
-        if affected_rows == 0:
-            # Verificamos si el producto existe para dar un error más específico.
-            inventory = self.inventory_repository.get_inventory_by_product_id(product_id)
-            if not inventory:
-                raise NotFoundError("inventario", product_id)
-            
-            # Si existe, el problema fue la falta de stock.
+        allocations = self.inventory_repository.allocate_stock(product_id, quantity)
+        if allocations is None:
+            self._raise_purchase_failure(product_id, quantity)
+        self._notify_stock_change()
+        result = self._build_purchase_result(product_id, quantity)
+        result["allocations"] = allocation_to_json(allocations)
+        return result
+
+    def purchase_product_idempotent(self, product_id: int, quantity: int, idempotency_key: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Procesa una compra protegida por un header Idempotency-Key.
+        La primera ejecución guarda su respuesta en la misma transacción del descuento;
+        los reintentos con la misma llave devuelven esa respuesta sin tocar el inventario.
+        Con MULTI_WAREHOUSE_ENABLED, la respuesta (también la guardada) incluye `allocations`
+        como en `purchase_product`.
+
+        Returns:
+            Tuple[Dict[str, Any], bool]: El resultado de la compra y si fue una respuesta repetida (replay).
+
+        Lanza:
+            - InvalidInputError: Si la cantidad o la llave son inválidas, o no hay suficiente stock.
+            - NotFoundError: Si el producto no se encuentra en el inventario.
+            - ConflictError: Si la llave ya se usó con un cuerpo de solicitud diferente.
+        """
+        self._validate_purchase_quantity(quantity)
+        if not idempotency_key or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
             raise InvalidInputError(
-                f"No hay suficiente stock para el producto con ID {product_id}. "
-                f"Stock disponible: {inventory.get('available_stock')}, se intentó comprar: {quantity}."
+                f"El header 'Idempotency-Key' debe tener entre 1 y {IDEMPOTENCY_KEY_MAX_LENGTH} caracteres."
             )
 
+        request_hash = hashlib.sha256(
+            json.dumps({"product_id": product_id, "quantity": quantity}, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+        # 1. Camino rápido: un reintento se responde sin tocar la fila de inventario.
+        stored = self.inventory_repository.get_idempotency_record(idempotency_key)
+        if stored:
+            return self._replay_idempotent_response(stored, request_hash), True
+
+        # 2. Primera ejecución: descuento y registro de la llave en una sola transacción.
+        result = self._build_purchase_result(product_id, quantity)
+        try:
+            if MULTI_WAREHOUSE_ENABLED:
+                allocations = self.inventory_repository.allocate_stock_idempotent(
+                    product_id, quantity, idempotency_key, request_hash, 200, result, IDEMPOTENCY_KEY_TTL_SECONDS
+                )
+                affected_rows = 0 if allocations is None else 1
+            else:
+                affected_rows = self.inventory_repository.decrease_inventory_stock_idempotent(
+                    product_id, quantity, idempotency_key, request_hash, 200, result, IDEMPOTENCY_KEY_TTL_SECONDS
+                )
+        except INTEGRITY_ERRORS as e:
+            if not is_duplicate_entry(e):
+                raise
+            # Un reintento concurrente confirmó primero la misma llave.
+            stored = self.inventory_repository.get_idempotency_record(idempotency_key)
+            if not stored:
+                raise ConflictError(f"La solicitud con Idempotency-Key '{idempotency_key}' aún se está procesando.")
+            return self._replay_idempotent_response(stored, request_hash), True
+
+        if affected_rows == 0:
+            self._raise_purchase_failure(product_id, quantity)
+        if MULTI_WAREHOUSE_ENABLED:
+            result["allocations"] = allocation_to_json(allocations)
+
+        self._notify_stock_change()
+        return result, False
+
+    def enqueue_purchase(self, product_id: int, quantity: int) -> Dict[str, Any]:
+        """
+        Acepta una compra asíncrona: la registra en el outbox durable y retorna su
+        tracking_id sin esperar el descuento del stock, que aplica un worker de la
+        partición del producto.
+
+        Lanza:
+            - InvalidInputError: Si el product_id o la cantidad son inválidos.
+            - NotFoundError: Si el producto está marcado como inexistente en la caché negativa.
+            - ServiceUnavailableError: Si las compras asíncronas están desactivadas.
+        """
+        worker = self.purchase_outbox_worker
+        if worker is None:
+            raise ServiceUnavailableError("Las compras asíncronas no están habilitadas.")
+        if not isinstance(product_id, int) or isinstance(product_id, bool):
+            raise InvalidInputError("El 'product_id' debe ser un número entero.")
+        self._validate_purchase_quantity(quantity)
+        if self._cached_as_missing(product_id):
+            raise NotFoundError("inventario", product_id)
+
+        tracking_id = uuid.uuid4().hex
+        partition = worker.partition_of(product_id)
+        self.inventory_repository.enqueue_purchase(tracking_id, product_id, quantity, partition)
+        worker.start()
+        worker.notify(partition)
+        return {"tracking_id": tracking_id, "product_id": product_id, "quantity": quantity, "status": "PENDING"}
+
+    def get_purchase_status(self, tracking_id: str) -> Dict[str, Any]:
+        """
+        Obtiene el estado de una compra asíncrona (PENDING, APPLIED, INSUFFICIENT_STOCK, NOT_FOUND o FAILED).
+
+        Lanza:
+            - NotFoundError: Si no existe una compra con ese tracking_id.
+        """
+        if self.purchase_outbox_worker is not None:
+            # Drena las compras que quedaron pendientes antes de un reinicio.
+            self.purchase_outbox_worker.start()
+        purchase = self.inventory_repository.get_purchase_request(tracking_id)
+        if not purchase:
+            raise NotFoundError("compra", tracking_id)
+        return purchase
+
+    def _on_async_purchases_processed(self, results: List[Dict[str, Any]]) -> None:
+        if any(result["status"] == "APPLIED" for result in results):
+            self._notify_stock_change()
+
+    def _cached_as_missing(self, product_id: int) -> bool:
+        """
+        True si la caché negativa responde que el producto no tiene inventario. La caché es
+        por worker: con la tabla de stock compartida, un inventario que otro worker del host
+        ya creó descarta la entrada en vez de esperar al TTL.
+        """
+        if self.negative_cache is None or not self.negative_cache.contains(product_id):
+            return False
+        if isinstance(self.inventory_repository, SharedStockRepository):
+            entry = self.inventory_repository.stock_table.get(product_id)
+            if entry is not None and entry[1] != ABSENT_VERSION:
+                self.negative_cache.discard(product_id)
+                return False
+        return True
+
+    def _validate_purchase_quantity(self, quantity: Any) -> None:
+        """Valida que la cantidad a comprar sea un entero positivo."""
+        if not isinstance(quantity, int) or quantity <= 0:
+            raise InvalidInputError("La cantidad ('quantity') debe ser un número entero positivo.")
+
+    def _raise_purchase_failure(self, product_id: int, quantity: int) -> None:
+        """Determina por qué no se descontó el stock y lanza el error específico."""
+        # Verificamos si el producto existe para dar un error más específico.
+        inventory = self.inventory_repository.get_inventory_by_product_id(product_id)
+        if not inventory:
+            raise NotFoundError("inventario", product_id)
+
+        # Si existe, el problema fue la falta de stock.
+        raise InvalidInputError(
+            f"No hay suficiente stock para el producto con ID {product_id}. "
+            f"Stock disponible: {inventory.get('available_stock')}, se intentó comprar: {quantity}."
+        )
+
+    def _build_purchase_result(self, product_id: int, quantity: int) -> Dict[str, Any]:
+        """Construye el cuerpo de respuesta de una compra exitosa."""
         return {
             "product_id": product_id,
             "quantity_purchased": quantity,
             "message": "Compra realizada con éxito."
-        }
\ No newline at end of file
+        }
+
+    def _replay_idempotent_response(self, stored: Dict[str, Any], request_hash: str) -> Dict[str, Any]:
+        """Valida que el reintento coincida con la solicitud original y retorna la respuesta guardada."""
+        if stored["request_hash"] != request_hash:
+            raise ConflictError(
+                f"La Idempotency-Key '{stored['idempotency_key']}' ya fue usada con un cuerpo de solicitud diferente."
+            )
+        return stored["response_body"]
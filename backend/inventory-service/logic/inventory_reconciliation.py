@@ -0,0 +1,182 @@
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Tipos de discrepancia que detecta la reconciliación.
+ORPHAN = "orphan"                            # Inventario de un producto que no existe
+MISSING = "missing"                          # Producto activo sin inventario (se ve con stock 0)
+INACTIVE_WITH_STOCK = "inactive_with_stock"  # Producto inactivo que conserva stock
+ISSUE_KINDS = (ORPHAN, MISSING, INACTIVE_WITH_STOCK)
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    """Lee el checkpoint de una corrida anterior, o None si no existe."""
+    try:
+        with open(path, "r", encoding="utf-8") as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    """Escribe el checkpoint de forma atómica (archivo temporal + rename)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump(state, checkpoint_file)
+    os.replace(temporary_path, path)
+
+
+class InventoryReconciler:
+    """
+    Reconcilia `products` con `inventory` mediante un merge-join de dos lecturas por keyset
+    ordenadas por product_id. En memoria solo hay un bloque de `chunk_size` filas de cada
+    tabla y los lotes de reparación pendientes, sin importar el tamaño del catálogo.
+
+    Detecta inventario huérfano, productos sin inventario y productos inactivos con stock.
+    Las discrepancias de los tipos indicados en `repair` se corrigen en lotes de
+    `repair_batch_size`, con una pausa de `throttle_seconds` tras cada lote para no
+    competir con el tráfico. Cada `chunk_size` claves se aplican las reparaciones pendientes
+    y se guarda el checkpoint, así una corrida interrumpida continúa donde quedó.
+    """
+
+    def __init__(
+        self,
+        repository: Any,
+        chunk_size: int = 1000,
+        repair: Iterable[str] = (),
+        repair_batch_size: int = 100,
+        throttle_seconds: float = 0.1,
+        checkpoint_path: Optional[str] = None,
+        on_issue: Optional[Callable[[str, int, Optional[int]], None]] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        sleep: Callable[[float], None] = time.sleep
+    ) -> None:
+        self.repository = repository
+        self.chunk_size = chunk_size
+        self.repair = frozenset(repair)
+        unknown = self.repair.difference(ISSUE_KINDS)
+        if unknown:
+            raise ValueError(f"Tipos de reparación desconocidos: {', '.join(sorted(unknown))}.")
+        self.repair_batch_size = repair_batch_size
+        self.throttle_seconds = throttle_seconds
+        self.checkpoint_path = checkpoint_path
+        self.on_issue = on_issue
+        self.on_progress = on_progress
+        self._sleep = sleep
+        self._repairers: Dict[str, Callable[[List[int]], int]] = {
+            ORPHAN: repository.delete_orphan_inventory,
+            MISSING: repository.create_missing_inventory,
+            INACTIVE_WITH_STOCK: repository.clear_inactive_stock,
+        }
+
+    def run(self, resume: bool = True) -> Dict[str, Any]:
+        """
+        Ejecuta la reconciliación (continuando desde el checkpoint si `resume`) y retorna
+        el estado final: última clave procesada, filas leídas, discrepancias y reparaciones.
+        """
+        state = self._initial_state(resume)
+        pending: Dict[str, List[int]] = {kind: [] for kind in self.repair}
+        start_after = state["last_product_id"]
+        products = self._keyset_stream(self.repository.get_products_after, start_after)
+        inventory = self._keyset_stream(self.repository.get_inventory_after, start_after)
+
+        product = next(products, None)
+        stock_row = next(inventory, None)
+        since_checkpoint = 0
+        while product is not None or stock_row is not None:
+            if stock_row is None or (product is not None and product[0] < stock_row[0]):
+                key = product[0]
+                state["products"] += 1
+                if product[1]:
+                    self._report(state, pending, MISSING, key, None)
+                product = next(products, None)
+            elif product is None or stock_row[0] < product[0]:
+                key = stock_row[0]
+                state["inventory"] += 1
+                self._report(state, pending, ORPHAN, key, stock_row[1])
+                stock_row = next(inventory, None)
+            else:
+                key = product[0]
+                state["products"] += 1
+                state["inventory"] += 1
+                is_active, available_stock = product[1], stock_row[1]
+                if not is_active and available_stock > 0:
+                    self._report(state, pending, INACTIVE_WITH_STOCK, key, available_stock)
+                product = next(products, None)
+                stock_row = next(inventory, None)
+
+            state["last_product_id"] = key
+            since_checkpoint += 1
+            if since_checkpoint >= self.chunk_size:
+                self._checkpoint(state, pending)
+                since_checkpoint = 0
+
+        state["completed"] = True
+        self._checkpoint(state, pending)
+        return state
+
+    def _initial_state(self, resume: bool) -> Dict[str, Any]:
+        if resume and self.checkpoint_path:
+            state = load_checkpoint(self.checkpoint_path)
+            # Una corrida terminada no se reanuda: se empieza de nuevo.
+            if state is not None and not state.get("completed"):
+                return state
+        return {
+            "last_product_id": 0,
+            "products": 0,
+            "inventory": 0,
+            "issues": {kind: 0 for kind in ISSUE_KINDS},
+            "repaired": {kind: 0 for kind in ISSUE_KINDS},
+            "completed": False,
+        }
+
+    def _keyset_stream(
+        self,
+        fetch: Callable[[int, int], List[Tuple[Any, ...]]],
+        after_key: int
+    ) -> Iterator[Tuple[Any, ...]]:
+        """Recorre una tabla por keyset (`key > after_key`) en bloques de `chunk_size` filas."""
+        while True:
+            rows = fetch(after_key, self.chunk_size)
+            yield from rows
+            if len(rows) < self.chunk_size:
+                return
+            after_key = rows[-1][0]
+
+    def _report(
+        self,
+        state: Dict[str, Any],
+        pending: Dict[str, List[int]],
+        kind: str,
+        product_id: int,
+        available_stock: Optional[int]
+    ) -> None:
+        state["issues"][kind] += 1
+        if self.on_issue is not None:
+            self.on_issue(kind, product_id, available_stock)
+        if kind in pending:
+            pending[kind].append(product_id)
+            if len(pending[kind]) >= self.repair_batch_size:
+                self._flush(state, pending, kind)
+
+    def _flush(self, state: Dict[str, Any], pending: Dict[str, List[int]], kind: str) -> None:
+        product_ids, pending[kind] = pending[kind], []
+        if not product_ids:
+            return
+        state["repaired"][kind] += self._repairers[kind](product_ids)
+        if self.throttle_seconds > 0:
+            self._sleep(self.throttle_seconds)
+
+    def _checkpoint(self, state: Dict[str, Any], pending: Dict[str, List[int]]) -> None:
+        # Las reparaciones pendientes se aplican antes de avanzar el checkpoint: al reanudar
+        # no se vuelven a leer las claves anteriores.
+        for kind in pending:
+            self._flush(state, pending, kind)
+        if self.checkpoint_path:
+            save_checkpoint(self.checkpoint_path, state)
+        if self.on_progress is not None:
+            self.on_progress(state)
@@ -0,0 +1,77 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics.registry import metrics_registry
+
+async_purchases_total = metrics_registry.counter(
+    "inventory_async_purchases_total", "Compras asíncronas procesadas desde el outbox por resultado."
+)
+
+
+class PurchaseOutboxWorker:
+    """
+    Pool de workers que drena `purchase_outbox`. Hay un hilo por partición
+    (`product_id % partitions`), así las compras de un mismo producto se aplican en orden
+    de llegada; cada hilo procesa lotes de hasta `batch_size` compras por transacción.
+
+    Los hilos se inician en el primer uso (tras el fork de Gunicorn) y esperan con
+    `poll_interval_seconds`; `notify` despierta a la partición que recibió una compra.
+    Si varios procesos drenan la misma partición, el bloqueo de filas del repositorio
+    los serializa.
+    """
+
+    def __init__(
+        self,
+        inventory_repository: Any,
+        partitions: int,
+        batch_size: int,
+        poll_interval_seconds: float,
+        on_processed: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+    ) -> None:
+        self.inventory_repository = inventory_repository
+        self.partitions = max(1, partitions)
+        self.batch_size = batch_size
+        self.poll_interval_seconds = poll_interval_seconds
+        self.on_processed = on_processed
+        self._wakeups = [threading.Event() for _ in range(self.partitions)]
+        self._threads: List[Optional[threading.Thread]] = [None] * self.partitions
+        self._lock = threading.Lock()
+
+    def partition_of(self, product_id: int) -> int:
+        return product_id % self.partitions
+
+    def start(self) -> None:
+        """Inicia (o reinicia, si murieron) los hilos de cada partición."""
+        with self._lock:
+            for partition, thread in enumerate(self._threads):
+                if thread is None or not thread.is_alive():
+                    thread = threading.Thread(
+                        target=self._run, args=(partition,), name=f"purchase-outbox-{partition}", daemon=True
+                    )
+                    self._threads[partition] = thread
+                    thread.start()
+
+    def notify(self, partition: int) -> None:
+        self._wakeups[partition].set()
+
+    def drain_once(self, partition: int) -> int:
+        """Procesa un lote de la partición. Retorna el número de compras procesadas."""
+        results = self.inventory_repository.process_purchase_batch(partition, self.batch_size)
+        for result in results:
+            async_purchases_total.inc(status=result["status"])
+        if results and self.on_processed is not None:
+            self.on_processed(results)
+        return len(results)
+
+    def _run(self, partition: int) -> None:
+        wakeup = self._wakeups[partition]
+        while True:
+            wakeup.clear()
+            try:
+                processed = self.drain_once(partition)
+            except Exception as e:
+                print(f"PURCHASE OUTBOX WARNING: Falló el lote de la partición {partition}. {e}")
+                processed = 0
+            # Un lote completo indica que quedan pendientes: se sigue sin esperar.
+            if processed < self.batch_size:
+                wakeup.wait(self.poll_interval_seconds)
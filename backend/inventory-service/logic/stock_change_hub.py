@@ -0,0 +1,210 @@
+import datetime
+import json
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from exceptions.api_exceptions import ServiceUnavailableError
+
+# Punto de partida cuando la tabla de inventario está vacía.
+EPOCH = datetime.datetime(1970, 1, 1)
+# Filas por consulta del observador; si una página llega llena se pide la siguiente.
+CHANGE_PAGE_SIZE = 5000
+
+
+class StockSubscription:
+    """
+    Suscripción de un cliente SSE a un conjunto de product_id.
+    Los eventos pendientes se COALESCEN por producto (solo se conserva el último estado),
+    de modo que un cliente lento nunca acumula más de un evento por producto suscrito.
+    """
+
+    def __init__(self, product_ids: FrozenSet[int]) -> None:
+        self.product_ids = product_ids
+        self.closed = False
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._condition = threading.Condition()
+
+    def offer(self, change: Dict[str, Any]) -> None:
+        """Encola (o reemplaza) el último cambio del producto y despierta al cliente."""
+        with self._condition:
+            self._pending[change["product_id"]] = change
+            self._condition.notify()
+
+    def wait(self, timeout: float) -> List[Dict[str, Any]]:
+        """Espera hasta `timeout` segundos por cambios; retorna [] si no hubo ninguno (heartbeat)."""
+        with self._condition:
+            if not self._pending and not self.closed:
+                self._condition.wait(timeout)
+            changes = list(self._pending.values())
+            self._pending.clear()
+            return changes
+
+    def close(self) -> None:
+        with self._condition:
+            self.closed = True
+            self._condition.notify()
+
+
+class StockChangeHub:
+    """
+    Distribuye los cambios de stock a todos los suscriptores SSE del proceso.
+    Un único hilo observador consulta `last_inventory_update` (índice dedicado) cada
+    `poll_interval_seconds`, sin importar cuántos clientes haya conectados; las escrituras
+    locales lo despiertan con `notify_write()` para publicar de inmediato. Los cambios hechos
+    por otros workers o instancias se detectan en la siguiente consulta. Los duplicados se
+    descartan comparando (version, stock), que solo se recuerdan para productos con
+    suscriptores; una fila recreada (versión reiniciada en 0) se publica de nuevo.
+
+    Cada consulta pagina por `(last_inventory_update, product_id)`, así que un segundo con
+    más filas que `page_size` no detiene el avance. Como `last_inventory_update` se fija al
+    ejecutar el UPDATE y no al confirmar, una transacción larga puede hacerse visible con una
+    fecha ya superada; por eso cada ciclo vuelve a leer los últimos `late_commit_seconds`.
+    Es una heurística: un commit más tardío que esa ventana no se publica.
+    """
+
+    def __init__(
+        self,
+        inventory_repository: Any,
+        poll_interval_seconds: float,
+        max_subscribers: int,
+        late_commit_seconds: float = 0,
+        page_size: int = CHANGE_PAGE_SIZE
+    ) -> None:
+        self.inventory_repository = inventory_repository
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_subscribers = max_subscribers
+        self.late_commit_window = datetime.timedelta(seconds=late_commit_seconds)
+        self.page_size = page_size
+        self._subscriptions: Set[StockSubscription] = set()
+        self._by_product: Dict[int, Set[StockSubscription]] = {}
+        self._last_versions: Dict[int, Tuple[Any, int]] = {}
+        self._since: Optional[datetime.datetime] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, product_ids: Iterable[int]) -> StockSubscription:
+        """
+        Registra un suscriptor y arranca el observador compartido si no está corriendo.
+
+        Lanza:
+            - ServiceUnavailableError: Si se alcanzó el máximo de suscriptores del proceso.
+        """
+        subscription = StockSubscription(frozenset(product_ids))
+        with self._lock:
+            if len(self._subscriptions) >= self.max_subscribers:
+                raise ServiceUnavailableError(
+                    "Se alcanzó el máximo de suscriptores de stock en tiempo real. Intente más tarde."
+                )
+            self._subscriptions.add(subscription)
+            for product_id in subscription.product_ids:
+                self._by_product.setdefault(product_id, set()).add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stock-change-watcher', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: StockSubscription) -> None:
+        subscription.close()
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            for product_id in subscription.product_ids:
+                subscribers = self._by_product.get(product_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_product[product_id]
+                        self._last_versions.pop(product_id, None)
+
+    def notify_write(self) -> None:
+        """Señal de las rutas de escritura locales: el observador consulta sin esperar el intervalo."""
+        self._wake.set()
+
+    def publish(self, change: Dict[str, Any]) -> None:
+        """Entrega un cambio a los suscriptores del producto, descartando estados ya publicados."""
+        product_id = change["product_id"]
+        version = change.get("version")
+        event = {"product_id": product_id, "available_stock": change["available_stock"], "version": version}
+        with self._lock:
+            subscribers = list(self._by_product.get(product_id, ()))
+            if not subscribers:
+                return
+            if version is not None:
+                # Las consultas leen el estado actual: una versión menor es una fila recreada, no
+                # un evento viejo, así que solo se descarta el mismo estado ya publicado.
+                state = (version, change["available_stock"])
+                if self._last_versions.get(product_id) == state:
+                    return
+                self._last_versions[product_id] = state
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    def poll_once(self) -> None:
+        """
+        Publica los cambios desde la última marca de tiempo vista, menos la ventana de commits
+        tardíos, recorriendo todas las páginas del keyset `(last_inventory_update, product_id)`.
+        """
+        if self._since is None:
+            # Línea base: el estado actual lo recibe cada cliente en su snapshot inicial.
+            self._since = self.inventory_repository.get_latest_inventory_update() or EPOCH
+        since, after_product_id = self._since - self.late_commit_window, 0
+        while True:
+            rows = self.inventory_repository.get_inventory_changes_since(since, after_product_id, self.page_size)
+            for row in rows:
+                self.publish(row)
+            if rows:
+                since, after_product_id = rows[-1]["last_inventory_update"], rows[-1]["product_id"]
+                self._since = max(self._since, since)
+            if len(rows) < self.page_size:
+                return
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._subscriptions:
+                    # Sin clientes no se consulta la BD; el próximo subscribe reinicia la línea base.
+                    self._thread = None
+                    self._since = None
+                    return
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"CRITICAL STOCK STREAM ERROR: No se pudieron consultar los cambios de inventario. {e}")
+            self._wake.wait(self.poll_interval_seconds)
+            self._wake.clear()
+
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """Serializa un mensaje en el formato text/event-stream."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def iter_stock_events(
+    hub: StockChangeHub,
+    subscription: StockSubscription,
+    snapshot: List[Dict[str, Any]],
+    heartbeat_seconds: float
+) -> Iterator[str]:
+    """
+    Genera el flujo SSE de una suscripción: snapshot inicial, cambios y heartbeats.
+    El heartbeat (comentario SSE) mantiene viva la conexión a través de proxies y permite
+    detectar clientes desconectados; al cerrarse el generador se libera la suscripción.
+    """
+    try:
+        yield f"retry: {int(heartbeat_seconds * 1000)}\n\n"
+        yield format_sse({"data": snapshot}, event="snapshot")
+        while not subscription.closed:
+            changes = subscription.wait(heartbeat_seconds)
+            if not changes:
+                yield ": heartbeat\n\n"
+                continue
+            for change in changes:
+                yield format_sse(change, event="stock", event_id=f"{change['product_id']}:{change['version']}")
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,98 @@
+import zlib
+from typing import Iterable, Iterator, Optional
+from flask import Flask, Response, request
+
+from config.settings import COMPRESSION_ENABLED, COMPRESSION_MIN_SIZE, COMPRESSION_LEVEL
+
+# brotli es opcional: si no está instalado solo se negocia gzip.
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/vnd.api+json', 'text/plain', 'text/html'}
+
+# ----------------- COMPRESORES INCREMENTALES -----------------
+
+class _GzipCompressor:
+    def __init__(self, level: int) -> None:
+        # wbits 16 + MAX_WBITS genera el formato gzip (cabecera y CRC) en lugar de zlib.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, level: int) -> None:
+        # La calidad de brotli va de 0 a 11; se escala el nivel de gzip (1-9).
+        self._compressor = brotli.Compressor(quality=min(11, max(0, level + 2)))
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _new_compressor(encoding: str):
+    if encoding == 'br':
+        return _BrotliCompressor(COMPRESSION_LEVEL)
+    return _GzipCompressor(COMPRESSION_LEVEL)
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Elige la codificación según Accept-Encoding (respetando q-values) y las disponibles."""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def compress_stream(chunks: Iterable, encoding: str) -> Iterator[bytes]:
+    """Comprime una respuesta en streaming bloque a bloque, sin acumularla en memoria."""
+    compressor = _new_compressor(encoding)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.finish()
+
+# ----------------- INTEGRACIÓN CON FLASK -----------------
+
+def register_response_compression(app: Flask) -> None:
+    """Registra la compresión gzip/brotli de respuestas según Accept-Encoding."""
+    if not COMPRESSION_ENABLED:
+        return
+
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        if (
+            response.direct_passthrough
+            or not 200 <= response.status_code < 300
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            # Tamaño desconocido: se comprime incrementalmente a medida que se genera.
+            response.response = compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < COMPRESSION_MIN_SIZE:
+                return response
+            compressor = _new_compressor(encoding)
+            response.set_data(compressor.compress(body) + compressor.finish())
+
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -1,8 +1,13 @@
 import datetime
+import threading
+import time
 import requests.exceptions
-from typing import Any, Dict, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from flask import Flask, jsonify, request, Response
 from exceptions.api_exceptions import APIException, ServiceUnavailableError
+from config.settings import NOT_FOUND_LOG_WINDOW_SECONDS
+from middleware.request_tracing import current_trace_id
 
 # ----------------- CONFIGURACIÓN DEL LOGGING ESTRUCTURADO -----------------
 
@@ -22,7 +27,12 @@ def write_structured_log(log_data: Dict[str, Any]) -> None:
     mensaje_error: str = log_data.get("message", "Error sin detalle.")
     
     # Formato de salida solicitado (Ej: 2025-11-12 19:00:00 products-service INVALID_INPUT_DATA /api/v1/products El precio...)
-    log_line: str = f"{fecha} {hora} {servicio} {codigo_error} {api_url} {mensaje_error}\n"
+    log_line: str = f"{fecha} {hora} {servicio} {codigo_error} {api_url} {mensaje_error}"
+    # Con traza activa se agrega su ID al final para buscar la solicitud en logs/traces/
+    trace_id: Optional[str] = log_data.get("trace_id")
+    if trace_id:
+        log_line += f" trace_id={trace_id}"
+    log_line += "\n"
 
     # 4. Escritura a Disco (Asumiendo que el volumen /logs está montado en Docker)
     log_file_path: str = f"logs/{fecha}.log" # YYYY-MM-DD.log
@@ -34,18 +44,52 @@ def write_structured_log(log_data: Dict[str, Any]) -> None:
         print(f"CRITICAL LOGGING ERROR: No se pudo escribir a {log_file_path}. Detalle: {e}")
 
 
+class LogRateLimiter:
+    """
+    Limita la escritura a disco de logs idénticos (mismo código de error y URL).
+    El primer log de cada ventana se escribe; los repetidos dentro de la ventana se cuentan
+    y el siguiente log escrito indica cuántos se suprimieron.
+    """
+
+    def __init__(self, window_seconds: float, max_keys: int = 10000) -> None:
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._windows: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Tuple[str, str]) -> Tuple[bool, int]:
+        """Retorna (debe_escribirse, repeticiones_suprimidas_desde_el_último_log)."""
+        if self.window_seconds <= 0:
+            return True, 0
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is not None and now - window[0] < self.window_seconds:
+                window[1] += 1
+                return False, 0
+            suppressed = window[1] if window is not None else 0
+            self._windows[key] = [now, 0]
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+            return True, suppressed
+
+# Los 404 repetidos (bots, enlaces obsoletos) no deben generar una línea de log por solicitud.
+not_found_log_limiter = LogRateLimiter(NOT_FOUND_LOG_WINDOW_SECONDS)
+
 # ----------------- MANEJADOR DE EXCEPCIONES CENTRAL -----------------
 
-def build_json_api_error(status_code: int, error_code: str, title: str, detail: str) -> Dict[str, Any]:
+def build_json_api_error(status_code: int, error_code: str, title: str, detail: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """Helper para construir la respuesta JSON API de error."""
-    return {
-        "errors": [{
-            "status": str(status_code),
-            "code": error_code,
-            "title": title,
-            "detail": detail
-        }]
+    error_object: Dict[str, Any] = {
+        "status": str(status_code),
+        "code": error_code,
+        "title": title,
+        "detail": detail
     }
+    if meta:
+        error_object["meta"] = meta
+    return {"errors": [error_object]}
 
 def register_error_handlers(app: Flask) -> None:
     """Registra los manejadores de errores para la aplicación Flask."""
@@ -74,6 +118,7 @@ def register_error_handlers(app: Flask) -> None:
             "api_url": request.path if request else "N/A",
             "error_code": error_code,
             "message": detail_message,
+            "trace_id": current_trace_id(),
         }
         write_structured_log(log_entry)
         
@@ -100,14 +145,22 @@ def register_error_handlers(app: Flask) -> None:
             "api_url": request.path if request else "N/A",
             "error_code": error.error_code,
             "message": error.detail,
+            "trace_id": current_trace_id(),
         }
-        write_structured_log(log_entry)
+        should_log, suppressed = True, 0
+        if error.status_code == 404:
+            should_log, suppressed = not_found_log_limiter.acquire((error.error_code, log_entry["api_url"]))
+        if should_log:
+            if suppressed:
+                log_entry["message"] = f"{error.detail} ({suppressed} repeticiones suprimidas)"
+            write_structured_log(log_entry)
 
         # 2. Formato de respuesta JSON API
         response_body = build_json_api_error(
             status_code=error.status_code,
             error_code=error.error_code,
             title=error.error_code,
-            detail=error.detail
+            detail=error.detail,
+            meta=error.meta
         )
         return jsonify(response_body), error.status_code
@@ -0,0 +1,86 @@
+import contextvars
+import re
+import time
+from typing import Optional
+from flask import Flask, request
+
+from config.settings import REQUEST_TIMEOUT_SECONDS, REQUEST_TIMEOUT_MAX_SECONDS
+from exceptions.api_exceptions import DeadlineExceededError, InvalidInputError
+
+DEADLINE_HEADER = 'X-Request-Timeout'
+
+# Instante (time.monotonic) en que vence la solicitud en curso; None = sin límite.
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('request_deadline', default=None)
+
+_SELECT_PREFIX = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+
+# ----------------- API DEL DEADLINE -----------------
+
+def set_deadline(timeout_seconds: Optional[float]) -> None:
+    """Fija el deadline del contexto actual a `timeout_seconds` desde ahora (None lo elimina)."""
+    _deadline.set(time.monotonic() + timeout_seconds if timeout_seconds is not None else None)
+
+
+def remaining_seconds() -> Optional[float]:
+    """Segundos restantes del presupuesto (puede ser negativo) o None si no hay deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(operation: str) -> None:
+    """
+    Aborta antes de iniciar una operación si el presupuesto ya se agotó.
+
+    Lanza:
+        - DeadlineExceededError: Si no queda tiempo.
+    """
+    remaining = remaining_seconds()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededError(f"Se agotó el tiempo de la solicitud antes de {operation}.")
+
+
+def outbound_timeout(default_seconds: float) -> float:
+    """Timeout para una llamada saliente: el menor entre `default_seconds` y el presupuesto restante."""
+    remaining = remaining_seconds()
+    return default_seconds if remaining is None else max(0.001, min(default_seconds, remaining))
+
+
+def with_max_execution_time(sql: str) -> str:
+    """
+    Agrega el hint `MAX_EXECUTION_TIME` (milisegundos restantes) a una SELECT, para que
+    MySQL la interrumpa (error 3024) cuando se agota el presupuesto. Las escrituras no
+    admiten el hint y se retornan sin cambios.
+    """
+    remaining = remaining_seconds()
+    if remaining is None or not _SELECT_PREFIX.match(sql):
+        return sql
+    milliseconds = max(1, int(remaining * 1000))
+    return _SELECT_PREFIX.sub(f"SELECT /*+ MAX_EXECUTION_TIME({milliseconds}) */", sql, count=1)
+
+# ----------------- INTEGRACIÓN CON FLASK -----------------
+
+def _requested_timeout() -> Optional[float]:
+    """Timeout de la solicitud: el header X-Request-Timeout (segundos), acotado al máximo, o el de configuración."""
+    header = request.headers.get(DEADLINE_HEADER)
+    if header is None:
+        return REQUEST_TIMEOUT_SECONDS if REQUEST_TIMEOUT_SECONDS > 0 else None
+    try:
+        timeout = float(header)
+    except ValueError:
+        timeout = 0
+    if not timeout > 0:
+        raise InvalidInputError(f"El header '{DEADLINE_HEADER}' debe ser un número de segundos mayor que 0.")
+    return min(timeout, REQUEST_TIMEOUT_MAX_SECONDS)
+
+
+def register_request_deadline(app: Flask) -> None:
+    """Fija un deadline por solicitud que las consultas a MySQL y al Products Service respetan."""
+
+    @app.before_request
+    def start_request_deadline() -> None:
+        set_deadline(_requested_timeout())
+
+    @app.teardown_request
+    def clear_request_deadline(_error: Optional[BaseException]) -> None:
+        # Los hilos de Gunicorn se reutilizan: el deadline no debe pasar a la siguiente solicitud.
+        set_deadline(None)
@@ -0,0 +1,155 @@
+import datetime
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Dict, Optional
+from flask import Flask, Response, g, request
+
+from config.settings import (
+    PROFILING_TOKEN, PROFILING_SAMPLE_RATE, PROFILING_INTERVAL_MS, PROFILING_OUTPUT_DIR
+)
+
+PROFILE_HEADER = 'X-Profile-Token'
+
+# ----------------- PERFILADOR POR MUESTREO -----------------
+
+class SamplingProfiler:
+    """
+    Perfilador por muestreo de pilas de bajo costo.
+    Un único hilo daemon lee periódicamente la pila de los hilos registrados
+    (`sys._current_frames`) y acumula las pilas en formato collapsed-stack.
+    El hilo solo se ejecuta mientras haya al menos una sesión activa.
+    """
+
+    def __init__(self, interval_seconds: float) -> None:
+        self.interval_seconds = interval_seconds
+        self._sessions: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread_id: int) -> None:
+        """Comienza a muestrear la pila del hilo indicado."""
+        with self._lock:
+            self._sessions[thread_id] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, thread_id: int) -> Counter:
+        """Detiene el muestreo del hilo y retorna las pilas colapsadas con su número de muestras."""
+        with self._lock:
+            return self._sessions.pop(thread_id, Counter())
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                thread_ids = list(self._sessions)
+                # Se limpia bajo el lock para no perder el set() de un start() concurrente.
+                if not thread_ids:
+                    self._wakeup.clear()
+            if not thread_ids:
+                self._wakeup.wait()
+                continue
+
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                stack = collapse_stack(frame)
+                with self._lock:
+                    session = self._sessions.get(thread_id)
+                    if session is not None:
+                        session[stack] += 1
+            del frames
+            time.sleep(self.interval_seconds)
+
+
+def collapse_stack(frame: Optional[FrameType]) -> str:
+    """Convierte una pila en la línea 'raíz;...;hoja' usada por flamegraph.pl / speedscope."""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        name = getattr(code, 'co_qualname', code.co_name)
+        labels.append(f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+def write_collapsed_stacks(stacks: Counter, route_label: str, duration_ms: float) -> Optional[str]:
+    """
+    Escribe las pilas en un archivo .folded junto a los logs, con la ruta como marco raíz.
+    Retorna la ruta del archivo o None si no hubo muestras o no se pudo escribir.
+    """
+    if not stacks:
+        return None
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    safe_route = re.sub(r'[^A-Za-z0-9]+', '_', route_label).strip('_')
+    file_path = os.path.join(PROFILING_OUTPUT_DIR, f"{timestamp}_{safe_route}_{int(duration_ms)}ms.folded")
+    root = route_label.replace(';', ',')
+    try:
+        os.makedirs(PROFILING_OUTPUT_DIR, exist_ok=True)
+        with open(file_path, 'w') as f:
+            for stack, samples in stacks.most_common():
+                f.write(f"{root};{stack} {samples}\n")
+    except Exception as e:
+        print(f"CRITICAL PROFILING ERROR: No se pudo escribir a {file_path}. Detalle: {e}")
+        return None
+    return file_path
+
+# ----------------- INTEGRACIÓN CON FLASK -----------------
+
+def _should_profile() -> bool:
+    """Decide si la solicitud actual se perfila (header privilegiado o muestreo aleatorio)."""
+    if PROFILING_TOKEN:
+        token = request.headers.get(PROFILE_HEADER)
+        if token and hmac.compare_digest(token, PROFILING_TOKEN):
+            return True
+    return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+
+def register_request_profiler(app: Flask) -> None:
+    """
+    Registra el perfilado bajo demanda si está configurado (PROFILING_TOKEN o PROFILING_SAMPLE_RATE).
+    Si no lo está, no se registra ningún hook: el costo por solicitud es cero.
+    """
+    if not PROFILING_TOKEN and PROFILING_SAMPLE_RATE <= 0:
+        return
+
+    profiler = SamplingProfiler(PROFILING_INTERVAL_MS / 1000.0)
+
+    @app.before_request
+    def start_request_profile() -> None:
+        if _should_profile():
+            g.profile_started_at = time.perf_counter()
+            profiler.start(threading.get_ident())
+
+    @app.after_request
+    def stop_request_profile(response: Response) -> Response:
+        started_at = g.pop('profile_started_at', None)
+        if started_at is None:
+            return response
+        stacks = profiler.stop(threading.get_ident())
+        route = request.url_rule.rule if request.url_rule else request.path
+        file_path = write_collapsed_stacks(
+            stacks, f"{request.method} {route}", (time.perf_counter() - started_at) * 1000
+        )
+        if file_path and request.headers.get(PROFILE_HEADER):
+            response.headers['X-Profile-File'] = os.path.basename(file_path)
+        return response
+
+    @app.teardown_request
+    def discard_request_profile(_error: Optional[BaseException]) -> None:
+        # Si after_request no se ejecutó, se libera la sesión para no seguir muestreando el hilo.
+        if g.pop('profile_started_at', None) is not None:
+            profiler.stop(threading.get_ident())
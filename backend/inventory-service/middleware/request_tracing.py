@@ -0,0 +1,224 @@
+import contextvars
+import datetime
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional
+from flask import Flask, Response, request
+
+from config.settings import TRACING_ENABLED, TRACING_SAMPLE_RATIO, TRACING_OUTPUT_DIR
+
+TRACEPARENT_HEADER = 'traceparent'
+SERVICE_NAME = 'inventory-service'
+
+# W3C Trace Context: version-trace_id-parent_id-flags (solo se acepta la versión 00).
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+# ----------------- SPANS -----------------
+
+class Span:
+    """
+    Operación medida dentro de una traza. Solo los spans muestreados (`sampled`) se
+    exportan; los no muestreados conservan sus IDs para el log y la propagación.
+    """
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'kind', 'sampled',
+                 'start_time', '_started', 'duration_ms', 'status', 'attributes')
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, kind: str, sampled: bool) -> None:
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status = 'OK'
+        self.attributes: Dict[str, Any] = {}
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = 'ERROR'
+        self.attributes['error.type'] = type(error).__name__
+        self.attributes['error.message'] = str(error)
+
+    def end(self) -> None:
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "service": SERVICE_NAME,
+            "start_time": datetime.datetime.fromtimestamp(self.start_time, datetime.timezone.utc).isoformat().replace('+00:00', 'Z'),
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class FileSpanExporter:
+    """
+    Escribe los spans de cada traza terminada como líneas JSON en `<dir>/YYYY-MM-DD.jsonl`.
+    Una traza se escribe de una sola vez al terminar la solicitud, así el costo es una
+    escritura por solicitud muestreada. Un colector (p. ej. el receptor filelog de
+    OpenTelemetry) puede leer los archivos y reenviarlos.
+    """
+
+    def __init__(self, output_dir: str) -> None:
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        fecha = datetime.date.today().isoformat()
+        file_path = os.path.join(self.output_dir, f"{fecha}.jsonl")
+        lines = "".join(json.dumps(span.to_dict(), default=str, separators=(",", ":")) + "\n" for span in spans)
+        try:
+            with self._lock:
+                os.makedirs(self.output_dir, exist_ok=True)
+                with open(file_path, "a") as f:
+                    f.write(lines)
+        except Exception as e:
+            print(f"CRITICAL TRACING ERROR: No se pudo escribir a {file_path}. Detalle: {e}")
+
+
+span_exporter = FileSpanExporter(TRACING_OUTPUT_DIR)
+
+# Span activo del contexto y spans terminados de la traza en curso (solo si está muestreada).
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar('current_span', default=None)
+_finished_spans: contextvars.ContextVar[Optional[List[Span]]] = contextvars.ContextVar('finished_spans', default=None)
+
+# ----------------- API DE TRAZAS -----------------
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """ID de la traza en curso (muestreada o no), para correlacionar logs."""
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+
+@contextmanager
+def start_span(name: str, kind: str = 'internal') -> Iterator[Optional[Span]]:
+    """
+    Abre un span hijo del span activo. Si la traza no está muestreada (o no hay traza)
+    retorna None sin crear nada, para que el costo fuera de la muestra sea mínimo.
+    Las excepciones se registran en el span y se vuelven a lanzar.
+    """
+    parent = _current_span.get()
+    finished = _finished_spans.get()
+    if parent is None or not parent.sampled or finished is None:
+        yield None
+        return
+
+    span = Span(parent.trace_id, parent.span_id, name, kind, sampled=True)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        span.end()
+        _current_span.reset(token)
+        finished.append(span)
+
+
+def inject_traceparent(headers: MutableMapping[str, str]) -> None:
+    """Agrega el header `traceparent` del span activo a una llamada saliente."""
+    span = _current_span.get()
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.traceparent
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Retorna {trace_id, parent_id, sampled} de un header `traceparent` válido, o None."""
+    match = _TRACEPARENT.match((value or "").strip().lower())
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == _INVALID_TRACE_ID or parent_id == _INVALID_SPAN_ID:
+        return None
+    return {"trace_id": trace_id, "parent_id": parent_id, "sampled": bool(int(flags, 16) & 1)}
+
+# ----------------- INTEGRACIÓN CON FLASK -----------------
+
+def _start_root_span() -> Span:
+    """
+    Muestreo en la cabecera: si el llamador envía `traceparent` se respeta su decisión
+    (flag sampled); si no, se muestrea una fracción TRACING_SAMPLE_RATIO de las solicitudes.
+    """
+    incoming = parse_traceparent(request.headers.get(TRACEPARENT_HEADER))
+    if incoming is not None:
+        trace_id, parent_id, sampled = incoming["trace_id"], incoming["parent_id"], incoming["sampled"]
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+        sampled = TRACING_SAMPLE_RATIO > 0 and random.random() < TRACING_SAMPLE_RATIO
+    route = request.url_rule.rule if request.url_rule is not None else request.path
+    span = Span(trace_id, parent_id, f"{request.method} {route}", 'server', sampled)
+    span.set_attribute("http.method", request.method)
+    span.set_attribute("http.target", request.full_path.rstrip('?'))
+    return span
+
+
+def register_request_tracing(app: Flask) -> None:
+    """
+    Abre un span raíz por solicitud (hijo del `traceparent` entrante, si existe) y exporta
+    la traza al terminar. Los spans hijos se crean con `start_span` en las consultas a
+    MySQL y en las llamadas al Products Service.
+    """
+    if not TRACING_ENABLED:
+        return
+
+    @app.before_request
+    def start_request_trace() -> None:
+        root = _start_root_span()
+        _current_span.set(root)
+        _finished_spans.set([] if root.sampled else None)
+
+    @app.after_request
+    def record_response_status(response: Response) -> Response:
+        root = _current_span.get()
+        if root is not None:
+            root.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                root.status = 'ERROR'
+        return response
+
+    @app.teardown_request
+    def finish_request_trace(error: Optional[BaseException]) -> None:
+        root = _current_span.get()
+        finished = _finished_spans.get()
+        # Los hilos de Gunicorn se reutilizan: la traza no debe pasar a la siguiente solicitud.
+        _current_span.set(None)
+        _finished_spans.set(None)
+        if root is None:
+            return
+        if error is not None:
+            root.record_error(error)
+        root.end()
+        if root.sampled and finished is not None:
+            span_exporter.export(finished + [root])
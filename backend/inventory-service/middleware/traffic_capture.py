@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterable, Optional
+from flask import Flask, Response, g, request
+
+from config.settings import (
+    TRAFFIC_CAPTURE_ENABLED, TRAFFIC_CAPTURE_SAMPLE_RATIO, TRAFFIC_CAPTURE_OUTPUT_DIR,
+    TRAFFIC_CAPTURE_MAX_FILE_BYTES, TRAFFIC_CAPTURE_MAX_FILES, TRAFFIC_CAPTURE_MAX_BODY_BYTES
+)
+
+# Únicos headers que se guardan: los que cambian el comportamiento del endpoint.
+CAPTURED_HEADERS = ('Content-Type', 'Accept-Encoding', 'Idempotency-Key', 'If-Match', 'Prefer', 'X-Request-Timeout')
+# Claves del body cuyo valor se reemplaza por REDACTED (a cualquier profundidad).
+SENSITIVE_KEY = re.compile(r'pass|secret|token|authorization|api[_-]?key|cookie', re.IGNORECASE)
+REDACTED = '[REDACTED]'
+# Campos que cambian entre corridas y no cuentan para comparar respuestas.
+VOLATILE_FIELDS = frozenset({'last_inventory_update', 'tracking_id', 'created_at', 'processed_at', 'trace_id'})
+
+# ----------------- SANITIZADO Y HUELLA DE RESPUESTAS -----------------
+
+def sanitize(value: Any) -> Any:
+    """Copia el JSON reemplazando los valores de claves sensibles."""
+    if isinstance(value, dict):
+        return {key: REDACTED if SENSITIVE_KEY.search(str(key)) else sanitize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [sanitize(item) for item in value]
+    return value
+
+
+def _without_fields(value: Any, ignored: Iterable[str]) -> Any:
+    if isinstance(value, dict):
+        return {key: _without_fields(item, ignored) for key, item in value.items() if key not in ignored}
+    if isinstance(value, list):
+        return [_without_fields(item, ignored) for item in value]
+    return value
+
+
+def response_fingerprint(body: bytes, ignored_fields: Iterable[str] = VOLATILE_FIELDS) -> str:
+    """
+    Huella (sha256 abreviado) de un cuerpo de respuesta para comparar builds. Un JSON se
+    normaliza (claves ordenadas, sin `ignored_fields`); otro contenido se usa tal cual.
+    """
+    try:
+        normalized = json.dumps(
+            _without_fields(json.loads(body), frozenset(ignored_fields)), sort_keys=True, separators=(',', ':')
+        ).encode('utf-8')
+    except ValueError:
+        normalized = body
+    return hashlib.sha256(normalized).hexdigest()[:16]
+
+# ----------------- ESCRITURA ROTATIVA -----------------
+
+class TrafficRecorder:
+    """
+    Escribe una línea JSON por solicitud en `<dir>/traffic-<pid>.jsonl` (un archivo por
+    worker: dos procesos no pueden rotar el mismo archivo) y lo rota al superar
+    TRAFFIC_CAPTURE_MAX_FILE_BYTES, conservando TRAFFIC_CAPTURE_MAX_FILES archivos.
+    El archivo se abre en el primer uso de cada proceso, tras el fork.
+    """
+
+    def __init__(self, output_dir: str) -> None:
+        self.output_dir = output_dir
+        self._handler: Optional[RotatingFileHandler] = None
+        self._pid: Optional[int] = None
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        try:
+            if self._handler is None or self._pid != os.getpid():
+                self._handler = self._open_handler()
+                self._pid = os.getpid()
+            line = json.dumps(entry, default=str, separators=(',', ':'))
+            # RotatingFileHandler serializa las escrituras entre hilos y rota por tamaño.
+            self._handler.handle(logging.makeLogRecord({'msg': line, 'levelno': logging.INFO}))
+        except Exception as e:
+            print(f"CRITICAL TRAFFIC CAPTURE ERROR: No se pudo escribir en {self.output_dir}. Detalle: {e}")
+
+    def _open_handler(self) -> RotatingFileHandler:
+        os.makedirs(self.output_dir, exist_ok=True)
+        return RotatingFileHandler(
+            os.path.join(self.output_dir, f'traffic-{os.getpid()}.jsonl'),
+            maxBytes=TRAFFIC_CAPTURE_MAX_FILE_BYTES,
+            backupCount=max(0, TRAFFIC_CAPTURE_MAX_FILES - 1),
+            encoding='utf-8',
+            delay=True
+        )
+
+
+traffic_recorder = TrafficRecorder(TRAFFIC_CAPTURE_OUTPUT_DIR)
+
+# ----------------- INTEGRACIÓN CON FLASK -----------------
+
+def _request_body() -> Any:
+    if request.content_length and request.content_length > TRAFFIC_CAPTURE_MAX_BODY_BYTES:
+        return {'_truncated': True}
+    body = request.get_json(silent=True)
+    if body is None:
+        raw = request.get_data(cache=True)
+        return raw.decode('utf-8', errors='replace') if raw else None
+    return sanitize(body)
+
+
+def _response_fingerprint(response: Response) -> Optional[str]:
+    # Las respuestas en streaming no se consumen aquí: el replay las compara del lado del cliente.
+    if response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return None
+    return response_fingerprint(response.get_data())
+
+
+def register_traffic_capture(app: Flask) -> None:
+    """
+    Registra la captura de tráfico si TRAFFIC_CAPTURE_ENABLED. Por cada solicitud muestreada
+    guarda método, ruta, query, headers permitidos, body sanitizado, estado, duración y la
+    huella de la respuesta, para reproducirla con `benchmarks/replay_traffic.py`.
+    Debe registrarse después de la compresión para ver el cuerpo sin comprimir.
+    """
+    if not TRAFFIC_CAPTURE_ENABLED:
+        return
+
+    @app.before_request
+    def start_traffic_capture() -> None:
+        if TRAFFIC_CAPTURE_SAMPLE_RATIO >= 1 or random.random() < TRAFFIC_CAPTURE_SAMPLE_RATIO:
+            g.capture_started_at = time.perf_counter()
+            g.capture_timestamp = time.time()
+
+    @app.after_request
+    def record_traffic(response: Response) -> Response:
+        started_at = g.pop('capture_started_at', None)
+        if started_at is None:
+            return response
+        traffic_recorder.record({
+            'ts': round(g.pop('capture_timestamp'), 6),
+            'method': request.method,
+            'path': request.path,
+            'route': request.url_rule.rule if request.url_rule else None,
+            'query': request.args.to_dict(flat=False),
+            'headers': {name: request.headers[name] for name in CAPTURED_HEADERS if name in request.headers},
+            'body': _request_body() if request.method in ('POST', 'PUT', 'PATCH') else None,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started_at) * 1000, 3),
+            'response_hash': _response_fingerprint(response),
+        })
+        return response
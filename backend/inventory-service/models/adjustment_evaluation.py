@@ -0,0 +1,32 @@
+from typing import Any, Dict, List, Tuple
+
+
+MAX_AVAILABLE_STOCK = 4294967295  # INT UNSIGNED (inventory.available_stock)
+
+
+def evaluate_adjustments(running_stock: Dict[int, int], adjustments: List[Tuple[int, int]]) -> Tuple[List[Dict[str, Any]], Dict[int, int]]:
+    """
+    Evalúa en orden una lista de ajustes relativos (product_id, delta) sobre el stock
+    bloqueado por la transacción. Las líneas de un mismo producto se evalúan sobre el stock
+    acumulado y se rechazan las que lo dejarían negativo (como `chk_stock_non_negative`) o
+    por encima de MAX_AVAILABLE_STOCK. Actualiza `running_stock` y retorna el resultado de
+    cada línea (APPLIED, INSUFFICIENT_STOCK, OUT_OF_RANGE o NOT_FOUND, con el stock
+    resultante) y el delta neto por producto.
+    """
+    results: List[Dict[str, Any]] = []
+    net_deltas: Dict[int, int] = {}
+    for product_id, delta in adjustments:
+        if product_id not in running_stock:
+            results.append({"status": "NOT_FOUND", "available_stock": None})
+            continue
+        new_stock = running_stock[product_id] + delta
+        if new_stock < 0:
+            results.append({"status": "INSUFFICIENT_STOCK", "available_stock": running_stock[product_id]})
+            continue
+        if new_stock > MAX_AVAILABLE_STOCK:
+            results.append({"status": "OUT_OF_RANGE", "available_stock": running_stock[product_id]})
+            continue
+        running_stock[product_id] = new_stock
+        net_deltas[product_id] = net_deltas.get(product_id, 0) + delta
+        results.append({"status": "APPLIED", "available_stock": new_stock})
+    return results, net_deltas
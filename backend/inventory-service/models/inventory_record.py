@@ -0,0 +1,63 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Sequence
+
+# Orden de columnas de las consultas que construyen InventoryRecord desde un cursor de tuplas.
+INVENTORY_RECORD_COLUMNS = (
+    'id', 'product_id', 'available_stock', 'location', 'last_inventory_update', 'version',
+    'reorder_threshold', 'below_threshold'
+)
+INVENTORY_RECORD_SELECT = ', '.join(INVENTORY_RECORD_COLUMNS)
+
+
+class InventoryRecord(Mapping):
+    """
+    Fila de inventario compacta (`__slots__`, sin `__dict__` por instancia).
+    Se construye directamente desde la tupla del cursor y admite acceso por atributo
+    (`record.available_stock`) y de solo lectura como diccionario (`record["available_stock"]`,
+    `record.get("version")`, `dict(record)`), por lo que sustituye a las filas de DictCursor
+    en el código existente. Para serializar con jsonify se usa `to_dict()`.
+    """
+
+    __slots__ = INVENTORY_RECORD_COLUMNS
+
+    def __init__(
+        self,
+        id: Any,
+        product_id: int,
+        available_stock: int,
+        location: Any = None,
+        last_inventory_update: Any = None,
+        version: Any = None,
+        reorder_threshold: Any = None,
+        below_threshold: Any = None
+    ) -> None:
+        self.id = id
+        self.product_id = product_id
+        self.available_stock = available_stock
+        self.location = location
+        self.last_inventory_update = last_inventory_update
+        self.version = version
+        self.reorder_threshold = reorder_threshold
+        self.below_threshold = below_threshold
+
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "InventoryRecord":
+        """Crea el registro desde una tupla en el orden de INVENTORY_RECORD_COLUMNS."""
+        return cls(*row)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in INVENTORY_RECORD_COLUMNS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(INVENTORY_RECORD_COLUMNS)
+
+    def __len__(self) -> int:
+        return len(INVENTORY_RECORD_COLUMNS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {column: getattr(self, column) for column in INVENTORY_RECORD_COLUMNS}
+
+    def __repr__(self) -> str:
+        return f"InventoryRecord(product_id={self.product_id}, available_stock={self.available_stock}, version={self.version})"
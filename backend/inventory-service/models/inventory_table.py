@@ -1,14 +1,69 @@
+import json
 import pymysql.connections
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from db.db_connection import DBConnection
+from models.inventory_record import InventoryRecord, INVENTORY_RECORD_SELECT
+from models.adjustment_evaluation import evaluate_adjustments
+from models.stock_allocation import (
+    Allocation, AllocationStrategy, LocatedStockError, LocationStock, allocation_to_json, plan_location_changes,
+    seed_location_code
+)
+
+# Margen por defecto de `get_stock_alerts` (LOW_STOCK_ALERT_SETTLE_SECONDS). Las alertas se
+# insertan al final de su transacción, que suele confirmarse en milisegundos, pero nada lo
+# garantiza: una transacción más lenta que el margen puede hacer visible su alerta cuando el
+# cursor ya la saltó.
+ALERT_SETTLE_SECONDS = 2
+
+
+def record_threshold_crossings(cursor: Any, product_ids: List[int], low_stock_threshold: Optional[int]) -> None:
+    """
+    Registra en `stock_alerts` las filas de `product_ids` que la escritura en curso movió
+    de un lado al otro de su umbral (`reorder_threshold` o `low_stock_threshold`) y
+    actualiza `below_threshold`. Sin cruces solo cuesta la lectura de esas filas, ya
+    bloqueadas por la transacción. No hace nada si las alertas están desactivadas (None).
+    Compartida por todas las escrituras de stock en MySQL, incluida la reconciliación.
+    """
+    if low_stock_threshold is None or not product_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    crossed = f"product_id IN ({placeholders}) AND below_threshold <> (available_stock < COALESCE(reorder_threshold, %s))"
+    params = tuple(product_ids) + (low_stock_threshold,)
+    cursor.execute(
+        f"""
+        INSERT INTO stock_alerts (product_id, kind, available_stock, threshold)
+        SELECT product_id, IF(below_threshold, 'RESTOCKED', 'LOW_STOCK'), available_stock,
+               COALESCE(reorder_threshold, %s)
+        FROM inventory
+        WHERE {crossed}
+        """,
+        (low_stock_threshold,) + params
+    )
+    if cursor.rowcount:
+        cursor.execute(f"UPDATE inventory SET below_threshold = 1 - below_threshold WHERE {crossed}", params)
+
 
 class InventoryRepository:
     """
     Repositorio para la gestión de operaciones CRUD en la tabla `inventory`.
+    Con `low_stock_threshold` (umbral por defecto) cada escritura de stock registra en
+    `stock_alerts`, en su misma transacción, las filas que cruzaron su umbral.
+    Con `allocation_strategy` (inventario multi-bodega) cada cambio del total de un producto
+    con filas en `inventory_locations` se reparte entre ellas en la misma transacción, de
+    modo que `available_stock` siga siendo la suma de sus ubicaciones.
     """
 
-    def __init__(self, db_connection: DBConnection) -> None:
+    def __init__(
+        self,
+        db_connection: DBConnection,
+        low_stock_threshold: Optional[int] = None,
+        allocation_strategy: Optional[AllocationStrategy] = None,
+        alert_settle_seconds: float = ALERT_SETTLE_SECONDS
+    ) -> None:
         self.db_connection = db_connection
+        self.low_stock_threshold = low_stock_threshold
+        self.allocation_strategy = allocation_strategy
+        self.alert_settle_seconds = alert_settle_seconds
 
     def create_inventory(self, product_id: int, available_stock: int, location: Optional[str] = None) -> int:
         """
@@ -24,8 +79,10 @@ class InventoryRepository:
             conn = self.db_connection.get_connection()
             with conn.cursor() as cursor:
                 cursor.execute(sql, (product_id, available_stock, location))
+                inventory_id = cursor.lastrowid
+                self._record_threshold_crossings(cursor, [product_id])
                 conn.commit()
-                return cursor.lastrowid
+                return inventory_id
         except Exception as e:
             if conn:
                 conn.rollback()
@@ -50,23 +107,44 @@ class InventoryRepository:
             if conn:
                 conn.close()
 
-    def update_inventory_stock(self, product_id: int, new_stock: int) -> int:
+    def update_inventory_stock(self, product_id: int, new_stock: int, expected_version: Optional[int] = None) -> int:
         """
-        Actualiza la cantidad de stock disponible para un producto.
+        Actualiza la cantidad de stock disponible para un producto e incrementa su versión.
+        Si se indica `expected_version`, solo actualiza si la fila conserva esa versión
+        (compare-and-set); una versión distinta resulta en 0 filas afectadas.
+        Con `allocation_strategy`, bloquea la fila (`FOR UPDATE`, como `set_location_stock`)
+        y comprueba en la misma transacción que el producto no tenga ubicaciones.
         Retorna el número de filas afectadas.
+
+        Lanza:
+            - LocatedStockError: Si el stock del producto se administra por ubicación.
         """
         sql = """
             UPDATE inventory
-            SET available_stock = %s
+            SET available_stock = %s, version = version + 1
             WHERE product_id = %s
         """
+        params: tuple = (new_stock, product_id)
+        if expected_version is not None:
+            sql += " AND version = %s"
+            params = (new_stock, product_id, expected_version)
         conn: Optional[pymysql.connections.Connection] = None
         try:
             conn = self.db_connection.get_connection()
             with conn.cursor() as cursor:
-                cursor.execute(sql, (new_stock, product_id))
+                if self.allocation_strategy is not None:
+                    cursor.execute("SELECT 1 FROM inventory WHERE product_id = %s FOR UPDATE", (product_id,))
+                    cursor.execute(
+                        "SELECT 1 FROM inventory_locations WHERE product_id = %s LIMIT 1 FOR SHARE", (product_id,)
+                    )
+                    if cursor.fetchone() is not None:
+                        raise LocatedStockError(product_id)
+                cursor.execute(sql, params)
+                affected_rows = cursor.rowcount
+                if affected_rows:
+                    self._record_threshold_crossings(cursor, [product_id])
                 conn.commit()
-                return cursor.rowcount
+                return affected_rows
         except Exception as e:
             if conn:
                 conn.rollback()
@@ -118,29 +196,720 @@ class InventoryRepository:
             if conn:
                 conn.close()
 
+    def get_inventory_records_by_product_ids(self, product_ids: List[int]) -> List[InventoryRecord]:
+        """
+        Igual que `get_inventory_by_product_ids`, pero lee con un cursor de tuplas y retorna
+        registros compactos (`InventoryRecord`) en lugar de un diccionario por fila.
+        """
+        if not product_ids:
+            return []
+
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        sql = f"SELECT {INVENTORY_RECORD_SELECT} FROM inventory WHERE product_id IN ({placeholders})"
+
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor(self.db_connection.driver.tuple_cursor_class) as cursor:
+                cursor.execute(sql, tuple(product_ids))
+                return [InventoryRecord.from_row(row) for row in cursor.fetchall()]
+        finally:
+            if conn:
+                conn.close()
+
+    def get_stock_map(self, product_ids: List[int]) -> Dict[int, int]:
+        """
+        Retorna {product_id: available_stock} para los product_ids con inventario.
+        El mapa se construye directamente desde las tuplas (product_id, available_stock)
+        del cursor, sin crear filas intermedias.
+        """
+        if not product_ids:
+            return {}
+
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        sql = f"SELECT product_id, available_stock FROM inventory WHERE product_id IN ({placeholders})"
+
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor(self.db_connection.driver.tuple_cursor_class) as cursor:
+                cursor.execute(sql, tuple(product_ids))
+                return dict(cursor.fetchall())
+        finally:
+            if conn:
+                conn.close()
+
+    def get_stock_page(self, limit: int, offset: int) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Retorna una página de tuplas (product_id, available_stock) ordenada por product_id
+        (índice `idx_unique_product_id`) y el total de registros de inventario.
+        Alimenta `/products-with-stock?view=stock`, que no consulta el Products Service.
+        """
+        sql = "SELECT product_id, available_stock FROM inventory ORDER BY product_id LIMIT %s OFFSET %s"
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor(self.db_connection.driver.tuple_cursor_class) as cursor:
+                cursor.execute(sql, (limit, offset))
+                rows = list(cursor.fetchall())
+                cursor.execute("SELECT COUNT(*) FROM inventory")
+                return rows, cursor.fetchone()[0]
+        finally:
+            if conn:
+                conn.close()
+
     def decrease_inventory_stock(self, product_id: int, quantity: int) -> int:
         """
         Disminuye la cantidad de stock disponible para un producto.
         Solo actualiza si hay suficiente stock.
         Retorna el número de filas afectadas.
         """
+        print(f'producto descontar: {product_id} cantidad {quantity}',)
+        return 0 if self.allocate_stock(product_id, quantity) is None else 1
+
+    def allocate_stock(self, product_id: int, quantity: int) -> Optional[Allocation]:
+        """
+        Descuenta `quantity` del total del producto (solo si alcanza) y de las ubicaciones que
+        elige `allocation_strategy`, en una sola transacción.
+        Retorna la asignación [(location_code, cantidad)] (vacía si el producto no tiene
+        ubicaciones) o None si no hay stock suficiente o el producto no existe.
+        """
         sql = """
             UPDATE inventory
-            SET available_stock = available_stock - %s
+            SET available_stock = available_stock - %s, version = version + 1
             WHERE product_id = %s AND available_stock >= %s
         """
         conn: Optional[pymysql.connections.Connection] = None
         try:
-            print(f'producto descontar: {product_id} cantidad {quantity}',)
             conn = self.db_connection.get_connection()
             with conn.cursor() as cursor:
                 cursor.execute(sql, (quantity, product_id, quantity))
+                if cursor.rowcount == 0:
+                    conn.commit()
+                    return None
+                # El UPDATE ya bloqueó la fila del total: las ubicaciones se bloquean después.
+                allocation, = self._apply_location_deltas(cursor, [(product_id, -quantity)])
+                self._record_threshold_crossings(cursor, [product_id])
                 conn.commit()
-                return cursor.rowcount
+                return allocation
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            raise e
+        finally:
+            if conn:
+                conn.close()
+
+    def decrease_inventory_stock_idempotent(
+        self,
+        product_id: int,
+        quantity: int,
+        idempotency_key: str,
+        request_hash: str,
+        response_status: int,
+        response_body: Dict[str, Any],
+        ttl_seconds: int
+    ) -> int:
+        """
+        Disminuye el stock y registra la Idempotency-Key en la MISMA transacción.
+        Si no hay stock suficiente se hace rollback y la llave queda libre.
+        Retorna el número de filas afectadas por el descuento.
+
+        Lanza:
+            - pymysql.err.IntegrityError (1062): Si la llave ya fue registrada (reintento).
+        """
+        allocation = self.allocate_stock_idempotent(
+            product_id, quantity, idempotency_key, request_hash, response_status, response_body, ttl_seconds
+        )
+        return 0 if allocation is None else 1
+
+    def allocate_stock_idempotent(
+        self,
+        product_id: int,
+        quantity: int,
+        idempotency_key: str,
+        request_hash: str,
+        response_status: int,
+        response_body: Dict[str, Any],
+        ttl_seconds: int
+    ) -> Optional[Allocation]:
+        """
+        Variante de `allocate_stock` que registra la Idempotency-Key en la MISMA transacción.
+        Con `allocation_strategy`, la respuesta guardada incluye la asignación en `allocations`
+        para que los reintentos respondan igual que la primera ejecución.
+        Retorna la asignación o None si no hay stock suficiente (rollback: la llave queda libre).
+
+        Lanza:
+            - pymysql.err.IntegrityError (1062): Si la llave ya fue registrada (reintento).
+        """
+        purge_sql = """
+            DELETE FROM idempotency_keys
+            WHERE idempotency_key = %s AND expires_at <= NOW()
+        """
+        insert_sql = """
+            INSERT INTO idempotency_keys (idempotency_key, request_hash, response_status, response_body, expires_at)
+            VALUES (%s, %s, %s, %s, NOW() + INTERVAL %s SECOND)
+        """
+        decrease_sql = """
+            UPDATE inventory
+            SET available_stock = available_stock - %s, version = version + 1
+            WHERE product_id = %s AND available_stock >= %s
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                # Una llave expirada que aún no purgó el evento no debe bloquear su reutilización.
+                cursor.execute(purge_sql, (idempotency_key,))
+                cursor.execute(insert_sql, (
+                    idempotency_key, request_hash, response_status, json.dumps(response_body), ttl_seconds
+                ))
+                cursor.execute(decrease_sql, (quantity, product_id, quantity))
+                if cursor.rowcount == 0:
+                    conn.rollback()
+                    return None
+                allocation, = self._apply_location_deltas(cursor, [(product_id, -quantity)])
+                if self.allocation_strategy is not None:
+                    # La llave se inserta antes del descuento (un reintento falla sin bloquear
+                    # el inventario); la asignación recién se conoce ahora.
+                    cursor.execute(
+                        "UPDATE idempotency_keys SET response_body = %s WHERE idempotency_key = %s",
+                        (json.dumps({**response_body, "allocations": allocation_to_json(allocation)}), idempotency_key)
+                    )
+                self._record_threshold_crossings(cursor, [product_id])
+                conn.commit()
+                return allocation
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            raise e
+        finally:
+            if conn:
+                conn.close()
+
+    def get_idempotency_record(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la respuesta almacenada para una Idempotency-Key vigente.
+        Retorna el registro con `response_body` ya decodificado o None si no existe o expiró.
+        """
+        sql = """
+            SELECT idempotency_key, request_hash, response_status, response_body
+            FROM idempotency_keys
+            WHERE idempotency_key = %s AND expires_at > NOW()
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(sql, (idempotency_key,))
+                record = cursor.fetchone()
+        finally:
+            if conn:
+                conn.close()
+
+        if record and isinstance(record.get("response_body"), (str, bytes)):
+            record["response_body"] = json.loads(record["response_body"])
+        return record
+
+    def apply_stock_adjustments(self, adjustments: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """
+        Aplica un lote de ajustes relativos (product_id, delta) en una sola transacción.
+        Bloquea las filas involucradas (en orden de product_id para evitar deadlocks),
+        descarta las líneas que dejarían el stock negativo (como `chk_stock_non_negative`)
+        y aplica el resto con un único UPDATE `available_stock = available_stock + delta`.
+        Retorna, por línea y en el mismo orden, su estado (APPLIED, INSUFFICIENT_STOCK o
+        NOT_FOUND) y el stock resultante.
+        """
+        if not adjustments:
+            return []
+
+        product_ids = sorted({product_id for product_id, _ in adjustments})
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        select_sql = f"""
+            SELECT product_id, available_stock
+            FROM inventory
+            WHERE product_id IN ({placeholders})
+            ORDER BY product_id
+            FOR UPDATE
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(select_sql, tuple(product_ids))
+                running_stock = {row["product_id"]: row["available_stock"] for row in cursor.fetchall()}
+
+                # Las líneas de un mismo producto se evalúan en orden sobre el stock acumulado.
+                results, net_deltas = evaluate_adjustments(running_stock, adjustments)
+                self._apply_net_deltas(cursor, net_deltas)
+                self._apply_location_deltas(cursor, list(net_deltas.items()))
+                self._record_threshold_crossings(cursor, list(net_deltas))
+                conn.commit()
+                return results
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            raise e
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def _apply_net_deltas(cursor: Any, net_deltas: Dict[int, int]) -> None:
+        """Aplica los deltas netos por producto con un único UPDATE `available_stock + CASE`."""
+        if not net_deltas:
+            return
+        case_sql = ' '.join(['WHEN %s THEN %s'] * len(net_deltas))
+        update_placeholders = ', '.join(['%s'] * len(net_deltas))
+        update_sql = f"""
+            UPDATE inventory
+            SET available_stock = available_stock + CASE product_id {case_sql} END,
+                version = version + 1
+            WHERE product_id IN ({update_placeholders})
+        """
+        case_params = [value for item in net_deltas.items() for value in item]
+        cursor.execute(update_sql, tuple(case_params) + tuple(net_deltas.keys()))
+
+    def _apply_location_deltas(self, cursor: Any, changes: Sequence[Tuple[int, int]]) -> List[Allocation]:
+        """
+        Reparte entre las ubicaciones los cambios (product_id, delta) ya aplicados al total
+        (ver `plan_location_changes`) con un único UPDATE `available_stock + CASE`. Bloquea
+        las ubicaciones después de las filas del total, el mismo orden que `set_location_stock`.
+        Retorna, por cambio, la asignación elegida (vacía sin `allocation_strategy`).
+        """
+        if self.allocation_strategy is None or not changes:
+            return [[] for _ in changes]
+        product_ids = sorted({product_id for product_id, _ in changes})
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        cursor.execute(
+            f"""
+            SELECT id, product_id, location_code, available_stock, priority
+            FROM inventory_locations
+            WHERE product_id IN ({placeholders})
+            ORDER BY product_id, priority, location_code
+            FOR UPDATE
+            """,
+            tuple(product_ids)
+        )
+        locations: Dict[int, List[Tuple[int, LocationStock]]] = {}
+        for row in cursor.fetchall():
+            locations.setdefault(row["product_id"], []).append(
+                (row["id"], LocationStock(row["location_code"], row["available_stock"], row["priority"]))
+            )
+        row_deltas, allocations = plan_location_changes(locations, changes, self.allocation_strategy)
+        if row_deltas:
+            case_sql = ' '.join(['WHEN %s THEN %s'] * len(row_deltas))
+            id_placeholders = ', '.join(['%s'] * len(row_deltas))
+            case_params = [value for item in row_deltas.items() for value in item]
+            cursor.execute(
+                f"""
+                UPDATE inventory_locations
+                SET available_stock = available_stock + CASE id {case_sql} END
+                WHERE id IN ({id_placeholders})
+                """,
+                tuple(case_params) + tuple(row_deltas)
+            )
+        return allocations
+
+    def _add_outcome_allocations(
+        self, cursor: Any, pending: List[Dict[str, Any]], outcomes: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Reparte entre las ubicaciones las compras APPLIED del lote, en orden de llegada, y
+        agrega a cada resultado su asignación (`allocations`; None si no se aplicó), con el
+        mismo formato que la respuesta de una compra síncrona.
+        """
+        if self.allocation_strategy is None:
+            return
+        applied = [index for index, outcome in enumerate(outcomes) if outcome["status"] == 'APPLIED']
+        allocations = self._apply_location_deltas(
+            cursor, [(pending[index]["product_id"], -pending[index]["quantity"]) for index in applied]
+        )
+        for outcome in outcomes:
+            outcome["allocations"] = None
+        for index, allocation in zip(applied, allocations):
+            outcomes[index]["allocations"] = allocation_to_json(allocation)
+
+    def get_locations(self, product_id: int) -> List[Dict[str, Any]]:
+        """Retorna el stock por ubicación de un producto, de la más cercana a la más lejana."""
+        sql = """
+            SELECT location_code, available_stock, priority
+            FROM inventory_locations
+            WHERE product_id = %s
+            ORDER BY priority, location_code
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(sql, (product_id,))
+                return list(cursor.fetchall())
+        finally:
+            if conn:
+                conn.close()
+
+    def set_location_stock(
+        self, product_id: int, location_code: str, available_stock: int, priority: Optional[int] = None
+    ) -> int:
+        """
+        Crea o actualiza el stock de un producto en una ubicación (`priority` None conserva el
+        rango actual, o el por defecto al crearla) y recalcula el total del producto como la
+        suma de sus ubicaciones, en la misma transacción. La primera ubicación de un producto
+        con stock no lo descarta: antes se crea la ubicación `seed_location_code` con el total.
+        Retorna el número de filas de inventario encontradas.
+        """
+        upsert_sql = """
+            INSERT INTO inventory_locations (product_id, location_code, available_stock, priority)
+            VALUES (%s, %s, %s, COALESCE(%s, 100))
+            ON DUPLICATE KEY UPDATE available_stock = %s, priority = COALESCE(%s, priority)
+        """
+        total_sql = """
+            UPDATE inventory
+            SET available_stock = (
+                    SELECT SUM(available_stock) FROM inventory_locations WHERE product_id = %s
+                ),
+                version = version + 1
+            WHERE product_id = %s
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                # La fila del total se bloquea primero, como en los descuentos.
+                cursor.execute(
+                    "SELECT available_stock, location FROM inventory WHERE product_id = %s FOR UPDATE", (product_id,)
+                )
+                inventory = cursor.fetchone()
+                if inventory is None:
+                    conn.rollback()
+                    return 0
+                cursor.execute("SELECT 1 FROM inventory_locations WHERE product_id = %s LIMIT 1", (product_id,))
+                if cursor.fetchone() is None and inventory["available_stock"] > 0:
+                    cursor.execute(
+                        """
+                        INSERT INTO inventory_locations (product_id, location_code, available_stock)
+                        VALUES (%s, %s, %s)
+                        """,
+                        (product_id, seed_location_code(inventory["location"]), inventory["available_stock"])
+                    )
+                cursor.execute(
+                    upsert_sql, (product_id, location_code, available_stock, priority, available_stock, priority)
+                )
+                cursor.execute(total_sql, (product_id, product_id))
+                self._record_threshold_crossings(cursor, [product_id])
+                conn.commit()
+                return 1
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            raise e
+        finally:
+            if conn:
+                conn.close()
+
+    def _record_threshold_crossings(self, cursor: Any, product_ids: List[int]) -> None:
+        record_threshold_crossings(cursor, product_ids, self.low_stock_threshold)
+
+    def set_reorder_threshold(self, product_id: int, reorder_threshold: Optional[int]) -> int:
+        """
+        Define el umbral de stock bajo de un producto (None vuelve al umbral por defecto) y
+        evalúa el cruce con el nuevo umbral en la misma transacción.
+        Retorna el número de filas encontradas.
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                # SELECT ... FOR UPDATE: rowcount del UPDATE no cuenta las filas sin cambios.
+                cursor.execute("SELECT id FROM inventory WHERE product_id = %s FOR UPDATE", (product_id,))
+                if cursor.fetchone() is None:
+                    conn.rollback()
+                    return 0
+                cursor.execute(
+                    "UPDATE inventory SET reorder_threshold = %s WHERE product_id = %s", (reorder_threshold, product_id)
+                )
+                self._record_threshold_crossings(cursor, [product_id])
+                conn.commit()
+                return 1
         except Exception as e:
             if conn:
                 conn.rollback()
             raise e
         finally:
             if conn:
-                conn.close()
\ No newline at end of file
+                conn.close()
+
+    def get_stock_alerts(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Retorna hasta `limit` alertas de stock con id mayor que `after_id`, en orden de id.
+        AUTO_INCREMENT asigna el id al insertar, no al confirmar: la alerta 6 puede ser visible
+        antes que la 5, y un lector que avanzara su cursor a 6 nunca vería la 5. La página se
+        corta en la primera alerta con menos de `alert_settle_seconds` de antigüedad. Es una
+        heurística: reduce esa ventana, pero una transacción que tarde más que el margen en
+        confirmar todavía puede dejar una alerta detrás del cursor.
+        """
+        sql = """
+            SELECT id, product_id, kind, available_stock, threshold, created_at,
+                   created_at <= NOW(3) - INTERVAL %s SECOND AS settled
+            FROM stock_alerts
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(sql, (self.alert_settle_seconds, after_id, limit))
+                rows = cursor.fetchall()
+        finally:
+            if conn:
+                conn.close()
+
+        alerts: List[Dict[str, Any]] = []
+        for row in rows:
+            if not row.pop("settled"):
+                break
+            alerts.append(row)
+        return alerts
+
+    def enqueue_purchase(self, tracking_id: str, product_id: int, quantity: int, partition_key: int) -> None:
+        """Registra una compra asíncrona como PENDING en `purchase_outbox`."""
+        sql = """
+            INSERT INTO purchase_outbox (tracking_id, product_id, quantity, partition_key)
+            VALUES (%s, %s, %s, %s)
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(sql, (tracking_id, product_id, quantity, partition_key))
+                conn.commit()
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            raise e
+        finally:
+            if conn:
+                conn.close()
+
+    def get_purchase_request(self, tracking_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el estado de una compra asíncrona por su tracking_id."""
+        sql = """
+            SELECT tracking_id, product_id, quantity, status, available_stock, allocations, created_at, processed_at
+            FROM purchase_outbox
+            WHERE tracking_id = %s
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(sql, (tracking_id,))
+                record = cursor.fetchone()
+        finally:
+            if conn:
+                conn.close()
+
+        if record and isinstance(record.get("allocations"), (str, bytes)):
+            record["allocations"] = json.loads(record["allocations"])
+        return record
+
+    def process_purchase_batch(self, partition_key: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Procesa en una transacción hasta `limit` compras PENDING de la partición, en orden de
+        llegada: bloquea las filas del outbox y del inventario, descuenta el stock con la
+        misma semántica que `allocate_stock` (nunca negativo) y guarda el resultado de cada
+        compra, con su asignación por ubicaciones si hay `allocation_strategy`. El bloqueo
+        sin SKIP LOCKED serializa a los workers de la misma partición en distintos procesos,
+        lo que preserva el orden por producto.
+        La transacción corre en READ COMMITTED: en REPEATABLE READ el SELECT ... FOR UPDATE
+        tomaría next-key locks sobre `idx_pending_partition`, y el INSERT de `enqueue_purchase`
+        en la misma partición esperaría al commit del lote.
+        Si las ubicaciones no cubren una compra (`plan_location_changes` lanza ValueError), el
+        lote se reprocesa de a una compra y la que falla queda FAILED, en lugar de reintentar
+        el lote completo para siempre.
+        Retorna el resultado de cada compra procesada (lista vacía si no había pendientes).
+        """
+        try:
+            return self._drain_purchases(partition_key, limit)
+        except ValueError:
+            results: List[Dict[str, Any]] = []
+            for _ in range(limit):
+                processed = self._drain_purchases(partition_key, 1)
+                if not processed:
+                    break
+                results.extend(processed)
+            return results
+
+    def _drain_purchases(self, partition_key: int, limit: int) -> List[Dict[str, Any]]:
+        """Una transacción de `process_purchase_batch`; con una sola compra, un ValueError la marca FAILED."""
+        select_outbox_sql = """
+            SELECT id, tracking_id, product_id, quantity
+            FROM purchase_outbox
+            WHERE status = 'PENDING' AND partition_key = %s
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        pending: List[Dict[str, Any]] = []
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                # Aplica solo a la próxima transacción: bloquea las filas leídas, sin gaps.
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+                cursor.execute(select_outbox_sql, (partition_key, limit))
+                pending = list(cursor.fetchall())
+                if not pending:
+                    conn.commit()
+                    return []
+
+                product_ids = sorted({row["product_id"] for row in pending})
+                placeholders = ', '.join(['%s'] * len(product_ids))
+                cursor.execute(
+                    f"""
+                    SELECT product_id, available_stock
+                    FROM inventory
+                    WHERE product_id IN ({placeholders})
+                    ORDER BY product_id
+                    FOR UPDATE
+                    """,
+                    tuple(product_ids)
+                )
+                running_stock = {row["product_id"]: row["available_stock"] for row in cursor.fetchall()}
+                outcomes, net_deltas = evaluate_adjustments(
+                    running_stock, [(row["product_id"], -row["quantity"]) for row in pending]
+                )
+                self._apply_net_deltas(cursor, net_deltas)
+                self._add_outcome_allocations(cursor, pending, outcomes)
+                self._record_threshold_crossings(cursor, list(net_deltas))
+
+                ids = [row["id"] for row in pending]
+                case_sql = ' '.join(['WHEN %s THEN %s'] * len(ids))
+                id_placeholders = ', '.join(['%s'] * len(ids))
+                status_params = [value for row, outcome in zip(pending, outcomes) for value in (row["id"], outcome["status"])]
+                stock_params = [value for row, outcome in zip(pending, outcomes) for value in (row["id"], outcome["available_stock"])]
+                params = status_params + stock_params
+                allocations_sql = ''
+                if self.allocation_strategy is not None:
+                    allocations_sql = f"allocations = CAST(CASE id {case_sql} END AS JSON),"
+                    params += [
+                        value for row, outcome in zip(pending, outcomes)
+                        for value in (
+                            row["id"],
+                            None if outcome["allocations"] is None else json.dumps(outcome["allocations"])
+                        )
+                    ]
+                cursor.execute(
+                    f"""
+                    UPDATE purchase_outbox
+                    SET status = CASE id {case_sql} END,
+                        available_stock = CASE id {case_sql} END,
+                        {allocations_sql}
+                        processed_at = CURRENT_TIMESTAMP(3)
+                    WHERE id IN ({id_placeholders})
+                    """,
+                    tuple(params) + tuple(ids)
+                )
+                conn.commit()
+                return [
+                    {"tracking_id": row["tracking_id"], "product_id": row["product_id"], "quantity": row["quantity"], **outcome}
+                    for row, outcome in zip(pending, outcomes)
+                ]
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            if conn and isinstance(e, ValueError) and len(pending) == 1:
+                return self._fail_purchase(conn, pending[0])
+            raise e
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def _fail_purchase(conn: Any, row: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Marca FAILED una compra que no se puede aplicar, si sigue PENDING, sin tocar el stock."""
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE purchase_outbox
+                SET status = 'FAILED', processed_at = CURRENT_TIMESTAMP(3)
+                WHERE id = %s AND status = 'PENDING'
+                """,
+                (row["id"],)
+            )
+            failed = cursor.rowcount
+        conn.commit()
+        if not failed:
+            return []
+        return [{
+            "tracking_id": row["tracking_id"], "product_id": row["product_id"], "quantity": row["quantity"],
+            "status": "FAILED", "available_stock": None, "allocations": None
+        }]
+
+    def get_inventory_watermark(self) -> Tuple[int, int, int]:
+        """
+        Marca que cambia con toda escritura de inventario: (filas, SUM(version), MAX(id)).
+        Cada escritura de stock incrementa `version`; un DELETE baja el conteo y un INSERT
+        sube MAX(id) (AUTO_INCREMENT no reutiliza ids), aunque ocurran en el mismo segundo.
+        Recorre la tabla: pensada para consultas periódicas, no por solicitud.
+        """
+        sql = """
+            SELECT COUNT(*) AS row_count, COALESCE(SUM(version), 0) AS version_sum, COALESCE(MAX(id), 0) AS max_id
+            FROM inventory
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(sql)
+                row = cursor.fetchone()
+        finally:
+            if conn:
+                conn.close()
+        return int(row["row_count"]), int(row["version_sum"]), int(row["max_id"])
+
+    def get_latest_inventory_update(self) -> Optional[Any]:
+        """
+        Obtiene la marca de tiempo del último cambio de inventario.
+        Retorna None si la tabla está vacía.
+        """
+        sql = "SELECT MAX(last_inventory_update) AS latest FROM inventory"
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(sql)
+                row = cursor.fetchone()
+                return row["latest"] if row else None
+        finally:
+            if conn:
+                conn.close()
+
+    def get_inventory_changes_since(
+        self, since: Any, after_product_id: int = 0, limit: int = 5000
+    ) -> List[Dict[str, Any]]:
+        """
+        Obtiene los registros modificados después de la posición `(since, after_product_id)`,
+        ordenados por `(last_inventory_update, product_id)`. La columna tiene resolución de
+        segundos, así que la fecha sola no basta para paginar: el consumidor continúa desde la
+        última fila recibida. Con `after_product_id=0` se incluye todo el segundo `since`.
+        Usa el índice `idx_inventory_changes`.
+        """
+        sql = """
+            SELECT product_id, available_stock, version, last_inventory_update
+            FROM inventory
+            WHERE last_inventory_update > %s
+               OR (last_inventory_update = %s AND product_id > %s)
+            ORDER BY last_inventory_update, product_id
+            LIMIT %s
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(sql, (since, since, after_product_id, limit))
+                return cursor.fetchall()
+        finally:
+            if conn:
+                conn.close()
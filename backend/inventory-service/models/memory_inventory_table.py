@@ -0,0 +1,415 @@
+import copy
+import datetime
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pymysql.err
+
+from models.inventory_record import InventoryRecord, INVENTORY_RECORD_COLUMNS
+from models.adjustment_evaluation import evaluate_adjustments
+from models.stock_allocation import (
+    Allocation, AllocationStrategy, LocatedStockError, LocationStock, allocation_to_json, plan_location_changes,
+    seed_location_code
+)
+
+DUPLICATE_ENTRY_ERROR = 1062
+
+
+def _utc_now() -> datetime.datetime:
+    # UTC sin zona, como CURRENT_TIMESTAMP de SQLite: los backends son intercambiables.
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _now() -> datetime.datetime:
+    # Resolución de segundos, igual que la columna TIMESTAMP de MySQL.
+    return _utc_now().replace(microsecond=0)
+
+
+class InMemoryInventoryRepository:
+    """
+    Repositorio de inventario en memoria del proceso, con la misma interfaz y semántica que
+    `InventoryRepository`: descuento condicional, `product_id` único (IntegrityError 1062),
+    stock no negativo y columna `version`. Pensado para pruebas de rendimiento que aíslan el
+    costo de Python y para desarrollo sin MySQL; los datos se pierden al reiniciar y cada
+    worker de Gunicorn tiene su propia copia.
+    """
+
+    def __init__(
+        self, low_stock_threshold: Optional[int] = None, allocation_strategy: Optional[AllocationStrategy] = None
+    ) -> None:
+        self.low_stock_threshold = low_stock_threshold
+        self.allocation_strategy = allocation_strategy
+        self._inventory: Dict[int, Dict[str, Any]] = {}
+        # Stock por ubicación: product_id -> location_code -> fila.
+        self._locations: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self._idempotency_keys: Dict[str, Dict[str, Any]] = {}
+        # Outbox de compras asíncronas: tracking_id -> registro, en orden de llegada.
+        self._purchase_outbox: Dict[str, Dict[str, Any]] = {}
+        self._stock_alerts: List[Dict[str, Any]] = []
+        self._next_id = 1
+        # Un único lock serializa las escrituras, como el bloqueo de fila de InnoDB.
+        self._lock = threading.RLock()
+
+    def create_inventory(self, product_id: int, available_stock: int, location: Optional[str] = None) -> int:
+        """
+        Crea un nuevo registro de inventario para un producto.
+        Retorna el ID del nuevo registro de inventario.
+
+        Lanza:
+            - pymysql.err.IntegrityError (1062): Si ya existe inventario para el product_id.
+        """
+        with self._lock:
+            if product_id in self._inventory:
+                raise pymysql.err.IntegrityError(
+                    DUPLICATE_ENTRY_ERROR, f"Duplicate entry '{product_id}' for key 'idx_unique_product_id'"
+                )
+            if available_stock < 0:
+                raise pymysql.err.IntegrityError(3819, "Check constraint 'chk_stock_non_negative' is violated.")
+            inventory_id = self._next_id
+            self._next_id += 1
+            self._inventory[product_id] = {
+                "id": inventory_id,
+                "product_id": product_id,
+                "available_stock": available_stock,
+                "location": location,
+                "last_inventory_update": _now(),
+                "version": 0,
+                "reorder_threshold": None,
+                "below_threshold": 0,
+            }
+            self._record_threshold_crossing(self._inventory[product_id])
+            return inventory_id
+
+    def get_inventory_by_product_id(self, product_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._inventory.get(product_id)
+            return dict(record) if record else None
+
+    def update_inventory_stock(self, product_id: int, new_stock: int, expected_version: Optional[int] = None) -> int:
+        with self._lock:
+            record = self._inventory.get(product_id)
+            if record is None or (expected_version is not None and record["version"] != expected_version):
+                return 0
+            if self.allocation_strategy is not None and self._locations.get(product_id):
+                raise LocatedStockError(product_id)
+            self._set_stock(record, new_stock)
+            return 1
+
+    def delete_inventory(self, product_id: int) -> int:
+        with self._lock:
+            self._locations.pop(product_id, None)  # ON DELETE CASCADE
+            return 1 if self._inventory.pop(product_id, None) is not None else 0
+
+    def get_inventory_by_product_ids(self, product_ids: List[int]) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(self._inventory[pid]) for pid in product_ids if pid in self._inventory]
+
+    def get_inventory_records_by_product_ids(self, product_ids: List[int]) -> List[InventoryRecord]:
+        with self._lock:
+            return [
+                InventoryRecord(*(self._inventory[pid][column] for column in INVENTORY_RECORD_COLUMNS))
+                for pid in product_ids if pid in self._inventory
+            ]
+
+    def get_stock_map(self, product_ids: List[int]) -> Dict[int, int]:
+        with self._lock:
+            return {pid: self._inventory[pid]["available_stock"] for pid in product_ids if pid in self._inventory}
+
+    def get_stock_page(self, limit: int, offset: int) -> Tuple[List[Tuple[int, int]], int]:
+        with self._lock:
+            product_ids = sorted(self._inventory)
+            return [
+                (pid, self._inventory[pid]["available_stock"]) for pid in product_ids[offset:offset + limit]
+            ], len(product_ids)
+
+    def decrease_inventory_stock(self, product_id: int, quantity: int) -> int:
+        return 0 if self.allocate_stock(product_id, quantity) is None else 1
+
+    def allocate_stock(self, product_id: int, quantity: int) -> Optional[Allocation]:
+        """Descuenta el total y las ubicaciones elegidas de forma atómica (ver `InventoryRepository`)."""
+        with self._lock:
+            record = self._inventory.get(product_id)
+            if record is None or record["available_stock"] < quantity:
+                return None
+            allocation, = self._apply_location_deltas([(product_id, -quantity)])
+            self._set_stock(record, record["available_stock"] - quantity)
+            return allocation
+
+    def decrease_inventory_stock_idempotent(
+        self,
+        product_id: int,
+        quantity: int,
+        idempotency_key: str,
+        request_hash: str,
+        response_status: int,
+        response_body: Dict[str, Any],
+        ttl_seconds: int
+    ) -> int:
+        """
+        Registra la llave y descuenta el stock de forma atómica; sin stock suficiente
+        la llave no se registra.
+
+        Lanza:
+            - pymysql.err.IntegrityError (1062): Si la llave ya fue registrada (reintento).
+        """
+        allocation = self.allocate_stock_idempotent(
+            product_id, quantity, idempotency_key, request_hash, response_status, response_body, ttl_seconds
+        )
+        return 0 if allocation is None else 1
+
+    def allocate_stock_idempotent(
+        self,
+        product_id: int,
+        quantity: int,
+        idempotency_key: str,
+        request_hash: str,
+        response_status: int,
+        response_body: Dict[str, Any],
+        ttl_seconds: int
+    ) -> Optional[Allocation]:
+        """
+        `allocate_stock` con la llave registrada de forma atómica; la respuesta guardada
+        incluye la asignación (ver `InventoryRepository`).
+
+        Lanza:
+            - pymysql.err.IntegrityError (1062): Si la llave ya fue registrada (reintento).
+        """
+        with self._lock:
+            stored = self._idempotency_keys.get(idempotency_key)
+            if stored is not None and stored["expires_at"] > _now():
+                raise pymysql.err.IntegrityError(
+                    DUPLICATE_ENTRY_ERROR, f"Duplicate entry '{idempotency_key}' for key 'PRIMARY'"
+                )
+            allocation = self.allocate_stock(product_id, quantity)
+            if allocation is None:
+                return None
+            response_body = copy.deepcopy(response_body)
+            if self.allocation_strategy is not None:
+                response_body["allocations"] = allocation_to_json(allocation)
+            self._idempotency_keys[idempotency_key] = {
+                "idempotency_key": idempotency_key,
+                "request_hash": request_hash,
+                "response_status": response_status,
+                "response_body": response_body,
+                "expires_at": _now() + datetime.timedelta(seconds=ttl_seconds),
+            }
+            return allocation
+
+    def get_idempotency_record(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            stored = self._idempotency_keys.get(idempotency_key)
+            if stored is None:
+                return None
+            if stored["expires_at"] <= _now():
+                del self._idempotency_keys[idempotency_key]
+                return None
+            record = {key: value for key, value in stored.items() if key != "expires_at"}
+            record["response_body"] = copy.deepcopy(stored["response_body"])
+            return record
+
+    def apply_stock_adjustments(self, adjustments: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """Aplica el lote de ajustes relativos de forma atómica (ver `InventoryRepository`)."""
+        with self._lock:
+            running_stock = {
+                product_id: self._inventory[product_id]["available_stock"]
+                for product_id, _ in adjustments if product_id in self._inventory
+            }
+            results, net_deltas = evaluate_adjustments(running_stock, adjustments)
+            self._apply_location_deltas(list(net_deltas.items()))
+            for product_id in net_deltas:
+                self._set_stock(self._inventory[product_id], running_stock[product_id])
+            return results
+
+    def enqueue_purchase(self, tracking_id: str, product_id: int, quantity: int, partition_key: int) -> None:
+        with self._lock:
+            if tracking_id in self._purchase_outbox:
+                raise pymysql.err.IntegrityError(
+                    DUPLICATE_ENTRY_ERROR, f"Duplicate entry '{tracking_id}' for key 'idx_unique_tracking_id'"
+                )
+            self._purchase_outbox[tracking_id] = {
+                "tracking_id": tracking_id,
+                "product_id": product_id,
+                "quantity": quantity,
+                "partition_key": partition_key,
+                "status": "PENDING",
+                "available_stock": None,
+                "allocations": None,
+                "created_at": _utc_now(),
+                "processed_at": None,
+            }
+
+    def get_purchase_request(self, tracking_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._purchase_outbox.get(tracking_id)
+            if record is None:
+                return None
+            return {key: value for key, value in record.items() if key != "partition_key"}
+
+    def process_purchase_batch(self, partition_key: int, limit: int) -> List[Dict[str, Any]]:
+        """Procesa las compras PENDING de la partición en orden de llegada (ver `InventoryRepository`)."""
+        try:
+            return self._drain_purchases(partition_key, limit)
+        except ValueError:
+            results: List[Dict[str, Any]] = []
+            for _ in range(limit):
+                processed = self._drain_purchases(partition_key, 1)
+                if not processed:
+                    break
+                results.extend(processed)
+            return results
+
+    def _drain_purchases(self, partition_key: int, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            pending = [
+                record for record in self._purchase_outbox.values()
+                if record["status"] == "PENDING" and record["partition_key"] == partition_key
+            ][:limit]
+            if not pending:
+                return []
+            purchases = [(record["product_id"], -record["quantity"]) for record in pending]
+            running_stock = {
+                product_id: self._inventory[product_id]["available_stock"]
+                for product_id, _ in purchases if product_id in self._inventory
+            }
+            outcomes, net_deltas = evaluate_adjustments(running_stock, purchases)
+            if self.allocation_strategy is not None:
+                applied = [index for index, outcome in enumerate(outcomes) if outcome["status"] == "APPLIED"]
+                try:
+                    # Planifica antes de modificar: un ValueError no deja cambios a medias.
+                    allocations = self._apply_location_deltas([purchases[index] for index in applied])
+                except ValueError:
+                    if len(pending) > 1:
+                        raise
+                    pending[0].update(status="FAILED", processed_at=_utc_now())
+                    return [{
+                        "tracking_id": pending[0]["tracking_id"], "product_id": pending[0]["product_id"],
+                        "quantity": pending[0]["quantity"], "status": "FAILED", "available_stock": None,
+                        "allocations": None
+                    }]
+                for outcome in outcomes:
+                    outcome["allocations"] = None
+                for index, allocation in zip(applied, allocations):
+                    outcomes[index]["allocations"] = allocation_to_json(allocation)
+            for product_id in net_deltas:
+                self._set_stock(self._inventory[product_id], running_stock[product_id])
+            processed_at = _utc_now()
+            for record, outcome in zip(pending, outcomes):
+                record.update(outcome, processed_at=processed_at)
+            return [
+                {"tracking_id": r["tracking_id"], "product_id": r["product_id"], "quantity": r["quantity"], **outcome}
+                for r, outcome in zip(pending, outcomes)
+            ]
+
+    def set_reorder_threshold(self, product_id: int, reorder_threshold: Optional[int]) -> int:
+        with self._lock:
+            record = self._inventory.get(product_id)
+            if record is None:
+                return 0
+            record["reorder_threshold"] = reorder_threshold
+            self._record_threshold_crossing(record)
+            return 1
+
+    def get_stock_alerts(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            # Los id son consecutivos desde 1: la página empieza en la posición `after_id`.
+            return [dict(alert) for alert in self._stock_alerts[max(after_id, 0):max(after_id, 0) + limit]]
+
+    def get_locations(self, product_id: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._locations.get(product_id, {}).values()
+            return [
+                {key: row[key] for key in ("location_code", "available_stock", "priority")}
+                for row in sorted(rows, key=lambda row: (row["priority"], row["location_code"]))
+            ]
+
+    def set_location_stock(
+        self, product_id: int, location_code: str, available_stock: int, priority: Optional[int] = None
+    ) -> int:
+        with self._lock:
+            record = self._inventory.get(product_id)
+            if record is None:
+                return 0
+            if available_stock < 0:
+                raise pymysql.err.IntegrityError(3819, "Check constraint 'chk_location_stock_non_negative' is violated.")
+            locations = self._locations.setdefault(product_id, {})
+            if not locations and record["available_stock"] > 0:
+                # La primera ubicación no descarta el stock previo (ver `InventoryRepository`).
+                seed_code = seed_location_code(record["location"])
+                locations[seed_code] = {
+                    "location_code": seed_code, "available_stock": record["available_stock"], "priority": 100
+                }
+            row = locations.get(location_code)
+            if row is None:
+                row = locations[location_code] = {"location_code": location_code, "priority": 100}
+            row["available_stock"] = available_stock
+            if priority is not None:
+                row["priority"] = priority
+            self._set_stock(record, sum(location["available_stock"] for location in locations.values()))
+            return 1
+
+    def _apply_location_deltas(self, changes: Sequence[Tuple[int, int]]) -> List[Allocation]:
+        """Reparte entre las ubicaciones los cambios de los totales (ver `InventoryRepository`)."""
+        if self.allocation_strategy is None:
+            return [[] for _ in changes]
+        # Cada fila se identifica por (product_id, location_code).
+        locations = {
+            product_id: [
+                ((product_id, code), LocationStock(code, row["available_stock"], row["priority"]))
+                for code, row in self._locations[product_id].items()
+            ]
+            for product_id, _ in changes if self._locations.get(product_id)
+        }
+        row_deltas, allocations = plan_location_changes(locations, changes, self.allocation_strategy)
+        for (product_id, code), delta in row_deltas.items():
+            self._locations[product_id][code]["available_stock"] += delta
+        return allocations
+
+    def get_inventory_watermark(self) -> Tuple[int, int, int]:
+        """(filas, SUM(version), MAX(id)): cambia con toda escritura (ver `InventoryRepository`)."""
+        with self._lock:
+            records = self._inventory.values()
+            return (
+                len(records),
+                sum(r["version"] for r in records),
+                max((r["id"] for r in records), default=0)
+            )
+
+    def get_latest_inventory_update(self) -> Optional[datetime.datetime]:
+        with self._lock:
+            return max((r["last_inventory_update"] for r in self._inventory.values()), default=None)
+
+    def get_inventory_changes_since(
+        self, since: Any, after_product_id: int = 0, limit: int = 5000
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            changed = [
+                {key: r[key] for key in ("product_id", "available_stock", "version", "last_inventory_update")}
+                for r in self._inventory.values()
+                if (r["last_inventory_update"], r["product_id"]) > (since, after_product_id)
+            ]
+        changed.sort(key=lambda r: (r["last_inventory_update"], r["product_id"]))
+        return changed[:limit]
+
+    def _set_stock(self, record: Dict[str, Any], new_stock: int) -> None:
+        record["available_stock"] = new_stock
+        record["version"] += 1
+        record["last_inventory_update"] = _now()
+        self._record_threshold_crossing(record)
+
+    def _record_threshold_crossing(self, record: Dict[str, Any]) -> None:
+        """Registra una alerta si la escritura movió la fila de un lado al otro de su umbral."""
+        if self.low_stock_threshold is None:
+            return
+        threshold = record["reorder_threshold"] if record["reorder_threshold"] is not None else self.low_stock_threshold
+        below = int(record["available_stock"] < threshold)
+        if below == record["below_threshold"]:
+            return
+        record["below_threshold"] = below
+        self._stock_alerts.append({
+            "id": len(self._stock_alerts) + 1,
+            "product_id": record["product_id"],
+            "kind": "LOW_STOCK" if below else "RESTOCKED",
+            "available_stock": record["available_stock"],
+            "threshold": threshold,
+            "created_at": _now(),
+        })
@@ -1,3 +1,6 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Tuple
 from marshmallow import Schema, fields
 
 class ProductAttributesSchema(Schema):
@@ -26,4 +29,48 @@ class ProductSchema(Schema):
 class ProductListResponseSchema(Schema):
     """Esquema para la respuesta completa de la lista de productos."""
     data = fields.Nested(ProductSchema, many=True)
-    meta = fields.Dict()
\ No newline at end of file
+    meta = fields.Dict()
+
+
+# Atributos que se pueden pedir con `fields[productos]` (sparse fieldsets de JSON:API), en orden.
+PRODUCT_FIELDS: Tuple[str, ...] = tuple(ProductAttributesSchema._declared_fields)
+# Atributos que aporta el inventario y no el Products Service.
+INVENTORY_FIELDS: Tuple[str, ...] = ('available_stock',)
+
+
+@lru_cache(maxsize=64)
+def product_list_schema(product_fields: Optional[Tuple[str, ...]] = None) -> ProductListResponseSchema:
+    """
+    Esquema de la lista de productos que serializa solo los atributos de `product_fields`
+    (todos si es None). Se reutiliza por combinación de atributos: construir el esquema
+    cuesta más que serializar una página chica.
+    """
+    if product_fields is None:
+        return ProductListResponseSchema()
+    return ProductListResponseSchema(
+        only=('data.type', 'data.id', 'meta') + tuple(f'data.attributes.{name}' for name in product_fields)
+    )
+
+
+@lru_cache(maxsize=64)
+def _product_schema(product_fields: Optional[Tuple[str, ...]]) -> ProductSchema:
+    if product_fields is None:
+        return ProductSchema()
+    return ProductSchema(only=('type', 'id') + tuple(f'attributes.{name}' for name in product_fields))
+
+
+def stream_product_list(
+    products_with_stock: Dict[str, Any], product_fields: Optional[Tuple[str, ...]] = None
+) -> Iterator[str]:
+    """
+    Serializa la lista de productos en formato JSON:API emitiendo un item de `data` a la vez.
+    Equivale a `product_list_schema(product_fields).dump()` + `jsonify`, pero sin construir la
+    página serializada completa ni el buffer JSON único en memoria. `products_with_stock` ya
+    está completo: la página obtenida del Products Service no se lee por partes.
+    """
+    product_schema = _product_schema(product_fields)
+    separators = (',', ':')
+    yield '{"data":['
+    for index, product in enumerate(products_with_stock.get("data") or []):
+        yield (',' if index else '') + json.dumps(product_schema.dump(product), separators=separators)
+    yield '],"meta":' + json.dumps(products_with_stock.get("meta", {}), separators=separators) + '}'
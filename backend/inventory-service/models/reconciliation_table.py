@@ -0,0 +1,140 @@
+import pymysql.connections
+from typing import Any, List, Optional, Tuple
+
+from db.db_connection import DBConnection
+from models.inventory_table import record_threshold_crossings
+
+
+class ReconciliationRepository:
+    """
+    Lecturas por keyset y reparaciones acotadas sobre `products` e `inventory` para la
+    reconciliación (`commands/reconcile_inventory.py`). Solo existe para MySQL: es el único
+    backend que comparte base de datos con el Products Service.
+
+    Cada lectura es una consulta corta por índice (`WHERE id > ? ORDER BY id LIMIT ?`), sin
+    transacciones largas ni bloqueos de lectura. Las reparaciones vuelven a comprobar la
+    condición en la misma sentencia, por si la fila cambió desde que se leyó.
+    Con `multi_warehouse` (MULTI_WAREHOUSE_ENABLED), las reparaciones de stock también
+    ajustan `inventory_locations`, para que el total siga siendo la suma de sus ubicaciones.
+    Con `low_stock_threshold` (LOW_STOCK_ALERTS_ENABLED) registran los cruces de umbral
+    como cualquier otra escritura de stock.
+    """
+
+    def __init__(
+        self, db_connection: DBConnection, multi_warehouse: bool = False, low_stock_threshold: Optional[int] = None
+    ) -> None:
+        self.db_connection = db_connection
+        self.multi_warehouse = multi_warehouse
+        self.low_stock_threshold = low_stock_threshold
+
+    def get_products_after(self, after_id: int, limit: int) -> List[Tuple[int, bool]]:
+        """Retorna hasta `limit` tuplas (id, is_active) de `products` con id > after_id, ordenadas."""
+        sql = "SELECT id, is_active FROM products WHERE id > %s ORDER BY id LIMIT %s"
+        return [(product_id, bool(is_active)) for product_id, is_active in self._fetch_tuples(sql, (after_id, limit))]
+
+    def get_inventory_after(self, after_product_id: int, limit: int) -> List[Tuple[int, int]]:
+        """Retorna hasta `limit` tuplas (product_id, available_stock) con product_id > after_product_id, ordenadas."""
+        sql = """
+            SELECT product_id, available_stock FROM inventory
+            WHERE product_id > %s ORDER BY product_id LIMIT %s
+        """
+        return [tuple(row) for row in self._fetch_tuples(sql, (after_product_id, limit))]
+
+    def get_max_keys(self) -> Tuple[int, int]:
+        """Retorna (máximo id de products, máximo product_id de inventory); 0 si la tabla está vacía."""
+        sql = "SELECT (SELECT COALESCE(MAX(id), 0) FROM products), (SELECT COALESCE(MAX(product_id), 0) FROM inventory)"
+        row = self._fetch_tuples(sql, ())[0]
+        return int(row[0]), int(row[1])
+
+    def create_missing_inventory(self, product_ids: List[int]) -> int:
+        """
+        Crea inventario con stock 0 para los productos indicados que no lo tienen.
+        INSERT IGNORE omite los que ya tienen registro o ya no existen (FK).
+        Retorna el número de filas creadas.
+        """
+        placeholders = ', '.join(['(%s, 0)'] * len(product_ids))
+        sql = f"INSERT IGNORE INTO inventory (product_id, available_stock) VALUES {placeholders}"
+        return self._execute_write(sql, tuple(product_ids))
+
+    def delete_orphan_inventory(self, product_ids: List[int]) -> int:
+        """Elimina el inventario de los product_ids indicados que no existen en `products`."""
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        sql = f"""
+            DELETE i FROM inventory i
+            LEFT JOIN products p ON p.id = i.product_id
+            WHERE i.product_id IN ({placeholders}) AND p.id IS NULL
+        """
+        return self._execute_write(sql, tuple(product_ids))
+
+    def clear_inactive_stock(self, product_ids: List[int]) -> int:
+        """
+        Deja en 0 el stock de los product_ids indicados cuyo producto está inactivo (y el de
+        sus ubicaciones), en una transacción. Las filas a reparar se bloquean primero, en
+        orden de product_id y antes que sus ubicaciones, como en las escrituras del inventario.
+        Retorna el número de productos reparados.
+        """
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        select_sql = f"""
+            SELECT i.product_id
+            FROM inventory i
+            JOIN products p ON p.id = i.product_id
+            WHERE i.product_id IN ({placeholders}) AND p.is_active = 0 AND i.available_stock > 0
+            ORDER BY i.product_id
+            FOR UPDATE OF i
+        """
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(select_sql, tuple(product_ids))
+                cleared = [row["product_id"] for row in cursor.fetchall()]
+                if not cleared:
+                    conn.commit()
+                    return 0
+                cleared_placeholders = ', '.join(['%s'] * len(cleared))
+                cursor.execute(
+                    f"UPDATE inventory SET available_stock = 0, version = version + 1 WHERE product_id IN ({cleared_placeholders})",
+                    tuple(cleared)
+                )
+                if self.multi_warehouse:
+                    cursor.execute(
+                        f"UPDATE inventory_locations SET available_stock = 0 WHERE product_id IN ({cleared_placeholders})",
+                        tuple(cleared)
+                    )
+                record_threshold_crossings(cursor, cleared, self.low_stock_threshold)
+                conn.commit()
+                return len(cleared)
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            raise e
+        finally:
+            if conn:
+                conn.close()
+
+    def _fetch_tuples(self, sql: str, params: Tuple[Any, ...]) -> List[Tuple[Any, ...]]:
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor(self.db_connection.driver.tuple_cursor_class) as cursor:
+                cursor.execute(sql, params)
+                return list(cursor.fetchall())
+        finally:
+            if conn:
+                conn.close()
+
+    def _execute_write(self, sql: str, params: Tuple[Any, ...]) -> int:
+        conn: Optional[pymysql.connections.Connection] = None
+        try:
+            conn = self.db_connection.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            raise e
+        finally:
+            if conn:
+                conn.close()
@@ -0,0 +1,61 @@
+from typing import Any, Optional
+
+from config.settings import (
+    STORAGE_BACKEND, SQLITE_DATABASE_PATH,
+    SHARED_STOCK_ENABLED, SHARED_STOCK_PATH, SHARED_STOCK_CAPACITY, SHARED_STOCK_TTL_SECONDS,
+    LOW_STOCK_ALERTS_ENABLED, LOW_STOCK_DEFAULT_THRESHOLD, LOW_STOCK_ALERT_SETTLE_SECONDS,
+    MULTI_WAREHOUSE_ENABLED, ALLOCATION_STRATEGY
+)
+from models.stock_allocation import AllocationStrategy, get_allocation_strategy
+
+STORAGE_BACKENDS = ('mysql', 'sqlite', 'memory')
+# Umbral por defecto de las alertas de stock bajo (None las desactiva).
+LOW_STOCK_THRESHOLD = LOW_STOCK_DEFAULT_THRESHOLD if LOW_STOCK_ALERTS_ENABLED else None
+
+
+def create_inventory_repository(backend: str = STORAGE_BACKEND) -> Any:
+    """
+    Crea el repositorio de inventario del backend configurado en STORAGE_BACKEND.
+    Todos exponen la interfaz de `InventoryRepository` y las mismas garantías de integridad.
+    Con SHARED_STOCK_ENABLED, MySQL y SQLite se envuelven con la tabla de stock compartida
+    entre workers (el backend en memoria no: cada worker tiene sus propios datos).
+    Con LOW_STOCK_ALERTS_ENABLED, cada escritura de stock registra los cruces de umbral.
+    Con MULTI_WAREHOUSE_ENABLED, los cambios del total se reparten entre las ubicaciones
+    del producto con la estrategia ALLOCATION_STRATEGY.
+
+    Lanza:
+        - ValueError: Si el backend no es uno de STORAGE_BACKENDS, la estrategia de
+          asignación no existe o la tabla compartida existente no coincide con
+          SHARED_STOCK_CAPACITY.
+    """
+    allocation_strategy = _allocation_strategy()
+    if backend == 'mysql':
+        from db.db_connection import DBConnection
+        from models.inventory_table import InventoryRepository
+        return _with_shared_stock(InventoryRepository(
+            DBConnection(), LOW_STOCK_THRESHOLD, allocation_strategy, LOW_STOCK_ALERT_SETTLE_SECONDS
+        ))
+    if backend == 'sqlite':
+        from models.sqlite_inventory_table import SQLiteInventoryRepository
+        return _with_shared_stock(SQLiteInventoryRepository(
+            SQLITE_DATABASE_PATH, low_stock_threshold=LOW_STOCK_THRESHOLD, allocation_strategy=allocation_strategy
+        ))
+    if backend == 'memory':
+        from models.memory_inventory_table import InMemoryInventoryRepository
+        return InMemoryInventoryRepository(LOW_STOCK_THRESHOLD, allocation_strategy)
+    raise ValueError(f"STORAGE_BACKEND inválido: '{backend}'. Valores permitidos: {', '.join(STORAGE_BACKENDS)}.")
+
+
+def _allocation_strategy() -> Optional[AllocationStrategy]:
+    return get_allocation_strategy(ALLOCATION_STRATEGY) if MULTI_WAREHOUSE_ENABLED else None
+
+
+def _with_shared_stock(repository: Any) -> Any:
+    if not SHARED_STOCK_ENABLED:
+        return repository
+    from cache.shared_stock_table import SharedStockTable
+    from models.shared_stock_repository import SharedStockRepository
+
+    stock_table = SharedStockTable(SHARED_STOCK_PATH, SHARED_STOCK_CAPACITY, SHARED_STOCK_TTL_SECONDS)
+    stock_table.open()  # Una configuración inválida falla al arrancar, no en cada solicitud
+    return SharedStockRepository(repository, stock_table)
@@ -0,0 +1,163 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cache.shared_stock_table import ABSENT_VERSION, SharedStockTable
+from metrics.registry import metrics_registry
+
+shared_stock_lookups_total = metrics_registry.counter(
+    "inventory_shared_stock_lookups_total",
+    "product_id consultados en la tabla de stock compartida entre workers por resultado (hit/miss)."
+)
+
+
+class SharedStockRepository:
+    """
+    Envuelve un repositorio de inventario (MySQL o SQLite) con la tabla de stock compartida
+    entre los workers del host (`SharedStockTable`). Expone la misma interfaz: los métodos
+    que no redefine se delegan tal cual.
+
+    - `get_stock_map` responde desde la tabla los product_id con entrada vigente, sin consultar
+      la base de datos ni a otros procesos, y solo consulta los faltantes (que quedan guardados).
+    - Cada escritura exitosa relee (stock, version) de las filas afectadas y actualiza la
+      tabla, así una compra en un worker se ve de inmediato en los demás. Si la relectura
+      falla se vacían los slots: la escritura nunca falla por la tabla.
+    """
+
+    def __init__(self, inventory_repository: Any, stock_table: SharedStockTable) -> None:
+        self.inventory_repository = inventory_repository
+        self.stock_table = stock_table
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inventory_repository, name)
+
+    # -------------------- LECTURAS --------------------
+
+    def get_stock_map(self, product_ids: List[int]) -> Dict[int, int]:
+        stock_map: Dict[int, int] = {}
+        misses: List[int] = []
+        for product_id in product_ids:
+            entry = self.stock_table.get(product_id)
+            if entry is None:
+                misses.append(product_id)
+            elif entry[1] != ABSENT_VERSION:
+                stock_map[product_id] = entry[0]
+        if product_ids:
+            shared_stock_lookups_total.inc(len(product_ids) - len(misses), result="hit")
+        if misses:
+            shared_stock_lookups_total.inc(len(misses), result="miss")
+            stock_map.update(self._load(misses))
+        return stock_map
+
+    # -------------------- ESCRITURAS --------------------
+
+    def create_inventory(self, product_id: int, available_stock: int, location: Optional[str] = None) -> int:
+        inventory_id = self.inventory_repository.create_inventory(product_id, available_stock, location)
+        # Una fila recreada reinicia `version`: debe pisar la entrada del registro eliminado.
+        self._refresh([product_id], force=True)
+        return inventory_id
+
+    def update_inventory_stock(self, product_id: int, new_stock: int, expected_version: Optional[int] = None) -> int:
+        affected_rows = self.inventory_repository.update_inventory_stock(product_id, new_stock, expected_version)
+        if affected_rows:
+            self._refresh([product_id])
+        return affected_rows
+
+    def delete_inventory(self, product_id: int) -> int:
+        affected_rows = self.inventory_repository.delete_inventory(product_id)
+        self.stock_table.discard(product_id)
+        return affected_rows
+
+    def decrease_inventory_stock(self, product_id: int, quantity: int) -> int:
+        affected_rows = self.inventory_repository.decrease_inventory_stock(product_id, quantity)
+        if affected_rows:
+            self._refresh([product_id])
+        return affected_rows
+
+    def decrease_inventory_stock_idempotent(
+        self,
+        product_id: int,
+        quantity: int,
+        idempotency_key: str,
+        request_hash: str,
+        response_status: int,
+        response_body: Dict[str, Any],
+        ttl_seconds: int
+    ) -> int:
+        affected_rows = self.inventory_repository.decrease_inventory_stock_idempotent(
+            product_id, quantity, idempotency_key, request_hash, response_status, response_body, ttl_seconds
+        )
+        if affected_rows:
+            self._refresh([product_id])
+        return affected_rows
+
+    def allocate_stock(self, product_id: int, quantity: int) -> Optional[List[Tuple[str, int]]]:
+        allocations = self.inventory_repository.allocate_stock(product_id, quantity)
+        if allocations is not None:
+            self._refresh([product_id])
+        return allocations
+
+    def allocate_stock_idempotent(
+        self,
+        product_id: int,
+        quantity: int,
+        idempotency_key: str,
+        request_hash: str,
+        response_status: int,
+        response_body: Dict[str, Any],
+        ttl_seconds: int
+    ) -> Optional[List[Tuple[str, int]]]:
+        allocations = self.inventory_repository.allocate_stock_idempotent(
+            product_id, quantity, idempotency_key, request_hash, response_status, response_body, ttl_seconds
+        )
+        if allocations is not None:
+            self._refresh([product_id])
+        return allocations
+
+    def set_location_stock(
+        self, product_id: int, location_code: str, available_stock: int, priority: Optional[int] = None
+    ) -> int:
+        affected_rows = self.inventory_repository.set_location_stock(product_id, location_code, available_stock, priority)
+        if affected_rows:
+            self._refresh([product_id])
+        return affected_rows
+
+    def apply_stock_adjustments(self, adjustments: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        results = self.inventory_repository.apply_stock_adjustments(adjustments)
+        self._refresh(_applied_product_ids(
+            (product_id for product_id, _ in adjustments), (result["status"] for result in results)
+        ))
+        return results
+
+    def process_purchase_batch(self, partition_key: int, limit: int) -> List[Dict[str, Any]]:
+        results = self.inventory_repository.process_purchase_batch(partition_key, limit)
+        self._refresh(_applied_product_ids(
+            (result["product_id"] for result in results), (result["status"] for result in results)
+        ))
+        return results
+
+    # -------------------- INTERNOS --------------------
+
+    def _load(self, product_ids: List[int], force: bool = False) -> Dict[int, int]:
+        """Lee (stock, version) de la base de datos, los guarda en la tabla y retorna el mapa de stock."""
+        records = self.inventory_repository.get_inventory_records_by_product_ids(product_ids)
+        stock_map: Dict[int, int] = {}
+        for record in records:
+            stock_map[record.product_id] = record.available_stock
+            self.stock_table.put(record.product_id, record.available_stock, record.version, force=force)
+        for product_id in product_ids:
+            if product_id not in stock_map:
+                self.stock_table.put_absent(product_id)
+        return stock_map
+
+    def _refresh(self, product_ids: List[int], force: bool = False) -> None:
+        if not product_ids:
+            return
+        try:
+            self._load(product_ids, force=force)
+        except Exception as e:
+            print(f"SHARED STOCK WARNING: No se pudo refrescar la tabla compartida tras la escritura. {e}")
+            for product_id in product_ids:
+                self.stock_table.discard(product_id)
+
+
+def _applied_product_ids(product_ids: Iterable[int], statuses: Iterable[str]) -> List[int]:
+    return sorted({product_id for product_id, status in zip(product_ids, statuses) if status == "APPLIED"})
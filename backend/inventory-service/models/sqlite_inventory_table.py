@@ -0,0 +1,716 @@
+import datetime
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pymysql.err
+
+from models.inventory_record import InventoryRecord, INVENTORY_RECORD_SELECT
+from models.adjustment_evaluation import evaluate_adjustments
+from models.stock_allocation import (
+    Allocation, AllocationStrategy, LocatedStockError, LocationStock, allocation_to_json, plan_location_changes,
+    seed_location_code
+)
+
+DUPLICATE_ENTRY_ERROR = 1062
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Mismo esquema que database/init/*.sql, traducido a SQLite.
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS inventory (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL UNIQUE,
+        available_stock INTEGER NOT NULL DEFAULT 0 CHECK (available_stock >= 0),
+        location TEXT,
+        last_inventory_update TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        version INTEGER NOT NULL DEFAULT 0,
+        reorder_threshold INTEGER,
+        below_threshold INTEGER NOT NULL DEFAULT 0
+    );
+    DROP INDEX IF EXISTS idx_last_inventory_update;
+    CREATE INDEX IF NOT EXISTS idx_inventory_changes ON inventory (last_inventory_update, product_id);
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        idempotency_key TEXT PRIMARY KEY,
+        request_hash TEXT NOT NULL,
+        response_status INTEGER NOT NULL,
+        response_body TEXT NOT NULL,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        expires_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS purchase_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tracking_id TEXT NOT NULL UNIQUE,
+        product_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        partition_key INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'PENDING',
+        available_stock INTEGER,
+        allocations TEXT,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        processed_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_pending_partition ON purchase_outbox (status, partition_key, id);
+    CREATE TABLE IF NOT EXISTS stock_alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        available_stock INTEGER NOT NULL,
+        threshold INTEGER NOT NULL,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS inventory_locations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL REFERENCES inventory (product_id) ON DELETE CASCADE,
+        location_code TEXT NOT NULL,
+        available_stock INTEGER NOT NULL DEFAULT 0 CHECK (available_stock >= 0),
+        priority INTEGER NOT NULL DEFAULT 100,
+        last_update TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (product_id, location_code)
+    );
+"""
+# Columnas agregadas después de la primera versión del esquema (archivos existentes).
+ADDED_COLUMNS = {
+    ("inventory", "reorder_threshold"): "ALTER TABLE inventory ADD COLUMN reorder_threshold INTEGER",
+    ("inventory", "below_threshold"): "ALTER TABLE inventory ADD COLUMN below_threshold INTEGER NOT NULL DEFAULT 0",
+    ("purchase_outbox", "allocations"): "ALTER TABLE purchase_outbox ADD COLUMN allocations TEXT",
+}
+
+
+def _to_duplicate_entry(error: sqlite3.IntegrityError) -> Exception:
+    """Traduce la violación de UNIQUE/PRIMARY KEY al IntegrityError 1062 que espera la capa de servicio."""
+    if "UNIQUE" in str(error):
+        return pymysql.err.IntegrityError(DUPLICATE_ENTRY_ERROR, f"Duplicate entry: {error}")
+    return pymysql.err.IntegrityError(3819, str(error))
+
+
+class SQLiteInventoryRepository:
+    """
+    Repositorio de inventario sobre un archivo SQLite en modo WAL, con la misma interfaz y
+    semántica que `InventoryRepository`. Permite desplegar el servicio en un único
+    contenedor (edge/dev) sin MySQL. WAL permite lectores concurrentes con un escritor;
+    las transacciones de escritura usan `BEGIN IMMEDIATE` para tomar el bloqueo antes de leer.
+    """
+
+    def __init__(
+        self,
+        database_path: str,
+        busy_timeout_ms: int = 5000,
+        low_stock_threshold: Optional[int] = None,
+        allocation_strategy: Optional[AllocationStrategy] = None
+    ) -> None:
+        self.database_path = database_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.low_stock_threshold = low_stock_threshold
+        self.allocation_strategy = allocation_strategy
+        # Una conexión por hilo: sqlite3 no permite compartirlas entre hilos.
+        self._local = threading.local()
+        directory = os.path.dirname(database_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Conexión temporal: con preload_app el constructor corre en el master de Gunicorn, y una
+        # conexión guardada en `_local` la heredaría (y reutilizaría) el hilo principal de cada
+        # worker tras el fork, lo que SQLite no permite.
+        conn = sqlite3.connect(database_path, isolation_level=None, timeout=busy_timeout_ms / 1000)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA_SQL)
+            for (table, column), ddl in ADDED_COLUMNS.items():
+                if column not in {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                    conn.execute(ddl)
+        finally:
+            conn.close()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            # isolation_level=None: las transacciones se abren explícitamente.
+            conn = sqlite3.connect(self.database_path, isolation_level=None, timeout=self.busy_timeout_ms / 1000)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")  # ON DELETE CASCADE de inventory_locations
+            self._local.connection = conn
+        return conn
+
+    def _write(self, sql: str, params: tuple) -> sqlite3.Cursor:
+        """Ejecuta una escritura de una sola sentencia (atómica por sí misma en SQLite)."""
+        try:
+            return self._get_connection().execute(sql, params)
+        except sqlite3.IntegrityError as e:
+            raise _to_duplicate_entry(e)
+
+    def _write_stock(self, sql: str, params: tuple, product_ids: List[int]) -> sqlite3.Cursor:
+        """
+        Escritura de stock de una sola sentencia. Con alertas de stock bajo, la sentencia y el
+        registro de los cruces de umbral van en una misma transacción (o en la que ya esté abierta).
+        """
+        if self.low_stock_threshold is None:
+            return self._write(sql, params)
+        conn = self._get_connection()
+        own_transaction = not conn.in_transaction
+        if own_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(sql, params)
+            if cursor.rowcount:
+                self._record_threshold_crossings(conn, product_ids)
+            if own_transaction:
+                conn.execute("COMMIT")
+            return cursor
+        except Exception as e:
+            if own_transaction:
+                conn.execute("ROLLBACK")
+            if isinstance(e, sqlite3.IntegrityError):
+                raise _to_duplicate_entry(e)
+            raise
+
+    def _record_threshold_crossings(self, conn: sqlite3.Connection, product_ids: List[int]) -> None:
+        """Registra los cruces de umbral de `product_ids` (ver `InventoryRepository`)."""
+        if self.low_stock_threshold is None or not product_ids:
+            return
+        placeholders = ', '.join(['?'] * len(product_ids))
+        crossed = f"product_id IN ({placeholders}) AND below_threshold <> (available_stock < COALESCE(reorder_threshold, ?))"
+        params = tuple(product_ids) + (self.low_stock_threshold,)
+        cursor = conn.execute(
+            f"""
+            INSERT INTO stock_alerts (product_id, kind, available_stock, threshold)
+            SELECT product_id, CASE WHEN below_threshold = 1 THEN 'RESTOCKED' ELSE 'LOW_STOCK' END,
+                   available_stock, COALESCE(reorder_threshold, ?)
+            FROM inventory
+            WHERE {crossed}
+            """,
+            (self.low_stock_threshold,) + params
+        )
+        if cursor.rowcount:
+            conn.execute(f"UPDATE inventory SET below_threshold = 1 - below_threshold WHERE {crossed}", params)
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        record = dict(row)
+        if isinstance(record.get("last_inventory_update"), str):
+            record["last_inventory_update"] = datetime.datetime.strptime(record["last_inventory_update"], TIMESTAMP_FORMAT)
+        return record
+
+    def create_inventory(self, product_id: int, available_stock: int, location: Optional[str] = None) -> int:
+        """
+        Crea un nuevo registro de inventario para un producto.
+        Retorna el ID del nuevo registro de inventario.
+
+        Lanza:
+            - pymysql.err.IntegrityError (1062): Si ya existe inventario para el product_id.
+        """
+        cursor = self._write_stock(
+            "INSERT INTO inventory (product_id, available_stock, location) VALUES (?, ?, ?)",
+            (product_id, available_stock, location), [product_id]
+        )
+        return cursor.lastrowid
+
+    def get_inventory_by_product_id(self, product_id: int) -> Optional[Dict[str, Any]]:
+        row = self._get_connection().execute("SELECT * FROM inventory WHERE product_id = ?", (product_id,)).fetchone()
+        return self._to_dict(row)
+
+    def update_inventory_stock(self, product_id: int, new_stock: int, expected_version: Optional[int] = None) -> int:
+        sql = """
+            UPDATE inventory
+            SET available_stock = ?, version = version + 1, last_inventory_update = CURRENT_TIMESTAMP
+            WHERE product_id = ?
+        """
+        params: tuple = (new_stock, product_id)
+        if expected_version is not None:
+            sql += " AND version = ?"
+            params = (new_stock, product_id, expected_version)
+        if self.allocation_strategy is None:
+            return self._write_stock(sql, params, [product_id]).rowcount
+        # La comprobación de ubicaciones y el UPDATE comparten la transacción (ver `InventoryRepository`).
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM inventory_locations WHERE product_id = ? LIMIT 1", (product_id,)).fetchone():
+                raise LocatedStockError(product_id)
+            affected_rows = self._write_stock(sql, params, [product_id]).rowcount
+            conn.execute("COMMIT")
+            return affected_rows
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete_inventory(self, product_id: int) -> int:
+        return self._write("DELETE FROM inventory WHERE product_id = ?", (product_id,)).rowcount
+
+    def get_inventory_by_product_ids(self, product_ids: List[int]) -> List[Dict[str, Any]]:
+        if not product_ids:
+            return []
+        placeholders = ', '.join(['?'] * len(product_ids))
+        rows = self._get_connection().execute(
+            f"SELECT * FROM inventory WHERE product_id IN ({placeholders})", tuple(product_ids)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def get_inventory_records_by_product_ids(self, product_ids: List[int]) -> List[InventoryRecord]:
+        if not product_ids:
+            return []
+        placeholders = ', '.join(['?'] * len(product_ids))
+        cursor = self._get_connection().cursor()
+        cursor.row_factory = None  # Tuplas en lugar de sqlite3.Row
+        rows = cursor.execute(
+            f"SELECT {INVENTORY_RECORD_SELECT} FROM inventory WHERE product_id IN ({placeholders})", tuple(product_ids)
+        ).fetchall()
+        return [
+            InventoryRecord.from_row(row[:4] + (datetime.datetime.strptime(row[4], TIMESTAMP_FORMAT),) + row[5:])
+            for row in rows
+        ]
+
+    def get_stock_map(self, product_ids: List[int]) -> Dict[int, int]:
+        if not product_ids:
+            return {}
+        placeholders = ', '.join(['?'] * len(product_ids))
+        cursor = self._get_connection().cursor()
+        cursor.row_factory = None
+        cursor.execute(f"SELECT product_id, available_stock FROM inventory WHERE product_id IN ({placeholders})", tuple(product_ids))
+        return dict(cursor.fetchall())
+
+    def get_stock_page(self, limit: int, offset: int) -> Tuple[List[Tuple[int, int]], int]:
+        cursor = self._get_connection().cursor()
+        cursor.row_factory = None
+        rows = cursor.execute(
+            "SELECT product_id, available_stock FROM inventory ORDER BY product_id LIMIT ? OFFSET ?", (limit, offset)
+        ).fetchall()
+        return rows, cursor.execute("SELECT COUNT(*) FROM inventory").fetchone()[0]
+
+    def decrease_inventory_stock(self, product_id: int, quantity: int) -> int:
+        return 0 if self.allocate_stock(product_id, quantity) is None else 1
+
+    def allocate_stock(self, product_id: int, quantity: int) -> Optional[Allocation]:
+        """Descuenta el total y las ubicaciones elegidas en una transacción (ver `InventoryRepository`)."""
+        sql = """
+            UPDATE inventory
+            SET available_stock = available_stock - ?, version = version + 1, last_inventory_update = CURRENT_TIMESTAMP
+            WHERE product_id = ? AND available_stock >= ?
+        """
+        params = (quantity, product_id, quantity)
+        if self.allocation_strategy is None:
+            return [] if self._write_stock(sql, params, [product_id]).rowcount else None
+        conn = self._get_connection()
+        own_transaction = not conn.in_transaction
+        if own_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        try:
+            allocations: Optional[Allocation] = None
+            if conn.execute(sql, params).rowcount:
+                allocations, = self._apply_location_deltas(conn, [(product_id, -quantity)])
+                self._record_threshold_crossings(conn, [product_id])
+            if own_transaction:
+                conn.execute("COMMIT")
+            return allocations
+        except Exception:
+            if own_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def decrease_inventory_stock_idempotent(
+        self,
+        product_id: int,
+        quantity: int,
+        idempotency_key: str,
+        request_hash: str,
+        response_status: int,
+        response_body: Dict[str, Any],
+        ttl_seconds: int
+    ) -> int:
+        """
+        Disminuye el stock y registra la Idempotency-Key en la MISMA transacción.
+
+        Lanza:
+            - pymysql.err.IntegrityError (1062): Si la llave ya fue registrada (reintento).
+        """
+        allocation = self.allocate_stock_idempotent(
+            product_id, quantity, idempotency_key, request_hash, response_status, response_body, ttl_seconds
+        )
+        return 0 if allocation is None else 1
+
+    def allocate_stock_idempotent(
+        self,
+        product_id: int,
+        quantity: int,
+        idempotency_key: str,
+        request_hash: str,
+        response_status: int,
+        response_body: Dict[str, Any],
+        ttl_seconds: int
+    ) -> Optional[Allocation]:
+        """
+        `allocate_stock` con la Idempotency-Key registrada en la MISMA transacción; la respuesta
+        guardada incluye la asignación (ver `InventoryRepository`).
+
+        Lanza:
+            - pymysql.err.IntegrityError (1062): Si la llave ya fue registrada (reintento).
+        """
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM idempotency_keys WHERE idempotency_key = ? AND expires_at <= CURRENT_TIMESTAMP",
+                (idempotency_key,)
+            )
+            conn.execute(
+                """
+                INSERT INTO idempotency_keys (idempotency_key, request_hash, response_status, response_body, expires_at)
+                VALUES (?, ?, ?, ?, datetime('now', ?))
+                """,
+                (idempotency_key, request_hash, response_status, json.dumps(response_body), f"+{int(ttl_seconds)} seconds")
+            )
+            allocation = self.allocate_stock(product_id, quantity)
+            if allocation is None:
+                conn.execute("ROLLBACK")
+                return None
+            if self.allocation_strategy is not None:
+                conn.execute(
+                    "UPDATE idempotency_keys SET response_body = ? WHERE idempotency_key = ?",
+                    (json.dumps({**response_body, "allocations": allocation_to_json(allocation)}), idempotency_key)
+                )
+            conn.execute("COMMIT")
+            return allocation
+        except sqlite3.IntegrityError as e:
+            conn.execute("ROLLBACK")
+            raise _to_duplicate_entry(e)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_idempotency_record(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        row = self._get_connection().execute(
+            """
+            SELECT idempotency_key, request_hash, response_status, response_body
+            FROM idempotency_keys
+            WHERE idempotency_key = ? AND expires_at > CURRENT_TIMESTAMP
+            """,
+            (idempotency_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record["response_body"] = json.loads(record["response_body"])
+        return record
+
+    def apply_stock_adjustments(self, adjustments: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        """Aplica el lote de ajustes relativos en una sola transacción (ver `InventoryRepository`)."""
+        if not adjustments:
+            return []
+
+        product_ids = sorted({product_id for product_id, _ in adjustments})
+        placeholders = ', '.join(['?'] * len(product_ids))
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                f"SELECT product_id, available_stock FROM inventory WHERE product_id IN ({placeholders})",
+                tuple(product_ids)
+            ).fetchall()
+            running_stock = {row["product_id"]: row["available_stock"] for row in rows}
+            results, net_deltas = evaluate_adjustments(running_stock, adjustments)
+            self._apply_net_deltas(conn, net_deltas)
+            self._apply_location_deltas(conn, list(net_deltas.items()))
+            self._record_threshold_crossings(conn, list(net_deltas))
+            conn.execute("COMMIT")
+            return results
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _apply_net_deltas(conn: sqlite3.Connection, net_deltas: Dict[int, int]) -> None:
+        conn.executemany(
+            """
+            UPDATE inventory
+            SET available_stock = available_stock + ?, version = version + 1, last_inventory_update = CURRENT_TIMESTAMP
+            WHERE product_id = ?
+            """,
+            [(delta, product_id) for product_id, delta in net_deltas.items()]
+        )
+
+    def _apply_location_deltas(self, conn: sqlite3.Connection, changes: Sequence[Tuple[int, int]]) -> List[Allocation]:
+        """Reparte entre las ubicaciones los cambios ya aplicados al total (ver `InventoryRepository`)."""
+        if self.allocation_strategy is None or not changes:
+            return [[] for _ in changes]
+        product_ids = sorted({product_id for product_id, _ in changes})
+        placeholders = ', '.join(['?'] * len(product_ids))
+        rows = conn.execute(
+            f"""
+            SELECT id, product_id, location_code, available_stock, priority
+            FROM inventory_locations
+            WHERE product_id IN ({placeholders})
+            ORDER BY product_id, priority, location_code
+            """,
+            tuple(product_ids)
+        ).fetchall()
+        locations: Dict[int, List[Tuple[int, LocationStock]]] = {}
+        for row in rows:
+            locations.setdefault(row["product_id"], []).append(
+                (row["id"], LocationStock(row["location_code"], row["available_stock"], row["priority"]))
+            )
+        row_deltas, allocations = plan_location_changes(locations, changes, self.allocation_strategy)
+        conn.executemany(
+            """
+            UPDATE inventory_locations
+            SET available_stock = available_stock + ?, last_update = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            [(delta, row_id) for row_id, delta in row_deltas.items()]
+        )
+        return allocations
+
+    def _add_outcome_allocations(
+        self, conn: sqlite3.Connection, pending: List[sqlite3.Row], outcomes: List[Dict[str, Any]]
+    ) -> None:
+        """Reparte las compras APPLIED del lote y agrega su asignación (ver `InventoryRepository`)."""
+        if self.allocation_strategy is None:
+            return
+        applied = [index for index, outcome in enumerate(outcomes) if outcome["status"] == 'APPLIED']
+        allocations = self._apply_location_deltas(
+            conn, [(pending[index]["product_id"], -pending[index]["quantity"]) for index in applied]
+        )
+        for outcome in outcomes:
+            outcome["allocations"] = None
+        for index, allocation in zip(applied, allocations):
+            outcomes[index]["allocations"] = allocation_to_json(allocation)
+
+    def get_locations(self, product_id: int) -> List[Dict[str, Any]]:
+        rows = self._get_connection().execute(
+            """
+            SELECT location_code, available_stock, priority
+            FROM inventory_locations
+            WHERE product_id = ?
+            ORDER BY priority, location_code
+            """,
+            (product_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_location_stock(
+        self, product_id: int, location_code: str, available_stock: int, priority: Optional[int] = None
+    ) -> int:
+        """Fija el stock de una ubicación y recalcula el total del producto (ver `InventoryRepository`)."""
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            inventory = conn.execute(
+                "SELECT available_stock, location FROM inventory WHERE product_id = ?", (product_id,)
+            ).fetchone()
+            if inventory is None:
+                conn.execute("ROLLBACK")
+                return 0
+            has_locations = conn.execute(
+                "SELECT 1 FROM inventory_locations WHERE product_id = ? LIMIT 1", (product_id,)
+            ).fetchone() is not None
+            if not has_locations and inventory["available_stock"] > 0:
+                # La primera ubicación no descarta el stock previo (ver `InventoryRepository`).
+                conn.execute(
+                    "INSERT INTO inventory_locations (product_id, location_code, available_stock) VALUES (?, ?, ?)",
+                    (product_id, seed_location_code(inventory["location"]), inventory["available_stock"])
+                )
+            conn.execute(
+                """
+                INSERT INTO inventory_locations (product_id, location_code, available_stock, priority)
+                VALUES (?, ?, ?, COALESCE(?, 100))
+                ON CONFLICT (product_id, location_code) DO UPDATE
+                SET available_stock = excluded.available_stock, priority = COALESCE(?, priority),
+                    last_update = CURRENT_TIMESTAMP
+                """,
+                (product_id, location_code, available_stock, priority, priority)
+            )
+            conn.execute(
+                """
+                UPDATE inventory
+                SET available_stock = (SELECT SUM(available_stock) FROM inventory_locations WHERE product_id = ?),
+                    version = version + 1, last_inventory_update = CURRENT_TIMESTAMP
+                WHERE product_id = ?
+                """,
+                (product_id, product_id)
+            )
+            self._record_threshold_crossings(conn, [product_id])
+            conn.execute("COMMIT")
+            return 1
+        except sqlite3.IntegrityError as e:
+            conn.execute("ROLLBACK")
+            raise _to_duplicate_entry(e)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def enqueue_purchase(self, tracking_id: str, product_id: int, quantity: int, partition_key: int) -> None:
+        self._write(
+            "INSERT INTO purchase_outbox (tracking_id, product_id, quantity, partition_key) VALUES (?, ?, ?, ?)",
+            (tracking_id, product_id, quantity, partition_key)
+        )
+
+    def get_purchase_request(self, tracking_id: str) -> Optional[Dict[str, Any]]:
+        row = self._get_connection().execute(
+            """
+            SELECT tracking_id, product_id, quantity, status, available_stock, allocations, created_at, processed_at
+            FROM purchase_outbox
+            WHERE tracking_id = ?
+            """,
+            (tracking_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        if record["allocations"] is not None:
+            record["allocations"] = json.loads(record["allocations"])
+        return record
+
+    def process_purchase_batch(self, partition_key: int, limit: int) -> List[Dict[str, Any]]:
+        """Procesa las compras PENDING de la partición en una transacción (ver `InventoryRepository`)."""
+        try:
+            return self._drain_purchases(partition_key, limit)
+        except ValueError:
+            results: List[Dict[str, Any]] = []
+            for _ in range(limit):
+                processed = self._drain_purchases(partition_key, 1)
+                if not processed:
+                    break
+                results.extend(processed)
+            return results
+
+    def _drain_purchases(self, partition_key: int, limit: int) -> List[Dict[str, Any]]:
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        pending: List[sqlite3.Row] = []
+        try:
+            pending = conn.execute(
+                """
+                SELECT id, tracking_id, product_id, quantity
+                FROM purchase_outbox
+                WHERE status = 'PENDING' AND partition_key = ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (partition_key, limit)
+            ).fetchall()
+            if not pending:
+                conn.execute("COMMIT")
+                return []
+
+            product_ids = sorted({row["product_id"] for row in pending})
+            placeholders = ', '.join(['?'] * len(product_ids))
+            rows = conn.execute(
+                f"SELECT product_id, available_stock FROM inventory WHERE product_id IN ({placeholders})",
+                tuple(product_ids)
+            ).fetchall()
+            running_stock = {row["product_id"]: row["available_stock"] for row in rows}
+            outcomes, net_deltas = evaluate_adjustments(
+                running_stock, [(row["product_id"], -row["quantity"]) for row in pending]
+            )
+            self._apply_net_deltas(conn, net_deltas)
+            self._add_outcome_allocations(conn, pending, outcomes)
+            self._record_threshold_crossings(conn, list(net_deltas))
+            conn.executemany(
+                """
+                UPDATE purchase_outbox
+                SET status = ?, available_stock = ?, allocations = ?, processed_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+                """,
+                [
+                    (
+                        outcome["status"], outcome["available_stock"],
+                        None if outcome.get("allocations") is None else json.dumps(outcome["allocations"]), row["id"]
+                    )
+                    for row, outcome in zip(pending, outcomes)
+                ]
+            )
+            conn.execute("COMMIT")
+            return [
+                {"tracking_id": row["tracking_id"], "product_id": row["product_id"], "quantity": row["quantity"], **outcome}
+                for row, outcome in zip(pending, outcomes)
+            ]
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            if isinstance(e, ValueError) and len(pending) == 1:
+                return self._fail_purchase(pending[0])
+            raise
+
+    def _fail_purchase(self, row: sqlite3.Row) -> List[Dict[str, Any]]:
+        """Marca FAILED una compra que no se puede aplicar, si sigue PENDING, sin tocar el stock."""
+        failed = self._write(
+            """
+            UPDATE purchase_outbox
+            SET status = 'FAILED', processed_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'PENDING'
+            """,
+            (row["id"],)
+        ).rowcount
+        if not failed:
+            return []
+        return [{
+            "tracking_id": row["tracking_id"], "product_id": row["product_id"], "quantity": row["quantity"],
+            "status": "FAILED", "available_stock": None, "allocations": None
+        }]
+
+    def set_reorder_threshold(self, product_id: int, reorder_threshold: Optional[int]) -> int:
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            affected_rows = conn.execute(
+                "UPDATE inventory SET reorder_threshold = ? WHERE product_id = ?", (reorder_threshold, product_id)
+            ).rowcount
+            self._record_threshold_crossings(conn, [product_id] if affected_rows else [])
+            conn.execute("COMMIT")
+            return affected_rows
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_stock_alerts(self, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Alertas con id mayor que `after_id`, en orden de id. Con un único escritor a la vez
+        (`BEGIN IMMEDIATE`) los ids se confirman en orden: no hace falta el margen de MySQL.
+        """
+        rows = self._get_connection().execute(
+            """
+            SELECT id, product_id, kind, available_stock, threshold, created_at
+            FROM stock_alerts
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+            """,
+            (after_id, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_inventory_watermark(self) -> Tuple[int, int, int]:
+        """(filas, SUM(version), MAX(id)): cambia con toda escritura (ver `InventoryRepository`)."""
+        cursor = self._get_connection().cursor()
+        cursor.row_factory = None
+        row = cursor.execute(
+            "SELECT COUNT(*), COALESCE(SUM(version), 0), COALESCE(MAX(id), 0) FROM inventory"
+        ).fetchone()
+        return row[0], row[1], row[2]
+
+    def get_latest_inventory_update(self) -> Optional[datetime.datetime]:
+        row = self._get_connection().execute("SELECT MAX(last_inventory_update) AS latest FROM inventory").fetchone()
+        if row is None or row["latest"] is None:
+            return None
+        return datetime.datetime.strptime(row["latest"], TIMESTAMP_FORMAT)
+
+    def get_inventory_changes_since(
+        self, since: Any, after_product_id: int = 0, limit: int = 5000
+    ) -> List[Dict[str, Any]]:
+        if isinstance(since, datetime.datetime):
+            since = since.strftime(TIMESTAMP_FORMAT)
+        rows = self._get_connection().execute(
+            """
+            SELECT product_id, available_stock, version, last_inventory_update
+            FROM inventory
+            WHERE last_inventory_update > ?
+               OR (last_inventory_update = ? AND product_id > ?)
+            ORDER BY last_inventory_update, product_id
+            LIMIT ?
+            """,
+            (since, since, after_product_id, limit)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
@@ -0,0 +1,164 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class LocationStock(NamedTuple):
+    """Stock de un producto en una ubicación (fila de `inventory_locations`)."""
+    location_code: str
+    available_stock: int
+    priority: int  # Rango de asignación: menor = más cercana al punto de despacho
+
+
+DEFAULT_LOCATION_CODE = 'DEFAULT'  # Ubicación que recibe el stock previo a la primera ubicación
+LOCATION_CODE_MAX_LENGTH = 50  # Largo de `inventory_locations.location_code`
+
+Allocation = List[Tuple[str, int]]  # [(location_code, cantidad)]
+AllocationStrategy = Callable[[Sequence[LocationStock], int], Optional[Allocation]]
+
+
+class LocatedStockError(Exception):
+    """
+    El stock del producto se administra por ubicación: un total absoluto no dice a qué
+    ubicaciones corresponde. Los repositorios la lanzan dentro de la transacción que
+    bloquea la fila de inventario, así que la comprobación no compite con `set_location_stock`.
+    """
+
+    def __init__(self, product_id: int) -> None:
+        super().__init__(f"El stock del producto con ID {product_id} se administra por ubicación.")
+        self.product_id = product_id
+
+
+def _fill(ordered: Sequence[LocationStock], quantity: int) -> Optional[Allocation]:
+    """Toma el stock de las ubicaciones en el orden dado hasta cubrir `quantity`."""
+    allocation: Allocation = []
+    remaining = quantity
+    for location in ordered:
+        if remaining == 0:
+            break
+        taken = min(location.available_stock, remaining)
+        if taken > 0:
+            allocation.append((location.location_code, taken))
+            remaining -= taken
+    return allocation if remaining == 0 else None
+
+
+def allocate_nearest(locations: Sequence[LocationStock], quantity: int) -> Optional[Allocation]:
+    """
+    La ubicación más cercana (menor `priority`) que cubre toda la cantidad, para despachar
+    desde un solo lugar. Si ninguna alcanza, reparte desde la más cercana hacia las lejanas.
+    """
+    ordered = sorted(locations, key=lambda location: (location.priority, location.location_code))
+    for location in ordered:
+        if location.available_stock >= quantity:
+            return [(location.location_code, quantity)]
+    return _fill(ordered, quantity)
+
+
+def allocate_largest(locations: Sequence[LocationStock], quantity: int) -> Optional[Allocation]:
+    """La ubicación con más stock (y, si no alcanza, las siguientes de mayor a menor stock)."""
+    ordered = sorted(
+        locations, key=lambda location: (-location.available_stock, location.priority, location.location_code)
+    )
+    return _fill(ordered, quantity)
+
+
+def allocate_split(locations: Sequence[LocationStock], quantity: int) -> Optional[Allocation]:
+    """
+    Reparte la cantidad en proporción al stock de cada ubicación, para que se vacíen al mismo
+    ritmo. Las unidades que sobran del redondeo van a las ubicaciones más cercanas con saldo.
+    """
+    total = sum(location.available_stock for location in locations)
+    if quantity > total:
+        return None
+    ordered = sorted(locations, key=lambda location: (location.priority, location.location_code))
+    shares = [quantity * location.available_stock // total if total else 0 for location in ordered]
+    remaining = quantity - sum(shares)
+    for index, location in enumerate(ordered):
+        if remaining == 0:
+            break
+        extra = min(location.available_stock - shares[index], remaining)
+        shares[index] += extra
+        remaining -= extra
+    return [(location.location_code, share) for location, share in zip(ordered, shares) if share > 0]
+
+
+ALLOCATION_STRATEGIES: Dict[str, AllocationStrategy] = {
+    'nearest': allocate_nearest,
+    'largest': allocate_largest,
+    'split': allocate_split,
+}
+
+
+def seed_location_code(location: Optional[str]) -> str:
+    """
+    Código de la ubicación que conserva el stock de un producto al registrar su primera
+    ubicación: su `location` de inventario o, si no tiene, DEFAULT_LOCATION_CODE.
+    """
+    return (location or DEFAULT_LOCATION_CODE)[:LOCATION_CODE_MAX_LENGTH]
+
+
+def get_allocation_strategy(name: str) -> AllocationStrategy:
+    """
+    Retorna la estrategia de asignación registrada con `name`.
+
+    Lanza:
+        - ValueError: Si la estrategia no es una de ALLOCATION_STRATEGIES.
+    """
+    try:
+        return ALLOCATION_STRATEGIES[name]
+    except KeyError:
+        raise ValueError(
+            f"ALLOCATION_STRATEGY inválida: '{name}'. Valores permitidos: {', '.join(ALLOCATION_STRATEGIES)}."
+        ) from None
+
+
+def plan_location_changes(
+    locations: Dict[int, List[Tuple[int, LocationStock]]],
+    changes: Sequence[Tuple[int, int]],
+    allocate: AllocationStrategy
+) -> Tuple[Dict[int, int], List[Allocation]]:
+    """
+    Traduce cambios (product_id, delta), ya aplicados al total de `inventory`, a deltas por
+    fila de ubicación (`locations`: product_id -> [(id de la fila, LocationStock)]). Los
+    cambios se planifican en orden sobre el stock acumulado de cada ubicación.
+    - Un descuento se reparte con la estrategia `allocate`.
+    - Un ingreso va a la ubicación más cercana.
+    - Los productos sin ubicaciones solo tienen el total y se omiten.
+    Retorna {id de fila: delta} y, por cambio y en el mismo orden, la asignación elegida
+    (vacía para ingresos y productos sin ubicaciones).
+
+    Lanza:
+        - ValueError: Si las ubicaciones no cubren un descuento que el total sí permitió
+          (el total y la suma de las ubicaciones no coinciden); la transacción debe revertirse.
+    """
+    row_deltas: Dict[int, int] = {}
+    allocations: List[Allocation] = []
+    for product_id, delta in changes:
+        rows = locations.get(product_id)
+        if not rows or delta == 0:
+            allocations.append([])
+            continue
+        row_ids = {location.location_code: row_id for row_id, location in rows}
+        current = [
+            location._replace(available_stock=location.available_stock + row_deltas.get(row_id, 0))
+            for row_id, location in rows
+        ]
+        if delta < 0:
+            allocation = allocate(current, -delta)
+            if allocation is None:
+                raise ValueError(f"El stock por ubicación del producto {product_id} no cubre el descuento de {-delta}.")
+            for location_code, quantity in allocation:
+                row_id = row_ids[location_code]
+                row_deltas[row_id] = row_deltas.get(row_id, 0) - quantity
+            allocations.append(allocation)
+        else:
+            row_id, _ = min(rows, key=lambda row: (row[1].priority, row[1].location_code))
+            row_deltas[row_id] = row_deltas.get(row_id, 0) + delta
+            allocations.append([])
+    return row_deltas, allocations
+
+
+def allocation_to_json(allocation: Optional[Allocation]) -> Optional[List[Dict[str, Any]]]:
+    """Formato de respuesta de una asignación: [{"location_code", "quantity"}] (None se conserva)."""
+    if allocation is None:
+        return None
+    return [{"location_code": location_code, "quantity": quantity} for location_code, quantity in allocation]
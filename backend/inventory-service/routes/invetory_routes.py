@@ -1,15 +1,24 @@
+from typing import Any, Dict, Optional, Tuple
 from flask import Blueprint, jsonify, request, Response
 
-from db.db_connection import DBConnection
-from models.inventory_table import InventoryRepository
+from models.repository_factory import create_inventory_repository
 from logic.inventory_logic import InventoryService
+from logic.stock_change_hub import StockChangeHub, iter_stock_events
 from exceptions.api_exceptions import InvalidInputError
-from models.product_schema import ProductListResponseSchema
+from models.product_schema import PRODUCT_FIELDS, INVENTORY_FIELDS, product_list_schema, stream_product_list
+from config.settings import (
+    MAX_PAGE_LIMIT, STREAM_RESPONSE_MIN_LIMIT,
+    STOCK_STREAM_POLL_INTERVAL_SECONDS, STOCK_STREAM_HEARTBEAT_SECONDS, STOCK_STREAM_LATE_COMMIT_SECONDS,
+    STOCK_STREAM_MAX_SUBSCRIBERS, STOCK_STREAM_MAX_PRODUCT_IDS
+)
 
 # ----------------- INYECCIÓN DE DEPENDENCIAS -----------------
-db_connection = DBConnection()
-inventory_repository = InventoryRepository(db_connection)
-inventory_service = InventoryService(inventory_repository)
+inventory_repository = create_inventory_repository()
+stock_change_hub = StockChangeHub(
+    inventory_repository, STOCK_STREAM_POLL_INTERVAL_SECONDS, STOCK_STREAM_MAX_SUBSCRIBERS,
+    late_commit_seconds=STOCK_STREAM_LATE_COMMIT_SECONDS
+)
+inventory_service = InventoryService(inventory_repository, stock_change_hub=stock_change_hub)
 
 # ----------------- CREACIÓN DEL BLUEPRINT -----------------
 inventory_bp = Blueprint(
@@ -86,13 +95,17 @@ def get_inventory_route(product_id: int):
           $ref: '#/definitions/Error'
     """
     inventory = inventory_service.get_inventory_for_product(product_id)
-    return jsonify({
+    response = jsonify({
         "data": {
             "type": "inventory",
             "id": str(inventory.get("id")),
             "attributes": inventory
         }
-    }), 200
+    })
+    # La versión de la fila se expone como ETag para usarla en If-Match (concurrencia optimista).
+    if inventory.get("version") is not None:
+        response.set_etag(str(inventory["version"]))
+    return response, 200
 
 
 @inventory_bp.route('/<int:product_id>/stock', methods=['PUT'])
@@ -108,6 +121,11 @@ def update_stock_route(product_id: int):
         type: integer
         required: true
         description: The ID of the product to update stock for.
+      - in: header
+        name: If-Match
+        type: string
+        required: false
+        description: ETag (version) returned by GET. The update only applies if the inventory was not modified since.
       - in: body
         name: body
         required: true
@@ -117,6 +135,9 @@ def update_stock_route(product_id: int):
             new_stock:
               type: integer
               description: The new stock quantity.
+            expected_version:
+              type: integer
+              description: Alternative to If-Match. The update only applies if the current version matches.
     responses:
       200:
         description: Stock updated successfully.
@@ -130,16 +151,256 @@ def update_stock_route(product_id: int):
         description: Inventory not found.
         schema:
           $ref: '#/definitions/Error'
+      409:
+        description: The inventory was modified concurrently. The current state is returned in meta.current_state.
+        schema:
+          $ref: '#/definitions/Error'
     """
     data = request.get_json()
     if not data or 'new_stock' not in data:
         raise InvalidInputError("El cuerpo de la solicitud debe contener 'new_stock'.")
 
     new_stock = data.get('new_stock')
+    expected_version = _get_expected_version(data)
     
-    updated_inventory = inventory_service.update_stock_for_product(product_id, new_stock)
+    updated_inventory = inventory_service.update_stock_for_product(product_id, new_stock, expected_version)
     
-    return jsonify({"data": updated_inventory}), 200
+    response = jsonify({"data": updated_inventory})
+    if updated_inventory.get("version") is not None:
+        response.set_etag(str(updated_inventory["version"]))
+    return response, 200
+
+
+def _get_expected_version(data: Dict[str, Any]) -> Optional[int]:
+    """
+    Obtiene la versión esperada desde el header If-Match o el campo `expected_version`.
+    Retorna None si el cliente no solicitó una escritura condicional.
+    """
+    header_version: Optional[int] = None
+    if request.if_match and not request.if_match.star_tag:
+        etags = request.if_match.as_set(include_weak=True)
+        if len(etags) != 1:
+            raise InvalidInputError("El header 'If-Match' debe contener un único ETag.")
+        try:
+            header_version = int(etags.pop())
+        except ValueError:
+            raise InvalidInputError("El header 'If-Match' debe contener la versión numérica del inventario.")
+
+    body_version = data.get('expected_version')
+    if body_version is not None and (not isinstance(body_version, int) or isinstance(body_version, bool)):
+        raise InvalidInputError("El campo 'expected_version' debe ser un número entero.")
+
+    if header_version is not None and body_version is not None and header_version != body_version:
+        raise InvalidInputError("'If-Match' y 'expected_version' indican versiones diferentes.")
+
+    return header_version if header_version is not None else body_version
+
+
+@inventory_bp.route('/<int:product_id>/threshold', methods=['PUT'])
+def set_reorder_threshold_route(product_id: int):
+    """
+    Set the low-stock threshold of a product.
+    ---
+    tags:
+      - Inventory
+    parameters:
+      - in: path
+        name: product_id
+        type: integer
+        required: true
+        description: The ID of the product.
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            reorder_threshold:
+              type: integer
+              description: Low-stock threshold. null restores LOW_STOCK_DEFAULT_THRESHOLD.
+    responses:
+      200:
+        description: Threshold updated successfully.
+      400:
+        description: Invalid input.
+        schema:
+          $ref: '#/definitions/Error'
+      404:
+        description: Inventory not found.
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'reorder_threshold' not in data:
+        raise InvalidInputError("El cuerpo de la solicitud debe contener 'reorder_threshold'.")
+
+    result = inventory_service.set_reorder_threshold(product_id, data.get('reorder_threshold'))
+    return jsonify({"data": result}), 200
+
+
+@inventory_bp.route('/<int:product_id>/locations', methods=['GET'])
+def get_locations_route(product_id: int):
+    """
+    Get the stock of a product per location, along with its total.
+    ---
+    tags:
+      - Inventory
+    parameters:
+      - in: path
+        name: product_id
+        type: integer
+        required: true
+        description: The ID of the product.
+    responses:
+      200:
+        description: Total stock and per-location stock, nearest location first.
+      404:
+        description: Inventory not found.
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    return jsonify({"data": inventory_service.get_locations_for_product(product_id)}), 200
+
+
+@inventory_bp.route('/<int:product_id>/locations/<string:location_code>', methods=['PUT'])
+def set_location_stock_route(product_id: int, location_code: str):
+    """
+    Set the stock of a product at a location; the product total is recomputed in the same write.
+    ---
+    tags:
+      - Inventory
+    parameters:
+      - in: path
+        name: product_id
+        type: integer
+        required: true
+        description: The ID of the product.
+      - in: path
+        name: location_code
+        type: string
+        required: true
+        description: Warehouse code (created if it does not exist).
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - available_stock
+          properties:
+            available_stock:
+              type: integer
+              description: Stock at this location.
+            priority:
+              type: integer
+              description: Allocation rank, lower is nearer. Omitted keeps the current one (100 for a new location).
+    responses:
+      200:
+        description: Location stock updated; returns the new per-location view.
+      400:
+        description: Invalid input or MULTI_WAREHOUSE_ENABLED is off.
+        schema:
+          $ref: '#/definitions/Error'
+      404:
+        description: Inventory not found.
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or 'available_stock' not in data:
+        raise InvalidInputError("El cuerpo de la solicitud debe contener 'available_stock'.")
+
+    result = inventory_service.set_location_stock(
+        product_id, location_code, data.get('available_stock'), data.get('priority')
+    )
+    return jsonify({"data": result}), 200
+
+
+@inventory_bp.route('/alerts', methods=['GET'])
+def get_stock_alerts_route():
+    """
+    Get low-stock threshold crossings, oldest first.
+    ---
+    tags:
+      - Inventory
+    parameters:
+      - in: query
+        name: after_id
+        type: integer
+        default: 0
+        description: Returns the alerts after this id (meta.next_after_id of the previous page).
+      - in: query
+        name: limit
+        type: integer
+        default: 100
+        description: The number of alerts per page (maximum MAX_PAGE_LIMIT).
+    responses:
+      200:
+        description: A page of LOW_STOCK / RESTOCKED alerts.
+      400:
+        description: Invalid after_id or limit.
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    try:
+        after_id = int(request.args.get('after_id', 0))
+        limit = int(request.args.get('limit', 100))
+    except (TypeError, ValueError):
+        raise InvalidInputError("Los parámetros 'after_id' y 'limit' deben ser números enteros.")
+    if after_id < 0 or not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise InvalidInputError(f"'after_id' debe ser >= 0 y 'limit' debe estar entre 1 y {MAX_PAGE_LIMIT}.")
+
+    return jsonify(inventory_service.get_stock_alerts(after_id, limit)), 200
+
+
+@inventory_bp.route('/adjustments', methods=['POST'])
+def apply_stock_adjustments_route():
+    """
+    Apply relative stock adjustments (restock / decrement deltas) in bulk.
+    ---
+    tags:
+      - Inventory
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - adjustments
+          properties:
+            adjustments:
+              type: array
+              items:
+                type: object
+                required:
+                  - product_id
+                  - delta
+                properties:
+                  product_id:
+                    type: integer
+                    description: The ID of the product to adjust.
+                  delta:
+                    type: integer
+                    description: Relative change. Positive to restock, negative to decrement.
+                  reason:
+                    type: string
+                    description: Free text reason (e.g. delivery number).
+    responses:
+      200:
+        description: Per-line results. Lines that would make the stock negative or reference unknown products are rejected individually.
+      400:
+        description: Invalid input.
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    data = request.get_json()
+    if not data or 'adjustments' not in data:
+        raise InvalidInputError("El cuerpo de la solicitud debe contener 'adjustments'.")
+
+    result = inventory_service.apply_stock_adjustments(data.get('adjustments'))
+
+    return jsonify({"data": result}), 200
 
 
 @inventory_bp.route('/<int:product_id>', methods=['DELETE'])
@@ -184,10 +445,30 @@ def get_products_with_stock_route():
         name: limit
         type: integer
         default: 10
-        description: The number of items per page.
+        description: The number of items per page (maximum MAX_PAGE_LIMIT, 1000 by default).
+      - in: query
+        name: stream
+        type: boolean
+        required: false
+        description: Stream the JSON:API data items incrementally. Enabled automatically for limit >= STREAM_RESPONSE_MIN_LIMIT.
+      - in: query
+        name: fields[productos]
+        type: string
+        required: false
+        description: Comma-separated product attributes to return (JSON:API sparse fieldset), e.g. name,price,available_stock.
+      - in: query
+        name: view
+        type: string
+        enum: [full, stock]
+        default: full
+        description: "stock returns only inventory data (product id and available_stock) without calling the product service."
     responses:
       200:
         description: A paginated list of products with stock information.
+      400:
+        description: Invalid page or limit.
+        schema:
+          $ref: '#/definitions/Error'
       503:
         description: The product service is unavailable.
         schema:
@@ -198,18 +479,114 @@ def get_products_with_stock_route():
         limit = int(request.args.get('limit', 10))
     except (TypeError, ValueError):
         raise InvalidInputError("Los parámetros 'page' y 'limit' deben ser números enteros.")
+    if page < 1 or not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise InvalidInputError(f"'page' debe ser >= 1 y 'limit' debe estar entre 1 y {MAX_PAGE_LIMIT}.")
 
-    # 1. Obtener los datos desde la capa de lógica (sigue siendo un diccionario de Python)
-    products_with_stock = inventory_service.get_products_with_stock(page, limit)
+    view = request.args.get('view', 'full')
+    if view not in PRODUCT_VIEWS:
+        raise InvalidInputError(f"'view' debe ser uno de: {', '.join(PRODUCT_VIEWS)}.")
+    product_fields = _get_product_fields(request.args.get('fields[productos]'))
 
-    # 2. Serializar los datos usando el esquema de Marshmallow
-    schema = ProductListResponseSchema()
+    # 1. Obtener los datos desde la capa de lógica (sigue siendo un diccionario de Python)
+    if view == 'stock':
+        # Solo inventario: no se consulta el servicio de productos.
+        if product_fields is not None and set(product_fields) - set(INVENTORY_FIELDS):
+            raise InvalidInputError("Con 'view=stock' solo se puede pedir el atributo 'available_stock'.")
+        product_fields = INVENTORY_FIELDS
+        products_with_stock = inventory_service.get_stock_page(page, limit)
+    else:
+        products_with_stock = inventory_service.get_products_with_stock(page, limit, product_fields)
+
+    # 2a. Páginas grandes: se emite cada item de `data` a medida que se serializa (la página
+    #     ya está completa en memoria; se evitan solo sus copias serializadas)
+    stream = request.args.get('stream', '').lower()
+    if stream == 'true' or (stream != 'false' and limit >= STREAM_RESPONSE_MIN_LIMIT):
+        return Response(stream_product_list(products_with_stock, product_fields), status=200, mimetype='application/json')
+
+    # 2b. Serializar los datos usando el esquema de Marshmallow (solo los atributos pedidos)
+    schema = product_list_schema(product_fields)
     result = schema.dump(products_with_stock)
 
         # 3. Retornar el resultado serializado
 
     return jsonify(result), 200
 
+
+PRODUCT_VIEWS = ('full', 'stock')
+
+
+def _get_product_fields(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Lee `fields[productos]` (sparse fieldsets de JSON:API). Retorna None si no viene, o los
+    atributos pedidos en el orden del esquema (así cada combinación reutiliza su esquema).
+    """
+    if value is None:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested - set(PRODUCT_FIELDS)
+    if unknown:
+        raise InvalidInputError(
+            f"Atributos desconocidos en 'fields[productos]': {', '.join(sorted(unknown))}. "
+            f"Permitidos: {', '.join(PRODUCT_FIELDS)}."
+        )
+    return tuple(name for name in PRODUCT_FIELDS if name in requested)
+
+
+@inventory_bp.route('/stream', methods=['GET'])
+def stream_stock_changes_route():
+    """
+    Stream stock changes for a set of products (Server-Sent Events).
+    ---
+    tags:
+      - Inventory
+    produces:
+      - text/event-stream
+    parameters:
+      - in: query
+        name: product_ids
+        type: string
+        required: true
+        description: Comma-separated product IDs to watch (maximum STOCK_STREAM_MAX_PRODUCT_IDS, 500 by default).
+    responses:
+      200:
+        description: Event stream. A `snapshot` event with the current stock is sent first, then one `stock` event per change ({product_id, available_stock, version}) and periodic heartbeat comments.
+      400:
+        description: Missing or invalid product_ids.
+        schema:
+          $ref: '#/definitions/Error'
+      503:
+        description: Too many concurrent stream subscribers.
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    raw_ids = [value.strip() for value in request.args.get('product_ids', '').split(',') if value.strip()]
+    try:
+        product_ids = sorted({int(value) for value in raw_ids})
+    except ValueError:
+        raise InvalidInputError("'product_ids' debe ser una lista de enteros separados por comas.")
+    if not product_ids or len(product_ids) > STOCK_STREAM_MAX_PRODUCT_IDS:
+        raise InvalidInputError(f"'product_ids' debe contener entre 1 y {STOCK_STREAM_MAX_PRODUCT_IDS} IDs.")
+
+    # Se suscribe antes del snapshot para no perder cambios ocurridos entre ambos pasos.
+    subscription = stock_change_hub.subscribe(product_ids)
+    try:
+        snapshot = [
+            {"product_id": record.product_id, "available_stock": record.available_stock, "version": record.version}
+            for record in inventory_repository.get_inventory_records_by_product_ids(product_ids)
+        ]
+    except Exception:
+        stock_change_hub.unsubscribe(subscription)
+        raise
+
+    response = Response(
+        iter_stock_events(stock_change_hub, subscription, snapshot, STOCK_STREAM_HEARTBEAT_SECONDS),
+        status=200, mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    # Evita que Nginx (u otro proxy) acumule los eventos en su buffer.
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @inventory_bp.route('/purchase', methods=['POST'])
 def purchase_product_route():
 
@@ -225,6 +602,26 @@ def purchase_product_route():
 
         parameters:
 
+          - in: header
+
+            name: Prefer
+
+            type: string
+
+            required: false
+
+            description: Send respond-async to enqueue the purchase and receive 202 with a tracking ID.
+
+          - in: header
+
+            name: Idempotency-Key
+
+            type: string
+
+            required: false
+
+            description: Optional key to safely retry the purchase. Retries with the same key replay the first response.
+
           - in: body
 
             name: body
@@ -259,7 +656,11 @@ def purchase_product_route():
 
           200:
 
-            description: Purchase successful.
+            description: Purchase successful (or replayed, with header Idempotent-Replayed true). With MULTI_WAREHOUSE_ENABLED, `allocations` lists the locations the stock was taken from.
+
+          202:
+
+            description: Purchase accepted for asynchronous processing (header Prefer respond-async, ASYNC_PURCHASES_ENABLED). Poll the Location header for the outcome.
 
           400:
 
@@ -277,6 +678,14 @@ def purchase_product_route():
 
               $ref: '#/definitions/Error'
 
+          409:
+
+            description: Idempotency-Key reused with a different request body.
+
+            schema:
+
+              $ref: '#/definitions/Error'
+
         """
 
         data = request.get_json()
@@ -293,10 +702,74 @@ def purchase_product_route():
 
     
 
-        result = inventory_service.purchase_product(product_id, quantity)
+        idempotency_key = request.headers.get('Idempotency-Key')
+
+        if _prefers_async() and inventory_service.purchase_outbox_worker is not None:
 
-        
+            if idempotency_key is not None:
 
-        return jsonify({"data": result}), 200
+                raise InvalidInputError("El header 'Idempotency-Key' no se admite en compras asíncronas (Prefer: respond-async).")
+
+            accepted = inventory_service.enqueue_purchase(product_id, quantity)
+
+            response = jsonify({"data": accepted})
+
+            response.headers['Location'] = f"{inventory_bp.url_prefix}/purchases/{accepted['tracking_id']}"
+
+            response.headers['Preference-Applied'] = 'respond-async'
+
+            return response, 202
+
+    
 
-    
\ No newline at end of file
+        if idempotency_key is None:
+
+            result = inventory_service.purchase_product(product_id, quantity)
+
+            return jsonify({"data": result}), 200
+
+    
+
+        result, replayed = inventory_service.purchase_product_idempotent(product_id, quantity, idempotency_key)
+
+        response = jsonify({"data": result})
+
+        response.headers['Idempotent-Replayed'] = 'true' if replayed else 'false'
+
+        return response, 200
+
+    
+
+
+def _prefers_async() -> bool:
+    """True si el cliente pidió procesamiento asíncrono con `Prefer: respond-async` (RFC 7240)."""
+    preferences = request.headers.get('Prefer', '')
+    return any(token.strip().lower() == 'respond-async' for token in preferences.split(','))
+
+
+@inventory_bp.route('/purchases/<string:tracking_id>', methods=['GET'])
+def get_purchase_status_route(tracking_id: str):
+    """
+    Get the outcome of an asynchronous purchase.
+    ---
+    tags:
+      - Inventory
+    parameters:
+      - in: path
+        name: tracking_id
+        type: string
+        required: true
+        description: Tracking ID returned by POST /purchase with Prefer respond-async.
+    responses:
+      200:
+        description: Purchase status (PENDING, APPLIED, INSUFFICIENT_STOCK, NOT_FOUND or FAILED). PENDING responses include Retry-After.
+      404:
+        description: Unknown tracking ID.
+        schema:
+          $ref: '#/definitions/Error'
+    """
+    purchase = inventory_service.get_purchase_status(tracking_id)
+    response = jsonify({"data": purchase})
+    if purchase.get("status") == "PENDING":
+        response.headers['Retry-After'] = '1'
+    return response, 200
@@ -0,0 +1,23 @@
+from flask import Blueprint, Response
+
+from metrics.registry import metrics_registry
+
+# ----------------- CREACIÓN DEL BLUEPRINT -----------------
+metrics_bp = Blueprint('metrics_api', __name__)
+
+# ----------------- DEFINICIÓN DE RUTAS -----------------
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics_route():
+    """
+    Process metrics in Prometheus text format.
+    ---
+    tags:
+      - Monitoring
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Metrics of the current worker process (DB pool acquire time, query latency, slow queries).
+    """
+    return Response(metrics_registry.render(), status=200, mimetype='text/plain; version=0.0.4')
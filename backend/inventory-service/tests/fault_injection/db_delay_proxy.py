@@ -0,0 +1,131 @@
+"""
+Inyección de demoras en el acceso a la base de datos.
+
+- `DelayProxy`: proxy TCP entre el servicio y MySQL. Demora cada paquete que el cliente envía
+  (en la práctica, cada sentencia) según una `LatencyDistribution`. Se usa apuntando
+  MYSQL_HOST/MYSQL_PORT al proxy; no requiere cambios en el servicio.
+- `DelayingRepository`: envuelve cualquier repositorio de inventario (memory, sqlite) y demora
+  cada llamada, para ensayar escenarios sin MySQL.
+
+Uso independiente del proxy (desde inventory-service/):
+    python -m tests.fault_injection.db_delay_proxy --listen-port 3307 --upstream localhost:3306 --latency fixed:5@0.02=2000
+"""
+import argparse
+import socket
+import threading
+import time
+from typing import Any, Optional
+
+from tests.fault_injection.faults import LatencyDistribution
+
+BUFFER_SIZE = 65536
+
+
+class DelayProxy:
+    """Proxy TCP con un hilo por sentido de cada conexión (suficiente para un pool de pocas decenas)."""
+
+    def __init__(self, upstream_host: str, upstream_port: int, latency: LatencyDistribution,
+                 host: str = "127.0.0.1", port: int = 0) -> None:
+        self.upstream = (upstream_host, upstream_port)
+        self.latency = latency
+        self._listener = socket.create_server((host, port))
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> tuple:
+        return self._listener.getsockname()[:2]
+
+    def start(self) -> "DelayProxy":
+        self._thread = threading.Thread(target=self._accept_loop, name="db-delay-proxy", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._closed.set()
+        self._listener.close()
+
+    def __enter__(self) -> "DelayProxy":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def _accept_loop(self) -> None:
+        while not self._closed.is_set():
+            try:
+                client, _ = self._listener.accept()
+            except OSError:
+                return  # Listener cerrado
+            try:
+                upstream = socket.create_connection(self.upstream)
+            except OSError as e:
+                print(f"DB PROXY WARNING: No se pudo conectar a {self.upstream}. {e}")
+                client.close()
+                continue
+            # Solo se demora lo que envía el cliente: la sentencia llega tarde al servidor.
+            self._pump(client, upstream, delay=True)
+            self._pump(upstream, client, delay=False)
+
+    def _pump(self, source: socket.socket, target: socket.socket, delay: bool) -> None:
+        def run() -> None:
+            try:
+                while True:
+                    data = source.recv(BUFFER_SIZE)
+                    if not data:
+                        break
+                    if delay:
+                        time.sleep(self.latency.sample_ms() / 1000)
+                    target.sendall(data)
+            except OSError:
+                pass
+            finally:
+                for sock in (source, target):
+                    try:
+                        sock.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+                    sock.close()
+
+        threading.Thread(target=run, name="db-delay-pump", daemon=True).start()
+
+
+class DelayingRepository:
+    """Delega en el repositorio envuelto, demorando cada método público según la distribución."""
+
+    def __init__(self, repository: Any, latency: LatencyDistribution) -> None:
+        self._repository = repository
+        self.latency = latency
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._repository, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        def delayed(*args: Any, **kwargs: Any) -> Any:
+            time.sleep(self.latency.sample_ms() / 1000)
+            return attribute(*args, **kwargs)
+
+        return delayed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listen-port", type=int, default=3307)
+    parser.add_argument("--upstream", default="localhost:3306", help="host:puerto de MySQL")
+    parser.add_argument("--latency", default="fixed:50", help="Distribución de latencia (ver LatencyDistribution)")
+    args = parser.parse_args()
+
+    host, _, port = args.upstream.partition(":")
+    proxy = DelayProxy(host, int(port or 3306), LatencyDistribution(args.latency), host="0.0.0.0", port=args.listen_port)
+    proxy.start()
+    print(f"Proxy de demoras en {proxy.address} -> {args.upstream} (Ctrl+C para terminar)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        proxy.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Distribuciones de latencia y perfiles de fallas compartidos por el stub y el proxy de base de datos."""
+import math
+import random
+import threading
+from typing import Optional
+
+
+class LatencyDistribution:
+    """
+    Latencia aleatoria en milisegundos, descrita con una especificación corta:
+        none                  sin latencia
+        fixed:50              siempre 50 ms
+        uniform:10-200        uniforme entre 10 y 200 ms
+        lognormal:80,0.8      log-normal con mediana 80 ms y sigma 0.8 (cola larga)
+    Se puede agregar una probabilidad de "stall" con `@p=stall_ms`, p. ej. `fixed:5@0.01=3000`.
+    """
+
+    def __init__(self, spec: str = "none", rng: Optional[random.Random] = None) -> None:
+        self.spec = spec
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        base, _, stall = spec.partition("@")
+        kind, _, args = base.partition(":")
+        self.kind = kind.strip().lower() or "none"
+        self.stall_probability, self.stall_ms = 0.0, 0.0
+        if stall:
+            probability, _, stall_ms = stall.partition("=")
+            self.stall_probability, self.stall_ms = float(probability), float(stall_ms)
+
+        if self.kind == "none":
+            self.params: tuple = ()
+        elif self.kind == "fixed":
+            self.params = (float(args),)
+        elif self.kind == "uniform":
+            low, _, high = args.partition("-")
+            self.params = (float(low), float(high))
+        elif self.kind == "lognormal":
+            median, _, sigma = args.partition(",")
+            self.params = (math.log(float(median)), float(sigma or 0.5))
+        else:
+            raise ValueError(f"Distribución de latencia desconocida: '{spec}'")
+
+    def sample_ms(self) -> float:
+        with self._lock:
+            if self.stall_probability and self._rng.random() < self.stall_probability:
+                return self.stall_ms
+            if self.kind == "fixed":
+                return self.params[0]
+            if self.kind == "uniform":
+                return self._rng.uniform(*self.params)
+            if self.kind == "lognormal":
+                return self._rng.lognormvariate(*self.params)
+            return 0.0
+
+    def __repr__(self) -> str:
+        return f"LatencyDistribution({self.spec!r})"
+
+
+class FaultProfile:
+    """
+    Fallas del stub del Products Service. Cada respuesta sortea, en este orden:
+      - error_rate: responde 500 con un cuerpo de error.
+      - malformed_rate: responde 200 con un JSON truncado.
+      - partial_rate: por producto, elimina `attributes` o `id` del elemento.
+    La latencia se aplica antes de responder, incluso a los errores.
+    """
+
+    def __init__(
+        self,
+        latency: str = "none",
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        partial_rate: float = 0.0,
+        seed: Optional[int] = None
+    ) -> None:
+        rng = random.Random(seed)
+        self.latency = LatencyDistribution(latency, random.Random(rng.random()))
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.partial_rate = partial_rate
+        self._rng = rng
+        self._lock = threading.Lock()
+
+    def roll(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < probability
+
+    def choice(self, options: list):
+        with self._lock:
+            return self._rng.choice(options)
@@ -0,0 +1,154 @@
+"""
+Escenarios de fallas y latencia para las rutas de enriquecimiento y de compra.
+
+Levanta el stub del Products Service, crea la app en el mismo proceso y, por cada escenario,
+genera carga concurrente contra:
+  - GET  /api/v1/inventory/products-with-stock  (enriquecimiento: Products Service + MySQL)
+  - POST /api/v1/inventory/purchase            (compra: solo MySQL)
+Reporta percentiles de latencia y la mezcla de códigos de estado de cada ruta.
+
+Con `--storage memory` (por defecto) no requiere MySQL: las demoras de base de datos se
+inyectan envolviendo el repositorio. Con `--storage mysql` el pool se conecta a través de
+`DelayProxy` (MYSQL_HOST/MYSQL_PORT del .env como destino) y la base debe existir.
+
+Uso (desde inventory-service/):
+    python -m tests.fault_injection.scenarios
+    python -m tests.fault_injection.scenarios --scenarios products_slow,db_stall --requests 500 --concurrency 32
+"""
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.bench_utils import print_table, summarize_latencies
+from tests.fault_injection.db_delay_proxy import DelayProxy, DelayingRepository
+from tests.fault_injection.faults import FaultProfile, LatencyDistribution
+from tests.fault_injection.stub_products_service import StubProductsService
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Cada escenario define el perfil del Products Service, la latencia de la base de datos
+# y, opcionalmente, el X-Request-Timeout que envía el cliente.
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "baseline": {},
+    "products_slow": {"products": {"latency": "lognormal:250,0.7"}},
+    "products_flaky": {"products": {"latency": "fixed:10", "error_rate": 0.2}},
+    "products_malformed": {"products": {"malformed_rate": 0.1, "partial_rate": 0.1}},
+    "products_stall_deadline": {"products": {"latency": "fixed:10@0.1=3000"}, "request_timeout": 1.0},
+    "db_slow": {"db_latency": "lognormal:20,0.6"},
+    "db_stall": {"db_latency": "fixed:1@0.05=1500", "request_timeout": 1.0},
+}
+
+ENRICHMENT = "enrichment"
+PURCHASE = "purchase"
+
+
+def configure_environment(stub: StubProductsService, args: argparse.Namespace) -> Any:
+    """Apunta el servicio al stub (y al proxy, con MySQL) ANTES de importar la app."""
+    os.environ["PRODUCTS_SERVICE_URL_INTERNAL"] = stub.base_url
+    os.environ.setdefault("PRODUCTS_API_KEY", "fault-injection-key")
+    os.environ["STORAGE_BACKEND"] = args.storage
+    os.environ.setdefault("TRACING_SAMPLE_RATIO", "0")
+    if args.storage != "mysql":
+        return None
+    proxy = DelayProxy(
+        os.environ.get("MYSQL_HOST", "localhost"), int(os.environ.get("MYSQL_PORT", 3306)), LatencyDistribution()
+    ).start()
+    os.environ["MYSQL_HOST"], os.environ["MYSQL_PORT"] = proxy.address[0], str(proxy.address[1])
+    return proxy
+
+
+def seed_inventory(repository: Any, product_count: int, stock: int) -> None:
+    for product_id in range(1, product_count + 1):
+        try:
+            repository.create_inventory(product_id, stock, f"Bodega {product_id % 5}")
+        except Exception:
+            pass  # Ya existe (MySQL reutilizado entre corridas)
+
+
+def run_endpoint(app: Any, endpoint: str, args: argparse.Namespace, request_timeout: Any) -> Dict[str, Any]:
+    headers = {"X-Request-Timeout": str(request_timeout)} if request_timeout else {}
+
+    def call(_: int) -> Tuple[float, int]:
+        client = app.test_client()
+        started = time.perf_counter()
+        if endpoint == ENRICHMENT:
+            page = random.randint(1, max(1, args.products // args.page_limit))
+            response = client.get(
+                f"/api/v1/inventory/products-with-stock?page={page}&limit={args.page_limit}&stream=false",
+                headers=headers
+            )
+        else:
+            response = client.post(
+                "/api/v1/inventory/purchase",
+                json={"product_id": random.randint(1, args.products), "quantity": 1},
+                headers=headers
+            )
+        response.get_data()
+        return (time.perf_counter() - started) * 1000, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(call, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(status for _, status in results)
+    summary = summarize_latencies([latency for latency, _ in results], elapsed)
+    summary["status_mix"] = " ".join(f"{status}:{count}" for status, count in sorted(statuses.items()))
+    summary["error_pct"] = 100.0 * sum(c for s, c in statuses.items() if s >= 500) / max(1, len(results))
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Escenarios separados por coma")
+    parser.add_argument("--storage", choices=["memory", "sqlite", "mysql"], default="memory")
+    parser.add_argument("--requests", type=int, default=300, help="Solicitudes por ruta y escenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--products", type=int, default=1000, help="Productos del stub (e inventario sembrado)")
+    parser.add_argument("--page-limit", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=None, help="Semilla para reproducir las fallas")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.scenarios.split(",") if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Escenarios desconocidos: {', '.join(unknown)}")
+
+    os.chdir(SERVICE_DIR)
+    os.makedirs("logs", exist_ok=True)
+    stub = StubProductsService(total_products=args.products).start()
+    proxy = configure_environment(stub, args)
+
+    from app import create_app
+    import routes.invetory_routes as routes
+
+    app = create_app()
+    seed_inventory(routes.inventory_repository, args.products, stock=10 ** 9)
+    delaying_repository = None
+    if proxy is None:
+        delaying_repository = DelayingRepository(routes.inventory_repository, LatencyDistribution())
+        routes.inventory_service.inventory_repository = delaying_repository
+
+    table: List[Dict[str, Any]] = []
+    try:
+        for name in args.scenarios.split(","):
+            scenario = SCENARIOS[name]
+            stub.profile = FaultProfile(seed=args.seed, **scenario.get("products", {}))
+            db_latency = LatencyDistribution(scenario.get("db_latency", "none"), random.Random(args.seed))
+            (proxy or delaying_repository).latency = db_latency
+            for endpoint in (ENRICHMENT, PURCHASE):
+                summary = run_endpoint(app, endpoint, args, scenario.get("request_timeout"))
+                table.append({"scenario": name, "endpoint": endpoint, **summary})
+    finally:
+        stub.stop()
+        if proxy is not None:
+            proxy.stop()
+
+    print_table(table, ["scenario", "endpoint", "requests", "p50_ms", "p95_ms", "p99_ms", "max_ms", "error_pct", "status_mix"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Stub local del Products Service con inyección de latencia, errores y respuestas parciales.
+
+Sirve `GET /api/v1/productos?page=&limit=` con el mismo formato JSON API del servicio real
+(`{"data": [{"id", "type", "attributes"}], "meta": {...}}`). El perfil de fallas se puede
+cambiar en caliente (`stub.profile = FaultProfile(...)`) entre escenarios.
+
+Uso independiente (desde inventory-service/):
+    python -m tests.fault_injection.stub_products_service --port 8081 --latency lognormal:80,0.8 --error-rate 0.05
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from tests.fault_injection.faults import FaultProfile
+
+PRODUCTS_PATH = "/api/v1/productos"
+
+
+class StubProductsService:
+    """Servidor HTTP en un hilo daemon; `base_url` se usa como PRODUCTS_SERVICE_URL_INTERNAL."""
+
+    def __init__(self, profile: Optional[FaultProfile] = None, total_products: int = 1000,
+                 host: str = "127.0.0.1", port: int = 0) -> None:
+        self.profile = profile or FaultProfile()
+        self.total_products = total_products
+        self.requests_served = 0
+        self.last_headers: Dict[str, str] = {}
+        self._counter_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubProductsService":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-products", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubProductsService":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def build_page(self, page: int, limit: int) -> Dict[str, Any]:
+        """Página de productos con IDs consecutivos (1..total_products), con fallas parciales aplicadas."""
+        offset = (page - 1) * limit
+        products: List[Dict[str, Any]] = []
+        for product_id in range(offset + 1, min(offset + limit, self.total_products) + 1):
+            product: Dict[str, Any] = {
+                "id": str(product_id),
+                "type": "products",
+                "attributes": {"name": f"Producto {product_id}", "price": round(product_id * 1.5, 2)},
+            }
+            if self.profile.roll(self.profile.partial_rate):
+                del product[self.profile.choice(["attributes", "id"])]
+            products.append(product)
+        return {"data": products, "meta": {"total": self.total_products, "limite": limit, "offset": offset}}
+
+    def _handler_class(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                with stub._counter_lock:
+                    stub.requests_served += 1
+                    stub.last_headers = dict(self.headers.items())
+                profile = stub.profile
+                time.sleep(profile.latency.sample_ms() / 1000)
+
+                url = urlparse(self.path)
+                if url.path != PRODUCTS_PATH:
+                    return self._send(404, {"errors": [{"status": "404", "detail": "Ruta no encontrada"}]})
+                if profile.roll(profile.error_rate):
+                    return self._send(500, {"errors": [{"status": "500", "detail": "Falla inyectada"}]})
+
+                query = parse_qs(url.query)
+                page = int(query.get("page", ["1"])[0])
+                limit = int(query.get("limit", ["10"])[0])
+                body = json.dumps(stub.build_page(page, limit)).encode("utf-8")
+                if profile.roll(profile.malformed_rate):
+                    body = body[: max(1, len(body) // 2)]  # JSON truncado
+                self._send_bytes(200, body)
+
+            def _send(self, status: int, payload: Dict[str, Any]) -> None:
+                self._send_bytes(status, json.dumps(payload).encode("utf-8"))
+
+            def _send_bytes(self, status: int, body: bytes) -> None:
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # El cliente abandonó la solicitud por timeout
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # Sin log de acceso: los escenarios generan miles de solicitudes
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", default="none", help="Distribución de latencia (ver LatencyDistribution)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--partial-rate", type=float, default=0.0)
+    parser.add_argument("--total-products", type=int, default=1000)
+    args = parser.parse_args()
+
+    profile = FaultProfile(args.latency, args.error_rate, args.malformed_rate, args.partial_rate)
+    stub = StubProductsService(profile, args.total_products, host="0.0.0.0", port=args.port).start()
+    print(f"Stub del Products Service en {stub.base_url}{PRODUCTS_PATH} (Ctrl+C para terminar)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
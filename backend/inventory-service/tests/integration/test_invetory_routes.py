@@ -3,8 +3,7 @@ from unittest.mock import patch
 import json
 
 from app import create_app
-from db.db_connection import DBConnection
-from models.inventory_table import InventoryRepository
+from routes.invetory_routes import inventory_repository
 
 # Fixture para crear una instancia de la aplicación Flask para pruebas
 @pytest.fixture(scope='module')
@@ -23,8 +22,8 @@ def test_client(test_app):
 # Fixture para limpiar y poblar la base de datos de prueba
 @pytest.fixture(scope='function')
 def setup_database():
-    db_connection = DBConnection()
-    inventory_repo = InventoryRepository(db_connection)
+    # Mismo repositorio que usan las rutas (STORAGE_BACKEND=memory no requiere MySQL)
+    inventory_repo = inventory_repository
 
     product_ids = [101, 102, 103, 104]
     # Limpiar datos antes de la prueba
@@ -144,3 +143,45 @@ def test_get_products_with_stock(mock_get_products, test_client, setup_database)
     
     assert product_104 is not None
     assert product_104["attributes"]["available_stock"] == 80
+
+@patch('logic.inventory_logic.get_products_from_service')
+def test_get_products_with_stock_sparse_fieldset(mock_get_products, test_client, setup_database):
+    """
+    Con fields[productos] solo se serializan los atributos pedidos, y al servicio de
+    productos solo se le piden los que no son de inventario.
+    """
+    mock_get_products.return_value = (MOCK_PRODUCTS_RESPONSE, 200)
+
+    response = test_client.get(
+        '/api/v1/inventory/products-with-stock?page=1&limit=10&fields[productos]=price,name,available_stock'
+    )
+
+    assert response.status_code == 200
+    assert mock_get_products.call_args.kwargs == {"fields": ["name", "price"]}
+    product_101 = json.loads(response.data)["data"][0]
+    assert product_101 == {
+        "type": "productos", "id": "101",
+        "attributes": {"name": "RGB Mechanical Keyboard", "price": "79.99", "available_stock": 150}
+    }
+
+    response = test_client.get('/api/v1/inventory/products-with-stock?fields[productos]=name,password')
+    assert response.status_code == 400
+
+@patch('logic.inventory_logic.get_products_from_service')
+def test_get_products_with_stock_view_stock(mock_get_products, test_client, setup_database):
+    """
+    Con view=stock la respuesta sale solo del inventario, sin llamar al servicio de productos.
+    """
+    response = test_client.get('/api/v1/inventory/products-with-stock?page=2&limit=2&view=stock')
+
+    assert response.status_code == 200
+    mock_get_products.assert_not_called()
+    data = json.loads(response.data)
+    assert data["data"] == [
+        {"type": "productos", "id": "103", "attributes": {"available_stock": 320}},
+        {"type": "productos", "id": "104", "attributes": {"available_stock": 80}},
+    ]
+    assert data["meta"] == {"total": 4, "limite": 2, "offset": 2}
+
+    response = test_client.get('/api/v1/inventory/products-with-stock?view=stock&fields[productos]=name')
+    assert response.status_code == 400
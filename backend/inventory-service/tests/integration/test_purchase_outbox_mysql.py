@@ -0,0 +1,75 @@
+import threading
+import uuid
+
+import pytest
+
+from db.db_connection import DBConnection, MYSQL_DATABASE
+from models.inventory_table import InventoryRepository
+
+# Requiere MySQL con el esquema de database/init (MYSQL_* del .env); sin él se omite.
+PRODUCT_ID = 990001
+PARTITION = 65000  # Fuera del rango de ASYNC_PURCHASE_PARTITIONS: ningún worker la drena
+
+
+def _execute(sql, params):
+    conn = DBConnection().get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def mysql_repository():
+    if not MYSQL_DATABASE:
+        pytest.skip("MYSQL_DATABASE no está configurada.")
+    repository = InventoryRepository(DBConnection())
+    try:
+        repository.delete_inventory(PRODUCT_ID)
+    except Exception as e:
+        pytest.skip(f"MySQL no está disponible: {e}")
+    # inventory.product_id tiene FK a products (fk_inventory_product): el producto de prueba se crea aquí.
+    _execute(
+        "INSERT IGNORE INTO products (id, name, price) VALUES (%s, %s, %s)",
+        (PRODUCT_ID, f"Producto de prueba outbox {PRODUCT_ID}", 1)
+    )
+    repository.create_inventory(PRODUCT_ID, 100)
+    yield repository
+    _execute("DELETE FROM purchase_outbox WHERE partition_key = %s", (PARTITION,))
+    repository.delete_inventory(PRODUCT_ID)
+    _execute("DELETE FROM products WHERE id = %s", (PRODUCT_ID,))
+
+
+def test_enqueue_does_not_wait_for_an_open_batch(mysql_repository):
+    """El INSERT de una compra nueva no espera al lote que tiene bloqueadas las pendientes de su partición."""
+    repository = mysql_repository
+    tracking_ids = [uuid.uuid4().hex for _ in range(2)]
+    repository.enqueue_purchase(tracking_ids[0], PRODUCT_ID, 1, PARTITION)
+
+    batch_open, release_batch = threading.Event(), threading.Event()
+    record_threshold_crossings = repository._record_threshold_crossings
+
+    def hold_batch_open(cursor, product_ids):
+        record_threshold_crossings(cursor, product_ids)
+        batch_open.set()
+        release_batch.wait(10)
+
+    repository._record_threshold_crossings = hold_batch_open
+    batch = threading.Thread(target=repository.process_purchase_batch, args=(PARTITION, 100))
+    batch.start()
+    try:
+        assert batch_open.wait(5)
+        enqueue = threading.Thread(
+            target=repository.enqueue_purchase, args=(tracking_ids[1], PRODUCT_ID, 1, PARTITION)
+        )
+        enqueue.start()
+        enqueue.join(3)
+        assert not enqueue.is_alive(), "enqueue_purchase esperó al commit del lote"
+    finally:
+        release_batch.set()
+        batch.join(10)
+
+    assert repository.get_purchase_request(tracking_ids[0])['status'] == 'APPLIED'
+    assert repository.get_purchase_request(tracking_ids[1])['status'] == 'PENDING'
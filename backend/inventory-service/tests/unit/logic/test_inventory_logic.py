@@ -22,11 +22,8 @@ MOCK_PRODUCTS_RESPONSE = {
     "meta": {"total": 2, "limite": 10, "offset": 0}
 }
 
-# Mock de la respuesta del repositorio de inventario
-MOCK_INVENTORY_LIST = [
-    {"product_id": 101, "available_stock": 50},
-    {"product_id": 102, "available_stock": 15},
-]
+# Mock de la respuesta del repositorio de inventario (mapa product_id -> stock)
+MOCK_STOCK_MAP = {101: 50, 102: 15}
 
 @patch('logic.inventory_logic.get_products_from_service')
 def test_get_products_with_stock_success(mock_get_products, inventory_service, mock_inventory_repository):
@@ -35,20 +32,33 @@ def test_get_products_with_stock_success(mock_get_products, inventory_service, m
     """
     # Configurar mocks
     mock_get_products.return_value = (MOCK_PRODUCTS_RESPONSE, 200)
-    mock_inventory_repository.get_inventory_by_product_ids.return_value = MOCK_INVENTORY_LIST
+    mock_inventory_repository.get_stock_map.return_value = MOCK_STOCK_MAP
 
     # Llamar al método
     result = inventory_service.get_products_with_stock(page=1, limit=10)
 
     # Verificar llamadas a los mocks
     mock_get_products.assert_called_once_with(1, 10)
-    mock_inventory_repository.get_inventory_by_product_ids.assert_called_once_with([101, 102])
+    mock_inventory_repository.get_stock_map.assert_called_once_with([101, 102])
 
     # Verificar el resultado
     assert len(result["data"]) == 2
     assert result["data"][0]["attributes"]["available_stock"] == 50
     assert result["data"][1]["attributes"]["available_stock"] == 15
 
+@patch('logic.inventory_logic.get_products_from_service')
+def test_get_products_with_stock_sparse_fields_skip_stock(mock_get_products, inventory_service, mock_inventory_repository):
+    """
+    Prueba que sin 'available_stock' en los atributos pedidos no se consulta el inventario.
+    """
+    mock_get_products.return_value = ({"data": [{"id": "101", "attributes": {"name": "Product A"}}], "meta": {}}, 200)
+
+    result = inventory_service.get_products_with_stock(page=1, limit=10, product_fields=("name",))
+
+    mock_get_products.assert_called_once_with(1, 10, fields=["name"])
+    mock_inventory_repository.get_stock_map.assert_not_called()
+    assert result["data"][0]["attributes"] == {"name": "Product A"}
+
 @patch('logic.inventory_logic.get_products_from_service')
 def test_get_products_with_stock_product_service_unavailable(mock_get_products, inventory_service):
     """
@@ -73,7 +83,7 @@ def test_get_products_with_stock_no_products_found(mock_get_products, inventory_
     result = inventory_service.get_products_with_stock(page=1, limit=10)
 
     # Verificar que no se llama al repositorio de inventario
-    mock_inventory_repository.get_inventory_by_product_ids.assert_not_called()
+    mock_inventory_repository.get_stock_map.assert_not_called()
 
     # Verificar el resultado
     assert result["data"] == []
@@ -94,9 +104,7 @@ def test_get_products_with_stock_some_products_without_inventory(mock_get_produc
     mock_get_products.return_value = (mock_products, 200)
     
     # Solo el producto 101 tiene inventario
-    mock_inventory_repository.get_inventory_by_product_ids.return_value = [
-        {"product_id": 101, "available_stock": 50}
-    ]
+    mock_inventory_repository.get_stock_map.return_value = {101: 50}
 
     # Llamar al método
     result = inventory_service.get_products_with_stock(page=1, limit=10)
@@ -105,3 +113,34 @@ def test_get_products_with_stock_some_products_without_inventory(mock_get_produc
     assert len(result["data"]) == 2
     assert result["data"][0]["attributes"]["available_stock"] == 50
     assert result["data"][1]["attributes"]["available_stock"] == 0 # Stock por defecto
+
+@patch('logic.inventory_logic.get_products_from_service')
+def test_get_products_with_stock_partial_products(mock_get_products, inventory_service, mock_inventory_repository):
+    """
+    Prueba que los productos sin 'attributes' o sin un ID válido no rompen el enriquecimiento.
+    """
+    mock_products = {
+        "data": [
+            {"id": "101"},                                   # Sin attributes
+            {"attributes": {"name": "Sin ID"}},              # Sin id
+            {"id": "abc", "attributes": None},               # ID inválido
+        ],
+        "meta": {}
+    }
+    mock_get_products.return_value = (mock_products, 200)
+    mock_inventory_repository.get_stock_map.return_value = {101: 50}
+
+    result = inventory_service.get_products_with_stock(page=1, limit=10)
+
+    mock_inventory_repository.get_stock_map.assert_called_once_with([101])
+    assert [p["attributes"]["available_stock"] for p in result["data"]] == [50, None, None]
+
+@patch('logic.inventory_logic.get_products_from_service')
+def test_get_products_with_stock_malformed_payload(mock_get_products, inventory_service):
+    """
+    Prueba que una respuesta con 'data' que no es una lista se reporta como servicio no disponible.
+    """
+    mock_get_products.return_value = ({"data": {"id": "101"}}, 200)
+
+    with pytest.raises(ServiceUnavailableError):
+        inventory_service.get_products_with_stock(page=1, limit=10)
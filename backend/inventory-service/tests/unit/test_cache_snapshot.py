@@ -0,0 +1,98 @@
+import gzip
+
+import pytest
+
+from cache.cache_snapshot import CacheSnapshotter
+from cache.negative_lookup_cache import NegativeLookupCache
+from cache.page_prefetcher import PagePrefetcher
+
+PAGE = {"data": [{"id": "11", "attributes": {"available_stock": 3}}], "meta": {"total": 30}}
+PAGE_ONE = {"data": [{"id": "1", "attributes": {}}], "meta": {"total": 30}}
+
+# -------------------- FIXTURES --------------------
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+class Watermark:
+    """Simula `get_inventory_watermark` y cuenta las consultas."""
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        return self.value
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    return str(tmp_path / "snapshots" / "cache.json.gz")
+
+def build_caches(clock):
+    negative_cache = NegativeLookupCache(ttl_seconds=30, max_entries=100, clock=clock)
+    prefetcher = PagePrefetcher(lambda page, limit: PAGE, ttl_seconds=30, max_entries=10, max_workers=1, clock=clock)
+    return negative_cache, prefetcher
+
+def dump_warm_snapshot(snapshot_path, watermark, wall_clock):
+    clock = FakeClock()
+    negative_cache, prefetcher = build_caches(clock)
+    negative_cache.add(404)
+    prefetcher.schedule_next(1, 10, PAGE_ONE)
+    prefetcher.shutdown()  # Espera a que se guarde la página 2
+    clock.now += 10  # Quedan 20 s de vida
+    snapshotter = CacheSnapshotter(snapshot_path, 60, watermark, negative_cache, prefetcher, clock=wall_clock)
+    assert snapshotter.dump() is True
+
+# -------------------- PRUEBAS --------------------
+
+def test_new_worker_restores_entries_and_revalidates_once(snapshot_path):
+    watermark = Watermark("2026-10-18 10:00:00")
+    wall_clock = FakeClock(5000.0)
+    dump_warm_snapshot(snapshot_path, watermark, wall_clock)
+
+    wall_clock.now += 5  # El worker nuevo arranca 5 s después
+    clock = FakeClock(0.0)
+    negative_cache, prefetcher = build_caches(clock)
+    snapshotter = CacheSnapshotter(snapshot_path, 60, watermark, negative_cache, prefetcher, clock=wall_clock)
+
+    assert snapshotter.load() == 2
+    assert watermark.calls == 1  # Solo el dump: la carga no consulta el inventario
+    assert negative_cache.contains(404) is True
+    assert prefetcher.get(2, 10) == PAGE
+    assert watermark.calls == 2  # Una revalidación para todas las entradas restauradas
+
+    clock.now = 15.1  # 20 s restantes - 5 s transcurridos desde el snapshot
+    assert negative_cache.contains(404) is False
+
+def test_restored_entries_are_dropped_when_inventory_changed(snapshot_path):
+    watermark = Watermark("2026-10-18 10:00:00")
+    wall_clock = FakeClock(5000.0)
+    dump_warm_snapshot(snapshot_path, watermark, wall_clock)
+
+    watermark.value = "2026-10-18 10:00:07"  # Otro worker escribió stock
+    negative_cache, prefetcher = build_caches(FakeClock(0.0))
+    CacheSnapshotter(snapshot_path, 60, watermark, negative_cache, prefetcher, clock=wall_clock).load()
+
+    assert prefetcher.get(2, 10) is None
+    assert negative_cache.contains(404) is False
+    assert len(negative_cache) == 0
+
+def test_expired_or_invalid_snapshots_are_ignored(snapshot_path):
+    watermark = Watermark("w")
+    wall_clock = FakeClock(5000.0)
+    dump_warm_snapshot(snapshot_path, watermark, wall_clock)
+
+    wall_clock.now += 60  # Más que la vida restante de todas las entradas
+    negative_cache, prefetcher = build_caches(FakeClock(0.0))
+    snapshotter = CacheSnapshotter(snapshot_path, 60, watermark, negative_cache, prefetcher, clock=wall_clock)
+    assert snapshotter.load() == 0
+
+    with gzip.open(snapshot_path, "wt") as snapshot_file:
+        snapshot_file.write("{no es json")
+    assert snapshotter.load() == 0
+    assert CacheSnapshotter(snapshot_path + ".missing", 60, watermark, negative_cache).load() == 0
@@ -0,0 +1,80 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from middleware.compression import register_response_compression
+from models.product_schema import ProductListResponseSchema, stream_product_list
+
+# -------------------- FIXTURES --------------------
+
+MOCK_PAGE = {
+    "data": [
+        {"type": "productos", "id": str(pid), "attributes": {"id": pid, "name": f"Producto {pid}", "available_stock": pid}}
+        for pid in range(1, 51)
+    ],
+    "meta": {"total": 50, "limite": 50, "offset": 0}
+}
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    register_response_compression(app)
+
+    @app.route('/small')
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route('/large')
+    def large():
+        return jsonify(ProductListResponseSchema().dump(MOCK_PAGE))
+
+    @app.route('/streamed')
+    def streamed():
+        return Response(stream_product_list(MOCK_PAGE), mimetype='application/json')
+
+    return app.test_client()
+
+# -------------------- PRUEBAS DE SERIALIZACIÓN EN STREAMING --------------------
+
+def test_stream_product_list_matches_schema_dump():
+    """Verifica que el streaming produce el mismo documento que el esquema de Marshmallow."""
+    streamed = json.loads(''.join(stream_product_list(MOCK_PAGE)))
+
+    assert streamed == ProductListResponseSchema().dump(MOCK_PAGE)
+
+def test_stream_product_list_empty_page():
+    """Verifica el documento JSON:API de una página vacía."""
+    assert json.loads(''.join(stream_product_list({"data": [], "meta": {}}))) == {"data": [], "meta": {}}
+
+# -------------------- PRUEBAS DE COMPRESIÓN --------------------
+
+def test_small_response_is_not_compressed(client):
+    """Verifica que bajo el umbral mínimo no se comprime."""
+    response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+def test_large_response_is_gzipped(client):
+    """Verifica la compresión gzip negociada de una respuesta grande."""
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data)) == ProductListResponseSchema().dump(MOCK_PAGE)
+
+def test_streamed_response_is_gzipped_incrementally(client):
+    """Verifica que la respuesta en streaming se comprime sin Content-Length."""
+    response = client.get('/streamed', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert json.loads(gzip.decompress(response.data))['meta']['total'] == 50
+
+def test_no_accept_encoding_is_not_compressed(client):
+    """Verifica que sin Accept-Encoding la respuesta viaja sin comprimir."""
+    response = client.get('/large', headers={'Accept-Encoding': 'identity'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert json.loads(response.data)['meta']['total'] == 50
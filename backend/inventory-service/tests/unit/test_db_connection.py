@@ -0,0 +1,115 @@
+import gc
+import threading
+import types
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from dbutils.pooled_db import PooledDB
+
+from db.db_connection import DBConnection
+import db.drivers as drivers
+import external_conections.products_services_integration as products_integration
+
+# -------------------- FIXTURES --------------------
+
+@pytest.fixture(autouse=True)
+def clean_pool():
+    """Aísla el singleton del pool entre pruebas."""
+    DBConnection.reset_pool()
+    yield
+    DBConnection.reset_pool()
+
+# -------------------- PRUEBAS DEL CICLO DE VIDA DEL POOL --------------------
+
+def test_get_pool_creates_single_instance_across_threads():
+    """Verifica que hilos concurrentes comparten un único pool por proceso."""
+    with patch.object(DBConnection, '_create_pool', side_effect=lambda: MagicMock()) as mock_create:
+        pools = []
+        threads = [threading.Thread(target=lambda: pools.append(DBConnection.get_pool())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    mock_create.assert_called_once()
+    assert all(pool is pools[0] for pool in pools)
+
+class FakeConnection:
+    """Conexión DB-API mínima que registra si se cerró (el socket compartido con el master)."""
+
+    def __init__(self, closed):
+        self._closed = closed
+
+    def cursor(self):
+        return MagicMock()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self._closed.append(self)
+
+def fake_dbapi(closed):
+    """Módulo DB-API falso para construir un PooledDB real sin servidor MySQL."""
+    module = types.ModuleType('fake_dbapi')
+    module.threadsafety = 1
+    module.Error = module.OperationalError = module.InterfaceError = module.InternalError = type('Error', (Exception,), {})
+    module.connect = lambda: FakeConnection(closed)
+    return module
+
+def test_reset_pool_discards_without_closing_inherited_connections():
+    """
+    Tras el fork se descarta el pool heredado sin cerrar sus sockets, con un PooledDB real:
+    PooledDB.__del__ cierra las conexiones inactivas si el pool se recolecta.
+    """
+    closed = []
+    # Se crean bajo demanda: ninguna referencia de la prueba mantiene vivo el pool heredado.
+    creators = [fake_dbapi(closed), fake_dbapi([])]
+    with patch.object(DBConnection, '_create_pool',
+                      side_effect=lambda: PooledDB(creator=creators.pop(0), mincached=2, maxconnections=2)):
+        DBConnection.get_pool()
+        DBConnection.reset_pool()
+        new_pool = DBConnection.get_pool()
+    gc.collect()
+
+    assert closed == []
+    assert DBConnection.get_pool() is new_pool
+
+def test_reset_http_session_creates_new_session():
+    """Verifica que cada worker obtiene su propia sesión HTTP tras el fork."""
+    inherited_session = products_integration.get_http_session()
+    products_integration.reset_http_session()
+
+    assert products_integration.get_http_session() is not inherited_session
+    assert products_integration.get_http_session() is products_integration.get_http_session()
+
+# -------------------- PRUEBAS DE LA CAPA DE DRIVERS --------------------
+
+def test_load_driver_falls_back_to_pymysql_when_mysqlclient_missing():
+    """Sin mysqlclient instalado se usa PyMySQL en lugar de fallar el arranque."""
+    with patch('db.drivers._load_mysqlclient', side_effect=ImportError("No module named 'MySQLdb'")):
+        driver = drivers.load_driver('mysqlclient')
+
+    assert driver is drivers.PYMYSQL_DRIVER
+    with pytest.raises(ValueError):
+        drivers.load_driver('oracle')
+
+def test_connect_kwargs_use_each_driver_dialect():
+    """mysqlclient usa `passwd`/`db`; PyMySQL, `password`/`database`."""
+    fake_mysqlclient = drivers.MySQLDriver('mysqlclient', MagicMock(), MagicMock(), MagicMock(), Exception)
+
+    assert drivers.PYMYSQL_DRIVER.connect_kwargs('h', 'u', 'p', 'd')['database'] == 'd'
+    kwargs = fake_mysqlclient.connect_kwargs('h', 'u', 'p', 'd')
+    assert (kwargs['passwd'], kwargs['db'], kwargs['autocommit']) == ('p', 'd', False)
+
+def test_duplicate_entry_detection_is_driver_agnostic():
+    """El código 1062 se reconoce sin importar la clase de excepción del driver."""
+    class MySQLdbIntegrityError(Exception):
+        pass
+
+    assert drivers.is_duplicate_entry(MySQLdbIntegrityError(1062, "Duplicate entry '101'"))
+    assert not drivers.is_duplicate_entry(MySQLdbIntegrityError(1452, "Cannot add or update a child row"))
@@ -0,0 +1,52 @@
+import random
+from unittest.mock import MagicMock
+
+import pytest
+
+from exceptions.api_exceptions import ServiceUnavailableError
+from external_conections.products_services_integration import get_products_from_service
+from logic.inventory_logic import InventoryService
+from tests.fault_injection.faults import FaultProfile, LatencyDistribution
+from tests.fault_injection.stub_products_service import StubProductsService
+
+# -------------------- FIXTURES --------------------
+
+@pytest.fixture
+def stub(monkeypatch):
+    with StubProductsService(total_products=20) as stub:
+        monkeypatch.setenv('PRODUCTS_SERVICE_URL_INTERNAL', stub.base_url)
+        monkeypatch.setenv('PRODUCTS_API_KEY', 'key')
+        yield stub
+
+# -------------------- PRUEBAS --------------------
+
+def test_latency_distribution_specs():
+    assert LatencyDistribution("none").sample_ms() == 0
+    assert LatencyDistribution("fixed:50").sample_ms() == 50
+    assert 10 <= LatencyDistribution("uniform:10-20").sample_ms() <= 20
+    assert LatencyDistribution("fixed:1@1=900", random.Random(1)).sample_ms() == 900
+    with pytest.raises(ValueError):
+        LatencyDistribution("pareto:3")
+
+def test_stub_serves_products_page(stub):
+    data, status = get_products_from_service(page=2, limit=5)
+    assert status == 200
+    assert [p["id"] for p in data["data"]] == ["6", "7", "8", "9", "10"]
+    assert stub.requests_served == 1
+    assert stub.last_headers["X-API-KEY"] == "key"
+
+def test_injected_errors_and_truncated_json_map_to_503(stub):
+    stub.profile = FaultProfile(error_rate=1.0)
+    with pytest.raises(ServiceUnavailableError):
+        get_products_from_service()
+    stub.profile = FaultProfile(malformed_rate=1.0)
+    with pytest.raises(ServiceUnavailableError):
+        get_products_from_service()
+
+def test_enrichment_survives_partial_products(stub):
+    stub.profile = FaultProfile(partial_rate=1.0, seed=7)
+    repository = MagicMock()
+    repository.get_stock_map.return_value = {}
+    result = InventoryService(inventory_repository=repository).get_products_with_stock(page=1, limit=10)
+    assert len(result["data"]) == 10
+    assert all("available_stock" in product["attributes"] for product in result["data"])
@@ -7,6 +7,7 @@ from unittest.mock import MagicMock, patch
 from typing import Any, Dict
 
 from models.inventory_table import InventoryRepository
+from models.stock_allocation import LocatedStockError, allocate_nearest
 from db.db_connection import DBConnection
 # Asumo que las excepciones básicas de Python como Exception y pymysql.err.IntegrityError son manejadas en el Repositorio
 
@@ -187,6 +188,37 @@ def test_update_inventory_stock_success(repository, mock_db_connection):
     mock_conn.close.assert_called_once()
     assert rows_affected == 1
 
+def test_update_inventory_stock_with_expected_version(repository, mock_db_connection):
+    """Verifica el compare-and-set: la versión esperada se agrega al WHERE."""
+    _, mock_conn, mock_cursor = mock_db_connection
+
+    mock_cursor.rowcount = 1
+
+    rows_affected = repository.update_inventory_stock(product_id=101, new_stock=40, expected_version=3)
+
+    sql_executed, params = mock_cursor.execute.call_args[0]
+    assert 'version = version + 1' in sql_executed
+    assert 'AND version = %s' in sql_executed
+    assert params == (40, 101, 3)
+    mock_conn.commit.assert_called_once()
+    assert rows_affected == 1
+
+def test_update_inventory_stock_checks_locations_under_the_row_lock(mock_db_connection):
+    """Con multi-bodega, la comprobación de ubicaciones va en la transacción del UPDATE."""
+    mock_db_conn_instance, mock_conn, mock_cursor = mock_db_connection
+    repository = InventoryRepository(mock_db_conn_instance, allocation_strategy=allocate_nearest)
+    mock_cursor.fetchone.return_value = {'1': 1}
+
+    with pytest.raises(LocatedStockError):
+        repository.update_inventory_stock(product_id=101, new_stock=40)
+
+    statements = [call[0][0] for call in mock_cursor.execute.call_args_list]
+    assert 'FOR UPDATE' in statements[0]
+    assert 'inventory_locations' in statements[1]
+    assert not any(statement.lstrip().startswith('UPDATE') for statement in statements)
+    mock_conn.rollback.assert_called_once()
+    mock_conn.commit.assert_not_called()
+
 def test_update_inventory_stock_not_found(repository, mock_db_connection):
     """Verifica que la actualización retorna 0 si el producto no existe."""
     _, mock_conn, mock_cursor = mock_db_connection
@@ -320,4 +352,231 @@ def test_delete_inventory_cursor_error(repository, mock_db_connection):
     
     mock_conn.commit.assert_not_called()
     mock_conn.rollback.assert_called_once()
-    mock_conn.close.assert_called_once()
\ No newline at end of file
+    mock_conn.close.assert_called_once()
+
+def test_decrease_inventory_stock_idempotent_success(repository, mock_db_connection):
+    """Verifica que la llave y el descuento se confirman en un único commit."""
+    _, mock_conn, mock_cursor = mock_db_connection
+
+    mock_cursor.rowcount = 1
+
+    rows_affected = repository.decrease_inventory_stock_idempotent(
+        product_id=101, quantity=2, idempotency_key='key-1', request_hash='abc',
+        response_status=200, response_body={'product_id': 101}, ttl_seconds=60
+    )
+
+    # 1. Validación de SQL: purga, registro de la llave y descuento en la misma conexión
+    executed_sql = [c[0][0] for c in mock_cursor.execute.call_args_list]
+    assert 'DELETE FROM idempotency_keys' in executed_sql[0]
+    assert 'INSERT INTO idempotency_keys' in executed_sql[1]
+    assert 'available_stock >= %s' in executed_sql[2]
+
+    # 2. Validación de Transacción
+    mock_conn.commit.assert_called_once()
+    mock_conn.rollback.assert_not_called()
+    mock_conn.close.assert_called_once()
+    assert rows_affected == 1
+
+def test_decrease_inventory_stock_idempotent_insufficient_stock(repository, mock_db_connection):
+    """Verifica que sin stock suficiente se hace rollback y la llave no queda registrada."""
+    _, mock_conn, mock_cursor = mock_db_connection
+
+    mock_cursor.rowcount = 0
+
+    rows_affected = repository.decrease_inventory_stock_idempotent(
+        product_id=101, quantity=999, idempotency_key='key-1', request_hash='abc',
+        response_status=200, response_body={}, ttl_seconds=60
+    )
+
+    mock_conn.commit.assert_not_called()
+    mock_conn.rollback.assert_called_once()
+    mock_conn.close.assert_called_once()
+    assert rows_affected == 0
+
+def test_decrease_inventory_stock_idempotent_duplicate_key(repository, mock_db_connection):
+    """Verifica que una llave duplicada propaga el IntegrityError tras el rollback."""
+    _, mock_conn, mock_cursor = mock_db_connection
+
+    mock_cursor.execute.side_effect = [None, pymysql.err.IntegrityError(1062, "Duplicate entry")]
+
+    with pytest.raises(pymysql.err.IntegrityError):
+        repository.decrease_inventory_stock_idempotent(
+            product_id=101, quantity=1, idempotency_key='key-1', request_hash='abc',
+            response_status=200, response_body={}, ttl_seconds=60
+        )
+
+    mock_conn.commit.assert_not_called()
+    mock_conn.rollback.assert_called_once()
+    mock_conn.close.assert_called_once()
+
+def test_get_idempotency_record_decodes_body(repository, mock_db_connection):
+    """Verifica que la respuesta almacenada se decodifica desde JSON."""
+    _, mock_conn, mock_cursor = mock_db_connection
+
+    mock_cursor.fetchone.return_value = {
+        'idempotency_key': 'key-1', 'request_hash': 'abc',
+        'response_status': 200, 'response_body': '{"product_id": 101}'
+    }
+
+    record = repository.get_idempotency_record('key-1')
+
+    sql_executed = mock_cursor.execute.call_args[0][0]
+    assert 'expires_at > NOW()' in sql_executed
+    mock_conn.close.assert_called_once()
+    assert record['response_body'] == {'product_id': 101}
+
+def test_apply_stock_adjustments_batches_and_rejects_negative(repository, mock_db_connection):
+    """Verifica el bloqueo, el rechazo de líneas negativas y el UPDATE único con CASE."""
+    _, mock_conn, mock_cursor = mock_db_connection
+
+    mock_cursor.fetchall.return_value = [
+        {'product_id': 101, 'available_stock': 5},
+        {'product_id': 102, 'available_stock': 0},
+    ]
+
+    results = repository.apply_stock_adjustments([(101, 10), (102, -1), (101, -12), (999, 3)])
+
+    # 1. Validación de SQL: SELECT ... FOR UPDATE y un único UPDATE relativo
+    assert mock_cursor.execute.call_count == 2
+    select_sql = mock_cursor.execute.call_args_list[0][0][0]
+    update_sql, update_params = mock_cursor.execute.call_args_list[1][0]
+    assert 'FOR UPDATE' in select_sql
+    assert 'available_stock = available_stock + CASE product_id' in update_sql
+    assert update_params == (101, -2, 101)
+
+    # 2. Validación de resultados por línea
+    assert [r['status'] for r in results] == ['APPLIED', 'INSUFFICIENT_STOCK', 'APPLIED', 'NOT_FOUND']
+    assert results[2]['available_stock'] == 3
+
+    mock_conn.commit.assert_called_once()
+    mock_conn.close.assert_called_once()
+
+def test_apply_stock_adjustments_db_error(repository, mock_db_connection):
+    """Verifica el rollback si falla el lote de ajustes."""
+    _, mock_conn, mock_cursor = mock_db_connection
+
+    mock_cursor.execute.side_effect = Exception("Lock wait timeout")
+
+    with pytest.raises(Exception, match="Lock wait timeout"):
+        repository.apply_stock_adjustments([(101, 1)])
+
+    mock_conn.commit.assert_not_called()
+    mock_conn.rollback.assert_called_once()
+    mock_conn.close.assert_called_once()
+
+def test_get_inventory_changes_since(repository, mock_db_connection):
+    """Verifica la consulta por keyset (last_inventory_update, product_id) usada por el stream de stock."""
+    _, mock_conn, mock_cursor = mock_db_connection
+
+    mock_cursor.fetchall.return_value = [{'product_id': 101, 'available_stock': 7, 'version': 3}]
+
+    changes = repository.get_inventory_changes_since('2025-11-13 10:00:00', 250, limit=100)
+
+    sql, params = mock_cursor.execute.call_args[0]
+    assert 'ORDER BY last_inventory_update, product_id' in sql
+    assert params == ('2025-11-13 10:00:00', '2025-11-13 10:00:00', 250, 100)
+    assert changes[0]['version'] == 3
+    mock_conn.close.assert_called_once()
+
+def test_get_stock_map_uses_tuple_cursor(repository, mock_db_connection):
+    """El mapa de stock se construye desde las tuplas del cursor, sin un dict por fila."""
+    mock_db_conn_instance, mock_conn, mock_cursor = mock_db_connection
+
+    mock_cursor.fetchall.return_value = ((101, 50), (102, 0))
+
+    stock_map = repository.get_stock_map([101, 102, 999])
+
+    mock_conn.cursor.assert_called_once_with(mock_db_conn_instance.driver.tuple_cursor_class)
+    sql, params = mock_cursor.execute.call_args[0]
+    assert sql.startswith("SELECT product_id, available_stock FROM inventory")
+    assert params == (101, 102, 999)
+    assert stock_map == {101: 50, 102: 0}
+    mock_conn.close.assert_called_once()
+
+def test_get_inventory_records_by_product_ids(repository, mock_db_connection):
+    """Las filas se convierten en InventoryRecord con acceso por atributo y por clave."""
+    _, _, mock_cursor = mock_db_connection
+
+    mock_cursor.fetchall.return_value = ((1, 101, 50, 'A1', '2025-11-13 10:00:00', 4),)
+
+    records = repository.get_inventory_records_by_product_ids([101])
+
+    assert records[0].available_stock == 50
+    assert records[0]['version'] == 4
+    assert records[0].to_dict()['location'] == 'A1'
+    assert repository.get_stock_map([]) == {}
+
+def test_process_purchase_batch_applies_in_order_and_records_outcome(repository, mock_db_connection):
+    """Verifica el lote del outbox: bloqueo en orden, descuento condicional y resultado por compra."""
+    _, mock_conn, mock_cursor = mock_db_connection
+
+    mock_cursor.fetchall.side_effect = [
+        [
+            {'id': 1, 'tracking_id': 'a', 'product_id': 101, 'quantity': 3},
+            {'id': 2, 'tracking_id': 'b', 'product_id': 101, 'quantity': 3},
+        ],
+        [{'product_id': 101, 'available_stock': 5}],
+    ]
+
+    results = repository.process_purchase_batch(partition_key=1, limit=100)
+
+    assert [r['status'] for r in results] == ['APPLIED', 'INSUFFICIENT_STOCK']
+    assert [r['available_stock'] for r in results] == [2, 2]
+    executed = [c[0][0] for c in mock_cursor.execute.call_args_list]
+    # Sin next-key locks sobre idx_pending_partition: enqueue_purchase no espera al lote.
+    assert executed[0] == 'SET TRANSACTION ISOLATION LEVEL READ COMMITTED'
+    assert 'FOR UPDATE' in executed[1] and 'SKIP LOCKED' not in executed[1]
+    assert 'UPDATE inventory' in executed[3]
+    outbox_sql, outbox_params = mock_cursor.execute.call_args_list[4][0]
+    assert 'UPDATE purchase_outbox' in outbox_sql
+    assert outbox_params == (1, 'APPLIED', 2, 'INSUFFICIENT_STOCK', 1, 2, 2, 2, 1, 2)
+    mock_conn.commit.assert_called_once()
+
+def test_process_purchase_batch_without_pending(repository, mock_db_connection):
+    """Sin compras pendientes solo se ejecuta la consulta del outbox."""
+    _, mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = []
+
+    assert repository.process_purchase_batch(partition_key=0, limit=100) == []
+    assert mock_cursor.execute.call_count == 2
+    mock_conn.close.assert_called_once()
+
+def test_decrease_inventory_stock_records_threshold_crossing(mock_db_connection):
+    """Con alertas activas, el cruce de umbral se registra en la misma transacción del descuento."""
+    mock_db_conn_instance, mock_conn, mock_cursor = mock_db_connection
+    repository = InventoryRepository(mock_db_conn_instance, low_stock_threshold=10)
+    mock_cursor.rowcount = 1
+
+    assert repository.decrease_inventory_stock(product_id=101, quantity=2) == 1
+
+    executed = [c[0] for c in mock_cursor.execute.call_args_list]
+    assert 'available_stock >= %s' in executed[0][0]
+    assert 'INSERT INTO stock_alerts' in executed[1][0]
+    assert executed[1][1] == (10, 101, 10)  # Umbral por defecto para COALESCE(reorder_threshold, %s)
+    assert 'SET below_threshold = 1 - below_threshold' in executed[2][0]
+    mock_conn.commit.assert_called_once()
+
+def test_get_stock_alerts_stops_at_the_first_unsettled_alert(repository, mock_db_connection):
+    """Una alerta reciente puede tener ids menores sin confirmar: la página termina antes de ella."""
+    _, mock_conn, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = [
+        {'id': 4, 'kind': 'LOW_STOCK', 'settled': 1},
+        {'id': 6, 'kind': 'RESTOCKED', 'settled': 0},
+        {'id': 7, 'kind': 'LOW_STOCK', 'settled': 1},
+    ]
+
+    alerts = repository.get_stock_alerts(after_id=3, limit=10)
+
+    assert alerts == [{'id': 4, 'kind': 'LOW_STOCK'}]
+    sql, params = mock_cursor.execute.call_args[0]
+    assert 'NOW(3) - INTERVAL %s SECOND' in sql
+    assert params == (2, 3, 10)
+    mock_conn.close.assert_called_once()
+
+def test_get_stock_alerts_uses_the_configured_settle_window(mock_db_connection):
+    mock_db_conn_instance, _, mock_cursor = mock_db_connection
+    mock_cursor.fetchall.return_value = []
+
+    InventoryRepository(mock_db_conn_instance, alert_settle_seconds=30).get_stock_alerts(after_id=0, limit=5)
+
+    assert mock_cursor.execute.call_args[0][1] == (30, 0, 5)
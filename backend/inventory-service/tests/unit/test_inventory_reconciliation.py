@@ -0,0 +1,160 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from logic.inventory_reconciliation import (
+    INACTIVE_WITH_STOCK, MISSING, ORPHAN, InventoryReconciler, load_checkpoint
+)
+from models.reconciliation_table import ReconciliationRepository
+
+# -------------------- FIXTURES --------------------
+
+class FakeReconciliationRepository:
+    """Tablas `products` e `inventory` en memoria con la interfaz de ReconciliationRepository."""
+
+    def __init__(self, products, inventory):
+        self.products = dict(products)    # id -> is_active
+        self.inventory = dict(inventory)  # product_id -> available_stock
+        self.reads = []
+        self.fail_after_reads = None
+
+    def get_products_after(self, after_id, limit):
+        return self._page("products", sorted(self.products.items()), after_id, limit)
+
+    def get_inventory_after(self, after_product_id, limit):
+        return self._page("inventory", sorted(self.inventory.items()), after_product_id, limit)
+
+    def _page(self, table, rows, after_key, limit):
+        self.reads.append((table, after_key))
+        if self.fail_after_reads is not None and len(self.reads) > self.fail_after_reads:
+            raise ConnectionError("MySQL no disponible")
+        return [row for row in rows if row[0] > after_key][:limit]
+
+    def create_missing_inventory(self, product_ids):
+        created = [pid for pid in product_ids if pid in self.products and pid not in self.inventory]
+        self.inventory.update((pid, 0) for pid in created)
+        return len(created)
+
+    def delete_orphan_inventory(self, product_ids):
+        orphans = [pid for pid in product_ids if pid in self.inventory and pid not in self.products]
+        for pid in orphans:
+            del self.inventory[pid]
+        return len(orphans)
+
+    def clear_inactive_stock(self, product_ids):
+        cleared = [pid for pid in product_ids if not self.products.get(pid, True) and self.inventory.get(pid)]
+        self.inventory.update((pid, 0) for pid in cleared)
+        return len(cleared)
+
+@pytest.fixture
+def repository():
+    products = {pid: True for pid in range(1, 21) if pid != 12}
+    products[5] = False   # Inactivo con stock
+    products[6] = False   # Inactivo sin inventario: no es discrepancia
+    inventory = {pid: 10 for pid in range(1, 21) if pid not in (3, 6, 7)}
+    inventory[12] = 2     # Huérfano entre productos
+    inventory[25] = 4     # Huérfano al final
+    return FakeReconciliationRepository(products, inventory)
+
+# -------------------- PRUEBAS --------------------
+
+def test_merge_join_reports_every_issue_kind(repository):
+    issues = []
+    reconciler = InventoryReconciler(repository, chunk_size=4, on_issue=lambda *issue: issues.append(issue))
+
+    state = reconciler.run()
+
+    assert issues == [(MISSING, 3, None), (INACTIVE_WITH_STOCK, 5, 10), (MISSING, 7, None),
+                      (ORPHAN, 12, 2), (ORPHAN, 25, 4)]
+    assert (state["products"], state["inventory"], state["completed"]) == (19, 18, True)
+    assert repository.inventory[5] == 10  # Sin --repair no se modifica nada
+    # Memoria acotada: se leen bloques de chunk_size filas, cada uno después de la última clave.
+    assert [after_key for table, after_key in repository.reads if table == "products"] == [0, 4, 8, 13, 17]
+
+def test_repairs_in_throttled_batches(repository):
+    pauses = []
+    reconciler = InventoryReconciler(
+        repository, chunk_size=4, repair=[MISSING, ORPHAN, INACTIVE_WITH_STOCK],
+        repair_batch_size=2, throttle_seconds=0.5, sleep=pauses.append
+    )
+
+    state = reconciler.run()
+
+    assert state["repaired"] == {ORPHAN: 2, MISSING: 2, INACTIVE_WITH_STOCK: 1}
+    assert repository.inventory[3] == 0 and repository.inventory[5] == 0
+    assert 25 not in repository.inventory
+    assert pauses and set(pauses) == {0.5}
+    assert InventoryReconciler(repository, chunk_size=4).run()["issues"] == {
+        ORPHAN: 0, MISSING: 0, INACTIVE_WITH_STOCK: 0
+    }
+
+def test_interrupted_run_resumes_from_checkpoint(repository, tmp_path):
+    checkpoint = str(tmp_path / "reconciliation.json")
+    repository.fail_after_reads = 6
+    with pytest.raises(ConnectionError):
+        InventoryReconciler(repository, chunk_size=4, repair=[MISSING], checkpoint_path=checkpoint).run()
+
+    saved = load_checkpoint(checkpoint)
+    assert saved["completed"] is False and saved["last_product_id"] > 0
+    assert repository.inventory[3] == 0  # Reparado antes de guardar el checkpoint
+
+    repository.fail_after_reads = None
+    repository.reads.clear()
+    state = InventoryReconciler(repository, chunk_size=4, repair=[MISSING], checkpoint_path=checkpoint).run()
+
+    assert repository.reads[0][1] == saved["last_product_id"]
+    assert state["products"] == 19
+    assert state["issues"][MISSING] == 2 and state["repaired"][MISSING] == 2
+
+def test_unknown_repair_kind_is_rejected(repository):
+    with pytest.raises(ValueError):
+        InventoryReconciler(repository, repair=["everything"])
+
+# -------------------- REPARACIONES EN MYSQL --------------------
+
+@pytest.fixture
+def mock_db_connection():
+    """Conexión y cursor de MySQL mockeados para ReconciliationRepository."""
+    mock_cursor = MagicMock()
+    mock_conn = MagicMock()
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_db_conn_instance = MagicMock()
+    mock_db_conn_instance.get_connection.return_value = mock_conn
+    return mock_db_conn_instance, mock_conn, mock_cursor
+
+def test_clear_inactive_stock_zeroes_locations_in_the_same_transaction(mock_db_connection):
+    """El total y sus ubicaciones se ponen en 0 juntos: el total sigue siendo su suma."""
+    mock_db_conn_instance, mock_conn, mock_cursor = mock_db_connection
+    repository = ReconciliationRepository(mock_db_conn_instance, multi_warehouse=True)
+    mock_cursor.fetchall.return_value = [{'product_id': 5}, {'product_id': 9}]
+
+    assert repository.clear_inactive_stock([5, 7, 9]) == 2
+
+    executed = [c[0] for c in mock_cursor.execute.call_args_list]
+    assert 'FOR UPDATE OF i' in executed[0][0] and executed[0][1] == (5, 7, 9)
+    assert 'UPDATE inventory SET available_stock = 0' in executed[1][0] and executed[1][1] == (5, 9)
+    assert 'UPDATE inventory_locations SET available_stock = 0' in executed[2][0] and executed[2][1] == (5, 9)
+    mock_conn.commit.assert_called_once()
+
+def test_clear_inactive_stock_without_matches_writes_nothing(mock_db_connection):
+    mock_db_conn_instance, _, mock_cursor = mock_db_connection
+    repository = ReconciliationRepository(mock_db_conn_instance, multi_warehouse=True)
+    mock_cursor.fetchall.return_value = []
+
+    assert repository.clear_inactive_stock([5]) == 0
+    assert mock_cursor.execute.call_count == 1
+
+def test_clear_inactive_stock_records_threshold_crossings(mock_db_connection):
+    """Dejar el stock en 0 es una escritura más: el cruce se registra en la misma transacción."""
+    mock_db_conn_instance, mock_conn, mock_cursor = mock_db_connection
+    repository = ReconciliationRepository(mock_db_conn_instance, low_stock_threshold=10)
+    mock_cursor.fetchall.return_value = [{'product_id': 5}]
+    mock_cursor.rowcount = 1
+
+    assert repository.clear_inactive_stock([5]) == 1
+
+    executed = [c[0] for c in mock_cursor.execute.call_args_list]
+    assert 'UPDATE inventory SET available_stock = 0' in executed[1][0]
+    assert 'INSERT INTO stock_alerts' in executed[2][0] and executed[2][1] == (10, 5, 10)
+    assert 'SET below_threshold = 1 - below_threshold' in executed[3][0]
+    mock_conn.commit.assert_called_once()
@@ -3,8 +3,9 @@ import pytest
 from unittest.mock import patch, MagicMock
 from typing import Dict, Any
 
-from exceptions.api_exceptions import NotFoundError, ConflictError, InvalidInputError
+from exceptions.api_exceptions import NotFoundError, ConflictError, InvalidInputError, VersionConflictError
 from logic.inventory_logic import InventoryService
+from models.stock_allocation import LocatedStockError
 
 # -------------------- FIXTURES DE MOCKING --------------------
 
@@ -72,6 +73,17 @@ def test_create_new_inventory_conflict_error(inventory_service, mock_inventory_r
         
     assert 'Ya existe un inventario para el producto' in excinfo.value.detail
 
+def test_create_new_inventory_conflict_error_with_mysqlclient(inventory_service, mock_inventory_repository):
+    """El 1062 se mapea a ConflictError también con el IntegrityError de mysqlclient."""
+    class MySQLdbIntegrityError(Exception):
+        pass
+
+    mock_inventory_repository.create_inventory.side_effect = MySQLdbIntegrityError(1062, "Duplicate entry")
+
+    with patch('logic.inventory_logic.INTEGRITY_ERRORS', (pymysql.err.IntegrityError, MySQLdbIntegrityError)):
+        with pytest.raises(ConflictError):
+            inventory_service.create_new_inventory(product_id=200, available_stock=10)
+
 # -------------------- PRUEBAS DE CONSULTA/ACTUALIZACIÓN --------------------
 
 def test_get_inventory_for_product_success(inventory_service, mock_inventory_repository):
@@ -117,6 +129,43 @@ def test_update_stock_for_product_negative_stock(inventory_service, mock_invento
     assert 'no puede ser negativo' in excinfo.value.detail
     mock_inventory_repository.update_inventory_stock.assert_not_called()
     
+def test_update_stock_for_product_expected_version_success(inventory_service, mock_inventory_repository):
+    """Verifica la escritura condicional exitosa y la nueva versión retornada."""
+
+    mock_inventory_repository.get_inventory_by_product_id.return_value = {**MOCK_INVENTORY_DATA, 'version': 3}
+    mock_inventory_repository.update_inventory_stock.return_value = 1
+
+    resultado = inventory_service.update_stock_for_product(product_id=101, new_stock=10, expected_version=3)
+
+    mock_inventory_repository.update_inventory_stock.assert_called_once_with(101, 10, 3)
+    assert resultado['version'] == 4
+
+def test_update_stock_for_product_stale_version(inventory_service, mock_inventory_repository):
+    """Verifica que una versión desactualizada lanza VersionConflictError sin escribir."""
+
+    mock_inventory_repository.get_inventory_by_product_id.return_value = {**MOCK_INVENTORY_DATA, 'version': 5}
+
+    with pytest.raises(VersionConflictError) as excinfo:
+        inventory_service.update_stock_for_product(product_id=101, new_stock=10, expected_version=3)
+
+    assert excinfo.value.status_code == 409
+    assert excinfo.value.meta['current_state']['version'] == 5
+    mock_inventory_repository.update_inventory_stock.assert_not_called()
+
+def test_update_stock_for_product_lost_race(inventory_service, mock_inventory_repository):
+    """Verifica que si otra escritura gana la carrera (0 filas) se informa el estado actual."""
+
+    mock_inventory_repository.get_inventory_by_product_id.side_effect = [
+        {**MOCK_INVENTORY_DATA, 'version': 3},
+        {**MOCK_INVENTORY_DATA, 'available_stock': 48, 'version': 4},
+    ]
+    mock_inventory_repository.update_inventory_stock.return_value = 0
+
+    with pytest.raises(VersionConflictError) as excinfo:
+        inventory_service.update_stock_for_product(product_id=101, new_stock=10, expected_version=3)
+
+    assert excinfo.value.meta['current_state']['available_stock'] == 48
+
 # -------------------- PRUEBAS DE ELIMINACIÓN --------------------
 
 def test_delete_inventory_for_product_success(inventory_service, mock_inventory_repository):
@@ -138,4 +187,252 @@ def test_delete_inventory_for_product_not_found(inventory_service, mock_inventor
     with pytest.raises(NotFoundError) as excinfo:
         inventory_service.delete_inventory_for_product(product_id=999)
         
-    assert 'inventario' in str(excinfo.value)
\ No newline at end of file
+    assert 'inventario' in str(excinfo.value)
+# -------------------- PRUEBAS DE COMPRA IDEMPOTENTE --------------------
+
+def test_purchase_product_idempotent_first_execution(inventory_service, mock_inventory_repository):
+    """Verifica que la primera ejecución descuenta el stock y guarda la respuesta."""
+
+    mock_inventory_repository.get_idempotency_record.return_value = None
+    mock_inventory_repository.decrease_inventory_stock_idempotent.return_value = 1
+
+    resultado, replayed = inventory_service.purchase_product_idempotent(101, 2, 'key-1')
+
+    mock_inventory_repository.decrease_inventory_stock_idempotent.assert_called_once()
+    assert replayed is False
+    assert resultado['quantity_purchased'] == 2
+
+def test_purchase_product_idempotent_replay_does_not_touch_inventory(inventory_service, mock_inventory_repository):
+    """Verifica que un reintento devuelve la respuesta guardada sin descontar stock."""
+
+    # Primera ejecución para obtener el hash de la solicitud guardado
+    mock_inventory_repository.get_idempotency_record.return_value = None
+    mock_inventory_repository.decrease_inventory_stock_idempotent.return_value = 1
+    primera, _ = inventory_service.purchase_product_idempotent(101, 2, 'key-1')
+    stored_hash = mock_inventory_repository.decrease_inventory_stock_idempotent.call_args[0][3]
+    mock_inventory_repository.decrease_inventory_stock_idempotent.reset_mock()
+
+    mock_inventory_repository.get_idempotency_record.return_value = {
+        'idempotency_key': 'key-1', 'request_hash': stored_hash,
+        'response_status': 200, 'response_body': primera
+    }
+
+    resultado, replayed = inventory_service.purchase_product_idempotent(101, 2, 'key-1')
+
+    assert replayed is True
+    assert resultado == primera
+    mock_inventory_repository.decrease_inventory_stock_idempotent.assert_not_called()
+    mock_inventory_repository.decrease_inventory_stock.assert_not_called()
+
+def test_purchase_product_idempotent_key_reused_with_other_body(inventory_service, mock_inventory_repository):
+    """Verifica que reutilizar la llave con otro cuerpo lanza ConflictError."""
+
+    mock_inventory_repository.get_idempotency_record.return_value = {
+        'idempotency_key': 'key-1', 'request_hash': 'otro-hash',
+        'response_status': 200, 'response_body': {}
+    }
+
+    with pytest.raises(ConflictError):
+        inventory_service.purchase_product_idempotent(101, 5, 'key-1')
+
+def test_purchase_product_idempotent_concurrent_retry_replays(inventory_service, mock_inventory_repository):
+    """Verifica que una llave confirmada por un reintento concurrente (1062) se responde como replay."""
+
+    stored = {'idempotency_key': 'key-1', 'request_hash': None, 'response_status': 200, 'response_body': {'ok': True}}
+
+    def get_record(_key):
+        # Vacío en la consulta inicial, confirmado tras el conflicto de llave.
+        return stored if mock_inventory_repository.decrease_inventory_stock_idempotent.called else None
+
+    mock_inventory_repository.get_idempotency_record.side_effect = get_record
+
+    def capture_hash(*args):
+        stored['request_hash'] = args[3]
+        raise pymysql.err.IntegrityError(1062, "Duplicate entry")
+
+    mock_inventory_repository.decrease_inventory_stock_idempotent.side_effect = capture_hash
+
+    resultado, replayed = inventory_service.purchase_product_idempotent(101, 1, 'key-1')
+
+    assert replayed is True
+    assert resultado == {'ok': True}
+
+def test_purchase_product_idempotent_insufficient_stock(inventory_service, mock_inventory_repository):
+    """Verifica que sin stock suficiente se lanza InvalidInputError y no hay replay."""
+
+    mock_inventory_repository.get_idempotency_record.return_value = None
+    mock_inventory_repository.decrease_inventory_stock_idempotent.return_value = 0
+    mock_inventory_repository.get_inventory_by_product_id.return_value = MOCK_INVENTORY_DATA
+
+    with pytest.raises(InvalidInputError) as excinfo:
+        inventory_service.purchase_product_idempotent(101, 500, 'key-1')
+
+    assert 'No hay suficiente stock' in excinfo.value.detail
+
+def test_purchase_product_idempotent_invalid_key(inventory_service, mock_inventory_repository):
+    """Verifica la validación de longitud de la Idempotency-Key."""
+
+    with pytest.raises(InvalidInputError):
+        inventory_service.purchase_product_idempotent(101, 1, '')
+
+    mock_inventory_repository.get_idempotency_record.assert_not_called()
+
+# -------------------- PRUEBAS DE AJUSTES MASIVOS --------------------
+
+def test_apply_stock_adjustments_per_line_results(inventory_service, mock_inventory_repository):
+    """Verifica que las líneas inválidas no llegan al repositorio y que cada línea tiene su resultado."""
+
+    mock_inventory_repository.apply_stock_adjustments.return_value = [
+        {'status': 'APPLIED', 'available_stock': 60},
+        {'status': 'INSUFFICIENT_STOCK', 'available_stock': 2},
+    ]
+
+    resultado = inventory_service.apply_stock_adjustments([
+        {'product_id': 101, 'delta': 10, 'reason': 'Entrega 45'},
+        {'product_id': 102, 'delta': 0},
+        {'product_id': 103, 'delta': -5},
+    ])
+
+    mock_inventory_repository.apply_stock_adjustments.assert_called_once_with([(101, 10), (103, -5)])
+    assert [r['status'] for r in resultado['results']] == ['applied', 'rejected', 'rejected']
+    assert resultado['results'][1]['error']['code'] == 'INVALID_INPUT_DATA'
+    assert resultado['results'][2]['error']['code'] == 'INVENTORY_NOT_AVAILABLE'
+    assert resultado['summary'] == {'total': 3, 'applied': 1, 'rejected': 2}
+
+def test_apply_stock_adjustments_chunks(inventory_service, mock_inventory_repository):
+    """Verifica que los ajustes se envían al repositorio en bloques."""
+
+    mock_inventory_repository.apply_stock_adjustments.side_effect = lambda lines: [
+        {'status': 'APPLIED', 'available_stock': 1} for _ in lines
+    ]
+
+    with patch('logic.inventory_logic.ADJUSTMENTS_CHUNK_SIZE', 2):
+        resultado = inventory_service.apply_stock_adjustments(
+            [{'product_id': pid, 'delta': 1} for pid in range(1, 6)]
+        )
+
+    assert mock_inventory_repository.apply_stock_adjustments.call_count == 3
+    assert resultado['summary']['applied'] == 5
+
+def test_apply_stock_adjustments_failed_chunk_keeps_committed_results(inventory_service, mock_inventory_repository):
+    """Si falla un bloque, los ya confirmados se reportan y el resto se rechaza sin aplicarse."""
+
+    mock_inventory_repository.apply_stock_adjustments.side_effect = [
+        [{'status': 'APPLIED', 'available_stock': 1}, {'status': 'APPLIED', 'available_stock': 1}],
+        Exception("Lock wait timeout exceeded"),
+    ]
+
+    with patch('logic.inventory_logic.ADJUSTMENTS_CHUNK_SIZE', 2):
+        resultado = inventory_service.apply_stock_adjustments(
+            [{'product_id': pid, 'delta': 1} for pid in range(1, 6)]
+        )
+
+    assert mock_inventory_repository.apply_stock_adjustments.call_count == 2
+    assert [r['status'] for r in resultado['results']] == ['applied', 'applied', 'rejected', 'rejected', 'rejected']
+    assert resultado['results'][4]['error']['code'] == 'SERVICE_UNAVAILABLE'
+    assert resultado['summary'] == {'total': 5, 'applied': 2, 'rejected': 3}
+
+def test_apply_stock_adjustments_rejects_out_of_range_lines(inventory_service, mock_inventory_repository):
+    """Los product_id fuera de BIGINT UNSIGNED y los delta fuera de INT UNSIGNED no llegan a la BD."""
+
+    mock_inventory_repository.apply_stock_adjustments.return_value = [
+        {'status': 'OUT_OF_RANGE', 'available_stock': 4294967000},
+    ]
+
+    resultado = inventory_service.apply_stock_adjustments([
+        {'product_id': 18446744073709551616, 'delta': 1},
+        {'product_id': 101, 'delta': -4294967296},
+        {'product_id': 102, 'delta': 1000},
+    ])
+
+    mock_inventory_repository.apply_stock_adjustments.assert_called_once_with([(102, 1000)])
+    assert [r['error']['code'] for r in resultado['results']] == ['INVALID_INPUT_DATA'] * 3
+
+def test_apply_stock_adjustments_empty_list(inventory_service, mock_inventory_repository):
+    """Verifica que una lista vacía lanza InvalidInputError."""
+
+    with pytest.raises(InvalidInputError):
+        inventory_service.apply_stock_adjustments([])
+
+    mock_inventory_repository.apply_stock_adjustments.assert_not_called()
+
+# -------------------- PRUEBAS DE LA CACHÉ NEGATIVA --------------------
+
+def test_get_inventory_for_product_negative_cache_skips_db(inventory_service, mock_inventory_repository):
+    """Verifica que un product_id confirmado como inexistente no vuelve a consultar la BD."""
+
+    mock_inventory_repository.get_inventory_by_product_id.return_value = None
+
+    for _ in range(3):
+        with pytest.raises(NotFoundError):
+            inventory_service.get_inventory_for_product(product_id=999)
+
+    mock_inventory_repository.get_inventory_by_product_id.assert_called_once_with(999)
+
+def test_create_new_inventory_invalidates_negative_cache(inventory_service, mock_inventory_repository):
+    """Verifica que crear el inventario invalida la entrada negativa del producto."""
+
+    mock_inventory_repository.get_inventory_by_product_id.return_value = None
+    with pytest.raises(NotFoundError):
+        inventory_service.get_inventory_for_product(product_id=200)
+
+    mock_inventory_repository.create_inventory.return_value = 7
+    inventory_service.create_new_inventory(product_id=200, available_stock=5)
+
+    mock_inventory_repository.get_inventory_by_product_id.return_value = MOCK_INVENTORY_DATA
+    assert inventory_service.get_inventory_for_product(product_id=200) == MOCK_INVENTORY_DATA
+
+# -------------------- PRUEBAS MULTI-BODEGA --------------------
+
+def test_purchase_product_reports_allocated_locations(inventory_service, mock_inventory_repository):
+    """Con MULTI_WAREHOUSE_ENABLED la compra pasa por la asignación y reporta las ubicaciones."""
+    mock_inventory_repository.allocate_stock.return_value = [('BOG', 2), ('MED', 1)]
+
+    with patch('logic.inventory_logic.MULTI_WAREHOUSE_ENABLED', True):
+        resultado = inventory_service.purchase_product(101, 3)
+
+    mock_inventory_repository.allocate_stock.assert_called_once_with(101, 3)
+    mock_inventory_repository.decrease_inventory_stock.assert_not_called()
+    assert resultado['allocations'] == [
+        {'location_code': 'BOG', 'quantity': 2}, {'location_code': 'MED', 'quantity': 1}
+    ]
+
+def test_idempotent_purchase_reports_allocated_locations(inventory_service, mock_inventory_repository):
+    """La compra con Idempotency-Key responde con la misma forma que la compra simple."""
+    mock_inventory_repository.get_idempotency_record.return_value = None
+    mock_inventory_repository.allocate_stock_idempotent.return_value = [('BOG', 3)]
+
+    with patch('logic.inventory_logic.MULTI_WAREHOUSE_ENABLED', True):
+        resultado, replay = inventory_service.purchase_product_idempotent(101, 3, 'key-1')
+
+    assert replay is False
+    mock_inventory_repository.decrease_inventory_stock_idempotent.assert_not_called()
+    assert resultado['allocations'] == [{'location_code': 'BOG', 'quantity': 3}]
+
+def test_purchase_product_allocation_insufficient_stock(inventory_service, mock_inventory_repository):
+    mock_inventory_repository.allocate_stock.return_value = None
+    mock_inventory_repository.get_inventory_by_product_id.return_value = MOCK_INVENTORY_DATA
+
+    with patch('logic.inventory_logic.MULTI_WAREHOUSE_ENABLED', True), pytest.raises(InvalidInputError):
+        inventory_service.purchase_product(101, 99)
+
+def test_update_stock_rejected_for_products_managed_per_location(inventory_service, mock_inventory_repository):
+    """Un total absoluto no se puede repartir: el stock se fija por ubicación."""
+    mock_inventory_repository.get_inventory_by_product_id.return_value = MOCK_INVENTORY_DATA
+    mock_inventory_repository.update_inventory_stock.side_effect = LocatedStockError(101)
+
+    with pytest.raises(ConflictError):
+        inventory_service.update_stock_for_product(101, 10)
+    mock_inventory_repository.get_locations.assert_not_called()
+
+def test_set_location_stock_validation(inventory_service, mock_inventory_repository):
+    with pytest.raises(InvalidInputError):  # Función desactivada
+        inventory_service.set_location_stock(101, 'BOG', 5)
+    with patch('logic.inventory_logic.MULTI_WAREHOUSE_ENABLED', True):
+        for location_code, stock, priority in (('', 5, None), ('BOG', -1, None), ('BOG', 5, -2), ('X' * 51, 5, None)):
+            with pytest.raises(InvalidInputError):
+                inventory_service.set_location_stock(101, location_code, stock, priority)
+        mock_inventory_repository.set_location_stock.return_value = 0
+        with pytest.raises(NotFoundError):
+            inventory_service.set_location_stock(101, 'BOG', 5)
+    mock_inventory_repository.set_location_stock.assert_called_once_with(101, 'BOG', 5, None)
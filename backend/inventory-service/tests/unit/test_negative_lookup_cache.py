@@ -0,0 +1,67 @@
+import pytest
+
+from cache.negative_lookup_cache import NegativeLookupCache
+from middleware.error_handler import LogRateLimiter
+
+# -------------------- FIXTURES --------------------
+
+class FakeClock:
+    """Reloj controlable para simular el paso del tiempo."""
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def negative_cache(clock):
+    return NegativeLookupCache(ttl_seconds=30, max_entries=3, clock=clock)
+
+# -------------------- PRUEBAS DE LA CACHÉ NEGATIVA --------------------
+
+def test_negative_cache_hit_until_ttl_expires(negative_cache, clock):
+    """Verifica que la entrada es válida durante el TTL y luego expira."""
+    negative_cache.add(999)
+    assert negative_cache.contains(999)
+
+    clock.now += 31
+    assert not negative_cache.contains(999)
+    assert len(negative_cache) == 0
+
+def test_negative_cache_is_bounded(negative_cache):
+    """Verifica que al superar el máximo se descarta la entrada más antigua."""
+    for product_id in (1, 2, 3, 4):
+        negative_cache.add(product_id)
+
+    assert len(negative_cache) == 3
+    assert not negative_cache.contains(1)
+    assert negative_cache.contains(4)
+
+def test_negative_cache_discard(negative_cache):
+    """Verifica la invalidación explícita (ej. al crear el inventario)."""
+    negative_cache.add(999)
+    negative_cache.discard(999)
+
+    assert not negative_cache.contains(999)
+
+# -------------------- PRUEBAS DEL LIMITADOR DE LOGS --------------------
+
+def test_log_rate_limiter_suppresses_identical_logs(monkeypatch):
+    """Verifica que los logs idénticos dentro de la ventana se suprimen y se contabilizan."""
+    now = [0.0]
+    monkeypatch.setattr('middleware.error_handler.time.monotonic', lambda: now[0])
+    limiter = LogRateLimiter(window_seconds=60)
+    key = ('RESOURCE_NOT_FOUND', '/api/v1/inventory/999')
+
+    assert limiter.acquire(key) == (True, 0)
+    assert limiter.acquire(key) == (False, 0)
+    assert limiter.acquire(key) == (False, 0)
+    # Otra URL no comparte ventana
+    assert limiter.acquire(('RESOURCE_NOT_FOUND', '/api/v1/inventory/998')) == (True, 0)
+
+    now[0] = 61.0
+    assert limiter.acquire(key) == (True, 2)
@@ -0,0 +1,74 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from exceptions.api_exceptions import ServiceUnavailableError
+from logic.inventory_logic import InventoryService
+from logic.page_fanout import PageFanout
+from middleware.request_deadline import remaining_seconds, set_deadline
+
+# -------------------- FIXTURES --------------------
+
+def products_page(page, limit):
+    offset = (page - 1) * limit
+    data = [{"id": str(offset + index + 1), "attributes": {}} for index in range(limit)]
+    return {"data": data, "meta": {"total": 5000, "limite": limit, "offset": offset}}, 200
+
+@pytest.fixture
+def fanout():
+    fanout = PageFanout(chunk_size=200, max_workers=4)
+    yield fanout
+    fanout.shutdown()
+
+@pytest.fixture
+def service(fanout):
+    repository = MagicMock()
+    repository.get_stock_map.side_effect = lambda ids: {pid: pid % 7 for pid in ids}
+    return InventoryService(inventory_repository=repository, negative_cache=None, page_fanout=fanout)
+
+# -------------------- PRUEBAS --------------------
+
+def test_plan_splits_into_equal_products_service_pages(fanout):
+    assert fanout.plan(2, 1000) == [(6, 200), (7, 200), (8, 200), (9, 200), (10, 200)]
+    assert fanout.plan(1, 300) == [(1, 150), (2, 150)]
+    assert fanout.plan(1, 200) is None  # No supera el tramo
+    assert fanout.plan(1, 997) is None  # Primo: sin tramos iguales razonables
+
+@patch('logic.inventory_logic.get_products_from_service', side_effect=products_page)
+def test_fanout_merges_enriched_chunks_in_order(mock_get_products, service):
+    result = service.get_products_with_stock(page=2, limit=1000)
+
+    assert sorted(call.args for call in mock_get_products.call_args_list) == [(p, 200) for p in range(6, 11)]
+    assert [product["id"] for product in result["data"]] == [str(pid) for pid in range(1001, 2001)]
+    assert result["data"][5]["attributes"]["available_stock"] == 1006 % 7
+    assert result["meta"] == {"total": 5000, "limite": 1000, "offset": 1000}
+    assert service.inventory_repository.get_stock_map.call_count == 5
+
+def test_chunks_run_concurrently_and_keep_the_deadline(fanout):
+    barrier = threading.Barrier(3, timeout=5)
+    deadlines = []
+
+    def fetch_chunk(page, limit):
+        barrier.wait()  # Solo avanza si los tres tramos están en vuelo a la vez
+        deadlines.append(remaining_seconds())
+        return {"data": [page], "meta": {}}
+
+    set_deadline(10)
+    try:
+        result = fanout.fetch(1, 600, fetch_chunk)
+    finally:
+        set_deadline(None)
+    assert result["data"] == [1, 2, 3]
+    assert all(remaining is not None and 0 < remaining <= 10 for remaining in deadlines)
+
+@patch('logic.inventory_logic.get_products_from_service')
+def test_failing_chunk_fails_the_request(mock_get_products, service):
+    def flaky(page, limit):
+        if page == 3:
+            raise ServiceUnavailableError("products caído")
+        return products_page(page, limit)
+    mock_get_products.side_effect = flaky
+
+    with pytest.raises(ServiceUnavailableError):
+        service.get_products_with_stock(page=1, limit=1000)
@@ -0,0 +1,101 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from cache.page_prefetcher import PagePrefetcher
+from logic.inventory_logic import InventoryService
+
+PAGE_ONE = {"data": [{"id": "1", "attributes": {}}], "meta": {"total": 30}}
+
+# -------------------- FIXTURES --------------------
+
+class BlockingFetcher:
+    """fetch_page que espera una señal, para observar el prefetch mientras está en vuelo."""
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.done = threading.Event()
+        self.calls = []
+
+    def __call__(self, page, limit):
+        self.calls.append((page, limit))
+        self.release.wait(5)
+        self.done.set()
+        return {"data": [{"id": str(page)}], "meta": {"page": page}}
+
+@pytest.fixture
+def fetcher():
+    return BlockingFetcher()
+
+@pytest.fixture
+def prefetcher(fetcher):
+    prefetcher = PagePrefetcher(fetcher, ttl_seconds=60, max_entries=10, max_workers=2)
+    yield prefetcher
+    fetcher.release.set()
+    prefetcher.shutdown()
+
+def wait_until_stored(prefetcher, fetcher):
+    fetcher.release.set()
+    assert fetcher.done.wait(5)
+    prefetcher.shutdown()  # Espera a que el hilo guarde la página
+
+# -------------------- PRUEBAS --------------------
+
+def test_prefetched_page_is_served_from_cache(prefetcher, fetcher):
+    assert prefetcher.schedule_next(1, 10, PAGE_ONE) is True
+    assert prefetcher.get(2, 10) is None  # Aún en vuelo: miss, sin esperar
+    wait_until_stored(prefetcher, fetcher)
+
+    assert prefetcher.get(2, 10) == {"data": [{"id": "2"}], "meta": {"page": 2}}
+    assert fetcher.calls == [(2, 10)]
+    assert prefetcher.stats()["hits"] == 1
+    assert prefetcher.stats()["hit_rate"] == 0.5
+
+def test_in_flight_prefetch_is_deduplicated(prefetcher, fetcher):
+    assert prefetcher.schedule_next(1, 10, PAGE_ONE) is True
+    assert prefetcher.schedule_next(1, 10, PAGE_ONE) is False
+    wait_until_stored(prefetcher, fetcher)
+    assert fetcher.calls == [(2, 10)]
+
+def test_last_page_and_empty_pages_are_not_prefetched(prefetcher, fetcher):
+    assert prefetcher.schedule_next(3, 10, PAGE_ONE) is False  # 3 * 10 >= total
+    assert prefetcher.schedule_next(1, 10, {"data": [], "meta": {}}) is False
+    assert fetcher.calls == []
+
+def test_invalidation_discards_in_flight_results(prefetcher, fetcher):
+    prefetcher.schedule_next(1, 10, PAGE_ONE)
+    prefetcher.invalidate()  # Escritura de stock mientras se prefetcheaba
+    wait_until_stored(prefetcher, fetcher)
+    assert prefetcher.get(2, 10) is None
+
+def test_full_pool_drops_prefetch(fetcher):
+    prefetcher = PagePrefetcher(fetcher, ttl_seconds=60, max_entries=10, max_workers=1)
+    assert prefetcher.schedule_next(1, 10, PAGE_ONE) is True
+    assert prefetcher.schedule_next(2, 10, PAGE_ONE) is False
+    fetcher.release.set()
+    prefetcher.shutdown()
+
+@patch('logic.inventory_logic.get_products_from_service')
+def test_service_serves_prefetched_page_without_calling_products(mock_get_products):
+    mock_get_products.side_effect = lambda page, limit: (
+        {"data": [{"id": str(page), "attributes": {}}], "meta": {"total": 100}}, 200
+    )
+    repository = MagicMock()
+    repository.get_stock_map.return_value = {}
+    service = InventoryService(inventory_repository=repository, negative_cache=None)
+    service.page_prefetcher = PagePrefetcher(service._fetch_products_with_stock, 60, 10, 1)
+
+    service.get_products_with_stock(page=1, limit=10)
+    service.page_prefetcher.shutdown()  # Espera el prefetch de la página 2
+    assert mock_get_products.call_count == 2
+
+    page_two = service.get_products_with_stock(page=2, limit=10)
+    service.page_prefetcher.shutdown()  # Espera el prefetch de la página 3
+    assert page_two["data"][0]["id"] == "2"
+    assert [call.args for call in mock_get_products.call_args_list] == [(1, 10), (2, 10), (3, 10)]
+
+    # Una compra invalida las páginas prefetcheadas.
+    repository.decrease_inventory_stock.return_value = 1
+    service.purchase_product(product_id=1, quantity=1)
+    assert service.page_prefetcher.get(3, 10) is None
@@ -0,0 +1,101 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+import routes.invetory_routes as inventory_routes
+from exceptions.api_exceptions import InvalidInputError, NotFoundError, ServiceUnavailableError
+from logic.inventory_logic import InventoryService
+from logic.purchase_outbox_worker import PurchaseOutboxWorker
+from middleware.error_handler import register_error_handlers
+from models.memory_inventory_table import InMemoryInventoryRepository
+
+# -------------------- FIXTURES --------------------
+
+@pytest.fixture
+def repository():
+    repository = InMemoryInventoryRepository()
+    repository.create_inventory(101, 5)
+    return repository
+
+@pytest.fixture
+def service(repository):
+    hub = MagicMock()
+    service = InventoryService(inventory_repository=repository, stock_change_hub=hub)
+    service.purchase_outbox_worker = PurchaseOutboxWorker(
+        repository, partitions=2, batch_size=10, poll_interval_seconds=0.05,
+        on_processed=service._on_async_purchases_processed
+    )
+    return service
+
+def wait_for_status(service, tracking_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        purchase = service.get_purchase_status(tracking_id)
+        if purchase['status'] != 'PENDING':
+            return purchase
+        time.sleep(0.01)
+    raise AssertionError("La compra no se procesó a tiempo")
+
+# -------------------- PRUEBAS --------------------
+
+def test_worker_drains_only_its_partition(repository):
+    worker = PurchaseOutboxWorker(repository, partitions=2, batch_size=10, poll_interval_seconds=1)
+    repository.enqueue_purchase('odd', 101, 1, worker.partition_of(101))
+    repository.enqueue_purchase('even', 102, 1, worker.partition_of(102))
+
+    assert worker.drain_once(0) == 1
+    assert repository.get_purchase_request('odd')['status'] == 'PENDING'
+    assert worker.drain_once(1) == 1
+    assert repository.get_purchase_request('odd')['status'] == 'APPLIED'
+
+def test_enqueued_purchases_are_applied_in_order(service, repository):
+    first = service.enqueue_purchase(101, 3)
+    second = service.enqueue_purchase(101, 3)
+    assert first['status'] == 'PENDING'
+
+    assert wait_for_status(service, first['tracking_id'])['status'] == 'APPLIED'
+    rejected = wait_for_status(service, second['tracking_id'])
+    assert (rejected['status'], rejected['available_stock']) == ('INSUFFICIENT_STOCK', 2)
+    assert repository.get_inventory_by_product_id(101)['available_stock'] == 2
+    service.stock_change_hub.notify_write.assert_called()
+
+def test_enqueue_validates_input(service):
+    with pytest.raises(InvalidInputError):
+        service.enqueue_purchase(101, 0)
+    with pytest.raises(InvalidInputError):
+        service.enqueue_purchase('101', 1)
+    with pytest.raises(NotFoundError):
+        service.get_purchase_status('desconocido')
+
+def test_enqueue_requires_async_mode(repository):
+    with pytest.raises(ServiceUnavailableError):
+        InventoryService(inventory_repository=repository).enqueue_purchase(101, 1)
+
+def test_route_accepts_with_202_and_location(service):
+    app = Flask(__name__)
+    register_error_handlers(app)
+    app.register_blueprint(inventory_routes.inventory_bp)
+    client = app.test_client()
+
+    with patch.object(inventory_routes, 'inventory_service', service):
+        response = client.post(
+            '/api/v1/inventory/purchase', json={'product_id': 101, 'quantity': 1},
+            headers={'Prefer': 'respond-async'}
+        )
+        assert response.status_code == 202
+        assert response.headers['Preference-Applied'] == 'respond-async'
+        location = response.headers['Location']
+        assert location.endswith(response.get_json()['data']['tracking_id'])
+
+        wait_for_status(service, response.get_json()['data']['tracking_id'])
+        status = client.get(location)
+        assert status.status_code == 200
+        assert status.get_json()['data']['status'] == 'APPLIED'
+
+        rejected = client.post(
+            '/api/v1/inventory/purchase', json={'product_id': 101, 'quantity': 1},
+            headers={'Prefer': 'respond-async', 'Idempotency-Key': 'k1'}
+        )
+        assert rejected.status_code == 400
@@ -0,0 +1,124 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import db.query_instrumentation as instrumentation
+from db.query_instrumentation import InstrumentedConnection, normalize_sql
+from metrics.registry import MetricsRegistry
+from middleware.error_handler import LogRateLimiter
+
+# -------------------- FIXTURES --------------------
+
+@pytest.fixture
+def raw_connection():
+    """Conexión del pool mockeada: un cursor para la consulta y otro para el EXPLAIN."""
+    query_cursor = MagicMock()
+    query_cursor.rowcount = 500
+    explain_cursor = MagicMock()
+    explain_cursor.fetchall.return_value = [{'table': 'inventory', 'type': 'range', 'key': 'product_id'}]
+    explain_context = MagicMock()
+    explain_context.__enter__.return_value = explain_cursor
+    connection = MagicMock()
+    connection.cursor.side_effect = [query_cursor, explain_context]
+    return connection, query_cursor, explain_cursor
+
+@pytest.fixture(autouse=True)
+def fresh_explain_limiter():
+    with patch.object(instrumentation, 'explain_limiter', LogRateLimiter(300)):
+        yield
+
+# -------------------- PRUEBAS --------------------
+
+def test_normalize_sql_collapses_in_lists_and_literals():
+    """Un IN de 3 o de 500 elementos comparte la misma forma normalizada."""
+    small = normalize_sql("SELECT *\n  FROM inventory WHERE product_id IN (%s, %s, %s)")
+    large = normalize_sql("SELECT * FROM inventory WHERE product_id IN (" + ", ".join(["%s"] * 500) + ")")
+    assert small == large == "SELECT * FROM inventory WHERE product_id IN (?+)"
+    assert normalize_sql("UPDATE inventory SET location = 'A1' WHERE id = 7") == "UPDATE inventory SET location = ? WHERE id = ?"
+    assert "WHEN ? THEN ? ... END" in normalize_sql("SET s = s + CASE product_id WHEN %s THEN %s WHEN %s THEN %s END")
+
+def test_fast_statement_is_not_logged(raw_connection):
+    """Por debajo del umbral solo se registran métricas."""
+    connection, _, _ = raw_connection
+    with patch.object(instrumentation, 'log_slow_query') as mock_log:
+        instrumented = InstrumentedConnection(connection, acquire_ms=1, threshold_ms=10_000)
+        with instrumented.cursor() as cursor:
+            cursor.execute("SELECT * FROM inventory WHERE product_id = %s", (101,))
+    mock_log.assert_not_called()
+
+def test_slow_select_logs_split_timings_and_explain_once_per_shape(raw_connection):
+    """Una SELECT lenta se loguea con tiempos de pool/ejecución y EXPLAIN limitado por forma."""
+    connection, query_cursor, explain_cursor = raw_connection
+    connection.cursor.side_effect = [query_cursor, MagicMock(__enter__=MagicMock(return_value=explain_cursor)), query_cursor]
+    params = tuple(range(500))
+    sql = "SELECT * FROM inventory WHERE product_id IN (" + ", ".join(["%s"] * 500) + ")"
+
+    with patch.object(instrumentation, 'log_slow_query') as mock_log:
+        instrumented = InstrumentedConnection(connection, acquire_ms=35.0, threshold_ms=0)
+        with instrumented.cursor() as cursor:
+            cursor.execute(sql, params)
+            cursor.execute(sql, params)
+        instrumented.commit()
+
+    second, first = (call.args[0] for call in mock_log.call_args_list)
+    assert first['sql'] == "SELECT * FROM inventory WHERE product_id IN (?+)"
+    assert first['param_count'] == 500 and first['rows'] == 500
+    assert first['acquire_ms'] == 35.0 and second['acquire_ms'] == 0.0
+    assert first['explain'] == [{'table': 'inventory', 'type': 'range', 'key': 'product_id'}]
+    assert 'explain' not in second
+    explain_cursor.execute.assert_called_once_with("EXPLAIN " + sql, params)
+
+def test_explain_waits_until_the_transaction_ends(raw_connection):
+    """El EXPLAIN no corre con los bloqueos de un SELECT ... FOR UPDATE tomados."""
+    connection, _, explain_cursor = raw_connection
+    sql = "SELECT id FROM purchase_outbox WHERE status = 'PENDING' FOR UPDATE"
+
+    with patch.object(instrumentation, 'log_slow_query') as mock_log:
+        instrumented = InstrumentedConnection(connection, acquire_ms=0, threshold_ms=0)
+        with instrumented.cursor() as cursor:
+            cursor.execute(sql)
+            explain_cursor.execute.assert_not_called()
+            mock_log.assert_not_called()
+        instrumented.close()
+
+    connection.close.assert_called_once()
+    explain_cursor.execute.assert_called_once_with("EXPLAIN " + sql, None)
+    assert mock_log.call_args.args[0]['explain'] == [{'table': 'inventory', 'type': 'range', 'key': 'product_id'}]
+
+def test_cursor_iterates_over_the_real_cursor(raw_connection):
+    connection, query_cursor, _ = raw_connection
+    query_cursor.__iter__.return_value = iter([{'id': 1}, {'id': 2}])
+
+    with InstrumentedConnection(connection, acquire_ms=0, threshold_ms=10_000).cursor() as cursor:
+        assert list(cursor) == [{'id': 1}, {'id': 2}]
+
+def test_slow_update_is_logged_without_explain_even_on_error(raw_connection):
+    """Las escrituras lentas (p. ej. esperando un lock) se reportan aunque fallen."""
+    connection, query_cursor, _ = raw_connection
+    query_cursor.execute.side_effect = Exception("Lock wait timeout exceeded")
+
+    with patch.object(instrumentation, 'log_slow_query') as mock_log:
+        instrumented = InstrumentedConnection(connection, acquire_ms=0, threshold_ms=0)
+        with pytest.raises(Exception, match="Lock wait timeout"):
+            with instrumented.cursor() as cursor:
+                cursor.execute("UPDATE inventory SET available_stock = available_stock - %s WHERE product_id = %s", (1, 101))
+
+    entry = mock_log.call_args.args[0]
+    assert entry['sql'].startswith("UPDATE inventory")
+    assert 'explain' not in entry
+    query_cursor.close.assert_called_once()
+
+def test_metrics_registry_renders_prometheus_text():
+    """El registro expone contadores e histogramas acumulativos en formato Prometheus."""
+    registry = MetricsRegistry()
+    registry.counter("slow_total", "Consultas lentas.").inc(operation="select")
+    histogram = registry.histogram("latency_seconds", "Latencia.", buckets=(0.1, 1.0))
+    histogram.observe(0.05, operation="select")
+    histogram.observe(0.5, operation="select")
+
+    text = registry.render()
+
+    assert 'slow_total{operation="select"} 1.0' in text
+    assert 'latency_seconds_bucket{operation="select",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{operation="select",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{operation="select"} 2' in text
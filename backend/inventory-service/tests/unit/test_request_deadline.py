@@ -0,0 +1,117 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from flask import Flask, jsonify
+
+from db.query_instrumentation import InstrumentedConnection
+from exceptions.api_exceptions import DeadlineExceededError
+from external_conections.products_services_integration import get_products_from_service
+from middleware.error_handler import register_error_handlers
+from middleware.request_deadline import (
+    check_deadline, outbound_timeout, register_request_deadline, remaining_seconds, set_deadline,
+    with_max_execution_time
+)
+
+# -------------------- FIXTURES --------------------
+
+@pytest.fixture(autouse=True)
+def clear_deadline():
+    set_deadline(None)
+    yield
+    set_deadline(None)
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    register_error_handlers(app)
+    register_request_deadline(app)
+
+    @app.route('/budget')
+    def budget():
+        return jsonify({'remaining': remaining_seconds()})
+
+    return app
+
+@pytest.fixture
+def products_env(monkeypatch):
+    monkeypatch.setenv('PRODUCTS_SERVICE_URL_INTERNAL', 'http://products:8000')
+    monkeypatch.setenv('PRODUCTS_API_KEY', 'key')
+
+# -------------------- PRUEBAS --------------------
+
+def test_header_sets_and_clamps_the_request_budget(app):
+    client = app.test_client()
+    with patch('middleware.request_deadline.REQUEST_TIMEOUT_MAX_SECONDS', 30):
+        short = client.get('/budget', headers={'X-Request-Timeout': '2'}).get_json()['remaining']
+        clamped = client.get('/budget', headers={'X-Request-Timeout': '600'}).get_json()['remaining']
+    assert 1 < short <= 2
+    assert 29 < clamped <= 30
+    # El deadline no sobrevive a la solicitud.
+    assert remaining_seconds() is None
+
+def test_invalid_header_returns_400(app):
+    response = app.test_client().get('/budget', headers={'X-Request-Timeout': 'abc'})
+    assert response.status_code == 400
+
+def test_check_deadline_raises_when_budget_is_spent():
+    check_deadline("probar")  # Sin deadline no hace nada
+    set_deadline(0)
+    with pytest.raises(DeadlineExceededError):
+        check_deadline("probar")
+
+def test_max_execution_time_hint_only_for_selects():
+    assert with_max_execution_time("SELECT * FROM inventory") == "SELECT * FROM inventory"
+    set_deadline(1.5)
+    hinted = with_max_execution_time("  select * FROM inventory")
+    assert hinted.startswith("SELECT /*+ MAX_EXECUTION_TIME(")
+    assert hinted.endswith(" * FROM inventory")
+    assert with_max_execution_time("UPDATE inventory SET version = 1") == "UPDATE inventory SET version = 1"
+
+def test_outbound_timeout_uses_the_smaller_budget():
+    assert outbound_timeout(5) == 5
+    set_deadline(0.5)
+    assert outbound_timeout(5) <= 0.5
+
+def test_cursor_refuses_statements_after_the_deadline():
+    raw_cursor = MagicMock()
+    connection = MagicMock()
+    connection.cursor.return_value = raw_cursor
+    set_deadline(0)
+    with pytest.raises(DeadlineExceededError):
+        InstrumentedConnection(connection, acquire_ms=0.0).cursor().execute("SELECT 1")
+    raw_cursor.execute.assert_not_called()
+
+def test_cursor_maps_mysql_execution_interrupted_to_504():
+    raw_cursor = MagicMock()
+    raw_cursor.execute.side_effect = Exception(3024, "Query execution was interrupted, maximum statement execution time exceeded")
+    connection = MagicMock()
+    connection.cursor.return_value = raw_cursor
+    set_deadline(10)
+    with pytest.raises(DeadlineExceededError) as excinfo:
+        InstrumentedConnection(connection, acquire_ms=0.0).cursor().execute("SELECT * FROM inventory")
+    assert excinfo.value.status_code == 504
+    assert "MAX_EXECUTION_TIME" in raw_cursor.execute.call_args[0][0]
+
+def test_products_call_propagates_remaining_budget(products_env):
+    session = MagicMock()
+    session.get.return_value.json.return_value = {'data': []}
+    session.get.return_value.status_code = 200
+    set_deadline(1)
+    with patch('external_conections.products_services_integration.get_http_session', return_value=session):
+        get_products_from_service()
+    kwargs = session.get.call_args.kwargs
+    assert kwargs['timeout'] <= 1
+    assert float(kwargs['headers']['X-Request-Timeout']) <= 1
+
+def test_products_timeout_after_deadline_is_504(products_env):
+    def slow_get(*args, **kwargs):
+        set_deadline(0)  # El presupuesto se agota mientras se espera la respuesta
+        raise requests.exceptions.ReadTimeout()
+
+    session = MagicMock()
+    session.get.side_effect = slow_get
+    with patch('external_conections.products_services_integration.get_http_session', return_value=session):
+        set_deadline(1)
+        with pytest.raises(DeadlineExceededError):
+            get_products_from_service()
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import Counter
+from unittest.mock import patch
+
+from flask import Flask
+
+import middleware.request_profiler as request_profiler
+from middleware.request_profiler import SamplingProfiler, collapse_stack, write_collapsed_stacks
+
+# -------------------- PRUEBAS DEL PERFILADOR --------------------
+
+def busy_work(seconds: float) -> None:
+    """Función con trabajo de CPU para que aparezca en las muestras."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+def test_sampling_profiler_collects_stacks_of_target_thread():
+    """Verifica que el perfilador acumula pilas del hilo registrado."""
+    profiler = SamplingProfiler(interval_seconds=0.001)
+
+    profiler.start(threading.get_ident())
+    busy_work(0.1)
+    stacks = profiler.stop(threading.get_ident())
+
+    assert sum(stacks.values()) > 0
+    assert any('busy_work' in stack for stack in stacks)
+
+def test_collapse_stack_orders_root_to_leaf():
+    """Verifica el formato collapsed-stack (raíz primero, hoja al final)."""
+    def leaf():
+        import sys
+        return collapse_stack(sys._getframe())
+
+    stack = leaf()
+
+    assert stack.split(';')[-1].startswith('test_collapse_stack_orders_root_to_leaf.<locals>.leaf')
+
+def test_write_collapsed_stacks_annotates_route(tmp_path):
+    """Verifica que el archivo .folded usa la ruta como marco raíz."""
+    with patch.object(request_profiler, 'PROFILING_OUTPUT_DIR', str(tmp_path)):
+        file_path = write_collapsed_stacks(Counter({'a;b': 3}), 'GET /api/v1/inventory/<int:product_id>', 12.5)
+
+    assert file_path is not None
+    with open(file_path) as f:
+        assert f.read() == 'GET /api/v1/inventory/<int:product_id>;a;b 3\n'
+
+def test_register_request_profiler_disabled_adds_no_hooks():
+    """Verifica que sin configuración no se registran hooks (costo cero)."""
+    app = Flask(__name__)
+    with patch.object(request_profiler, 'PROFILING_TOKEN', ''), patch.object(request_profiler, 'PROFILING_SAMPLE_RATE', 0):
+        request_profiler.register_request_profiler(app)
+
+    assert not app.before_request_funcs
+    assert not app.after_request_funcs
+
+def test_register_request_profiler_privileged_header(tmp_path):
+    """Verifica que el header privilegiado perfila la solicitud y escribe el archivo."""
+    app = Flask(__name__)
+
+    @app.route('/slow')
+    def slow():
+        busy_work(0.05)
+        return 'ok'
+
+    with patch.object(request_profiler, 'PROFILING_TOKEN', 'secret'), \
+         patch.object(request_profiler, 'PROFILING_SAMPLE_RATE', 0), \
+         patch.object(request_profiler, 'PROFILING_INTERVAL_MS', 1), \
+         patch.object(request_profiler, 'PROFILING_OUTPUT_DIR', str(tmp_path)):
+        request_profiler.register_request_profiler(app)
+        client = app.test_client()
+        unprofiled = client.get('/slow')
+        profiled = client.get('/slow', headers={'X-Profile-Token': 'secret'})
+
+    assert 'X-Profile-File' not in unprofiled.headers
+    assert (tmp_path / profiled.headers['X-Profile-File']).exists()
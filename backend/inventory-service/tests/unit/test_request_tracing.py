@@ -0,0 +1,105 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask, jsonify
+
+import middleware.request_tracing as tracing
+from db.query_instrumentation import InstrumentedConnection
+from exceptions.api_exceptions import NotFoundError
+from external_conections.products_services_integration import get_products_from_service
+from middleware.error_handler import register_error_handlers
+from middleware.request_tracing import (
+    FileSpanExporter, current_trace_id, parse_traceparent, register_request_tracing
+)
+
+INCOMING_TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+INCOMING_PARENT_ID = '00f067aa0ba902b7'
+
+# -------------------- FIXTURES --------------------
+
+@pytest.fixture
+def exporter(tmp_path):
+    exporter = FileSpanExporter(str(tmp_path))
+    with patch.object(tracing, 'span_exporter', exporter):
+        yield exporter
+
+@pytest.fixture
+def app(exporter, monkeypatch):
+    monkeypatch.setenv('PRODUCTS_SERVICE_URL_INTERNAL', 'http://products:8000')
+    monkeypatch.setenv('PRODUCTS_API_KEY', 'key')
+    app = Flask(__name__)
+    register_error_handlers(app)
+    register_request_tracing(app)
+    session = MagicMock()
+    session.get.return_value.json.return_value = {'data': []}
+    session.get.return_value.status_code = 200
+    app.config['products_session'] = session
+
+    @app.route('/work')
+    def work():
+        raw_connection = MagicMock()
+        raw_connection.cursor.return_value.rowcount = 1
+        with InstrumentedConnection(raw_connection, acquire_ms=0.0).cursor() as cursor:
+            cursor.execute("SELECT * FROM inventory WHERE product_id = %s", (1,))
+        with patch('external_conections.products_services_integration.get_http_session', return_value=session):
+            get_products_from_service()
+        return jsonify({'trace_id': current_trace_id()})
+
+    @app.route('/missing')
+    def missing():
+        raise NotFoundError('Inventario', 7)
+
+    return app
+
+def read_spans(exporter):
+    spans = []
+    for path in sorted(os.listdir(exporter.output_dir)):
+        with open(os.path.join(exporter.output_dir, path)) as f:
+            spans.extend(json.loads(line) for line in f)
+    return spans
+
+# -------------------- PRUEBAS --------------------
+
+def test_parse_traceparent_validates_format():
+    parsed = parse_traceparent(f'00-{INCOMING_TRACE_ID}-{INCOMING_PARENT_ID}-01')
+    assert parsed == {'trace_id': INCOMING_TRACE_ID, 'parent_id': INCOMING_PARENT_ID, 'sampled': True}
+    assert parse_traceparent('00-' + '0' * 32 + f'-{INCOMING_PARENT_ID}-01') is None
+    assert parse_traceparent('basura') is None
+    assert parse_traceparent(None) is None
+
+def test_sampled_request_exports_root_and_child_spans(app, exporter):
+    traceparent = f'00-{INCOMING_TRACE_ID}-{INCOMING_PARENT_ID}-01'
+    response = app.test_client().get('/work', headers={'traceparent': traceparent})
+    assert response.get_json()['trace_id'] == INCOMING_TRACE_ID
+
+    spans = {span['name']: span for span in read_spans(exporter)}
+    root = spans['GET /work']
+    query = spans['mysql.query']
+    products = spans['products-service GET /api/v1/productos']
+    assert root['parent_span_id'] == INCOMING_PARENT_ID
+    assert root['attributes']['http.status_code'] == 200
+    assert query['parent_span_id'] == products['parent_span_id'] == root['span_id']
+    assert query['attributes']['db.statement'] == "SELECT * FROM inventory WHERE product_id = ?"
+
+    # El products-service recibe el span de la llamada como padre.
+    outbound = app.config['products_session'].get.call_args.kwargs['headers']['traceparent']
+    assert outbound == f"00-{INCOMING_TRACE_ID}-{products['span_id']}-01"
+
+def test_unsampled_request_propagates_but_exports_nothing(app, exporter):
+    with patch.object(tracing, 'TRACING_SAMPLE_RATIO', 0):
+        response = app.test_client().get('/work')
+    trace_id = response.get_json()['trace_id']
+    assert len(trace_id) == 32
+    assert read_spans(exporter) == []
+    outbound = app.config['products_session'].get.call_args.kwargs['headers']['traceparent']
+    assert outbound.startswith(f"00-{trace_id}-") and outbound.endswith("-00")
+
+def test_error_log_includes_trace_id(app):
+    traceparent = f'00-{INCOMING_TRACE_ID}-{INCOMING_PARENT_ID}-00'
+    with patch('middleware.error_handler.write_structured_log') as mock_write_log:
+        response = app.test_client().get('/missing', headers={'traceparent': traceparent})
+    assert response.status_code == 404
+    assert mock_write_log.call_args[0][0]['trace_id'] == INCOMING_TRACE_ID
+    assert current_trace_id() is None
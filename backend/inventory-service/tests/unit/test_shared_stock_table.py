@@ -0,0 +1,112 @@
+import multiprocessing
+from unittest.mock import patch
+
+import pytest
+
+import cache.shared_stock_table as shared_stock_table
+from cache.negative_lookup_cache import NegativeLookupCache
+from cache.shared_stock_table import ABSENT_VERSION, SharedStockTable
+from models.memory_inventory_table import InMemoryInventoryRepository
+from models.shared_stock_repository import SharedStockRepository
+from exceptions.api_exceptions import NotFoundError
+from logic.inventory_logic import InventoryService
+
+# -------------------- FIXTURES --------------------
+
+@pytest.fixture
+def table_path(tmp_path):
+    return str(tmp_path / "shared-stock")
+
+@pytest.fixture
+def table(table_path):
+    table = SharedStockTable(table_path, capacity=1000, ttl_seconds=30)
+    yield table
+    table.close()
+
+class CountingRepository(InMemoryInventoryRepository):
+    """Repositorio en memoria que cuenta las lecturas de stock que llegan a la "base de datos"."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.record_reads = 0
+
+    def get_inventory_records_by_product_ids(self, product_ids):
+        self.record_reads += 1
+        return super().get_inventory_records_by_product_ids(product_ids)
+
+def write_from_other_worker(path, product_id, stock, version):
+    SharedStockTable(path, capacity=1000, ttl_seconds=30).put(product_id, stock, version)
+
+# -------------------- PRUEBAS --------------------
+
+def test_older_versions_never_overwrite_newer_ones(table):
+    assert table.get(7) is None
+    assert table.put(7, 10, version=3) is True
+    assert table.put(7, 12, version=2) is False  # Lectura lenta de MySQL anterior a la escritura
+    assert table.get(7) == (10, 3)
+    assert table.put(7, 9, version=4) is True
+    assert table.put(8, 5, version=0) is True and table.put_absent(8) is False
+
+    table.discard(7)
+    assert table.get(7) is None
+    assert table.put_absent(7) is True and table.get(7) == (0, ABSENT_VERSION)
+    assert table.put(5000, 1, version=1) is False  # Fuera de la capacidad
+
+def test_entries_expire_after_ttl(table):
+    table.put(7, 10, version=1)
+    with patch.object(shared_stock_table, '_now_ms', return_value=shared_stock_table._now_ms() + 31000):
+        assert table.get(7) is None
+
+def test_writes_from_another_process_are_visible(table, table_path):
+    table.put(7, 10, version=1)  # Crea el archivo antes del fork
+    worker = multiprocessing.get_context('fork').Process(
+        target=write_from_other_worker, args=(table_path, 7, 4, 2)
+    )
+    worker.start()
+    worker.join(10)
+    assert worker.exitcode == 0
+    assert table.get(7) == (4, 2)
+
+def test_capacity_mismatch_is_rejected(table, table_path):
+    table.open()
+    with pytest.raises(ValueError):
+        SharedStockTable(table_path, capacity=10, ttl_seconds=30).open()
+
+def test_repository_serves_hot_reads_from_the_shared_table(table, table_path):
+    repository = CountingRepository()
+    repository.create_inventory(101, 5)
+    worker_1 = SharedStockRepository(repository, table)
+    worker_2 = SharedStockRepository(repository, SharedStockTable(table_path, capacity=1000, ttl_seconds=30))
+
+    assert worker_2.get_stock_map([101, 102]) == {101: 5}
+    reads = repository.record_reads
+    assert worker_2.get_stock_map([101, 102]) == {101: 5}
+    assert repository.record_reads == reads  # Hit, incluido el producto sin inventario
+
+    # Una compra en el worker 1 se ve de inmediato en el worker 2, sin consultar la base de datos.
+    assert worker_1.decrease_inventory_stock(101, 2) == 1
+    reads = repository.record_reads
+    assert worker_2.get_stock_map([101]) == {101: 3}
+    assert repository.record_reads == reads
+
+    worker_1.delete_inventory(101)
+    worker_1.create_inventory(101, 8)  # La versión reinicia al recrear la fila
+    assert worker_2.get_stock_map([101]) == {101: 8}
+    assert worker_2.get_inventory_by_product_id(101)["available_stock"] == 8  # Delegado
+
+def test_negative_cache_sees_inventory_created_by_another_worker(table, table_path):
+    """Un 404 cacheado en un worker no sobrevive a la creación del inventario en otro."""
+    repository = InMemoryInventoryRepository()
+    worker_1 = InventoryService(SharedStockRepository(repository, table), NegativeLookupCache(30, 100))
+    worker_2 = InventoryService(
+        SharedStockRepository(repository, SharedStockTable(table_path, capacity=1000, ttl_seconds=30)),
+        NegativeLookupCache(30, 100)
+    )
+    with pytest.raises(NotFoundError):
+        worker_2.get_inventory_for_product(101)
+    assert worker_2.negative_cache.contains(101)
+
+    worker_1.create_new_inventory(101, 5)
+
+    assert worker_2.get_inventory_for_product(101)["available_stock"] == 5
+    assert not worker_2.negative_cache.contains(101)
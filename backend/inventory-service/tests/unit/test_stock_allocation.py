@@ -0,0 +1,75 @@
+import pytest
+
+from models.stock_allocation import (
+    LocationStock, allocate_largest, allocate_nearest, allocate_split, get_allocation_strategy, plan_location_changes,
+    seed_location_code
+)
+
+# -------------------- FIXTURES --------------------
+
+LOCATIONS = [
+    LocationStock('MED', 30, 2),
+    LocationStock('BOG', 6, 1),
+    LocationStock('CAL', 4, 3),
+]
+
+# -------------------- ESTRATEGIAS --------------------
+
+def test_nearest_prefers_a_single_location_close_to_dispatch():
+    assert allocate_nearest(LOCATIONS, 5) == [('BOG', 5)]
+    assert allocate_nearest(LOCATIONS, 10) == [('MED', 10)]  # BOG no cubre todo
+    assert allocate_nearest(LOCATIONS, 38) == [('BOG', 6), ('MED', 30), ('CAL', 2)]
+    assert allocate_nearest(LOCATIONS, 41) is None
+
+def test_largest_takes_from_the_fullest_location_first():
+    assert allocate_largest(LOCATIONS, 5) == [('MED', 5)]
+    assert allocate_largest(LOCATIONS, 33) == [('MED', 30), ('BOG', 3)]
+    assert allocate_largest(LOCATIONS, 41) is None
+
+@pytest.mark.parametrize('quantity', [1, 7, 20, 39, 40])
+def test_split_is_proportional_and_never_exceeds_a_location(quantity):
+    allocation = allocate_split(LOCATIONS, quantity)
+
+    stock = {location.location_code: location.available_stock for location in LOCATIONS}
+    assert sum(taken for _, taken in allocation) == quantity
+    assert all(0 < taken <= stock[code] for code, taken in allocation)
+
+def test_split_rounding_goes_to_the_nearest_locations():
+    assert allocate_split(LOCATIONS, 7) == [('BOG', 2), ('MED', 5)]  # 1 + 5 + 0 y sobra 1
+    assert allocate_split(LOCATIONS, 41) is None
+
+def test_unknown_strategy_is_rejected():
+    assert get_allocation_strategy('split') is allocate_split
+    with pytest.raises(ValueError):
+        get_allocation_strategy('cheapest')
+
+# -------------------- PLAN POR FILA --------------------
+
+def test_plan_translates_product_changes_to_location_rows():
+    locations = {101: [(1, LocationStock('BOG', 2, 1)), (2, LocationStock('MED', 9, 2))]}
+
+    row_deltas, allocations = plan_location_changes(locations, [(101, -5), (102, -1)], allocate_nearest)
+    assert row_deltas == {2: -5}
+    assert allocations == [[('MED', 5)], []]  # 102 no tiene ubicaciones
+
+    row_deltas, allocations = plan_location_changes(locations, [(101, 4)], allocate_nearest)
+    assert (row_deltas, allocations) == ({1: 4}, [[]])
+
+def test_plan_allocates_each_change_on_the_running_location_stock():
+    locations = {101: [(1, LocationStock('BOG', 6, 1)), (2, LocationStock('MED', 9, 2))]}
+
+    row_deltas, allocations = plan_location_changes(locations, [(101, -5), (101, -5)], allocate_nearest)
+
+    # La segunda compra ya no cabe en BOG (queda 1): se despacha entera desde MED.
+    assert allocations == [[('BOG', 5)], [('MED', 5)]]
+    assert row_deltas == {1: -5, 2: -5}
+
+def test_plan_fails_when_locations_do_not_cover_the_total():
+    locations = {101: [(1, LocationStock('BOG', 2, 1))]}
+    with pytest.raises(ValueError):
+        plan_location_changes(locations, [(101, -3)], allocate_nearest)
+
+def test_seed_location_uses_the_inventory_location_or_the_default():
+    assert seed_location_code('Bodega Norte') == 'Bodega Norte'
+    assert seed_location_code(None) == 'DEFAULT'
+    assert len(seed_location_code('x' * 80)) == 50
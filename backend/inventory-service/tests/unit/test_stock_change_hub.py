@@ -0,0 +1,151 @@
+import datetime
+import pytest
+from unittest.mock import MagicMock
+
+from logic.stock_change_hub import StockChangeHub, StockSubscription, iter_stock_events, format_sse
+from exceptions.api_exceptions import ServiceUnavailableError
+from models.memory_inventory_table import InMemoryInventoryRepository
+
+T0 = datetime.datetime(2025, 11, 13, 10, 0, 0)
+T1 = datetime.datetime(2025, 11, 13, 10, 0, 5)
+
+# -------------------- FIXTURES --------------------
+
+@pytest.fixture
+def mock_repository():
+    repository = MagicMock()
+    repository.get_latest_inventory_update.return_value = T0
+    repository.get_inventory_changes_since.return_value = []
+    return repository
+
+@pytest.fixture
+def hub(mock_repository):
+    return StockChangeHub(mock_repository, poll_interval_seconds=60, max_subscribers=2)
+
+def _register(hub, product_ids):
+    """Registra una suscripción sin arrancar el hilo observador (las pruebas llaman a poll_once)."""
+    subscription = StockSubscription(frozenset(product_ids))
+    hub._subscriptions.add(subscription)
+    for product_id in product_ids:
+        hub._by_product.setdefault(product_id, set()).add(subscription)
+    return subscription
+
+# -------------------- PRUEBAS --------------------
+
+def test_poll_once_fans_out_only_to_interested_subscribers(hub, mock_repository):
+    """Un cambio llega solo a las suscripciones de ese producto, con una sola consulta compartida."""
+    sub_101 = _register(hub, [101])
+    sub_102 = _register(hub, [102])
+    mock_repository.get_inventory_changes_since.return_value = [
+        {'product_id': 101, 'available_stock': 4, 'version': 2, 'last_inventory_update': T1},
+    ]
+
+    hub.poll_once()
+
+    mock_repository.get_inventory_changes_since.assert_called_once_with(T0, 0, hub.page_size)
+    assert sub_101.wait(0) == [{'product_id': 101, 'available_stock': 4, 'version': 2}]
+    assert sub_102.wait(0) == []
+    assert hub._since == T1
+
+def test_poll_once_pages_through_a_second_with_more_rows_than_the_page(mock_repository):
+    """Más filas que `page_size` en un mismo segundo: el keyset por product_id sigue avanzando."""
+    repository = InMemoryInventoryRepository()
+    for product_id in range(101, 108):
+        repository.create_inventory(product_id, 5)
+    hub = StockChangeHub(repository, poll_interval_seconds=60, max_subscribers=2, page_size=3)
+    subscription = _register(hub, range(101, 108))
+    hub._since = T0
+    for record in repository._inventory.values():
+        record["last_inventory_update"] = T1
+
+    hub.poll_once()
+
+    assert sorted(change['product_id'] for change in subscription.wait(0)) == list(range(101, 108))
+    assert hub._since == T1
+
+def test_poll_once_rereads_the_late_commit_window(mock_repository):
+    """Un commit tardío con fecha anterior a la marca se publica si cae dentro de la ventana."""
+    hub = StockChangeHub(mock_repository, poll_interval_seconds=60, max_subscribers=2, late_commit_seconds=10)
+    subscription = _register(hub, [101])
+    hub._since = T1
+    late_row = {'product_id': 101, 'available_stock': 4, 'version': 2, 'last_inventory_update': T0}
+    mock_repository.get_inventory_changes_since.return_value = [late_row]
+
+    hub.poll_once()
+
+    mock_repository.get_inventory_changes_since.assert_called_once_with(
+        T1 - datetime.timedelta(seconds=10), 0, hub.page_size
+    )
+    assert subscription.wait(0) == [{'product_id': 101, 'available_stock': 4, 'version': 2}]
+    assert hub._since == T1
+
+def test_duplicate_versions_are_not_republished(hub, mock_repository):
+    """La resolución de segundos devuelve filas repetidas; la versión evita reenviarlas."""
+    subscription = _register(hub, [101])
+    row = {'product_id': 101, 'available_stock': 4, 'version': 2, 'last_inventory_update': T1}
+    mock_repository.get_inventory_changes_since.return_value = [row]
+
+    hub.poll_once()
+    subscription.wait(0)
+    hub.poll_once()
+
+    assert subscription.wait(0) == []
+
+def test_slow_subscriber_keeps_only_latest_change(hub):
+    """Backpressure: los cambios pendientes se coalescen por producto."""
+    subscription = _register(hub, [101])
+
+    for version in range(1, 50):
+        hub.publish({'product_id': 101, 'available_stock': 100 - version, 'version': version})
+
+    assert subscription.wait(0) == [{'product_id': 101, 'available_stock': 51, 'version': 49}]
+
+def test_subscribe_enforces_max_subscribers(hub):
+    """Superado el máximo de suscriptores se responde 503."""
+    first = hub.subscribe([101])
+    second = hub.subscribe([102])
+
+    with pytest.raises(ServiceUnavailableError):
+        hub.subscribe([103])
+
+    hub.unsubscribe(first)
+    hub.unsubscribe(second)
+    assert hub._by_product == {}
+
+def test_iter_stock_events_snapshot_heartbeat_and_unsubscribe(hub):
+    """El flujo envía retry, snapshot, heartbeat y cambios, y libera la suscripción al cerrarse."""
+    subscription = _register(hub, [101])
+    events = iter_stock_events(hub, subscription, [{'product_id': 101, 'available_stock': 5, 'version': 1}], 0.01)
+
+    assert next(events) == "retry: 10\n\n"
+    assert next(events).startswith("event: snapshot\n")
+    assert next(events) == ": heartbeat\n\n"
+
+    hub.publish({'product_id': 101, 'available_stock': 4, 'version': 2})
+    assert next(events) == format_sse({'product_id': 101, 'available_stock': 4, 'version': 2}, event="stock", event_id="101:2")
+
+    events.close()
+    assert subscription.closed
+    assert subscription not in hub._subscriptions
+
+def test_recreated_row_is_republished(hub):
+    """Una fila eliminada y recreada reinicia `version`: su nuevo estado debe publicarse."""
+    subscription = _register(hub, [101])
+    hub.publish({'product_id': 101, 'available_stock': 4, 'version': 7})
+    subscription.wait(0)
+
+    hub.publish({'product_id': 101, 'available_stock': 50, 'version': 0})
+
+    assert subscription.wait(0) == [{'product_id': 101, 'available_stock': 50, 'version': 0}]
+
+def test_last_versions_only_tracks_subscribed_products(hub):
+    """Los productos sin suscriptores no dejan estado: el mapa no crece con el catálogo."""
+    for product_id in range(1000):
+        hub.publish({'product_id': product_id, 'available_stock': 1, 'version': 1})
+    assert hub._last_versions == {}
+
+    subscription = hub.subscribe([101])
+    hub.publish({'product_id': 101, 'available_stock': 1, 'version': 1})
+    assert 101 in hub._last_versions
+    hub.unsubscribe(subscription)
+    assert hub._last_versions == {}
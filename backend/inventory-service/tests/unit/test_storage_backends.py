@@ -0,0 +1,357 @@
+import datetime
+import threading
+
+import pymysql.err
+import pytest
+
+from models.memory_inventory_table import InMemoryInventoryRepository
+from models.sqlite_inventory_table import SQLiteInventoryRepository
+from models.repository_factory import create_inventory_repository
+from models.stock_allocation import LocatedStockError, allocate_nearest
+
+# -------------------- FIXTURES --------------------
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def repository(request, tmp_path):
+    """Ejecuta el mismo contrato sobre cada backend embebido."""
+    if request.param == 'memory':
+        return InMemoryInventoryRepository()
+    return SQLiteInventoryRepository(str(tmp_path / 'inventory.db'))
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def alerting_repository(request, tmp_path):
+    """Backends embebidos con alertas de stock bajo (umbral por defecto 10)."""
+    if request.param == 'memory':
+        return InMemoryInventoryRepository(low_stock_threshold=10)
+    return SQLiteInventoryRepository(str(tmp_path / 'inventory.db'), low_stock_threshold=10)
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def warehouse_repository(request, tmp_path):
+    """Backends embebidos con stock por ubicación y estrategia `nearest`."""
+    if request.param == 'memory':
+        return InMemoryInventoryRepository(allocation_strategy=allocate_nearest)
+    return SQLiteInventoryRepository(str(tmp_path / 'inventory.db'), allocation_strategy=allocate_nearest)
+
+# -------------------- CONTRATO DEL REPOSITORIO --------------------
+
+def test_create_and_read(repository):
+    inventory_id = repository.create_inventory(101, 50, 'A1')
+
+    record = repository.get_inventory_by_product_id(101)
+    assert record['id'] == inventory_id
+    assert (record['available_stock'], record['location'], record['version']) == (50, 'A1', 0)
+    assert isinstance(record['last_inventory_update'], datetime.datetime)
+    assert repository.get_inventory_by_product_id(999) is None
+
+def test_duplicate_product_id_raises_1062(repository):
+    repository.create_inventory(101, 50)
+
+    with pytest.raises(pymysql.err.IntegrityError) as exc_info:
+        repository.create_inventory(101, 10)
+    assert exc_info.value.args[0] == 1062
+
+def test_conditional_decrement_never_goes_negative(repository):
+    repository.create_inventory(101, 5)
+
+    assert repository.decrease_inventory_stock(101, 3) == 1
+    assert repository.decrease_inventory_stock(101, 3) == 0
+    assert repository.decrease_inventory_stock(999, 1) == 0
+    record = repository.get_inventory_by_product_id(101)
+    assert (record['available_stock'], record['version']) == (2, 1)
+
+def test_concurrent_decrements_sell_exactly_the_stock(repository):
+    repository.create_inventory(101, 20)
+    sold = []
+
+    def buyer():
+        for _ in range(10):
+            sold.append(repository.decrease_inventory_stock(101, 1))
+
+    threads = [threading.Thread(target=buyer) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(sold) == 20
+    assert repository.get_inventory_by_product_id(101)['available_stock'] == 0
+
+def test_update_with_expected_version(repository):
+    repository.create_inventory(101, 5)
+
+    assert repository.update_inventory_stock(101, 9, expected_version=1) == 0
+    assert repository.update_inventory_stock(101, 9, expected_version=0) == 1
+    assert repository.get_inventory_by_product_id(101)['version'] == 1
+
+def test_idempotent_decrement_registers_key_once(repository):
+    repository.create_inventory(101, 5)
+    body = {'product_id': 101, 'quantity': 2}
+
+    assert repository.decrease_inventory_stock_idempotent(101, 2, 'key-1', 'hash', 200, body, 60) == 1
+    with pytest.raises(pymysql.err.IntegrityError) as exc_info:
+        repository.decrease_inventory_stock_idempotent(101, 2, 'key-1', 'hash', 200, body, 60)
+    assert exc_info.value.args[0] == 1062
+
+    assert repository.get_idempotency_record('key-1')['response_body'] == body
+    # Sin stock suficiente la llave no queda registrada.
+    assert repository.decrease_inventory_stock_idempotent(101, 10, 'key-2', 'hash', 200, body, 60) == 0
+    assert repository.get_idempotency_record('key-2') is None
+    assert repository.get_inventory_by_product_id(101)['available_stock'] == 3
+
+def test_apply_stock_adjustments(repository):
+    repository.create_inventory(101, 5)
+    repository.create_inventory(102, 0)
+
+    results = repository.apply_stock_adjustments([(101, 10), (102, -1), (101, -12), (999, 3)])
+
+    assert [r['status'] for r in results] == ['APPLIED', 'INSUFFICIENT_STOCK', 'APPLIED', 'NOT_FOUND']
+    assert repository.get_inventory_by_product_id(101)['available_stock'] == 3
+    assert repository.get_inventory_by_product_id(102)['version'] == 0
+
+def test_apply_stock_adjustments_rejects_overflow(repository):
+    repository.create_inventory(101, 4294967290)
+
+    results = repository.apply_stock_adjustments([(101, 10), (101, 5)])
+
+    assert [r['status'] for r in results] == ['OUT_OF_RANGE', 'APPLIED']
+    assert repository.get_inventory_by_product_id(101)['available_stock'] == 4294967295
+
+def test_changes_since_and_delete(repository):
+    repository.create_inventory(101, 5)
+    latest = repository.get_latest_inventory_update()
+
+    changes = repository.get_inventory_changes_since(latest)
+    assert [c['product_id'] for c in changes] == [101]
+
+    assert repository.delete_inventory(101) == 1
+    assert repository.delete_inventory(101) == 0
+    assert repository.get_inventory_by_product_ids([101]) == []
+
+def test_timestamps_are_utc(repository):
+    """Memoria y SQLite (CURRENT_TIMESTAMP) guardan UTC sin zona: los backends son intercambiables."""
+    before = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, microsecond=0)
+    repository.create_inventory(101, 5)
+
+    latest = repository.get_latest_inventory_update()
+
+    assert before <= latest <= before + datetime.timedelta(seconds=5)
+
+def test_changes_since_pages_by_keyset(repository):
+    """Las páginas continúan tras la última fila leída aunque compartan el segundo."""
+    for product_id in range(101, 106):
+        repository.create_inventory(product_id, 5)
+    since, after_product_id, seen = datetime.datetime(1970, 1, 1), 0, []
+
+    while True:
+        page = repository.get_inventory_changes_since(since, after_product_id, limit=2)
+        seen.extend(c['product_id'] for c in page)
+        if len(page) < 2:
+            break
+        since, after_product_id = page[-1]['last_inventory_update'], page[-1]['product_id']
+
+    assert sorted(seen) == list(range(101, 106))
+    assert len(seen) == 5
+
+def test_watermark_changes_with_every_write(repository):
+    repository.create_inventory(101, 5)
+    repository.create_inventory(102, 5)
+    seen = [repository.get_inventory_watermark()]
+
+    repository.decrease_inventory_stock(101, 1)
+    seen.append(repository.get_inventory_watermark())
+    repository.delete_inventory(102)  # Mismo segundo, sin cambio de stock en las demás filas
+    seen.append(repository.get_inventory_watermark())
+    repository.create_inventory(103, 5)  # Mismo conteo y versión que antes del DELETE
+    seen.append(repository.get_inventory_watermark())
+
+    assert len(set(seen)) == len(seen)
+
+def test_stock_page_is_ordered_by_product_id(repository):
+    for product_id, stock in ((103, 7), (101, 5), (102, 0)):
+        repository.create_inventory(product_id, stock)
+
+    assert repository.get_stock_page(2, 0) == ([(101, 5), (102, 0)], 3)
+    assert repository.get_stock_page(2, 2) == ([(103, 7)], 3)
+
+def test_factory_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        create_inventory_repository('oracle')
+    assert isinstance(create_inventory_repository('memory'), InMemoryInventoryRepository)
+
+def test_sqlite_constructor_keeps_no_connection(tmp_path):
+    """Con preload_app el constructor corre en el master: no debe quedar una conexión que herede el worker."""
+    repository = SQLiteInventoryRepository(str(tmp_path / 'inventory.db'))
+    assert getattr(repository._local, 'connection', None) is None
+
+    repository.create_inventory(101, 5)  # El esquema ya existe para la primera conexión real
+    assert repository.get_stock_map([101]) == {101: 5}
+
+def test_compact_batch_reads(repository):
+    repository.create_inventory(101, 5, 'A1')
+    repository.create_inventory(102, 7)
+
+    assert repository.get_stock_map([101, 102, 999]) == {101: 5, 102: 7}
+    records = sorted(repository.get_inventory_records_by_product_ids([101, 102]), key=lambda r: r.product_id)
+    assert [(r.product_id, r.available_stock, r.location) for r in records] == [(101, 5, 'A1'), (102, 7, None)]
+    assert dict(records[0]) == repository.get_inventory_by_product_id(101)
+
+def test_purchase_outbox_drains_partition_in_order(repository):
+    repository.create_inventory(101, 5)
+    repository.enqueue_purchase('t1', 101, 3, 1)
+    repository.enqueue_purchase('t2', 101, 3, 1)
+    repository.enqueue_purchase('t3', 999, 1, 1)
+    repository.enqueue_purchase('t4', 102, 1, 0)
+
+    results = repository.process_purchase_batch(1, 10)
+
+    assert [(r['tracking_id'], r['status']) for r in results] == [
+        ('t1', 'APPLIED'), ('t2', 'INSUFFICIENT_STOCK'), ('t3', 'NOT_FOUND')
+    ]
+    assert repository.get_inventory_by_product_id(101)['available_stock'] == 2
+    assert repository.get_purchase_request('t2')['status'] == 'INSUFFICIENT_STOCK'
+    assert repository.get_purchase_request('t4')['status'] == 'PENDING'
+    assert repository.process_purchase_batch(1, 10) == []
+
+def test_threshold_crossings_are_recorded_once(alerting_repository):
+    repository = alerting_repository
+    repository.create_inventory(101, 50)
+    repository.create_inventory(102, 3)  # Nace por debajo del umbral
+
+    repository.decrease_inventory_stock(101, 30)  # 20: sin cruce
+    repository.decrease_inventory_stock(101, 12)  # 8: cruza hacia abajo
+    repository.decrease_inventory_stock(101, 1)   # 7: sigue abajo, sin alerta nueva
+    repository.update_inventory_stock(101, 40)    # Reposición
+    repository.apply_stock_adjustments([(102, 1), (101, -35)])
+    assert repository.set_reorder_threshold(101, 2) == 1  # 5 >= 2: vuelve a estar bien
+    assert repository.set_reorder_threshold(999, 2) == 0
+
+    alerts = repository.get_stock_alerts(0, 100)
+    assert [(a['product_id'], a['kind'], a['available_stock'], a['threshold']) for a in alerts] == [
+        (102, 'LOW_STOCK', 3, 10),
+        (101, 'LOW_STOCK', 8, 10),
+        (101, 'RESTOCKED', 40, 10),
+        (101, 'LOW_STOCK', 5, 10),
+        (101, 'RESTOCKED', 5, 2),
+    ]
+    assert [a['id'] for a in repository.get_stock_alerts(alerts[2]['id'], 2)] == [a['id'] for a in alerts[3:5]]
+
+def test_thresholds_are_ignored_when_alerts_are_disabled(repository):
+    repository.create_inventory(101, 1)
+    repository.decrease_inventory_stock(101, 1)
+    assert repository.get_stock_alerts(0, 100) == []
+
+def stock_by_location(repository, product_id):
+    return {row['location_code']: row['available_stock'] for row in repository.get_locations(product_id)}
+
+def test_location_stock_keeps_the_product_total(warehouse_repository):
+    repository = warehouse_repository
+    repository.create_inventory(101, 0)
+    repository.create_inventory(102, 7)  # Sin ubicaciones: solo el total
+
+    assert repository.set_location_stock(101, 'BOG', 5, priority=1) == 1
+    assert repository.set_location_stock(101, 'MED', 20, priority=2) == 1
+    assert repository.set_location_stock(999, 'BOG', 5) == 0
+    assert repository.get_stock_map([101])[101] == 25  # El total pasa a ser la suma
+
+    assert repository.allocate_stock(101, 4) == [('BOG', 4)]
+    assert repository.allocate_stock(101, 3) == [('MED', 3)]  # BOG ya no alcanza sola
+    assert repository.allocate_stock(101, 19) is None
+    assert repository.allocate_stock(101, 18) == [('BOG', 1), ('MED', 17)]
+    assert repository.allocate_stock(102, 2) == []
+    assert repository.allocate_stock(999, 1) is None
+
+    repository.apply_stock_adjustments([(101, 6), (101, -1)])  # Ingreso neto a la más cercana
+    assert stock_by_location(repository, 101) == {'BOG': 5, 'MED': 0}
+    assert repository.get_stock_map([101, 102]) == {101: 5, 102: 5}
+
+def test_first_location_keeps_the_existing_stock(warehouse_repository):
+    repository = warehouse_repository
+    repository.create_inventory(101, 100)
+    repository.create_inventory(102, 40, location='Bodega Norte')
+
+    repository.set_location_stock(101, 'A', 30)
+    repository.set_location_stock(102, 'Bodega Norte', 10)
+
+    assert stock_by_location(repository, 101) == {'A': 30, 'DEFAULT': 100}
+    assert stock_by_location(repository, 102) == {'Bodega Norte': 10}  # La semilla se reemplaza
+    assert repository.get_stock_map([101, 102]) == {101: 130, 102: 10}
+
+def test_purchase_allocations_are_stored_for_replays_and_async_status(warehouse_repository):
+    repository = warehouse_repository
+    repository.create_inventory(101, 0)
+    repository.set_location_stock(101, 'BOG', 3, priority=1)
+    repository.set_location_stock(101, 'MED', 10, priority=2)
+
+    body = {"product_id": 101}
+    assert repository.allocate_stock_idempotent(101, 2, 'key-1', 'hash', 200, body, 60) == [('BOG', 2)]
+    assert repository.get_idempotency_record('key-1')['response_body'] == {
+        "product_id": 101, "allocations": [{"location_code": "BOG", "quantity": 2}]
+    }
+    assert body == {"product_id": 101}
+
+    repository.enqueue_purchase('t1', 101, 4, 0)
+    repository.enqueue_purchase('t2', 101, 1, 0)
+    repository.enqueue_purchase('t3', 101, 50, 0)
+    outcomes = repository.process_purchase_batch(0, 10)
+
+    assert [outcome['allocations'] for outcome in outcomes] == [
+        [{"location_code": "MED", "quantity": 4}], [{"location_code": "BOG", "quantity": 1}], None
+    ]
+    assert repository.get_purchase_request('t1')['allocations'] == [{"location_code": "MED", "quantity": 4}]
+    assert repository.get_purchase_request('t3')['allocations'] is None
+
+def test_every_decrement_path_draws_from_locations(warehouse_repository):
+    repository = warehouse_repository
+    repository.create_inventory(101, 0)
+    repository.set_location_stock(101, 'BOG', 3, priority=1)
+    repository.set_location_stock(101, 'MED', 10, priority=2)
+
+    assert repository.decrease_inventory_stock(101, 2) == 1
+    assert repository.decrease_inventory_stock_idempotent(101, 4, 'key-1', 'hash', 200, {}, 60) == 1
+    repository.enqueue_purchase('t1', 101, 5, 0)
+    repository.process_purchase_batch(0, 10)
+
+    assert stock_by_location(repository, 101) == {'BOG': 1, 'MED': 1}
+    assert repository.get_inventory_by_product_id(101)['available_stock'] == 2
+
+def test_absolute_stock_update_is_rejected_once_located(warehouse_repository):
+    repository = warehouse_repository
+    repository.create_inventory(101, 5)
+    assert repository.update_inventory_stock(101, 8) == 1
+
+    repository.set_location_stock(101, 'BOG', 3)
+
+    with pytest.raises(LocatedStockError):
+        repository.update_inventory_stock(101, 50)
+    assert repository.get_inventory_by_product_id(101)['available_stock'] == 11
+
+def test_purchase_the_locations_cannot_cover_is_marked_failed(warehouse_repository):
+    """Una compra que rompe la planificación por ubicación no bloquea su partición."""
+    repository = warehouse_repository
+    for product_id in (101, 102):
+        repository.create_inventory(product_id, 0)
+        repository.set_location_stock(product_id, 'BOG', 5)
+    # Ubicaciones desalineadas del total: el descuento pasa por el total pero no por BOG.
+    if isinstance(repository, InMemoryInventoryRepository):
+        repository._locations[101]['BOG']['available_stock'] = 0
+    else:
+        repository._get_connection().execute("UPDATE inventory_locations SET available_stock = 0 WHERE product_id = 101")
+    for tracking_id, product_id in (('t1', 102), ('t2', 101), ('t3', 102)):
+        repository.enqueue_purchase(tracking_id, product_id, 1, 0)
+
+    outcomes = repository.process_purchase_batch(0, 10)
+
+    assert [outcome['status'] for outcome in outcomes] == ['APPLIED', 'FAILED', 'APPLIED']
+    assert repository.get_purchase_request('t2')['status'] == 'FAILED'
+    assert repository.get_stock_map([101, 102]) == {101: 5, 102: 3}
+    assert repository.process_purchase_batch(0, 10) == []
+
+def test_deleting_inventory_removes_its_locations(warehouse_repository):
+    repository = warehouse_repository
+    repository.create_inventory(101, 0)
+    repository.set_location_stock(101, 'BOG', 3)
+
+    repository.delete_inventory(101)
+    repository.create_inventory(101, 0)
+
+    assert repository.get_locations(101) == []
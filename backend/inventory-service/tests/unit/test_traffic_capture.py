@@ -0,0 +1,97 @@
+import glob
+import threading
+from unittest.mock import patch
+
+import pytest
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+
+import middleware.traffic_capture as traffic_capture
+from benchmarks.replay_traffic import find_mismatches, load_trace, replay, summarize_by_route
+from middleware.compression import register_response_compression
+from middleware.traffic_capture import REDACTED, VOLATILE_FIELDS, TrafficRecorder, register_traffic_capture
+
+# -------------------- FIXTURES --------------------
+
+def build_app(stock):
+    app = Flask(__name__)
+    register_response_compression(app)
+    register_traffic_capture(app)
+
+    @app.route('/api/v1/inventory/<int:product_id>')
+    def get_inventory(product_id):
+        return jsonify({'data': {'product_id': product_id, 'available_stock': stock[product_id],
+                                 'last_inventory_update': str(threading.get_ident())}})
+
+    @app.route('/api/v1/inventory/purchase', methods=['POST'])
+    def purchase():
+        body = request.get_json()
+        stock[body['product_id']] -= body['quantity']
+        return jsonify({'data': {'available_stock': stock[body['product_id']]}})
+
+    @app.route('/api/v1/inventory/stream')
+    def stream():
+        return Response(iter(['{"data":', '[]}']), mimetype='application/json')
+
+    return app
+
+@pytest.fixture
+def capture_dir(tmp_path):
+    recorder = TrafficRecorder(str(tmp_path / 'traffic'))
+    with patch.object(traffic_capture, 'TRAFFIC_CAPTURE_ENABLED', True), \
+            patch.object(traffic_capture, 'traffic_recorder', recorder):
+        yield tmp_path / 'traffic'
+
+def capture_traffic(capture_dir):
+    client = build_app({101: 10}).test_client()
+    client.get('/api/v1/inventory/101', headers={'X-API-KEY': 'secreto', 'Accept-Encoding': 'gzip'})
+    client.post('/api/v1/inventory/purchase', json={'product_id': 101, 'quantity': 2, 'api_key': 'x'},
+                headers={'Idempotency-Key': 'k-1'})
+    client.get('/api/v1/inventory/stream')
+    return load_trace(sorted(glob.glob(str(capture_dir / 'traffic-*.jsonl*'))))
+
+# -------------------- PRUEBAS --------------------
+
+def test_capture_records_sanitized_requests_with_timing(capture_dir):
+    records = capture_traffic(capture_dir)
+
+    assert [(r['method'], r['route'], r['status']) for r in records] == [
+        ('GET', '/api/v1/inventory/<int:product_id>', 200),
+        ('POST', '/api/v1/inventory/purchase', 200),
+        ('GET', '/api/v1/inventory/stream', 200),
+    ]
+    get, purchase, stream = records
+    assert get['headers'] == {'Accept-Encoding': 'gzip'}  # X-API-KEY no se guarda
+    assert purchase['headers'] == {'Content-Type': 'application/json', 'Idempotency-Key': 'k-1'}
+    assert purchase['body'] == {'product_id': 101, 'quantity': 2, 'api_key': REDACTED}
+    assert get['duration_ms'] >= 0 and get['response_hash'] is not None
+    assert stream['response_hash'] is None  # No se consume el streaming
+
+def test_volatile_fields_do_not_change_the_fingerprint():
+    first = b'{"data":{"available_stock":3,"last_inventory_update":"10:00"}}'
+    second = b'{"data":{"last_inventory_update":"10:05","available_stock":3}}'
+    assert traffic_capture.response_fingerprint(first) == traffic_capture.response_fingerprint(second)
+    assert traffic_capture.response_fingerprint(first) != traffic_capture.response_fingerprint(b'{"data":{}}')
+
+def test_replay_matches_capture_and_detects_a_diverging_build(capture_dir):
+    records = capture_traffic(capture_dir)
+    with patch.object(traffic_capture, 'TRAFFIC_CAPTURE_ENABLED', False):
+        servers = [make_server('127.0.0.1', 0, build_app({101: stock}), threaded=True) for stock in (10, 11)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        build_a, build_b = (
+            replay(records, f'http://127.0.0.1:{server.server_port}', speed=None, concurrency=1,
+                   timeout=5, ignored_fields=VOLATILE_FIELDS)
+            for server in servers
+        )
+    finally:
+        for server in servers:
+            server.shutdown()
+
+    assert find_mismatches(records, build_a, None) == []
+    assert [m['index'] for m in find_mismatches(records, build_b, build_a)] == [0, 1]
+    rows = summarize_by_route(records, build_a, 'A')
+    assert {row['route'] for row in rows} == {
+        'GET /api/v1/inventory/<int:product_id>', 'POST /api/v1/inventory/purchase', 'GET /api/v1/inventory/stream'
+    }
@@ -18,6 +18,9 @@ const productoSchema = Joi.object({
     }),
 });
 
+// Columnas que un cliente puede pedir con `fields[productos]` (sparse fieldsets de JSON:API).
+const CAMPOS_PRODUCTO = ['name', 'description', 'price', 'is_active', 'created_at', 'updated_at'];
+
 class ProductosService {
 
     // Tarea: Validar la entrada y orquestar la creación
@@ -50,9 +53,14 @@ class ProductosService {
     }
 
     // Tarea: Listar con paginación
-    async listarProductos(pagina = 1, limite = 10) {
+    // `campos` es el valor de `fields[productos]` ("name,price"); los campos desconocidos se ignoran.
+    async listarProductos(pagina = 1, limite = 10, campos) {
         const offset = (pagina - 1) * limite;
-        return productosModel.listarProductos({ limite, offset });
+        if (typeof campos !== 'string') {
+            return productosModel.listarProductos({ limite, offset });
+        }
+        const columnas = CAMPOS_PRODUCTO.filter(campo => campos.split(',').map(c => c.trim()).includes(campo));
+        return productosModel.listarProductos({ limite, offset, columnas });
     }
 
     async actualizarProducto(id, datos) {
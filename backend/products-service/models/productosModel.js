@@ -15,11 +15,13 @@ class ProductosModel {
 
     // Método 2: listarProductos(paginacion)
     // Tarea: Obtener lista paginada de productos activos.
-    async listarProductos({ limite, offset }) {
+    // `columnas` (opcional, ya validadas por el servicio) limita el SELECT a esas columnas más el id.
+    async listarProductos({ limite, offset, columnas }) {
         const pool = await poolPromise;
+        const seleccion = columnas ? ['id', ...columnas].join(', ') : '*';
         // Importante: No usar ORDER BY aquí para evitar errores de índice (firestore instruction).
         // Se recomienda ordenar en JS si es necesario.
-        const query = 'SELECT * FROM products WHERE is_active = 1 LIMIT ? OFFSET ?;';
+        const query = `SELECT ${seleccion} FROM products WHERE is_active = 1 LIMIT ? OFFSET ?;`;
         const [rows] = await pool.query(query, [limite, offset]);
 
         const countQuery = 'SELECT COUNT(*) as total FROM products WHERE is_active = 1;';
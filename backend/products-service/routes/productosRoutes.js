@@ -28,8 +28,9 @@ router.post('/productos', authApiKey, async (req, res, next) => {
 router.get('/productos', async (req, res, next) => {
     try {
         console.log('entro al sistema de productos')
-        const { page = 1, limit = 10 } = req.query;
-        const result = await productosService.listarProductos(parseInt(page), parseInt(limit));
+        const { page = 1, limit = 10, fields = {} } = req.query;
+        // Sparse fieldsets de JSON:API: ?fields[productos]=name,price
+        const result = await productosService.listarProductos(parseInt(page), parseInt(limit), fields.productos);
 
         // Formato JSON API (arreglo de recursos)
         res.status(200).json({
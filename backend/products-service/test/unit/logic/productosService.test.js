@@ -43,6 +43,25 @@ describe('ProductosService', () => {
         });
     });
 
+    // Tests para listarProductos
+    describe('listarProductos', () => {
+        it('debe pedir al modelo solo los campos conocidos de fields[productos]', async () => {
+            productosModel.listarProductos.mockResolvedValue({ data: [], meta: {} });
+
+            await productosService.listarProductos(2, 10, 'name, price,password');
+
+            expect(productosModel.listarProductos).toHaveBeenCalledWith({ limite: 10, offset: 10, columnas: ['name', 'price'] });
+        });
+
+        it('debe pedir todas las columnas si no hay fields[productos]', async () => {
+            productosModel.listarProductos.mockResolvedValue({ data: [], meta: {} });
+
+            await productosService.listarProductos(1, 5);
+
+            expect(productosModel.listarProductos).toHaveBeenCalledWith({ limite: 5, offset: 0 });
+        });
+    });
+
     // Tests para obtenerProducto
     describe('obtenerProducto', () => {
         it('debe devolver un producto si existe', async () => {
@@ -65,6 +65,16 @@ describe('ProductosModel', () => {
         expect(result.meta.total).toBe(10);
     });
 
+    test('listarProductos debe seleccionar solo el id y las columnas pedidas', async () => {
+        pool.query
+            .mockResolvedValueOnce([[{ id: 1, name: 'P1', price: '10.00' }]])
+            .mockResolvedValueOnce([[{ total: 1 }]]);
+
+        await productosModel.listarProductos({ limite: 5, offset: 0, columnas: ['name', 'price'] });
+
+        expect(pool.query).toHaveBeenCalledWith('SELECT id, name, price FROM products WHERE is_active = 1 LIMIT ? OFFSET ?;', [5, 0]);
+    });
+
     // Test para actualizarProducto
     test('actualizarProducto debe ejecutar UPDATE y devolver affectedRows', async () => {
         const datosUpdate = { name: 'Nuevo Nombre', price: 150 };
@@ -0,0 +1,36 @@
+-- DDL File: 03_idempotency_keys.sql
+-- Purpose: Storage for Idempotency-Key replays of POST /api/v1/inventory/purchase.
+-- Technology: MySQL (InnoDB Engine, Event Scheduler for automatic expiration)
+
+SET NAMES utf8mb4;
+
+-- --------------------------------------------------------
+-- TABLE: idempotency_keys (Managed by Inventory Microservice)
+-- --------------------------------------------------------
+-- The row is inserted in the same transaction as the stock decrement, so a
+-- stored key always means the purchase was committed exactly once.
+DROP TABLE IF EXISTS `idempotency_keys`;
+CREATE TABLE `idempotency_keys` (
+  -- Byte-exact, NO PAD collation: keys differing only in case or trailing spaces are distinct.
+  `idempotency_key` VARCHAR(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_bin NOT NULL COMMENT 'Client supplied Idempotency-Key header (PK)',
+  `request_hash` CHAR(64) NOT NULL COMMENT 'SHA-256 of the canonical request body, detects key reuse with a different payload',
+  `response_status` SMALLINT UNSIGNED NOT NULL COMMENT 'HTTP status of the first execution',
+  `response_body` JSON NOT NULL COMMENT 'Response body replayed to retries',
+  `created_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT 'First execution date',
+  `expires_at` TIMESTAMP NOT NULL COMMENT 'After this date the key is ignored and purged',
+
+  PRIMARY KEY (`idempotency_key`),
+  KEY `idx_expires_at` (`expires_at`) -- Optimizes the purge event
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Stored responses for idempotent purchase retries.';
+
+-- --------------------------------------------------------
+-- EVENT: automatic purge of expired idempotency keys
+-- --------------------------------------------------------
+SET GLOBAL event_scheduler = ON;
+
+DROP EVENT IF EXISTS `evt_purge_expired_idempotency_keys`;
+CREATE EVENT `evt_purge_expired_idempotency_keys`
+  ON SCHEDULE EVERY 10 MINUTE
+  COMMENT 'Deletes expired Idempotency-Key records in bounded batches'
+  DO
+    DELETE FROM `idempotency_keys` WHERE `expires_at` < NOW() LIMIT 10000;
@@ -0,0 +1,10 @@
+-- DDL File: 04_inventory_version.sql
+-- Purpose: Row version for optimistic concurrency (compare-and-set) on inventory writes.
+-- Technology: MySQL (InnoDB Engine)
+
+SET NAMES utf8mb4;
+
+-- Every write path increments `version`; PUT /api/v1/inventory/<product_id>/stock
+-- accepts If-Match / expected_version and only applies when the version still matches.
+ALTER TABLE `inventory`
+  ADD COLUMN `version` INT UNSIGNED NOT NULL DEFAULT 0 COMMENT 'Row version, incremented on every stock change (optimistic concurrency)' AFTER `location`;
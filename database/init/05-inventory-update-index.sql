@@ -0,0 +1,11 @@
+-- DDL File: 05_inventory_update_index.sql
+-- Purpose: Index for the stock change watcher (GET /api/v1/inventory/stream).
+-- Technology: MySQL (InnoDB Engine)
+
+SET NAMES utf8mb4;
+
+-- The watcher pages through `inventory` by the keyset (last_inventory_update, product_id):
+-- the timestamp has one-second resolution, so product_id breaks ties and every page resumes
+-- exactly after the last row read. Without this index every poll would scan the whole table.
+ALTER TABLE `inventory`
+  ADD KEY `idx_inventory_changes` (`last_inventory_update`, `product_id`);
@@ -0,0 +1,45 @@
+-- DDL File: 06_purchase_outbox.sql
+-- Purpose: Durable outbox for asynchronous purchases (POST /api/v1/inventory/purchase with Prefer: respond-async).
+-- Technology: MySQL (InnoDB Engine, Event Scheduler for automatic expiration)
+
+SET NAMES utf8mb4;
+
+-- --------------------------------------------------------
+-- TABLE: purchase_outbox (Managed by Inventory Microservice)
+-- --------------------------------------------------------
+-- A request is accepted (202) once its row is committed here. Workers drain the
+-- PENDING rows of one partition_key in id order, decrementing the stock and setting
+-- the outcome in the same transaction, so each purchase is applied exactly once.
+-- A purchase that can never be applied (its locations do not cover a decrement the
+-- total allowed) is marked FAILED without touching the stock, so it does not block
+-- the partition by failing every retry of its batch.
+DROP TABLE IF EXISTS `purchase_outbox`;
+CREATE TABLE `purchase_outbox` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT COMMENT 'Arrival order (PK)',
+  `tracking_id` CHAR(32) NOT NULL COMMENT 'Identifier returned to the client to poll the outcome',
+  `product_id` BIGINT UNSIGNED NOT NULL COMMENT 'Purchased product (same type as inventory.product_id)',
+  `quantity` INT UNSIGNED NOT NULL COMMENT 'Purchased quantity',
+  `partition_key` SMALLINT UNSIGNED NOT NULL COMMENT 'product_id % ASYNC_PURCHASE_PARTITIONS, one worker per partition',
+  `status` ENUM('PENDING', 'APPLIED', 'INSUFFICIENT_STOCK', 'NOT_FOUND', 'FAILED') NOT NULL DEFAULT 'PENDING',
+  `available_stock` INT NULL COMMENT 'Stock after the purchase (or current stock when rejected)',
+  `created_at` TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) COMMENT 'Acceptance date',
+  `processed_at` TIMESTAMP(3) NULL COMMENT 'Date the outcome was committed',
+
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `idx_unique_tracking_id` (`tracking_id`),
+  KEY `idx_pending_partition` (`status`, `partition_key`, `id`) -- Drain order per partition
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Accepted asynchronous purchases and their outcome.';
+
+-- --------------------------------------------------------
+-- EVENT: purge of processed purchases older than 7 days
+-- --------------------------------------------------------
+SET GLOBAL event_scheduler = ON;
+
+DROP EVENT IF EXISTS `evt_purge_processed_purchases`;
+CREATE EVENT `evt_purge_processed_purchases`
+  ON SCHEDULE EVERY 1 HOUR
+  COMMENT 'Deletes processed asynchronous purchases in bounded batches'
+  DO
+    DELETE FROM `purchase_outbox`
+    WHERE `status` <> 'PENDING' AND `processed_at` < NOW() - INTERVAL 7 DAY
+    LIMIT 10000;
@@ -0,0 +1,49 @@
+-- DDL File: 07_stock_alerts.sql
+-- Purpose: Per-product reorder thresholds and the low-stock alerts recorded when a row crosses its threshold.
+-- Technology: MySQL (InnoDB Engine, Event Scheduler for automatic expiration)
+
+SET NAMES utf8mb4;
+
+-- With LOW_STOCK_ALERTS_ENABLED the write paths compare the new stock with the threshold
+-- (reorder_threshold, or LOW_STOCK_DEFAULT_THRESHOLD when NULL) inside the same transaction.
+-- `below_threshold` remembers the side of the threshold the row is on, so an alert is only
+-- recorded when a write moves the row across it: detection costs O(changes), not O(table).
+ALTER TABLE `inventory`
+  ADD COLUMN `reorder_threshold` INT UNSIGNED NULL COMMENT 'Low-stock threshold for this product (NULL: LOW_STOCK_DEFAULT_THRESHOLD)' AFTER `version`,
+  ADD COLUMN `below_threshold` TINYINT(1) NOT NULL DEFAULT 0 COMMENT 'Whether available_stock was below the threshold after the last evaluated write' AFTER `reorder_threshold`;
+
+-- --------------------------------------------------------
+-- TABLE: stock_alerts (Managed by Inventory Microservice)
+-- --------------------------------------------------------
+-- One row per threshold crossing: LOW_STOCK when the stock drops below the threshold and
+-- RESTOCKED when it gets back to it or above. Read through GET /api/v1/inventory/alerts
+-- with keyset pagination on `id`. Ids are assigned at insert time, not at commit time, so
+-- a page stops at the first alert younger than LOW_STOCK_ALERT_SETTLE_SECONDS. This is a
+-- heuristic: alerts are inserted at the end of short transactions, but a transaction that
+-- takes longer than the window to commit can still leave its alert behind a reader's cursor.
+DROP TABLE IF EXISTS `stock_alerts`;
+CREATE TABLE `stock_alerts` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT COMMENT 'Crossing order (PK, pagination key)',
+  `product_id` BIGINT UNSIGNED NOT NULL COMMENT 'Product whose stock crossed its threshold',
+  `kind` ENUM('LOW_STOCK', 'RESTOCKED') NOT NULL COMMENT 'Direction of the crossing',
+  `available_stock` INT UNSIGNED NOT NULL COMMENT 'Stock right after the crossing write',
+  `threshold` INT UNSIGNED NOT NULL COMMENT 'Threshold in effect at the crossing',
+  `created_at` TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) COMMENT 'Crossing date (pagination settle horizon)',
+
+  PRIMARY KEY (`id`),
+  KEY `idx_created_at` (`created_at`) -- Expiration
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Low-stock threshold crossings.';
+
+-- --------------------------------------------------------
+-- EVENT: purge of alerts older than 30 days
+-- --------------------------------------------------------
+SET GLOBAL event_scheduler = ON;
+
+DROP EVENT IF EXISTS `evt_purge_stock_alerts`;
+CREATE EVENT `evt_purge_stock_alerts`
+  ON SCHEDULE EVERY 1 HOUR
+  COMMENT 'Deletes stock alerts older than 30 days in bounded batches'
+  DO
+    DELETE FROM `stock_alerts`
+    WHERE `created_at` < NOW() - INTERVAL 30 DAY
+    LIMIT 10000;
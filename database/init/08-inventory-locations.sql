@@ -0,0 +1,38 @@
+-- DDL File: 08_inventory_locations.sql
+-- Purpose: Per-location (warehouse) stock rows; inventory.available_stock keeps the per-product total.
+-- Technology: MySQL (InnoDB Engine)
+
+SET NAMES utf8mb4;
+
+-- --------------------------------------------------------
+-- TABLE: inventory_locations (Managed by Inventory Microservice)
+-- --------------------------------------------------------
+-- With MULTI_WAREHOUSE_ENABLED, a product with rows here has its stock split across
+-- locations, and inventory.available_stock is maintained as their sum in the same
+-- transaction as every change. Availability reads still touch a single inventory row.
+-- Purchases pick the locations with ALLOCATION_STRATEGY (nearest, largest or split).
+-- Lock order: the inventory row first, then its location rows.
+DROP TABLE IF EXISTS `inventory_locations`;
+CREATE TABLE `inventory_locations` (
+  `id` BIGINT UNSIGNED NOT NULL AUTO_INCREMENT COMMENT 'Unique location row identifier (PK)',
+  `product_id` BIGINT UNSIGNED NOT NULL COMMENT 'Product whose stock is stored at this location',
+  `location_code` VARCHAR(50) NOT NULL COMMENT 'Warehouse code (e.g., BOG-01)',
+  `available_stock` INT UNSIGNED NOT NULL DEFAULT 0 COMMENT 'Available stock at this location',
+  `priority` SMALLINT UNSIGNED NOT NULL DEFAULT 100 COMMENT 'Allocation rank: lower is nearer to the dispatch point',
+  `last_update` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `idx_product_location` (`product_id`, `location_code`),
+
+  CONSTRAINT `fk_location_inventory`
+    FOREIGN KEY (`product_id`)
+    REFERENCES `inventory` (`product_id`)
+    ON DELETE CASCADE,
+
+  CONSTRAINT `chk_location_stock_non_negative` CHECK (`available_stock` >= 0)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Stock per product and warehouse; inventory.available_stock is their total.';
+
+-- Asynchronous purchases report the locations they were dispatched from, like the
+-- synchronous responses ([{"location_code", "quantity"}]; NULL until APPLIED).
+ALTER TABLE `purchase_outbox`
+  ADD COLUMN `allocations` JSON NULL COMMENT 'Locations the purchase was allocated from' AFTER `available_stock`;
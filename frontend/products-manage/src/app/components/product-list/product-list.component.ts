@@ -1,8 +1,8 @@
-import { Component, OnInit } from '@angular/core';
+import { Component, OnDestroy, OnInit } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { FormsModule } from '@angular/forms'; // Importar FormsModule
 import { catchError, tap } from 'rxjs/operators';
-import { of } from 'rxjs';
+import { of, Subscription } from 'rxjs';
 import { ProductWithStock } from '../../../models/product.model';
 import { InventoryService } from '../../../services/inventory.service';
 
@@ -16,11 +16,13 @@ type ProductForCart = ProductWithStock & { purchaseQuantity: number | null };
   templateUrl: './product-list.component.html',
   styleUrl: './product-list.component.css'
 })
-export class ProductListComponent implements OnInit {
+export class ProductListComponent implements OnInit, OnDestroy {
 
   products: ProductForCart[] = [];
   isLoading = true;
   errorMessage: string | null = null;
+  // Suscripción SSE a los cambios de stock de los productos visibles
+  private stockSubscription: Subscription | null = null;
 
   constructor(
     private inventoryService: InventoryService
@@ -30,6 +32,10 @@ export class ProductListComponent implements OnInit {
     this.loadProducts();
   }
 
+  ngOnDestroy(): void {
+    this.stopWatchingStock();
+  }
+
   loadProducts(): void {
     this.isLoading = true;
     this.errorMessage = null;
@@ -44,9 +50,38 @@ export class ProductListComponent implements OnInit {
       // Mapear la respuesta para añadir la propiedad 'purchaseQuantity'
       this.products = response.data.map(p => ({ ...p, purchaseQuantity: null }));
       this.isLoading = false;
+      this.watchStock();
+    });
+  }
+
+  /**
+   * Mantiene el stock actualizado con los eventos del servidor en lugar de volver a consultar.
+   */
+  private watchStock(): void {
+    this.stopWatchingStock();
+    const productIds = this.products.map(p => p.attributes.id);
+    if (productIds.length === 0) {
+      return;
+    }
+    this.stockSubscription = this.inventoryService.watchStock(productIds).subscribe({
+      next: change => {
+        const product = this.products.find(p => p.attributes.id === change.product_id);
+        if (product) {
+          product.attributes.available_stock = change.available_stock;
+        }
+      },
+      error: err => {
+        console.error('Stock stream closed:', err);
+        this.stockSubscription = null;
+      }
     });
   }
 
+  private stopWatchingStock(): void {
+    this.stockSubscription?.unsubscribe();
+    this.stockSubscription = null;
+  }
+
   purchase(product: ProductForCart): void {
     if (!product.purchaseQuantity || product.purchaseQuantity <= 0) {
       this.errorMessage = 'Por favor, ingrese una cantidad válida.';
@@ -79,8 +114,9 @@ export class ProductListComponent implements OnInit {
       })
     ).subscribe(result => {
       // Si la compra fue exitosa (result no es null)
-      if (result) {
-        this.loadProducts(); // Recargar productos para actualizar el stock
+      // Con el stream activo el nuevo stock llega por SSE; sin él se recarga la lista.
+      if (result && !this.stockSubscription) {
+        this.loadProducts();
       }
     });
   }
@@ -1,8 +1,15 @@
-import { Injectable } from '@angular/core';
+import { Injectable, NgZone } from '@angular/core';
 import { HttpClient, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
 import { ApiResponse } from '../models/product.model';
 
+/** Cambio de stock publicado por el endpoint SSE /stream. */
+export interface StockChange {
+  product_id: number;
+  available_stock: number;
+  version: number | null;
+}
+
 @Injectable({
   providedIn: 'root'
 })
@@ -11,7 +18,7 @@ export class InventoryService {
   // La URL base utiliza el proxy configurado en proxy.json
   private apiUrl = '/inventory-services/api/v1/inventory';
 
-  constructor(private http: HttpClient) { }
+  constructor(private http: HttpClient, private zone: NgZone) { }
 
   /**
    * Obtiene la lista de productos con su stock disponible.
@@ -28,4 +35,33 @@ export class InventoryService {
     const body = { product_id: productId, quantity: quantity };
     return this.http.post(`${this.apiUrl}/purchase`, body);
   }
-}
\ No newline at end of file
+
+  /**
+   * Se suscribe a los cambios de stock de los productos indicados (Server-Sent Events).
+   * Emite primero el stock actual (snapshot) y luego cada cambio; EventSource reconecta solo.
+   * Al cancelar la suscripción se cierra la conexión.
+   */
+  watchStock(productIds: number[]): Observable<StockChange> {
+    return new Observable<StockChange>(subscriber => {
+      const url = `${this.apiUrl}/stream?product_ids=${productIds.join(',')}`;
+      const source = new EventSource(url);
+
+      source.addEventListener('snapshot', (event: MessageEvent) => {
+        const snapshot: { data: StockChange[] } = JSON.parse(event.data);
+        this.zone.run(() => snapshot.data.forEach(change => subscriber.next(change)));
+      });
+      source.addEventListener('stock', (event: MessageEvent) => {
+        const change: StockChange = JSON.parse(event.data);
+        this.zone.run(() => subscriber.next(change));
+      });
+      source.onerror = () => {
+        // CLOSED indica que el navegador no volverá a reconectar (p. ej. 4xx/5xx).
+        if (source.readyState === EventSource.CLOSED) {
+          this.zone.run(() => subscriber.error(new Error('El stream de stock se cerró.')));
+        }
+      };
+
+      return () => source.close();
+    });
+  }
+}